@@ -0,0 +1,732 @@
+"""bench.py -- throughput benchmarks of the EasyMoney functions.
+
+Runs each case (a function called on generated data) for each input
+size and input kind it accepts, and reports the best time per call and
+the throughput in items per second.  Results are written as JSON and
+compared against a stored baseline: a case whose throughput dropped by
+more than the threshold is a regression, and the run exits with status
+1 when there is one.
+
+    python benchmarks/bench.py --save-baseline
+    python benchmarks/bench.py                   # compare to the baseline
+    python benchmarks/bench.py -k SUM --sizes 10,1000,10000000 \\
+        --kinds list,numpy --output results.json
+
+Input kinds are a list, an array.array('d'), a NumPy array (skipped
+without NumPy) and a generator; a generator is consumed by the call, so
+its timing includes producing the items (from a list).  Cases that are
+too slow for the largest sizes set a maxSize and are skipped above it.
+Timings depend on the machine: keep one baseline per machine.
+
+Every implemented public EasyMoney method is covered by a case;
+uncovered() lists those that are not, and the tests keep it empty.
+"""
+
+import argparse
+import array
+import datetime
+import fnmatch
+import inspect
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, os.path.join(HERE, os.pardir, 'easymoney'))
+
+import easymoney
+import money
+import tables
+import wire
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+KINDS = ('list', 'array', 'numpy', 'generator')
+ALL = KINDS
+SEQUENCES = ('list', 'array', 'numpy')
+
+SIZES = (10, 1000, 100000)
+
+BASELINE = os.path.join(HERE, 'baseline.json')
+THRESHOLD = 0.25
+
+MIN_TIME = 0.05
+REPEAT = 3
+
+
+def _values(n, seed=20):
+
+    """Returns n positive floats, a random walk of prices."""
+
+    rng = random.Random(seed)
+    x = 100.0
+    values = []
+
+    for i in xrange(n):
+        x = max(1.0, x + rng.gauss(0, 1))
+        values.append(round(x, 2))
+
+    return values
+
+
+def _serials(n, seed=21):
+
+    rng = random.Random(seed)
+    return [float(rng.randint(36526, 47482)) for i in xrange(n)]
+
+
+def _input(values, kind):
+
+    """Returns a function that gives values as kind, fresh for each call
+    where kind needs it."""
+
+    if kind == 'list':
+        return lambda: values
+
+    if kind == 'array':
+        a = array.array('d', values)
+        return lambda: a
+
+    if kind == 'numpy':
+        a = numpy.array(values, dtype=numpy.float64)
+        return lambda: a
+
+    return lambda: (x for x in values)
+
+
+class Case(object):
+
+    """A benchmark: call(emoney, *inputs) on columns made by data(n).
+
+    data -- returns a list of columns (lists) of n items each; all of them
+            are passed in the same input kind
+    extra -- returns the arguments that follow the columns (not timed)
+    covers -- the EasyMoney methods the case times; by default the first
+              word of the name, with the f prefix where the method has one
+    """
+
+    def __init__(self, name, call, data=None, kinds=ALL, maxSize=None,
+                 extra=None, covers=None):
+
+        if covers is None:
+            word = name.split()[0]
+            covers = (word if hasattr(easymoney.EasyMoney, word)
+                      else 'f' + word,)
+
+        self.name = name
+        self.covers = covers
+        self.call = call
+        self.data = data or (lambda n: [_values(n)])
+        self.kinds = kinds
+        self.maxSize = maxSize
+        self.extra = extra
+
+    def runs(self, n, kind):
+
+        """Returns the callable to time, or None if the case does not take
+        n items of kind."""
+
+        if kind not in self.kinds or (kind == 'numpy' and numpy is None):
+            return None
+
+        if self.maxSize is not None and n > self.maxSize:
+            return None
+
+        columns = [_input(c, kind) for c in self.data(n)]
+        extra = self.extra(n) if self.extra else ()
+        emoney = easymoney.EasyMoney()
+        call = self.call
+
+        return lambda: call(emoney, *([c() for c in columns] + list(extra)))
+
+
+def _pairs(n):
+    return [_values(n, 22), _values(n, 23)]
+
+
+def _regressionData(n):
+
+    ys = _values(n)
+    return [ys, [float(i) for i in xrange(n)]]
+
+
+def _cashFlows(n):
+
+    flows = _values(n)
+    flows[0] = -sum(flows) * 0.8
+    return [flows]
+
+
+def _dates(n):
+
+    starts = _serials(n)
+    return [starts, [s + 400 for s in starts]]
+
+
+def _matrix(n):
+
+    side = max(2, int(math.sqrt(n)))
+    rng = random.Random(24)
+    m = [[rng.uniform(-1, 1) for j in xrange(side)] for i in xrange(side)]
+
+    for i in xrange(side):
+        m[i][i] += side
+
+    return m
+
+
+def _database(n):
+
+    rng = random.Random(25)
+    rows = [['Region', 'Amount']]
+    rows.extend([rng.choice(['north', 'south', 'east', 'west']),
+                 rng.uniform(0, 1000)] for i in xrange(n))
+    return rows
+
+
+def _dateParts(n):
+
+    rng = random.Random(26)
+    return [(rng.randint(1990, 2030), rng.randint(1, 12), rng.randint(1, 28))
+            for i in xrange(n)]
+
+
+def _rows(n, seed=27):
+
+    """Returns rows (settlement, maturity) of serials for the bond and
+    business day functions, maturity 1 to 10 years later."""
+
+    rng = random.Random(seed)
+    return [[(s, s + rng.randint(365, 3650)) for s in _serials(n, seed)]]
+
+
+def _rates(n):
+    return [[(0.0001 + i % 100 / 10000.0,) for i in xrange(n)]]
+
+
+def _words(n):
+
+    rng = random.Random(28)
+    letters = 'abcdefghijKLMNOPQRST'
+    return [[(''.join(rng.choice(letters) for j in xrange(8)),)
+             for i in xrange(n)]]
+
+
+def _nothing(n):
+
+    """n empty rows, for the functions of the current time."""
+
+    return [[()] * n]
+
+
+def _each(f):
+
+    """A call that applies f to every row of one list (scalar functions)."""
+
+    return lambda e, rows: [f(e, *r) for r in rows]
+
+
+def _dcase(name):
+
+    """A database function over n records, selecting about a quarter."""
+
+    return Case(name, lambda e, db: getattr(e, name)(
+                    db, 'Amount', [['Region'], ['north']]),
+                lambda n: [_database(n)], kinds=('list',), maxSize=1000000)
+
+
+def _sheet(n):
+
+    """Returns a sheet of n cells in the README cell format."""
+
+    values = _values(n)
+    cells = dict(('A%d' % (i + 1), {'value': v, 'type': 'number'})
+                 for i, v in enumerate(values))
+
+    for i in xrange(0, n, 10):
+        cells['A%d' % (i + 1)] = {'value': '=A%d * 2' % (i + 2),
+                                  'type': 'number', 'label': 'row %d' % i}
+
+    return cells
+
+
+def _moneyMode():
+
+    e = easymoney.EasyMoney()
+    e.money = money.Context()
+    return e
+
+
+CASES = [
+    # aggregates
+    Case('AVERAGE', lambda e, x: e.AVERAGE(x)),
+    Case('AVERAGEA', lambda e, x: e.AVERAGEA(x), kinds=('list',)),
+    Case('COUNT', lambda e, x: e.COUNT(x), kinds=SEQUENCES),
+    Case('COUNTA', lambda e, x: e.COUNTA(x), kinds=('list',)),
+    Case('GEOMEAN', lambda e, x: e.fGEOMEAN(x)),
+    Case('HARMEAN', lambda e, x: e.HARMEAN(x)),
+    Case('MAX', lambda e, x: e.MAX(x)),
+    Case('MAXA', lambda e, x: e.MAXA(x), kinds=('list',)),
+    Case('MIN', lambda e, x: e.MIN(x)),
+    Case('MINA', lambda e, x: e.MINA(x), kinds=('list',)),
+    Case('SUM', lambda e, x: e.SUM(x), kinds=SEQUENCES),
+    Case('SUMSQ', lambda e, x: e.SUMSQ(x)),
+    Case('FVSCHEDULE', lambda e, x: e.FVSCHEDULE(1000.0, x),
+         lambda n: [[r for (r,) in _rates(n)[0]]], kinds=('list',)),
+    Case('SUM money', lambda e, x: _moneyMode().SUM(x), kinds=('list',),
+         maxSize=1000000),
+
+    # order statistics and windows
+    Case('MEDIAN', lambda e, x: e.MEDIAN(x)),
+    Case('PERCENTILE', lambda e, x: e.fPERCENTILE(x, 0.9)),
+    Case('QUARTILE', lambda e, x: e.fQUARTILE(x, 1)),
+    Case('PERCENTILE_EXC', lambda e, x: e.fPERCENTILE_EXC(x, 0.9)),
+    Case('PERCENTILE_INC', lambda e, x: e.fPERCENTILE_INC(x, 0.9)),
+    Case('QUARTILE_EXC', lambda e, x: e.fQUARTILE_EXC(x, 1)),
+    Case('QUARTILE_INC', lambda e, x: e.fQUARTILE_INC(x, 1)),
+    Case('TRIMMEAN', lambda e, x: e.TRIMMEAN(x, 0.2)),
+    Case('ROLLING AVERAGE', lambda e, x: e.fROLLING(x, 20), maxSize=1000000),
+    Case('ROLLING MEDIAN', lambda e, x: e.fROLLING(x, 20, 'MEDIAN'),
+         maxSize=1000000),
+
+    # arrays
+    Case('SUMPRODUCT', lambda e, x, y: e.fSUMPRODUCT(x, y), _pairs),
+    Case('SUMX2MY2', lambda e, x, y: e.fSUMX2MY2(x, y), _pairs),
+    Case('SUMX2PY2', lambda e, x, y: e.fSUMX2PY2(x, y), _pairs),
+    Case('SUMXMY2', lambda e, x, y: e.fSUMXMY2(x, y), _pairs),
+    Case('LINEST', lambda e, y, x: e.fLINEST(y, x), _regressionData,
+         kinds=('list',)),
+    Case('TREND', lambda e, y, x: e.fTREND(y, x), _regressionData,
+         kinds=('list',)),
+    Case('GROWTH', lambda e, y, x: e.fGROWTH(y, x), _regressionData,
+         kinds=('list',)),
+    Case('LOGEST', lambda e, y, x: e.fLOGEST(y, x), _regressionData,
+         kinds=('list',)),
+    Case('TRANSPOSE', lambda e, m: e.fTRANSPOSE(m), lambda n: [_matrix(n)],
+         kinds=('list',), maxSize=1000000),
+    Case('MMULT', lambda e, m: e.fMMULT(m, m), lambda n: [_matrix(n)],
+         kinds=('list',), maxSize=1000000),
+    Case('MINVERSE', lambda e, m: e.fMINVERSE([list(r) for r in m]),
+         lambda n: [_matrix(n)], kinds=('list',), maxSize=1000000),
+    Case('MDETERM', lambda e, m: e.fMDETERM([list(r) for r in m]),
+         lambda n: [_matrix(n)], kinds=('list',), maxSize=1000000),
+
+    # cash flows
+    Case('NPV', lambda e, x: e.NPV(0.05, x), _cashFlows, kinds=SEQUENCES),
+    Case('IRR', lambda e, x: e.IRR(x), _cashFlows, kinds=('list',),
+         maxSize=1000000),
+    Case('XNPV', lambda e, x, d: e.XNPV(0.05, x, d),
+         lambda n: [_cashFlows(n)[0], sorted(_serials(n))],
+         kinds=('list',), maxSize=1000000),
+
+    Case('MIRR', lambda e, x: e.MIRR(x, 0.05, 0.07), _cashFlows,
+         kinds=('list',), maxSize=1000000),
+    Case('XIRR', lambda e, x, d: e.XIRR(x, d),
+         lambda n: [_cashFlows(n)[0], sorted(_serials(n))],
+         kinds=('list',), maxSize=1000000),
+
+    # loans, n periods per call
+    Case('AMORTIZE', lambda e, n: e.AMORTIZE(0.005, n, 250000.0),
+         lambda n: [], kinds=('list',), maxSize=1000000,
+         extra=lambda n: (n,)),
+    Case('CUMIPMT', lambda e, n: e.CUMIPMT(0.005, n, 250000.0, 1, n, 0),
+         lambda n: [], kinds=('list',), maxSize=1000000,
+         extra=lambda n: (n,)),
+    Case('CUMPRINC', lambda e, n: e.CUMPRINC(0.005, n, 250000.0, 1, n, 0),
+         lambda n: [], kinds=('list',), maxSize=1000000,
+         extra=lambda n: (n,)),
+
+    # dates and day counts, a column of dates per call
+    Case('DAYS360', lambda e, s, t: e.fDAYS360(s, t), _dates,
+         kinds=SEQUENCES),
+    Case('YEARFRAC', lambda e, s, t: e.fYEARFRAC(s, t, 1), _dates,
+         kinds=SEQUENCES),
+    Case('NETWORKDAYS', lambda e, s, t: e.fNETWORKDAYS(s, t), _dates,
+         kinds=SEQUENCES),
+    Case('PRICE', lambda e, s, t: e.PRICE(s, t, 0.05, 0.06, 100.0, 2),
+         _dates, kinds=('list', 'numpy'), maxSize=1000000),
+
+    # databases
+    _dcase('DAVERAGE'),
+    _dcase('DCOUNT'),
+    _dcase('DCOUNTA'),
+    Case('DGET', lambda e, db: e.DGET(db, 'Amount', [['Region'], ['centre']]),
+         lambda n: [_database(n) + [['centre', 1.0]]], kinds=('list',),
+         maxSize=1000000),
+    _dcase('DMAX'),
+    _dcase('DMIN'),
+    _dcase('DPRODUCT'),
+    _dcase('DSTDEV'),
+    _dcase('DSTDEVP'),
+    _dcase('DVAR'),
+    _dcase('DVARP'),
+    Case('DSUM', lambda e, db: e.DSUM(db, 'Amount', [['Region'], ['north']]),
+         lambda n: [_database(n)], kinds=('list',), maxSize=1000000),
+    Case('DSUM indexed',
+         lambda e, t: e.DSUM(t, 'Amount', [['Region'], ['north']]),
+         lambda n: [tables.Table(_database(n))], kinds=('list',),
+         maxSize=1000000),
+
+    # scalar functions, called once per row
+    Case('DATE', _each(lambda e, y, m, d: e.fDATE(y, m, d)),
+         lambda n: [_dateParts(n)], kinds=('list',), maxSize=1000000),
+    Case('PMT', _each(lambda e, r: e.PMT(r, 360, 250000.0)),
+         lambda n: [[(0.0001 + i % 100 / 10000.0,) for i in xrange(n)]],
+         kinds=('list',), maxSize=1000000),
+    Case('DAY', _each(lambda e, s: e.fDAY(s)),
+         lambda n: [[(s,) for s in _serials(n)]], kinds=('list',),
+         maxSize=1000000),
+    Case('MONTH', _each(lambda e, s: e.fMONTH(s)),
+         lambda n: [[(s,) for s in _serials(n)]], kinds=('list',),
+         maxSize=1000000, covers=('fMONTH',)),
+    Case('YEAR', _each(lambda e, s: e.fYEAR(s)),
+         lambda n: [[(s,) for s in _serials(n)]], kinds=('list',),
+         maxSize=1000000),
+    Case('WEEKDAY', _each(lambda e, s: e.fWEEKDAY(s, 2)),
+         lambda n: [[(s,) for s in _serials(n)]], kinds=('list',),
+         maxSize=1000000),
+    Case('isLeapYear', _each(lambda e, y, m, d: e.isLeapYear(y)),
+         lambda n: [_dateParts(n)], kinds=('list',), maxSize=1000000),
+    Case('daysInA360DayYear',
+         _each(lambda e, y, m, d: e.daysInA360DayYear(d, m, y, d, m, y + 1)),
+         lambda n: [_dateParts(n)], kinds=('list',), maxSize=1000000),
+    Case('NETWORKDAYS_INTL',
+         _each(lambda e, s, t: e.fNETWORKDAYS_INTL(s, t, 7)),
+         _rows, kinds=('list',), maxSize=1000000),
+    Case('WORKDAY', _each(lambda e, s, t: e.fWORKDAY(s, 250)),
+         _rows, kinds=('list',), maxSize=1000000),
+    Case('WORKDAY_INTL', _each(lambda e, s, t: e.fWORKDAY_INTL(s, 250, 7)),
+         _rows, kinds=('list',), maxSize=1000000),
+    Case('COUPDAYBS', _each(lambda e, s, t: e.COUPDAYBS(s, t, 2)),
+         _rows, kinds=('list',), maxSize=1000000),
+    Case('COUPDAYS', _each(lambda e, s, t: e.COUPDAYS(s, t, 2)),
+         _rows, kinds=('list',), maxSize=1000000),
+    Case('COUPDAYSNC', _each(lambda e, s, t: e.COUPDAYSNC(s, t, 2)),
+         _rows, kinds=('list',), maxSize=1000000),
+    Case('COUPNCD', _each(lambda e, s, t: e.COUPNCD(s, t, 2)),
+         _rows, kinds=('list',), maxSize=1000000),
+    Case('COUPNUM', _each(lambda e, s, t: e.COUPNUM(s, t, 2)),
+         _rows, kinds=('list',), maxSize=1000000),
+    Case('COUPPCD', _each(lambda e, s, t: e.COUPPCD(s, t, 2)),
+         _rows, kinds=('list',), maxSize=1000000),
+    Case('DURATION',
+         _each(lambda e, s, t: e.DURATION(s, t, 0.05, 0.06, 2)),
+         _rows, kinds=('list',), maxSize=100000),
+    Case('MDURATION',
+         _each(lambda e, s, t: e.MDURATION(s, t, 0.05, 0.06, 2)),
+         _rows, kinds=('list',), maxSize=100000),
+    Case('YIELD',
+         _each(lambda e, s, t: e.YIELD(s, t, 0.05, 98.0, 100.0, 2)),
+         _rows, kinds=('list',), maxSize=100000),
+    Case('IPMT', _each(lambda e, r: e.IPMT(r, 12, 360, 250000.0)),
+         _rates, kinds=('list',), maxSize=1000000),
+    Case('PPMT', _each(lambda e, r: e.PPMT(r, 12, 360, 250000.0)),
+         _rates, kinds=('list',), maxSize=1000000),
+    Case('FV', _each(lambda e, r: e.FV(r, 360, -1000.0)),
+         _rates, kinds=('list',), maxSize=1000000),
+    Case('PV', _each(lambda e, r: e.PV(r, 360, -1000.0)),
+         _rates, kinds=('list',), maxSize=1000000),
+    Case('fvAdjusted', _each(lambda e, pv: e.fvAdjusted(pv, 10.5, 90, 365)),
+         lambda n: [[(v,) for v in _values(n)]], kinds=('list',),
+         maxSize=1000000),
+    Case('fvCompound', _each(lambda e, pv: e.fvCompound(pv, 10.5, 12)),
+         lambda n: [[(v,) for v in _values(n)]], kinds=('list',),
+         maxSize=1000000),
+    Case('fvSimple', _each(lambda e, pv: e.fvSimple(pv, 10.5)),
+         lambda n: [[(v,) for v in _values(n)]], kinds=('list',),
+         maxSize=1000000),
+    Case('iSimple', _each(lambda e, pv: e.iSimple(pv, 10.5)),
+         lambda n: [[(v,) for v in _values(n)]], kinds=('list',),
+         maxSize=1000000),
+    Case('iSimpleFromFV', _each(lambda e, pv: e.iSimpleFromFV(pv, pv + 1.0)),
+         lambda n: [[(v,) for v in _values(n)]], kinds=('list',),
+         maxSize=1000000),
+    Case('irSimple', _each(lambda e, pv: e.irSimple(pv, pv + 1.0)),
+         lambda n: [[(v,) for v in _values(n)]], kinds=('list',),
+         maxSize=1000000),
+    Case('pvCompound', _each(lambda e, fv: e.pvCompound(fv, 10.5, 12)),
+         lambda n: [[(v,) for v in _values(n)]], kinds=('list',),
+         maxSize=1000000),
+    Case('pvSimple', _each(lambda e, fv: e.pvSimple(fv, 10.5)),
+         lambda n: [[(v,) for v in _values(n)]], kinds=('list',),
+         maxSize=1000000),
+    Case('pvSimpleFromIR', _each(lambda e, fv: e.pvSimpleFromIR(fv, 10.5)),
+         lambda n: [[(v,) for v in _values(n)]], kinds=('list',),
+         maxSize=1000000),
+    Case('ABS', _each(lambda e, x: e.ABS(-x)),
+         lambda n: [[(v,) for v in _values(n)]], kinds=('list',),
+         maxSize=1000000),
+    Case('INT', _each(lambda e, x: e.fINT(x)),
+         lambda n: [[(v,) for v in _values(n)]], kinds=('list',),
+         maxSize=1000000),
+    Case('xlongINT', _each(lambda e, x: e.fxlongINT(x)),
+         lambda n: [[(v,) for v in _values(n)]], kinds=('list',),
+         maxSize=1000000),
+    Case('CODE', _each(lambda e, s: e.fCODE(s)), _words, kinds=('list',),
+         maxSize=1000000),
+    Case('LEN', _each(lambda e, s: e.LEN(s)), _words, kinds=('list',),
+         maxSize=1000000),
+    Case('LOWER', _each(lambda e, s: e.LOWER(s)), _words, kinds=('list',),
+         maxSize=1000000),
+    Case('UPPER', _each(lambda e, s: e.fUPPER(s)), _words, kinds=('list',),
+         maxSize=1000000),
+
+    # the current time, called once per row
+    Case('current time',
+         _each(lambda e: (e.HOUR(), e.MINUTE(), e.MONTH(), e.NOW(),
+                          e.SECOND(), e.TIME(), e.TODAY())),
+         _nothing, kinds=('list',), maxSize=1000000,
+         covers=('HOUR', 'MINUTE', 'MONTH', 'NOW', 'SECOND', 'TIME',
+                 'TODAY')),
+    Case('current time f',
+         _each(lambda e: (e.fDATEVALUE(), e.fEDATE(), e.fEOMONTH(),
+                          e.fHOUR(), e.fMINUTE(), e.fNOW(), e.fSECOND(),
+                          e.fTIME(), e.fTODAY(), e.fDAY(), e.fMONTH(),
+                          e.fYEAR())),
+         _nothing, kinds=('list',), maxSize=1000000,
+         covers=('fDATEVALUE', 'fEDATE', 'fEOMONTH', 'fHOUR', 'fMINUTE',
+                 'fNOW', 'fSECOND', 'fTIME', 'fTODAY')),
+
+    # wire format against JSON cells, per item serialized
+    Case('WIRE dumps column', lambda e, x: wire.dumps(x),
+         kinds=('list', 'numpy')),
+    Case('JSON dumps column', lambda e, x: json.dumps(x), kinds=('list',)),
+    Case('WIRE loads column', lambda e, data: wire.loads(data),
+         lambda n: [wire.dumps(_values(n))], kinds=('list',)),
+    Case('JSON loads column', lambda e, data: json.loads(data),
+         lambda n: [json.dumps(_values(n))], kinds=('list',)),
+    Case('WIRE dumps sheet', lambda e, cells: wire.dumps(cells),
+         lambda n: [_sheet(n)], kinds=('list',), maxSize=1000000),
+    Case('JSON dumps sheet', lambda e, cells: json.dumps(cells),
+         lambda n: [_sheet(n)], kinds=('list',), maxSize=1000000),
+    Case('WIRE loads sheet', lambda e, data: wire.loads(data),
+         lambda n: [wire.dumps(_sheet(n))], kinds=('list',),
+         maxSize=1000000),
+    Case('JSON loads sheet', lambda e, data: json.loads(data),
+         lambda n: [json.dumps(_sheet(n))], kinds=('list',),
+         maxSize=1000000),
+]
+
+
+# public EasyMoney methods that are stubs without a body yet
+NOT_IMPLEMENTED = ('fEXPAND', 'fFREQUENCY', 'fNOEXPAND')
+
+
+def uncovered():
+
+    """Returns the implemented public EasyMoney methods no case covers."""
+
+    covered = set(NOT_IMPLEMENTED)
+
+    for case in CASES:
+        covered.update(case.covers)
+
+    return sorted(name for name in dir(easymoney.EasyMoney)
+                  if not name.startswith('_') and
+                  inspect.ismethod(getattr(easymoney.EasyMoney, name)) and
+                  name not in covered)
+
+
+def measure(f, minTime=MIN_TIME, repeat=REPEAT):
+
+    """Returns the best time of one call to f, in seconds, calling it in
+    loops that run at least minTime each."""
+
+    number = 1
+
+    while True:
+
+        start = time.time()
+
+        for i in xrange(number):
+            f()
+
+        elapsed = time.time() - start
+
+        if elapsed >= minTime:
+            break
+
+        number *= 10 if elapsed < minTime / 10 else 2
+
+    best = elapsed
+
+    for i in xrange(repeat - 1):
+
+        start = time.time()
+
+        for i in xrange(number):
+            f()
+
+        best = min(best, time.time() - start)
+
+    return best / number
+
+
+def key(name, kind, n):
+    return '%s/%s/%d' % (name, kind, n)
+
+
+def run(cases, sizes=SIZES, kinds=KINDS, minTime=MIN_TIME, report=None):
+
+    """Returns the results of cases as a dict of key(name, kind, size) to
+    {'seconds': per call, 'throughput': items per second}."""
+
+    results = {}
+
+    for case in cases:
+        for n in sizes:
+            for kind in kinds:
+
+                f = case.runs(n, kind)
+
+                if f is None:
+                    continue
+
+                seconds = measure(f, minTime)
+                k = key(case.name, kind, n)
+                results[k] = {'seconds': seconds, 'throughput': n / seconds}
+
+                if report is not None:
+                    report(k, results[k])
+
+    return results
+
+
+def environment():
+
+    return {'python': platform.python_version(),
+            'numpy': numpy.__version__ if numpy is not None else None,
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'date': datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')}
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+
+    """Returns the regressions of results against baseline (both dicts as
+    run() returns them), as (key, baseline throughput, throughput, change)
+    sorted by key; change is the relative change of throughput."""
+
+    regressions = []
+
+    for k in sorted(results):
+
+        if k not in baseline:
+            continue
+
+        before = baseline[k]['throughput']
+        after = results[k]['throughput']
+        change = after / before - 1.0
+
+        if change < -threshold:
+            regressions.append((k, before, after, change))
+
+    return regressions
+
+
+def load(path):
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(path, results):
+
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f,
+                  indent=1, sort_keys=True)
+
+
+def select(patterns):
+
+    """Returns the cases whose names match any of the shell patterns."""
+
+    if not patterns:
+        return CASES
+
+    return [c for c in CASES
+            if any(fnmatch.fnmatch(c.name.upper(), p.upper())
+                   for p in patterns)]
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-k', dest='patterns', action='append',
+                        help='run the cases matching this name or shell pattern')
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)),
+                        help='comma separated input sizes (default %(default)s)')
+    parser.add_argument('--kinds', default=','.join(KINDS),
+                        help='comma separated input kinds (default %(default)s)')
+    parser.add_argument('--min-time', type=float, default=MIN_TIME,
+                        help='seconds per timing loop (default %(default)s)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='baseline JSON file (default %(default)s)')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='allowed relative drop of throughput '
+                             '(default %(default)s)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store the results as the baseline')
+    parser.add_argument('--list', action='store_true',
+                        help='list the cases and exit')
+    args = parser.parse_args(argv)
+
+    cases = select(args.patterns)
+
+    if args.list:
+        for c in cases:
+            print '%-20s %s' % (c.name, ','.join(c.kinds))
+        return 0
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    kinds = args.kinds.split(',')
+
+    for kind in kinds:
+        if kind not in KINDS:
+            parser.error('unknown input kind %s' % kind)
+
+    def report(k, result):
+        print '%-40s %12.3g s %14.4g items/s' % (
+            k, result['seconds'], result['throughput'])
+        sys.stdout.flush()
+
+    results = run(cases, sizes, kinds, args.min_time, report)
+
+    if args.output:
+        save(args.output, results)
+
+    if args.save_baseline:
+        save(args.baseline, results)
+        print 'baseline saved to %s' % args.baseline
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print 'no baseline at %s; run with --save-baseline' % args.baseline
+        return 0
+
+    regressions = compare(results, load(args.baseline)['results'],
+                          args.threshold)
+
+    for k, before, after, change in regressions:
+        print 'REGRESSION %-40s %12.4g -> %12.4g items/s (%+.0f%%)' % (
+            k, before, after, change * 100)
+
+    if regressions:
+        return 1
+
+    print 'no regressions beyond %.0f%%' % (args.threshold * 100)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
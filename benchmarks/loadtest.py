@@ -0,0 +1,172 @@
+"""loadtest.py -- load test of the easymoney HTTP server.
+
+Starts a server on a free local port (or uses the one at --url), runs
+--clients threads that each send requests over one keep-alive
+connection for --duration seconds, and reports the p50 and p99 latency
+and the requests per second.  The requests are a mix of function calls
+(scalar calls that the server batches into column calls, and aggregates
+of --size items) and sheet evaluations; -k picks one kind.
+
+    python benchmarks/loadtest.py --clients 32 --duration 10
+    python benchmarks/loadtest.py --url http://127.0.0.1:8000 -k PRICE
+"""
+
+import argparse
+import httplib
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, os.path.join(HERE, os.pardir, 'easymoney'))
+
+
+def _price(rng, size):
+    return '/functions/PRICE', {'args': [39493, 39493 + rng.randint(400, 10000),
+                                         0.0575, rng.uniform(0.01, 0.1), 100, 2, 0]}
+
+
+def _yearfrac(rng, size):
+    return '/functions/YEARFRAC', {'args': [39448, 39448 + rng.randint(1, 3000), 1]}
+
+
+def _irr(rng, size):
+    flows = [-1000.0] + [rng.uniform(100, 400) for i in xrange(8)]
+    return '/functions/IRR', {'args': [flows]}
+
+
+def _average(rng, size):
+    return '/functions/AVERAGE', {'args': [[rng.random() for i in xrange(size)]]}
+
+
+def _sheet(rng, size):
+    cells = dict(('A%d' % i, {'value': rng.random(), 'type': 'number'})
+                 for i in xrange(1, 21))
+    cells['B1'] = {'value': '=SUM(A1:A20) * 2', 'type': 'number'}
+    cells['B2'] = {'value': '=AVERAGE(A1:A20) + B1', 'type': 'number'}
+    return '/evaluate', {'cells': cells, 'names': ['B2']}
+
+
+REQUESTS = {'PRICE': _price, 'YEARFRAC': _yearfrac, 'IRR': _irr,
+            'AVERAGE': _average, 'evaluate': _sheet}
+
+
+def percentile(sortedValues, p):
+
+    """Returns the p-th percentile (0-100) of sorted values, nearest rank."""
+
+    if not sortedValues:
+        return float('nan')
+
+    k = int(round(p / 100.0 * (len(sortedValues) - 1)))
+
+    return sortedValues[k]
+
+
+def client(host, port, kinds, size, stop, latencies, errors, seed):
+
+    rng = random.Random(seed)
+    connection = httplib.HTTPConnection(host, port)
+
+    try:
+        while time.time() < stop:
+
+            path, body = REQUESTS[rng.choice(kinds)](rng, size)
+            data = json.dumps(body)
+            start = time.time()
+            connection.request('POST', path, data,
+                               {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            latencies.append(time.time() - start)
+
+            if response.status != 200:
+                errors.append(response.status)
+    finally:
+        connection.close()
+
+
+def run(host, port, clients, duration, kinds, size):
+
+    """Returns (latencies in seconds, error statuses, elapsed seconds)."""
+
+    latencies = []
+    errors = []
+    stop = time.time() + duration
+    threads = [threading.Thread(target=client,
+                                args=(host, port, kinds, size, stop,
+                                      latencies, errors, i))
+               for i in xrange(clients)]
+    start = time.time()
+
+    for t in threads:
+        t.start()
+
+    for t in threads:
+        t.join()
+
+    return latencies, errors, time.time() - start
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='easymoney server load test')
+    parser.add_argument('--url', help='server to test (default: start one)')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--size', type=int, default=1000,
+                        help='items per aggregate call (default %(default)s)')
+    parser.add_argument('-k', dest='kinds', action='append',
+                        choices=sorted(REQUESTS),
+                        help='request kinds to send (default: all)')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='process pool size of the started server')
+    args = parser.parse_args(argv)
+
+    server = None
+
+    if args.url:
+        url = urlparse.urlparse(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        import server as easymoneyServer
+        server = easymoneyServer.Server(('127.0.0.1', 0),
+                                        processes=args.processes)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        host, port = server.server_address[:2]
+
+    try:
+        latencies, errors, elapsed = run(host, port, args.clients,
+                                         args.duration,
+                                         args.kinds or sorted(REQUESTS),
+                                         args.size)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    latencies.sort()
+
+    print 'requests   %d (%d errors) in %.1f s' % (len(latencies),
+                                                  len(errors), elapsed)
+    print 'throughput %.0f requests/s' % (len(latencies) / elapsed)
+    print 'latency    p50 %.2f ms, p99 %.2f ms' % (
+        percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000)
+
+    if server is not None:
+        b = server.batcher
+        print 'batches    %d for %d calls (%d in the process pool)' % (
+            b.batches, b.calls, b.pooled)
+
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
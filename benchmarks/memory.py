@@ -0,0 +1,115 @@
+"""memory.py -- memory per cell of the cell representations.
+
+Builds a column of n number cells (A1 to An) three ways and reports the
+resident memory each one adds and the time SUM takes over it:
+
+    dict   -- a sheet of cell dicts, {'A1': {'value': ..., 'type': ...}}
+    Cell   -- a sheet of cells.Cell objects (__slots__)
+    Range  -- one cells.Range (typed array and tags, no per-cell names)
+
+Each design is measured in a fresh interpreter, so the numbers do not
+depend on what the others left allocated.
+
+    python benchmarks/memory.py --sizes 100000,1000000,10000000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, os.path.join(HERE, os.pardir, 'easymoney'))
+
+DESIGNS = ('dict', 'Cell', 'Range')
+SIZES = (100000, 1000000)
+
+
+def rss():
+
+    """Returns the resident memory of this process in bytes (Linux), or
+    the peak resident memory elsewhere."""
+
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except IOError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def build(design, n):
+
+    import cells
+
+    # the values are made before measuring: all designs hold the same ones
+    values = [i * 0.25 for i in xrange(n)]
+    before = rss()
+
+    if design == 'dict':
+        sheet = dict(('A%d' % (i + 1), {'value': values[i], 'type': 'number'})
+                     for i in xrange(n))
+        column = lambda: [sheet['A%d' % (i + 1)]['value'] for i in xrange(n)]
+    elif design == 'Cell':
+        Cell = cells.Cell
+        sheet = dict(('A%d' % (i + 1), Cell(values[i], 'number'))
+                     for i in xrange(n))
+        column = lambda: [sheet['A%d' % (i + 1)].value for i in xrange(n)]
+    else:
+        sheet = cells.Range(values, 'number')
+        column = lambda: sheet
+
+    size = rss() - before
+
+    return sheet, column, size
+
+
+def measure(design, n):
+
+    """Returns (bytes, SUM seconds) of n cells built the design way."""
+
+    import easymoney
+
+    sheet, column, size = build(design, n)
+    emoney = easymoney.EasyMoney()
+
+    start = time.time()
+    emoney.SUM(column())
+
+    return size, time.time() - start
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)))
+    parser.add_argument('--designs', default=','.join(DESIGNS))
+    parser.add_argument('--one', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.one:
+        size, seconds = measure(args.one[0], int(args.one[1]))
+        print size, seconds
+        return 0
+
+    print '%-6s %10s %12s %10s %10s' % ('design', 'cells', 'MB',
+                                        'bytes/cell', 'SUM s')
+
+    for n in [int(s) for s in args.sizes.split(',')]:
+        for design in args.designs.split(','):
+            out = subprocess.check_output([sys.executable, __file__,
+                                           '--one', design, str(n)])
+            size, seconds = out.split()
+            size = int(size)
+            print '%-6s %10d %12.1f %10.1f %10.4f' % (
+                design, n, size / 2.0 ** 20, float(size) / n, float(seconds))
+            sys.stdout.flush()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""parallel.py -- scaling of parallel.Pool with the number of processes.
+
+Runs an end-of-day style batch -- for each of --books books, AVERAGE,
+MEDIAN, TRIMMEAN and SUMSQ of a price column of --size items, the NPV
+and IRR of a cash flow schedule, and a small sheet -- first in this
+process and then on pools of each of --processes workers, and reports
+the time of each run and its speedup over the sequential one.  The
+price columns are NumPy arrays where NumPy is installed, lists
+otherwise; either way they reach the workers through shared memory.
+
+    python benchmarks/parallel.py --books 64 --size 200000 --processes 1,2,4,8
+
+The speedup cannot exceed the number of cores of the machine (shown in
+the first line).
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, os.path.join(HERE, os.pardir, 'easymoney'))
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def books(count, size, seed=1):
+
+    """Returns (jobs, sheets) of count books."""
+
+    rng = random.Random(seed)
+    jobs = []
+    sheets = []
+
+    for b in xrange(count):
+
+        prices = [100 + rng.gauss(0, 5) for i in xrange(size)]
+
+        if numpy is not None:
+            prices = numpy.array(prices)
+
+        flows = [-10000.0] + [rng.uniform(1000, 3000) for i in xrange(10)]
+
+        jobs += [('AVERAGE', [prices]), ('MEDIAN', [prices]),
+                 ('TRIMMEAN', [prices, 0.1]), ('SUMSQ', [prices]),
+                 ('NPV', [0.08, flows]), ('IRR', [flows])]
+
+        cells = dict(('A%d' % i, {'value': rng.random(), 'type': 'number'})
+                     for i in xrange(1, 51))
+        cells['B1'] = {'value': '=SUM(A1:A50) * 2', 'type': 'number'}
+        cells['B2'] = {'value': '=AVERAGE(A1:A50) + B1', 'type': 'number'}
+        sheets.append(cells)
+
+    return jobs, sheets
+
+
+def timed(pool, jobs, sheets, repeat):
+
+    """Returns the best time of repeat runs of the batch on pool."""
+
+    best = None
+
+    for i in xrange(repeat):
+        start = time.time()
+        pool.map(jobs)
+        pool.evaluate(sheets, ['B2'])
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--books', type=int, default=32)
+    parser.add_argument('--size', type=int, default=100000,
+                        help='prices per book (default %(default)s)')
+    parser.add_argument('--processes', default='1,2,4',
+                        help='pool sizes to run (default %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    import parallel
+
+    jobs, sheets = books(args.books, args.size)
+
+    print '%d cores, %d jobs and %d sheets, %s prices' % (
+        multiprocessing.cpu_count(), len(jobs), len(sheets),
+        'NumPy' if numpy is not None else 'list')
+
+    with parallel.Pool(0) as pool:
+        base = timed(pool, jobs, sheets, args.repeat)
+
+    print '%-12s %8.3f s' % ('sequential', base)
+
+    for processes in map(int, args.processes.split(',')):
+        with parallel.Pool(processes) as pool:
+            elapsed = timed(pool, jobs, sheets, args.repeat)
+        print '%-12s %8.3f s  %5.2fx' % ('%d processes' % processes,
+                                         elapsed, base / elapsed)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
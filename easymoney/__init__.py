@@ -15,3 +15,5 @@ __license__ = 'The BSD 3-Clause License'
 __copyright__ = 'Copyright 2013 Jacek Artymiak'
 
 from . import easymoney
+from . import formula
+from . import workbook
@@ -0,0 +1,496 @@
+"""accumulators.py -- streaming accumulators for online statistics (sums,
+means and variances, extremes, geometric and harmonic means).
+
+An accumulator keeps a few numbers of state, however many values it has
+seen, and takes its values one at a time (add), from any iterable
+(extend) or from another accumulator of the same kind (merge), so partial
+results computed over chunks, files or worker processes combine into the
+result of the whole:
+
+    a = Moments(chunk1)
+    b = Moments(chunk2)
+    a.merge(b).value()    # the mean of chunk1 + chunk2
+
+Values are taken CHUNK at a time.  Lists and other iterables are checked
+and reduced a chunk at a time with the C-level builtins (math.fsum, min,
+max); array.array, memoryview and NumPy columns are reduced with NumPy
+when it is available.  Each chunk is summarized on its own and merged into
+the running state the same way two accumulators are merged.
+
+The results are numerically stable: sums are compensated (Neumaier),
+with integers summed exactly; means and variances use the pairwise
+update of Chan et al., the chunked form of Welford's algorithm; the
+geometric mean is taken in log space, so no running product overflows.
+"""
+
+import array
+import copy
+import math
+
+from itertools import islice
+
+from errors import NumError, TypeError, ZeroDivisionError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+CHUNK = 65536
+
+_NUMBER_TYPES = (int, long, float)
+
+_TYPECODES = 'bBhHiIlLfd'
+_KINDS = 'iuf'
+
+
+def _checked(chunk):
+
+    for x in chunk:
+        if type(x) not in _NUMBER_TYPES:
+            raise TypeError, 'non-numeric list item'
+
+    return chunk
+
+
+def _buffer(values):
+
+    """Returns values as a 1-d NumPy array, or as an array.array without
+    NumPy, if they are a typed numeric column; None otherwise."""
+
+    if numpy is not None and isinstance(values, numpy.ndarray):
+
+        if values.dtype.kind not in _KINDS:
+            raise TypeError, 'non-numeric column dtype'
+
+        return values.ravel()
+
+    if isinstance(values, memoryview):
+
+        fmt = values.format.lstrip('@')
+
+        if fmt not in _TYPECODES:
+            raise TypeError, 'unsupported column format'
+
+        col = array.array(fmt)
+        col.fromstring(values.tobytes())
+        values = col
+
+    if isinstance(values, array.array):
+
+        if values.typecode not in _TYPECODES:
+            raise TypeError, 'non-numeric column typecode'
+
+        if numpy is not None:
+            return numpy.frombuffer(values, dtype=values.typecode) \
+                if len(values) else numpy.zeros(0)
+
+        return values
+
+    return None
+
+
+class Accumulator(object):
+
+    """Base class of the accumulators.
+
+    Subclasses summarize a chunk of values with _addList (checked Python
+    numbers) and _addArray (a NumPy array), and combine two states with
+    _merge.  EXACT subclasses see integer columns as lists of Python
+    integers, so they stay exact.
+    """
+
+    EXACT = False
+
+    def __init__(self, values=None):
+
+        self.count = 0
+
+        if values is not None:
+            self.extend(values)
+
+    def add(self, x):
+
+        """Adds one value."""
+
+        self._addList(_checked([x]))
+
+        return self
+
+    def extend(self, values):
+
+        """Adds the values of an iterable or a typed column."""
+
+        col = _buffer(values)
+
+        if col is not None:
+
+            if numpy is None or (self.EXACT and col.dtype.kind != 'f'):
+
+                for start in xrange(0, len(col), CHUNK):
+                    self._addList(col[start:start + CHUNK].tolist())
+            else:
+
+                for start in xrange(0, len(col), CHUNK):
+                    self._addArray(col[start:start + CHUNK])
+
+            return self
+
+        if isinstance(values, basestring) or not hasattr(values, '__iter__'):
+            raise TypeError, 'values not iterable'
+
+        it = iter(values)
+
+        while True:
+
+            chunk = list(islice(it, CHUNK))
+
+            if not chunk:
+                return self
+
+            self._addList(_checked(chunk))
+
+    def merge(self, other):
+
+        """Adds the state of another accumulator of the same kind."""
+
+        if type(other) is not type(self):
+            raise TypeError, 'cannot merge %s into %s' % (
+                type(other).__name__, type(self).__name__)
+
+        self._merge(other)
+
+        return self
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+    def _addArray(self, a):
+        self._addList(a.tolist())
+
+    def _empty(self):
+
+        if not self.count:
+            raise ZeroDivisionError, 'no values'
+
+
+class Sum(Accumulator):
+
+    """Compensated sum.  Integers are summed exactly; the result is an
+    integer unless a float was added."""
+
+    EXACT = True
+
+    def __init__(self, values=None):
+
+        self.integer = 0
+        self.total = 0.0
+        self.error = 0.0
+        self.isFloat = False
+
+        Accumulator.__init__(self, values)
+
+    def _terms(self, chunk):
+        return chunk
+
+    def _arrayTerms(self, a):
+        return a
+
+    def _addFloat(self, s):
+
+        t = self.total + s
+
+        if abs(self.total) >= abs(s):
+            self.error += (self.total - t) + s
+        else:
+            self.error += (s - t) + self.total
+
+        self.total = t
+
+    def _addList(self, chunk):
+
+        self.count += len(chunk)
+        terms = self._terms(chunk)
+        floats = [x for x in terms if type(x) is float]
+
+        if len(floats) < len(terms):
+            self.integer += sum(x for x in terms if type(x) is not float)
+
+        if floats:
+            self.isFloat = True
+            self._addFloat(math.fsum(floats))
+
+    def _addArray(self, a):
+
+        self.count += len(a)
+
+        if len(a):
+            self.isFloat = True
+            self._addFloat(float(self._arrayTerms(a.astype(numpy.float64)).sum()))
+
+    def _merge(self, other):
+
+        self.count += other.count
+        self.integer += other.integer
+        self.isFloat = self.isFloat or other.isFloat
+        self._addFloat(other.total)
+        self._addFloat(other.error)
+
+    def value(self):
+
+        if self.isFloat:
+            return self.integer + (self.total + self.error)
+
+        return self.integer
+
+
+class SumSq(Sum):
+
+    """Compensated sum of squares."""
+
+    def _terms(self, chunk):
+        return [x * x for x in chunk]
+
+    def _arrayTerms(self, a):
+        return a * a
+
+
+class Moments(Accumulator):
+
+    """Count, mean and sum of squared deviations (Welford/Chan); value()
+    is the mean."""
+
+    def __init__(self, values=None):
+
+        self.mean = 0.0
+        self.m2 = 0.0
+
+        Accumulator.__init__(self, values)
+
+    def _combine(self, n, mean, m2):
+
+        total = self.count + n
+        d = mean - self.mean
+
+        self.mean += d * n / total
+        self.m2 += m2 + d * d * self.count * n / total
+        self.count = total
+
+    def _addList(self, chunk):
+
+        n = len(chunk)
+
+        if n:
+            mean = math.fsum(chunk) / n
+            self._combine(n, mean, math.fsum([(x - mean) ** 2 for x in chunk]))
+
+    def _addArray(self, a):
+
+        n = len(a)
+
+        if n:
+            a = a.astype(numpy.float64)
+            mean = float(a.mean())
+            d = a - mean
+            self._combine(n, mean, float(d.dot(d)))
+
+    def _merge(self, other):
+
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+
+    def value(self):
+
+        self._empty()
+
+        return self.mean
+
+    def devsq(self):
+        return self.m2
+
+    def variance(self):
+
+        """Returns the sample variance."""
+
+        if self.count < 2:
+            raise ZeroDivisionError, 'fewer than two values'
+
+        return self.m2 / (self.count - 1)
+
+    def variancep(self):
+
+        """Returns the population variance."""
+
+        self._empty()
+
+        return self.m2 / self.count
+
+    def stdev(self):
+        return math.sqrt(self.variance())
+
+    def stdevp(self):
+        return math.sqrt(self.variancep())
+
+
+class Min(Accumulator):
+
+    """Smallest value."""
+
+    _pick = staticmethod(min)
+    _method = 'min'
+
+    def __init__(self, values=None):
+
+        self.extreme = None
+
+        Accumulator.__init__(self, values)
+
+    def _update(self, x):
+
+        self.extreme = x if self.extreme is None else \
+            self._pick(self.extreme, x)
+
+    def _addList(self, chunk):
+
+        if chunk:
+            self.count += len(chunk)
+            self._update(self._pick(chunk))
+
+    def _addArray(self, a):
+
+        if len(a):
+            self.count += len(a)
+            self._update(getattr(a, self._method)().item())
+
+    def _merge(self, other):
+
+        if other.count:
+            self.count += other.count
+            self._update(other.extreme)
+
+    def value(self):
+
+        self._empty()
+
+        return self.extreme
+
+
+class Max(Min):
+
+    """Largest value."""
+
+    _pick = staticmethod(max)
+    _method = 'max'
+
+
+class GeoMean(Accumulator):
+
+    """Geometric mean, as the exponent of the mean logarithm.  The values
+    must be positive."""
+
+    def __init__(self, values=None):
+
+        self.logs = Sum()
+
+        Accumulator.__init__(self, values)
+
+    def _addList(self, chunk):
+
+        try:
+            self.logs._addList([math.log(x) for x in chunk])
+        except ValueError:
+            raise NumError, 'non-positive value'
+
+        self.count = self.logs.count
+
+    def _addArray(self, a):
+
+        if (a <= 0).any():
+            raise NumError, 'non-positive value'
+
+        self.logs._addArray(numpy.log(a.astype(numpy.float64)))
+        self.count = self.logs.count
+
+    def _merge(self, other):
+
+        self.logs._merge(other.logs)
+        self.count = self.logs.count
+
+    def value(self):
+
+        self._empty()
+
+        return math.exp(float(self.logs.value()) / self.count)
+
+
+class HarMean(Accumulator):
+
+    """Harmonic mean, as the count over the sum of reciprocals.  The values
+    must be positive."""
+
+    def __init__(self, values=None):
+
+        self.reciprocals = Sum()
+
+        Accumulator.__init__(self, values)
+
+    def _addList(self, chunk):
+
+        for x in chunk:
+            if x <= 0:
+                raise NumError, 'non-positive value'
+
+        self.reciprocals._addList([1.0 / x for x in chunk])
+        self.count = self.reciprocals.count
+
+    def _addArray(self, a):
+
+        if (a <= 0).any():
+            raise NumError, 'non-positive value'
+
+        self.reciprocals._addArray(1.0 / a.astype(numpy.float64))
+        self.count = self.reciprocals.count
+
+    def _merge(self, other):
+
+        self.reciprocals._merge(other.reciprocals)
+        self.count = self.reciprocals.count
+
+    def value(self):
+
+        self._empty()
+
+        return self.count / self.reciprocals.value()
+
+
+def consume(values, *accumulators):
+
+    """Feeds the values of an iterable or column to all of the accumulators
+    in a single pass and returns the accumulators."""
+
+    col = _buffer(values)
+
+    if col is not None:
+
+        for acc in accumulators:
+            acc.extend(col)
+
+        return accumulators
+
+    if isinstance(values, basestring) or not hasattr(values, '__iter__'):
+        raise TypeError, 'values not iterable'
+
+    it = iter(values)
+
+    while True:
+
+        chunk = list(islice(it, CHUNK))
+
+        if not chunk:
+            return accumulators
+
+        _checked(chunk)
+
+        for acc in accumulators:
+            acc._addList(chunk)
@@ -0,0 +1,262 @@
+"""amortization.py -- loan payments and whole amortization schedules.
+
+Sign conventions follow the spreadsheets: money received (the loan, pv)
+is positive, money paid out (payments, interest, principal) is negative.
+rate is the periodic rate as a fraction (0.05 / 12 for 5% a year paid
+monthly) and type is 0 for payments at the end of each period, 1 for
+payments at the beginning.
+
+Everything is derived from the outstanding balance after k payments,
+
+    b(k) = pv * (1 + rate) ** max(k - type, 0)
+           + pmt * ((1 + rate) ** k - 1) / rate
+
+so the interest paid in period k is -rate * b(k - 1) (nothing in the
+first period when paying in advance) and the principal is the rest of
+the payment.  amortize() evaluates it for every period of many loans at
+once (with NumPy when it is available) and the scalar functions evaluate
+it for one or two values of k.
+"""
+
+import array
+
+from errors import NumError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def payment(rate, nper, pv, fv=0.0, type=0):
+
+    """Returns the payment per period (PMT) of a loan.
+
+    rate -- periodic interest rate
+    nper -- number of payment periods
+    pv -- present value (the amount borrowed)
+    fv -- future value left after the last payment
+    type -- 0 (end of period) or 1 (beginning of period)
+    """
+
+    if nper == 0:
+        raise NumError, 'nper is zero'
+
+    if rate == 0:
+        return -(pv + fv) * 1.0 / nper
+
+    g = (1.0 + rate) ** nper
+
+    return -rate * (pv * g + fv) / ((1.0 + rate * type) * (g - 1.0))
+
+
+def balance(rate, k, pmt, pv, type=0):
+
+    """Returns the outstanding balance after k payments of pmt."""
+
+    if rate == 0:
+        return pv + pmt * k
+
+    return (pv * (1.0 + rate) ** max(k - type, 0) +
+            pmt * ((1.0 + rate) ** k - 1.0) / rate)
+
+
+def period(rate, per, nper, pv, fv=0.0, type=0):
+
+    """Returns (interest, principal) paid in period per (IPMT, PPMT)."""
+
+    if per < 1 or per > nper:
+        raise NumError, 'per outside 1..nper'
+
+    pmt = payment(rate, nper, pv, fv, type)
+
+    if type == 1 and per == 1:
+        interest = 0.0
+    else:
+        interest = -balance(rate, per - 1, pmt, pv, type) * rate
+
+    return interest, pmt - interest
+
+
+def cumulative(rate, nper, pv, start, end, type=0):
+
+    """Returns (interest, principal) paid from period start to period end
+    inclusive (CUMIPMT, CUMPRINC).  Two balance evaluations, whatever the
+    number of periods.
+    """
+
+    if rate <= 0 or nper <= 0 or pv <= 0:
+        raise NumError, 'rate, nper and pv must be positive'
+
+    if start < 1 or end < start or end > nper:
+        raise NumError, 'start and end outside 1..nper'
+
+    if type not in (0, 1):
+        raise NumError, 'type must be 0 or 1'
+
+    pmt = payment(rate, nper, pv, 0.0, type)
+    principal = balance(rate, end, pmt, pv, type) - \
+        balance(rate, start - 1, pmt, pv, type)
+
+    return pmt * (end - start + 1) - principal, principal
+
+
+class Schedule(object):
+
+    """Amortization schedules of one or more loans in columnar form.
+
+    Row j describes period period[j] of loan loan[j]; the rows of loan i
+    are offsets[i]:offsets[i + 1].  The columns are array.array objects,
+    or NumPy arrays when NumPy is available.
+
+    payment, interest, principal -- cash flows of the period
+    balance -- outstanding balance after the period's payment
+    pmt -- the payment of each loan
+    """
+
+    def __init__(self, loan, period, payment, interest, principal, balance,
+                 pmt, offsets):
+
+        self.loan = loan
+        self.period = period
+        self.payment = payment
+        self.interest = interest
+        self.principal = principal
+        self.balance = balance
+        self.pmt = pmt
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.loan)
+
+    def rows(self, i):
+
+        """Returns the slice of rows that belong to loan i."""
+
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+
+def _broadcast(args):
+
+    """Returns the arguments as equally long lists, repeating scalars."""
+
+    size = None
+
+    for a in args:
+
+        if hasattr(a, '__len__'):
+
+            if size is not None and len(a) != size:
+                raise NumError, 'argument lengths differ'
+
+            size = len(a)
+
+    if size is None:
+        size = 1
+
+    return [list(a) if hasattr(a, '__len__') else [a] * size for a in args]
+
+
+def amortize(rate, nper, pv, fv=0.0, type=0):
+
+    """Returns the Schedule of every period of every loan.
+
+    Each argument is a scalar or a sequence with one item per loan;
+    scalars apply to all loans.  nper must hold whole numbers of periods.
+    """
+
+    if numpy is not None:
+        return _amortizeNumpy(rate, nper, pv, fv, type)
+
+    rates, npers, pvs, fvs, types = _broadcast((rate, nper, pv, fv, type))
+
+    loanCol = array.array('l')
+    periodCol = array.array('l')
+    paymentCol = array.array('d')
+    interestCol = array.array('d')
+    principalCol = array.array('d')
+    balanceCol = array.array('d')
+    pmts = array.array('d')
+    offsets = array.array('l', [0])
+
+    for i in xrange(len(rates)):
+
+        r, n, b, w = rates[i], int(npers[i]), pvs[i], types[i]
+
+        if n < 1:
+            raise NumError, 'nper must be at least 1'
+
+        pmt = payment(r, n, b, fvs[i], w)
+        pmts.append(pmt)
+
+        interest = [0.0] * n
+        principal = [0.0] * n
+        balances = [0.0] * n
+        start = 0
+
+        if w == 1:
+            # the first payment is made before any interest accrues
+            b = b + pmt
+            principal[0] = pmt
+            balances[0] = b
+            start = 1
+
+        for k in xrange(start, n):
+            ip = -b * r
+            pp = pmt - ip
+            b = b + pp
+            interest[k] = ip
+            principal[k] = pp
+            balances[k] = b
+
+        loanCol.extend([i] * n)
+        periodCol.extend(xrange(1, n + 1))
+        paymentCol.extend([pmt] * n)
+        interestCol.extend(interest)
+        principalCol.extend(principal)
+        balanceCol.extend(balances)
+        offsets.append(offsets[-1] + n)
+
+    return Schedule(loanCol, periodCol, paymentCol, interestCol,
+                    principalCol, balanceCol, pmts, offsets)
+
+
+def _amortizeNumpy(rate, nper, pv, fv, type):
+
+    try:
+        r, n, b, f, w = numpy.broadcast_arrays(*[numpy.atleast_1d(
+            numpy.asarray(a, dtype=numpy.float64)) for a in
+            (rate, nper, pv, fv, type)])
+    except ValueError:
+        raise NumError, 'argument lengths differ'
+
+    n = n.astype(numpy.int64)
+
+    if (n < 1).any():
+        raise NumError, 'nper must be at least 1'
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        g = (1.0 + r) ** n
+        pmt = numpy.where(r == 0, -(b + f) / n,
+                          -r * (b * g + f) / ((1.0 + r * w) * (g - 1.0)))
+
+    offsets = numpy.zeros(len(n) + 1, dtype=numpy.int64)
+    numpy.cumsum(n, out=offsets[1:])
+
+    loan = numpy.repeat(numpy.arange(len(n)), n)
+    period = numpy.arange(offsets[-1]) - offsets[:-1][loan] + 1
+
+    rr, bb, ww, pp = r[loan], b[loan], w[loan], pmt[loan]
+
+    def balances(k):
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            return numpy.where(
+                rr == 0, bb + pp * k,
+                bb * (1.0 + rr) ** numpy.maximum(k - ww, 0) +
+                pp * ((1.0 + rr) ** k - 1.0) / rr)
+
+    interest = numpy.where((ww == 1) & (period == 1), 0.0,
+                           -balances(period - 1) * rr)
+
+    return Schedule(loan, period, pp, interest, pp - interest,
+                    balances(period), pmt, offsets)
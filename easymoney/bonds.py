@@ -0,0 +1,437 @@
+"""bonds.py -- coupon schedules, bond prices, yields and durations.
+
+Every bond function starts from the same facts about the coupon period
+that contains the settlement date: the previous and next coupon dates,
+the number of coupons left and the day counts A (coupon date to
+settlement), DSC (settlement to next coupon) and E (the whole period).
+A CouponSchedule holds them for one (settlement, maturity, frequency,
+basis) key and schedule() keeps the most recently used ones in an LRU
+cache, so repricing a book at new yields does no date arithmetic at all.
+
+Prices are per 100 of face value, rates and yields are annual fractions
+and dates are spreadsheet serial numbers (see dates.py).  With N coupons
+left, r = yld / frequency and c = 100 * rate / frequency,
+
+    PRICE = sum(c / (1 + r) ** t[k]) + redemption / (1 + r) ** t[N - 1]
+            - c * A / E,    t[k] = k + DSC / E
+
+and DURATION is the present-value weighted mean of t[k] in years.  YIELD
+inverts PRICE with the safeguarded Newton solver of solver.py.  The
+column functions price whole books, vectorized with NumPy when it is
+available.
+"""
+
+import array
+
+from collections import OrderedDict
+
+import dates
+import daycount
+import solver
+
+from errors import NumError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+FREQUENCIES = (1, 2, 4)
+
+
+class CouponSchedule(object):
+
+    """The coupon period around a settlement date.
+
+    pcd, ncd -- previous and next coupon dates (serial numbers)
+    num -- number of coupons payable after settlement
+    days -- E, the days in the coupon period (COUPDAYS)
+    daysBefore -- A, the days from pcd to settlement (COUPDAYBS)
+    daysToNext -- DSC, the days from settlement to ncd (COUPDAYSNC)
+    """
+
+    __slots__ = ('settlement', 'maturity', 'frequency', 'basis', 'pcd',
+                 'ncd', 'num', 'days', 'daysBefore', 'daysToNext')
+
+    def __init__(self, settlement, maturity, frequency=2, basis=0,
+                 date1904=False):
+
+        settlement = int(settlement)
+        maturity = int(maturity)
+
+        if frequency not in FREQUENCIES:
+            raise NumError, 'frequency must be 1, 2 or 4'
+
+        if basis not in daycount.BASES:
+            raise NumError, 'basis must be 0 to 4'
+
+        if settlement >= maturity:
+            raise NumError, 'settlement must be before maturity'
+
+        frequency = int(frequency)
+
+        self.settlement = settlement
+        self.maturity = maturity
+        self.frequency = frequency
+        self.basis = basis
+
+        y, m, d = dates.fromSerial(maturity, date1904)
+        ys, ms, ds = dates.fromSerial(settlement, date1904)
+        step = 12 // frequency
+        endOfMonth = d == dates.daysInMonth(y, m)
+
+        def couponDate(k):
+
+            # the coupon date k periods before maturity
+            total = y * 12 + m - 1 - k * step
+            cy, cm = divmod(total, 12)
+            cm += 1
+            last = dates.daysInMonth(cy, cm)
+            cd = last if endOfMonth else min(d, last)
+
+            return dates.serial(cy, cm, cd, date1904)
+
+        n = max(((y - ys) * 12 + m - ms) // step, 1)
+
+        while couponDate(n) > settlement:
+            n += 1
+
+        while n > 1 and couponDate(n - 1) <= settlement:
+            n -= 1
+
+        self.num = n
+        self.pcd = couponDate(n)
+        self.ncd = couponDate(n - 1)
+
+        if basis == 1:
+            self.days = float(self.ncd - self.pcd)
+        elif basis == 3:
+            self.days = 365.0 / frequency
+        else:
+            self.days = 360.0 / frequency
+
+        if basis == 0:
+            self.daysBefore = daycount.days360Serial(self.pcd, settlement,
+                                                     False, date1904)
+            self.daysToNext = self.days - self.daysBefore
+        elif basis == 4:
+            self.daysBefore = daycount.days360Serial(self.pcd, settlement,
+                                                     True, date1904)
+            self.daysToNext = daycount.days360Serial(settlement, self.ncd,
+                                                     True, date1904)
+        else:
+            self.daysBefore = settlement - self.pcd
+            self.daysToNext = self.ncd - settlement
+
+    def __repr__(self):
+        return 'CouponSchedule(%d, %d, %d, %d)' % (
+            self.settlement, self.maturity, self.frequency, self.basis)
+
+
+class ScheduleCache(object):
+
+    """A least recently used cache of CouponSchedule objects.
+
+    maxsize -- the number of schedules kept
+    hits, misses -- lookups served from and missing the cache
+    """
+
+    def __init__(self, maxsize=4096):
+
+        self.maxsize = maxsize
+        self.clear()
+
+    def clear(self):
+
+        self._schedules = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._schedules)
+
+    def get(self, settlement, maturity, frequency=2, basis=0,
+            date1904=False):
+
+        """Returns the CouponSchedule for the key, building it on a miss."""
+
+        key = (int(settlement), int(maturity), frequency, basis, date1904)
+        schedules = self._schedules
+        found = schedules.pop(key, None)
+
+        if found is None:
+
+            self.misses += 1
+            found = CouponSchedule(*key)
+
+            if len(schedules) >= self.maxsize:
+                schedules.popitem(last=False)
+
+        else:
+
+            self.hits += 1
+
+        schedules[key] = found
+
+        return found
+
+    def __repr__(self):
+        return 'ScheduleCache(size=%d, maxsize=%d, hits=%d, misses=%d)' % (
+            len(self), self.maxsize, self.hits, self.misses)
+
+
+defaultCache = ScheduleCache()
+
+
+def schedule(settlement, maturity, frequency=2, basis=0, date1904=False):
+
+    """Returns the cached CouponSchedule of a bond."""
+
+    return defaultCache.get(settlement, maturity, frequency, basis, date1904)
+
+
+def _flows(s, r, rate, redemption):
+
+    """Returns (dirty price, sum of t * discounted flow) at the periodic
+    yield r, t in periods."""
+
+    c = 100.0 * rate / s.frequency
+    x = s.daysToNext / s.days
+    v = 1.0 / (1.0 + r)
+    df = v ** x
+    total = 0.0
+    weighted = 0.0
+
+    for k in xrange(s.num):
+
+        flow = c + redemption if k == s.num - 1 else c
+        total += flow * df
+        weighted += (k + x) * flow * df
+        df *= v
+
+    return total, weighted
+
+
+def _accrued(s, rate):
+    return 100.0 * rate / s.frequency * s.daysBefore / s.days
+
+
+def _check(rate, redemption):
+
+    if rate < 0:
+        raise NumError, 'rate must not be negative'
+
+    if redemption <= 0:
+        raise NumError, 'redemption must be positive'
+
+
+def price(s, rate, yld, redemption=100.0):
+
+    """Returns the clean price per 100 of face value (PRICE) of the bond
+    with CouponSchedule s."""
+
+    _check(rate, redemption)
+
+    if yld < 0:
+        raise NumError, 'yield must not be negative'
+
+    r = float(yld) / s.frequency
+
+    if s.num == 1:
+
+        # money-market convention for the last coupon period
+        c = 100.0 * rate / s.frequency
+        x = s.daysToNext / s.days
+
+        return (redemption + c) / (1.0 + x * r) - _accrued(s, rate)
+
+    return _flows(s, r, rate, redemption)[0] - _accrued(s, rate)
+
+
+def bondYield(s, rate, pr, redemption=100.0, guess=None, stats=None):
+
+    """Returns the annual yield (YIELD) at which the bond with
+    CouponSchedule s has the clean price pr."""
+
+    _check(rate, redemption)
+
+    if pr <= 0:
+        raise NumError, 'price must be positive'
+
+    f = s.frequency
+    accrued = _accrued(s, rate)
+
+    if s.num == 1:
+
+        dirty = (pr + accrued) / 100.0
+        dsr = s.days - s.daysBefore
+
+        return (redemption / 100.0 + rate / f - dirty) / dirty * \
+            f * s.days / dsr
+
+    target = pr + accrued
+
+    def fn(r):
+        total, weighted = _flows(s, r, rate, redemption)
+        return total - target, -weighted / (1.0 + r)
+
+    if guess is None:
+        guess = rate if rate > 0 else 0.05
+
+    return solver.solve(fn, float(guess) / f, target, stats) * f
+
+
+def duration(s, coupon, yld):
+
+    """Returns the Macaulay duration in years (DURATION) of the bond with
+    CouponSchedule s, per 100 of face value."""
+
+    _check(coupon, 100.0)
+
+    if yld < 0:
+        raise NumError, 'yield must not be negative'
+
+    total, weighted = _flows(s, float(yld) / s.frequency, coupon, 100.0)
+
+    return weighted / total / s.frequency
+
+
+def modifiedDuration(s, coupon, yld):
+
+    """Returns the modified duration (MDURATION) of the bond with
+    CouponSchedule s."""
+
+    return duration(s, coupon, yld) / (1.0 + float(yld) / s.frequency)
+
+
+# Columns
+
+
+def _broadcast(columns):
+
+    n = max([len(c) for c in columns if daycount.isColumn(c)] or [1])
+    out = []
+
+    for c in columns:
+
+        if not daycount.isColumn(c):
+            c = [c] * n
+        elif len(c) != n:
+            raise NumError, 'bond columns differ in length'
+
+        out.append(c)
+
+    return out
+
+
+def schedules(settlements, maturities, frequency=2, basis=0,
+              date1904=False):
+
+    """Returns the cached CouponSchedule of every bond of a book."""
+
+    settlements, maturities = _broadcast([settlements, maturities])
+
+    return [schedule(a, b, frequency, basis, date1904)
+            for a, b in zip(settlements, maturities)]
+
+
+def _flowsNumpy(book, r, rates, redemptions):
+
+    """Returns (dirty prices, sums of t * discounted flows) of a book, one
+    row of padded coupon times per bond."""
+
+    num = numpy.array([s.num for s in book])
+    x = numpy.array([s.daysToNext / s.days for s in book])
+    f = numpy.array([s.frequency for s in book], dtype=numpy.float64)
+    c = 100.0 * numpy.asarray(rates, dtype=numpy.float64) / f
+
+    k = numpy.arange(num.max())
+    live = k < num[:, numpy.newaxis]
+    t = k + x[:, numpy.newaxis]
+    flows = numpy.where(live, c[:, numpy.newaxis], 0.0)
+    flows[numpy.arange(len(book)), num - 1] += redemptions
+    pv = flows * (1.0 + r[:, numpy.newaxis]) ** -t
+
+    return pv.sum(axis=1), (t * pv).sum(axis=1)
+
+
+def prices(settlements, maturities, rates, ylds, redemptions=100.0,
+           frequency=2, basis=0, date1904=False):
+
+    """Returns PRICE for every bond of a book.  Any argument but frequency
+    and basis may be a column; scalars apply to every bond.
+    """
+
+    settlements, maturities, rates, ylds, redemptions = _broadcast(
+        [settlements, maturities, rates, ylds, redemptions])
+    book = schedules(settlements, maturities, frequency, basis, date1904)
+
+    if numpy is None or not book:
+        return array.array('d', [price(s, c, y, red) for s, c, y, red in
+                                 zip(book, rates, ylds, redemptions)])
+
+    for c, y, red in zip(rates, ylds, redemptions):
+        _check(c, red)
+        if y < 0:
+            raise NumError, 'yield must not be negative'
+
+    rates = numpy.asarray(rates, dtype=numpy.float64)
+    ylds = numpy.asarray(ylds, dtype=numpy.float64)
+    redemptions = numpy.asarray(redemptions, dtype=numpy.float64)
+
+    r = ylds / frequency
+    total = _flowsNumpy(book, r, rates, redemptions)[0]
+    a = numpy.array([s.daysBefore / s.days for s in book])
+    x = numpy.array([s.daysToNext / s.days for s in book])
+    num = numpy.array([s.num for s in book])
+    c = 100.0 * rates / frequency
+
+    # money-market convention for bonds in their last coupon period
+    last = (redemptions + c) / (1.0 + x * r)
+
+    return numpy.where(num == 1, last, total) - c * a
+
+
+def yields(settlements, maturities, rates, prs, redemptions=100.0,
+           frequency=2, basis=0, date1904=False, stats=None):
+
+    """Returns YIELD for every bond of a book (see prices())."""
+
+    settlements, maturities, rates, prs, redemptions = _broadcast(
+        [settlements, maturities, rates, prs, redemptions])
+    book = schedules(settlements, maturities, frequency, basis, date1904)
+
+    return array.array('d', [bondYield(s, c, p, red, None, stats)
+                             for s, c, p, red in
+                             zip(book, rates, prs, redemptions)])
+
+
+def durations(settlements, maturities, coupons, ylds, frequency=2, basis=0,
+              date1904=False, modified=False):
+
+    """Returns DURATION (MDURATION when modified is True) for every bond
+    of a book (see prices())."""
+
+    settlements, maturities, coupons, ylds = _broadcast(
+        [settlements, maturities, coupons, ylds])
+    book = schedules(settlements, maturities, frequency, basis, date1904)
+
+    if numpy is None or not book:
+        fn = modifiedDuration if modified else duration
+        return array.array('d', [fn(s, c, y) for s, c, y in
+                                 zip(book, coupons, ylds)])
+
+    for c, y in zip(coupons, ylds):
+        _check(c, 100.0)
+        if y < 0:
+            raise NumError, 'yield must not be negative'
+
+    r = numpy.asarray(ylds, dtype=numpy.float64) / frequency
+    total, weighted = _flowsNumpy(book, r, coupons, 100.0)
+    result = weighted / total / frequency
+
+    if modified:
+        return result / (1.0 + r)
+
+    return result
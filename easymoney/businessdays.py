@@ -0,0 +1,299 @@
+"""businessdays.py -- business day arithmetic (NETWORKDAYS, WORKDAY).
+
+A HolidayCalendar is built once from a weekend mask and a list of
+holidays.  It keeps the holidays that fall on working days in a sorted
+array and a prefix count of the working days of the week, so that the
+number of working days before any serial number is
+
+    full weeks * working days per week + prefix[days left over]
+    - holidays before it (one binary search)
+
+NETWORKDAYS is the difference of two such counts.  WORKDAY turns the
+count around: it finds the working day with a given rank by jumping to
+the weekday of that rank, counting the holidays it skipped, and jumping
+again until the count settles, instead of stepping one day at a time.
+
+Dates are spreadsheet serial numbers (see dates.py).  The column
+methods process whole arrays of dates, vectorized with NumPy when it is
+available.
+"""
+
+import array
+
+from bisect import bisect_left
+
+import dates
+
+from errors import NumError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# spreadsheet weekend numbers, as masks from Monday to Sunday
+WEEKENDS = {1: '0000011', 2: '1000001', 3: '1100000', 4: '0110000',
+            5: '0011000', 6: '0001100', 7: '0000110', 11: '0000001',
+            12: '1000000', 13: '0100000', 14: '0010000', 15: '0001000',
+            16: '0000100', 17: '0000010'}
+
+
+def weekendMask(weekend=1):
+
+    """Returns the weekend as a tuple of seven booleans, Monday first.
+
+    weekend -- a spreadsheet weekend number (1 to 7, 11 to 17) or a
+               string of seven 0/1 characters, Monday first, 1 meaning a
+               day off (as in NETWORKDAYS.INTL)
+    """
+
+    if weekend in WEEKENDS:
+        weekend = WEEKENDS[weekend]
+
+    if not isinstance(weekend, basestring) or len(weekend) != 7 or \
+            weekend.strip('01'):
+        raise NumError, 'bad weekend %r' % (weekend,)
+
+    if weekend == '1111111':
+        raise NumError, 'weekend covers the whole week'
+
+    return tuple(c == '1' for c in weekend)
+
+
+class HolidayCalendar(object):
+
+    """Working days for a weekend mask and a list of holiday serials.
+
+    holidays -- serial numbers of holidays (any order, duplicates and
+                weekend days allowed)
+    weekend -- see weekendMask()
+    date1904 -- True if the serial numbers use the 1904 date system
+    """
+
+    def __init__(self, holidays=(), weekend=1, date1904=False):
+
+        self.weekend = weekendMask(weekend)
+        self.date1904 = bool(date1904)
+
+        # weekday (0 is Monday) of serial s is (s + self._shift) % 7
+        anchor = 40000
+        self._shift = (dates.weekday(anchor, date1904) - anchor) % 7
+
+        # phase p of a week is the day with (s + shift) % 7 == p, so the
+        # days from serial 7k on are phases shift, shift + 1, ...
+        work = [not self.weekend[(self._shift + i) % 7] for i in xrange(7)]
+
+        self.perWeek = sum(work)
+        self._prefix = [0] * 8
+
+        for i in xrange(7):
+            self._prefix[i + 1] = self._prefix[i] + work[i]
+
+        # offset within the week of the working day of each rank
+        self._position = [i for i in xrange(7) if work[i]]
+
+        # every holiday given, weekend days included, for rebuilding the
+        # calendar with another weekend (see calendar())
+        self.allHolidays = tuple(sorted(set(int(h) for h in holidays)))
+
+        self.holidays = array.array('l', [h for h in self.allHolidays
+                                          if self.isWeekday(h)])
+
+        if numpy is not None:
+            self._holidayColumn = numpy.array(self.holidays, dtype=numpy.int64)
+
+    def __len__(self):
+        return len(self.holidays)
+
+    def isWeekday(self, s):
+
+        """Returns True if s is not a weekend day."""
+
+        return not self.weekend[(int(s) + self._shift) % 7]
+
+    def isWorkday(self, s):
+
+        """Returns True if s is neither a weekend day nor a holiday."""
+
+        s = int(s)
+
+        if not self.isWeekday(s):
+            return False
+
+        i = bisect_left(self.holidays, s)
+
+        return i == len(self.holidays) or self.holidays[i] != s
+
+    def countBefore(self, s):
+
+        """Returns the number of working days before serial s (counted
+        from serial 0, negative for negative s)."""
+
+        weeks, rest = divmod(int(s), 7)
+
+        return weeks * self.perWeek + self._prefix[rest] - \
+            bisect_left(self.holidays, s)
+
+    def select(self, k):
+
+        """Returns the working day with rank k: the one with
+        countBefore(day) == k.
+        """
+
+        holidays = self.holidays
+        h = 0
+
+        while True:
+
+            weeks, rest = divmod(k + h, self.perWeek)
+            day = weeks * 7 + self._position[rest]
+            before = bisect_left(holidays, day)
+
+            if before != h:
+                h = before
+            elif before < len(holidays) and holidays[before] == day:
+                h += 1
+            else:
+                return day
+
+    def networkDays(self, start, end):
+
+        """Returns the number of working days from start to end, both
+        included; negative when end is before start."""
+
+        start = int(start)
+        end = int(end)
+
+        if start > end:
+            return -(self.countBefore(start + 1) - self.countBefore(end))
+
+        return self.countBefore(end + 1) - self.countBefore(start)
+
+    def workday(self, start, days):
+
+        """Returns the working day that is days working days after start
+        (before it when days is negative).  start itself need not be a
+        working day.
+        """
+
+        start = int(start)
+        days = int(days)
+
+        if days == 0:
+            return start
+
+        if days > 0:
+            return self.select(self.countBefore(start + 1) + days - 1)
+
+        return self.select(self.countBefore(start) + days)
+
+    # Columns
+
+    def _countBeforeColumn(self, s):
+
+        weeks, rest = numpy.divmod(s, 7)
+        prefix = numpy.array(self._prefix)
+
+        return weeks * self.perWeek + prefix[rest] - \
+            numpy.searchsorted(self._holidayColumn, s, side='left')
+
+    def _selectColumn(self, k):
+
+        holidays = self._holidayColumn
+        position = numpy.array(self._position)
+        padded = numpy.append(holidays, numpy.iinfo(numpy.int64).max)
+        h = numpy.zeros(len(k), dtype=numpy.int64)
+        day = numpy.zeros(len(k), dtype=numpy.int64)
+        active = numpy.ones(len(k), dtype=bool)
+
+        while active.any():
+
+            weeks, rest = numpy.divmod(k[active] + h[active], self.perWeek)
+            d = weeks * 7 + position[rest]
+            before = numpy.searchsorted(holidays, d, side='left')
+            hit = padded[before] == d
+            moved = before != h[active]
+
+            rows = numpy.nonzero(active)[0]
+            h[rows] = numpy.where(moved, before,
+                                  numpy.where(hit, h[rows] + 1, h[rows]))
+            day[rows] = d
+            active[rows[~moved & ~hit]] = False
+
+        return day
+
+    def networkDaysColumn(self, starts, ends):
+
+        """Returns networkDays() for every pair of starts and ends."""
+
+        if len(starts) != len(ends):
+            raise NumError, 'start and end columns differ in length'
+
+        if numpy is None:
+            return array.array('l', [self.networkDays(s, e)
+                                     for s, e in zip(starts, ends)])
+
+        a = numpy.asarray(starts).astype(numpy.int64)
+        b = numpy.asarray(ends).astype(numpy.int64)
+        lo = numpy.minimum(a, b)
+        hi = numpy.maximum(a, b)
+        n = self._countBeforeColumn(hi + 1) - self._countBeforeColumn(lo)
+
+        return numpy.where(a > b, -n, n)
+
+    def workdayColumn(self, starts, days):
+
+        """Returns workday() for every pair of starts and days (days may
+        be a single number)."""
+
+        if not hasattr(days, '__len__'):
+            days = [days] * len(starts)
+
+        if len(starts) != len(days):
+            raise NumError, 'start and days columns differ in length'
+
+        if numpy is None:
+            return array.array('l', [self.workday(s, n)
+                                     for s, n in zip(starts, days)])
+
+        s = numpy.asarray(starts).astype(numpy.int64)
+        n = numpy.asarray(days).astype(numpy.int64)
+        k = numpy.where(n > 0, self._countBeforeColumn(s + 1) + n - 1,
+                        self._countBeforeColumn(s) + n)
+
+        return numpy.where(n == 0, s, self._selectColumn(k))
+
+
+_calendars = {}
+_CACHE_SIZE = 32
+
+
+def calendar(holidays=None, weekend=1, date1904=False):
+
+    """Returns a HolidayCalendar for holidays and weekend.  holidays may
+    already be a HolidayCalendar: it is returned as is if it has the same
+    weekend and date system, and its holidays are used for a new calendar
+    otherwise.  Calendars built from lists are cached, so repeated calls
+    with the same holidays share one index.
+    """
+
+    if isinstance(holidays, HolidayCalendar):
+
+        if holidays.weekend == weekendMask(weekend) and \
+                holidays.date1904 == bool(date1904):
+            return holidays
+
+        holidays = holidays.allHolidays
+
+    key = (tuple(holidays or ()), weekend, date1904)
+    cal = _calendars.get(key)
+
+    if cal is None:
+
+        if len(_calendars) >= _CACHE_SIZE:
+            _calendars.clear()
+
+        cal = _calendars[key] = HolidayCalendar(key[0], weekend, date1904)
+
+    return cal
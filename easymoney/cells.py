@@ -0,0 +1,385 @@
+"""cells.py -- compact cells and ranges of cells.
+
+A cell as a dict ({'value': 1.5, 'type': 'number'}, see README) costs
+a few hundred bytes: the dict, its hash table and the boxed value.  Cell
+keeps the same three fields in __slots__, without a per-instance dict.
+
+Range keeps the values of a block of cells in one typed array -- int64
+when every value is an int, float64 otherwise -- with a parallel array
+of one-byte tags for the kind of each value:
+
+    NUMBER, INTEGER -- numbers (ints in a float array are tagged INTEGER
+                       so that they read back as ints)
+    BOOLEAN -- True or False, stored as 1 or 0
+    EMPTY -- None
+    TEXT, OTHER -- strings (formulas among them) and any other object,
+                   kept aside in a dict by position; their array slot
+                   holds 0
+
+so a range of numbers costs 9 bytes per cell.  A range shares one type
+and one label among its cells.  An int that the array cannot hold (one
+outside int64, or one a float array would round) is still a number:
+the range then keeps its values in a list instead, with the same tags.
+
+The EasyMoney aggregates take a Range as a column (see coercion.py): a
+range of numbers is summed, averaged, ... over its array without making
+a list, and a range with other values is handled as a list with the
+same values would be.
+"""
+
+import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+NUMBER, INTEGER, BOOLEAN, EMPTY, TEXT, OTHER = range(6)
+
+_INT64 = 2 ** 63
+_SPARSE = frozenset([TEXT, OTHER])
+
+# typecode of an array of int64 items, if the platform has one
+_INT_CODE = None
+
+for _code in 'lq':
+    try:
+        if array.array(_code).itemsize == 8:
+            _INT_CODE = _code
+            break
+    except ValueError:
+        pass
+
+
+class Cell(object):
+
+    """A cell: value (a number, a string, a formula, None), type and
+    label, as in the cell dicts of the README."""
+
+    __slots__ = ('value', 'type', 'label')
+
+    def __init__(self, value=None, type=None, label=None):
+
+        self.value = value
+        self.type = type
+        self.label = label
+
+    @classmethod
+    def fromDict(cls, cell):
+
+        return cls(cell.get('value'), cell.get('type'), cell.get('label'))
+
+    def toDict(self):
+
+        """Returns the cell as a cell dict, without the fields that are
+        None (other than value)."""
+
+        cell = {'value': self.value}
+
+        if self.type is not None:
+            cell['type'] = self.type
+
+        if self.label is not None:
+            cell['label'] = self.label
+
+        return cell
+
+    def __eq__(self, other):
+
+        return isinstance(other, Cell) and self.value == other.value and \
+            self.type == other.type and self.label == other.label
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'Cell(%r, %r, %r)' % (self.value, self.type, self.label)
+
+
+def _tag(x):
+
+    """Returns (tag, number to store) of a value."""
+
+    t = type(x)
+
+    if t is float:
+        return NUMBER, x
+
+    if t is int or t is long:
+        return INTEGER, x
+
+    if t is bool:
+        return BOOLEAN, int(x)
+
+    if x is None:
+        return EMPTY, 0
+
+    if isinstance(x, basestring):
+        return TEXT, 0
+
+    return OTHER, 0
+
+
+class Range(object):
+
+    """The values of a block of cells in a typed array, with a tag per
+    value (see the module docstring).
+
+    values -- iterable of cell values; lists of floats or of ints,
+              array.arrays and NumPy arrays are taken in one step
+    type, label -- shared by all the cells of the range
+
+    values and tags are the arrays themselves: read them, but change a
+    range only through its methods.
+    """
+
+    __slots__ = ('values', 'tags', 'others', 'type', 'label', '_nonNumbers')
+
+    def __init__(self, values=(), type=None, label=None):
+
+        self.type = type
+        self.label = label
+        self.others = {}
+        self._nonNumbers = 0
+
+        if not self._fromColumn(values):
+
+            # bool (and other) arrays hold Python values only in tolist()
+            if numpy is not None and isinstance(values, numpy.ndarray):
+                values = values.ravel().tolist()
+
+            self.values = array.array(_INT_CODE or 'd')
+            self.tags = array.array('B')
+            self.extend(values)
+
+    def _fromColumn(self, values):
+
+        """Takes values in one step if they are all floats or all ints;
+        returns False if they are not."""
+
+        if numpy is not None and isinstance(values, numpy.ndarray):
+            if values.dtype.kind == 'f':
+                values = array.array('d', values.astype('<f8').tostring())
+            elif values.dtype.kind in 'iu' and _INT_CODE and \
+                    values.dtype != numpy.uint64:
+                values = array.array(_INT_CODE,
+                                     values.astype('<i8').tostring())
+            else:
+                return False
+
+        if isinstance(values, array.array):
+            if values.typecode in 'fd':
+                self.values = array.array('d', values)
+                self.tags = array.array('B', [NUMBER]) * len(values)
+                return True
+            if values.typecode in 'bBhHiIl' and _INT_CODE:
+                self.values = array.array(_INT_CODE, values)
+                self.tags = array.array('B', [INTEGER]) * len(values)
+                return True
+            return False
+
+        if type(values) is not list or not values:
+            return False
+
+        types = set(map(type, values))
+
+        if types == set([float]):
+            self.values = array.array('d', values)
+            self.tags = array.array('B', [NUMBER]) * len(values)
+            return True
+
+        if types <= set([int, long]) and _INT_CODE and \
+                -_INT64 <= min(values) and max(values) < _INT64:
+            self.values = array.array(_INT_CODE, values)
+            self.tags = array.array('B', [INTEGER]) * len(values)
+            return True
+
+        return False
+
+    @classmethod
+    def fromCells(cls, cells, names, type=None, label=None):
+
+        """Returns the range of the cells names of a sheet (a dict of cell
+        dicts or Cells); missing cells are empty."""
+
+        values = []
+
+        for name in names:
+            cell = cells.get(name)
+            if cell is None:
+                values.append(None)
+            elif isinstance(cell, Cell):
+                values.append(cell.value)
+            else:
+                values.append(cell.get('value'))
+
+        return cls(values, type, label)
+
+    def __len__(self):
+        return len(self.tags)
+
+    def _floats(self):
+
+        """Makes the values array hold floats (for a float), or a list if
+        a float cannot hold one of its ints exactly."""
+
+        if type(self.values) is list or self.values.typecode == 'd':
+            return
+
+        ints = self.values
+        floats = array.array('d', ints)
+
+        for i in xrange(len(ints)):
+            if self.tags[i] == INTEGER and floats[i] != ints[i]:
+                self.values = ints.tolist()
+                return
+
+        self.values = floats
+
+    def _holds(self, number):
+
+        """Makes the values hold the int number, as a list if the array
+        cannot."""
+
+        values = self.values
+
+        if type(values) is list:
+            return
+
+        if values.typecode == 'd':
+            try:
+                fits = float(number) == number
+            except OverflowError:
+                fits = False
+        else:
+            fits = -_INT64 <= number < _INT64
+
+        if not fits:
+            self.values = values.tolist()
+
+    def _store(self, tag, number):
+
+        if tag == NUMBER:
+            self._floats()
+        elif tag == INTEGER:
+            self._holds(number)
+
+    def append(self, value):
+
+        tag, number = _tag(value)
+        self._store(tag, number)
+
+        if tag in _SPARSE:
+            self.others[len(self.tags)] = value
+
+        if tag > INTEGER:
+            self._nonNumbers += 1
+
+        self.values.append(number)
+        self.tags.append(tag)
+
+    def extend(self, values):
+
+        for value in values:
+            self.append(value)
+
+    def __getitem__(self, i):
+
+        if isinstance(i, slice):
+            return Range([self[k] for k in xrange(*i.indices(len(self)))],
+                         self.type, self.label)
+
+        if i < 0:
+            i += len(self.tags)
+
+        tag = self.tags[i]
+
+        if tag == NUMBER:
+            return self.values[i]
+
+        if tag == INTEGER:
+            return int(self.values[i])
+
+        if tag == BOOLEAN:
+            return bool(self.values[i])
+
+        if tag == EMPTY:
+            return None
+
+        return self.others[i]
+
+    def __setitem__(self, i, value):
+
+        if i < 0:
+            i += len(self.tags)
+
+        old = self.tags[i]
+        tag, number = _tag(value)
+        self._store(tag, number)
+        self.others.pop(i, None)
+
+        if tag in _SPARSE:
+            self.others[i] = value
+
+        self._nonNumbers += (tag > INTEGER) - (old > INTEGER)
+        self.values[i] = number
+        self.tags[i] = tag
+
+    def __iter__(self):
+
+        # a list holds ints as ints
+        if not self._nonNumbers and (type(self.values) is list or
+                                     self.values.typecode != 'd' or
+                                     INTEGER not in self.tags):
+            return iter(self.values)
+
+        return (self[i] for i in xrange(len(self.tags)))
+
+    def __eq__(self, other):
+
+        return isinstance(other, Range) and list(self) == list(other) and \
+            self.type == other.type and self.label == other.label
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'Range(%r, %r, %r)' % (list(self), self.type, self.label)
+
+    def cell(self, i):
+
+        """Returns the i-th cell as a Cell."""
+
+        return Cell(self[i], self.type, self.label)
+
+    def isNumeric(self):
+
+        """Returns True if every value is a number (int or float)."""
+
+        return not self._nonNumbers
+
+    def numbers(self, zero=False):
+
+        """Returns the numbers of the range as an array (a list when the
+        range keeps a list): its values itself when every value is a
+        number, else new ones without the other values (with 0 in their
+        place when zero is True)."""
+
+        if not self._nonNumbers:
+            return self.values
+
+        values = self.values
+        tags = self.tags
+
+        if zero:
+            numbers = [values[i] if tags[i] <= INTEGER else 0
+                       for i in xrange(len(tags))]
+        else:
+            numbers = [values[i] for i in xrange(len(tags))
+                       if tags[i] <= INTEGER]
+
+        if type(values) is list:
+            return numbers
+
+        return array.array(values.typecode, numbers)
@@ -0,0 +1,311 @@
+"""coercion.py -- the checking and coercion of the aggregates' arguments.
+
+numbers() looks at an nLst once and returns its numbers as a Numbers
+object, classified by kind:
+
+    COLUMN -- an array.array, memoryview or NumPy array of numbers, or a
+              cells.Range; the element type comes with the buffer,
+              nothing is checked per item and the math runs over the
+              buffer (NumPy when available, C-level builtins otherwise)
+    INT, FLOAT, MIXED -- a list of ints (and longs), of floats, or of
+              both
+
+A list is classified with one C-level pass over the types of its items
+(set(map(type, nLst))), not with a chain of type tests per item; the
+aggregates then run on the builtins (sum, min, max, ...) over the list
+itself, whose inner loops have their own fast paths for all-int and
+all-float items.  Lists holding other items are handled by policy:
+
+    STRICT -- raise TypeError (AVERAGE, MIN, MAX, ...)
+    SKIP -- leave them out (SUM)
+    ZERO -- count them as 0 (AVERAGEA, MINA, MAXA)
+
+and only then is a new list built.  The caller's list is never changed.
+A Range holding other values than numbers follows the same policies,
+using its tags instead of the types of the items; one that keeps its
+numbers in a list (ints too big for its array) is handled as that list.
+Booleans are not numbers here, as they were not for the per-item tests.
+"""
+
+import __builtin__
+import array
+import math
+import operator
+
+from itertools import imap, repeat
+
+from cells import Range
+from errors import NumError, TypeError, ZeroDivisionError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+COLUMN = 'column'
+INT = 'int'
+FLOAT = 'float'
+MIXED = 'mixed'
+
+STRICT = 'strict'
+SKIP = 'skip'
+ZERO = 'zero'
+
+_INTS = frozenset([int, long])
+_FLOATS = frozenset([float])
+_NUMBERS = frozenset([int, long, float])
+
+_COLUMN_TYPECODES = 'bBhHiIlLfd'
+# bool arrays are not numbers, as booleans in lists are not
+_COLUMN_KINDS = 'iuf'
+
+
+def column(nLst):
+
+    """Returns nLst as a column (array.array or 1-d numpy.ndarray), or None
+    if nLst is not one of the column types or a Range with other values
+    than numbers.
+
+    Raises TypeError if the column does not hold numbers.
+    """
+
+    if isinstance(nLst, Range):
+
+        # a range of ints too big for an array keeps them in a list
+        if nLst.isNumeric() and type(nLst.values) is not list:
+            return nLst.values
+
+        return None
+
+    if isinstance(nLst, array.array):
+
+        if nLst.typecode not in _COLUMN_TYPECODES:
+
+            raise TypeError, 'non-numeric column typecode'
+
+        return nLst
+
+    if numpy is not None and isinstance(nLst, numpy.ndarray):
+
+        if nLst.dtype.kind not in _COLUMN_KINDS:
+
+            raise TypeError, 'non-numeric column dtype'
+
+        return nLst.ravel()
+
+    if isinstance(nLst, memoryview):
+
+        if numpy is not None:
+
+            try:
+                col = numpy.frombuffer(nLst.tobytes(), dtype=nLst.format)
+            except (ValueError, __builtin__.TypeError):
+                raise TypeError, 'unsupported column format'
+
+            return column(col)
+
+        fmt = nLst.format.lstrip('@')
+
+        if fmt not in _COLUMN_TYPECODES:
+
+            raise TypeError, 'unsupported column format'
+
+        col = array.array(fmt)
+        col.fromstring(nLst.tobytes())
+
+        return col
+
+    return None
+
+
+def isColumn(nLst):
+
+    return isinstance(nLst, (array.array, memoryview, Range)) or \
+        (numpy is not None and isinstance(nLst, numpy.ndarray))
+
+
+def isStream(nLst):
+
+    """Returns True for iterables that are neither lists nor columns
+    (generators, tuples, files of numbers), which the aggregates feed to
+    the streaming accumulators."""
+
+    return type(nLst) is not list and hasattr(nLst, '__iter__') and \
+        not isColumn(nLst)
+
+
+def _kind(types):
+
+    if types <= _INTS:
+        return INT
+
+    if types <= _FLOATS:
+        return FLOAT
+
+    return MIXED
+
+
+def numbers(nLst, policy=STRICT):
+
+    """Returns the numbers of nLst (a list or a column) as Numbers.
+
+    Raises TypeError for other arguments, ZeroDivisionError for an empty
+    nLst.
+    """
+
+    if isinstance(nLst, Range):
+
+        if policy == STRICT and not nLst.isNumeric():
+            raise TypeError, 'non-numeric list item'
+
+        nLst = nLst.numbers(policy == ZERO)
+
+    col = column(nLst)
+
+    if col is not None:
+
+        if len(col) < 1:
+            raise ZeroDivisionError, 'nLst has zero length'
+
+        return Numbers(col, COLUMN)
+
+    if type(nLst) is not list:
+        raise TypeError, 'nLst argument not a list'
+
+    if len(nLst) < 1:
+        raise ZeroDivisionError, 'nLst has zero length'
+
+    types = set(map(type, nLst))
+
+    if types <= _NUMBERS:
+        return Numbers(nLst, _kind(types))
+
+    if policy == STRICT:
+        raise TypeError, 'non-numeric list item'
+
+    if policy == SKIP:
+        values = [x for x in nLst if type(x) in _NUMBERS]
+        return Numbers(values, _kind(types & _NUMBERS))
+
+    values = [x if type(x) in _NUMBERS else 0 for x in nLst]
+
+    return Numbers(values, _kind((types & _NUMBERS) | _INTS))
+
+
+def _scalar(x):
+
+    """Returns NumPy scalars as plain Python numbers."""
+
+    if hasattr(x, 'item'):
+        return x.item()
+
+    return x
+
+
+class Numbers(object):
+
+    """The numbers of an aggregate's argument and their kind.  values is
+    the caller's list or column itself unless items had to be left out
+    or replaced; it is only ever read."""
+
+    def __init__(self, values, kind):
+
+        self.values = values
+        self.kind = kind
+        self.isNumpy = numpy is not None and isinstance(values, numpy.ndarray)
+
+    def __len__(self):
+        return len(self.values)
+
+    def positive(self):
+
+        """Returns self, raising NumError unless every value is greater
+        than 0 (the means of GEOMEAN and HARMEAN), as the streaming
+        accumulators do."""
+
+        if self.min() <= 0:
+            raise NumError, 'non-positive value'
+
+        return self
+
+    def _big(self):
+
+        """Returns the largest magnitude of an integer NumPy column."""
+
+        v = self.values
+
+        return max(abs(_scalar(v.min())), abs(_scalar(v.max())))
+
+    def sum(self):
+
+        v = self.values
+
+        if self.isNumpy and v.dtype.kind == 'f':
+            return _scalar(v.sum())
+
+        if self.isNumpy:
+
+            # integer sums wrap around silently: use int64 only while the
+            # sum cannot overflow it, exact Python ints otherwise
+            if self._big() * len(v) < 2 ** 63:
+                return _scalar(v.sum(dtype=numpy.int64))
+
+            v = v.tolist()
+
+        return sum(v)
+
+    def sumSq(self):
+
+        v = self.values
+
+        if self.isNumpy and v.dtype.kind == 'f':
+            return _scalar(numpy.dot(v, v))
+
+        if self.isNumpy:
+
+            # as in sum()
+            big = self._big()
+
+            if big * big * len(v) < 2 ** 63:
+                v = v.astype(numpy.int64)
+                return _scalar(numpy.dot(v, v))
+
+            v = v.tolist()
+
+        return sum(imap(operator.mul, v, v))
+
+    def min(self):
+
+        if self.isNumpy:
+            return _scalar(self.values.min())
+
+        return min(self.values)
+
+    def max(self):
+
+        if self.isNumpy:
+            return _scalar(self.values.max())
+
+        return max(self.values)
+
+    def sumLog(self):
+
+        """Returns the sum of the natural logarithms (the log of the
+        product, which overflows a float long before its log does)."""
+
+        if self.isNumpy:
+            return _scalar(numpy.log(self.values.astype(numpy.float64)).sum())
+
+        return math.fsum(imap(math.log, self.values))
+
+    def sumInv(self):
+
+        """Returns the sum of the reciprocals."""
+
+        v = self.values
+
+        if self.isNumpy:
+            return _scalar((1.0 / v.astype(numpy.float64)).sum())
+
+        return sum(imap(operator.truediv, repeat(1.0, len(v)), v))
@@ -0,0 +1,363 @@
+"""dates.py -- spreadsheet date serial numbers.
+
+Spreadsheets store a date as a serial number of days.  In the 1900 date
+system serial 1 is 1900-01-01 and, for compatibility with Lotus 1-2-3,
+serial 60 is the non-existent 1900-02-29; in the 1904 date system serial
+0 is 1904-01-01.
+
+Conversions go through a day number (days since 1900-01-01) and a few
+lookup tables built at import time: the day number of every January 1st
+from FIRST_YEAR to LAST_YEAR and the month and day of every day of a
+common and a leap year.  Both directions are then a handful of table
+lookups.  Dates outside the tables fall back to datetime ordinals.
+
+The column functions convert whole arrays of dates, with NumPy when it
+is available.
+"""
+
+import __builtin__
+import array
+import datetime
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+FIRST_YEAR = 1900
+LAST_YEAR = 2200
+
+_ORDINAL_1900 = datetime.date(1900, 1, 1).toordinal()
+
+# day number of 1904-01-01, serial 0 of the 1904 date system
+_OFFSET_1904 = 1460
+
+# day number of 1900-03-01, the first date after the phantom 1900-02-29
+_MARCH_1900 = 59
+
+
+def isLeap(year):
+
+    """Returns True if year is a leap year of the Gregorian calendar."""
+
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def _tables():
+
+    yearStart = array.array('l')
+    leaps = array.array('B')
+    days = 0
+
+    for y in xrange(FIRST_YEAR, LAST_YEAR + 2):
+        yearStart.append(days)
+        leaps.append(isLeap(y))
+        days += 366 if isLeap(y) else 365
+
+    lengths = ((31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31),
+               (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31))
+    monthStart = []
+    monthOfDay = []
+    dayOfDay = []
+
+    for leap in (0, 1):
+
+        starts = array.array('H', [0])
+        months = array.array('B')
+        mdays = array.array('B')
+
+        for m, n in enumerate(lengths[leap]):
+            starts.append(starts[-1] + n)
+            months.extend([m + 1] * n)
+            mdays.extend(xrange(1, n + 1))
+
+        monthStart.append(starts)
+        monthOfDay.append(months)
+        dayOfDay.append(mdays)
+
+    return yearStart, leaps, lengths, monthStart, monthOfDay, dayOfDay
+
+
+(_YEAR_START, _LEAP, MONTH_LENGTHS, _MONTH_START,
+ _MONTH_OF_DAY, _DAY_OF_DAY) = _tables()
+
+_LAST_DAY = _YEAR_START[-1]
+
+
+def daysInMonth(year, month):
+
+    """Returns the number of days in the given month."""
+
+    return MONTH_LENGTHS[isLeap(year)][month - 1]
+
+
+def dayNumber(y, m, d):
+
+    """Returns the number of days between 1900-01-01 and y-m-d.
+
+    Months outside 1..12 roll over into neighbouring years and days
+    outside the month into neighbouring months, as DATE() does.
+    """
+
+    if type(y) not in (int, long) or type(m) not in (int, long) or \
+            type(d) not in (int, long):
+        raise __builtin__.TypeError, 'integer arguments expected'
+
+    if m < 1 or m > 12:
+        y += (m - 1) // 12
+        m = (m - 1) % 12 + 1
+
+    i = y - FIRST_YEAR
+
+    if 0 <= i <= LAST_YEAR - FIRST_YEAR:
+        return _YEAR_START[i] + _MONTH_START[_LEAP[i]][m - 1] + d - 1
+
+    if y < 1 or y > 9999:
+        raise ValueError, 'year %d is out of range' % y
+
+    return datetime.date(y, m, 1).toordinal() - _ORDINAL_1900 + d - 1
+
+
+def fromDayNumber(n):
+
+    """Returns (y, m, d) for the day number n."""
+
+    if 0 <= n < _LAST_DAY:
+
+        i = int(n * 400 // 146097)
+
+        if _YEAR_START[i] > n:
+            i -= 1
+        elif _YEAR_START[i + 1] <= n:
+            i += 1
+
+        doy = n - _YEAR_START[i]
+        leap = _LEAP[i]
+
+        return (FIRST_YEAR + i, _MONTH_OF_DAY[leap][doy],
+                _DAY_OF_DAY[leap][doy])
+
+    try:
+        d = datetime.date.fromordinal(int(n) + _ORDINAL_1900)
+    except (ValueError, OverflowError):
+        raise ValueError, 'day number %d is out of range' % n
+
+    return d.year, d.month, d.day
+
+
+def serial(y, m, d, date1904=False):
+
+    """Returns the serial number of the date y-m-d (the DATE() function).
+
+    Years 0 to 1899 are taken as 1900 to 3799, as spreadsheets do.  In
+    the 1900 date system days of January and February 1900 count on past
+    the phantom 1900-02-29, so serial(1900, 2, 29) is 60.
+    """
+
+    if type(y) in (int, long) and 0 <= y < 1900:
+        y += 1900
+
+    if not date1904 and y == 1900 and m in (1, 2):
+        s = _phantomSerial(m, d)
+        if s >= 1:
+            return s
+
+    n = dayNumber(y, m, d)
+
+    if date1904:
+
+        if n < _OFFSET_1904:
+            raise ValueError, 'date before 1904-01-01'
+
+        return n - _OFFSET_1904
+
+    if n < 0:
+        raise ValueError, 'date before 1900-01-01'
+
+    return n + 1 if n < _MARCH_1900 else n + 2
+
+
+def _phantomSerial(m, d):
+
+    """Returns the serial of day d of month m (1 or 2) of 1900, counting
+    February 1900 as 29 days long."""
+
+    return (m == 2) * 31 + d
+
+
+def _serialToDayNumber(s, date1904):
+
+    s = int(s)
+
+    if date1904:
+        return s + _OFFSET_1904
+
+    return s - 1 if s < 60 else s - 2
+
+
+def fromSerial(s, date1904=False):
+
+    """Returns (y, m, d) for the serial number s.  Fractions of a day are
+    ignored.  In the 1900 date system serial 60 is (1900, 2, 29) and serial
+    0 is (1900, 1, 0), as spreadsheets display them.
+    """
+
+    if s < 0:
+        raise ValueError, 'negative date serial'
+
+    if not date1904:
+
+        if int(s) == 60:
+            return (1900, 2, 29)
+
+        if int(s) == 0:
+            return (1900, 1, 0)
+
+    return fromDayNumber(_serialToDayNumber(s, date1904))
+
+
+def toDate(s, date1904=False):
+
+    """Returns the datetime.date of the serial number s."""
+
+    return datetime.date(*fromSerial(s, date1904))
+
+
+def fromDate(date, date1904=False):
+
+    """Returns the serial number of a datetime.date."""
+
+    return serial(date.year, date.month, date.day, date1904)
+
+
+def weekday(s, date1904=False):
+
+    """Returns the day of the week of the serial number s, 0 for Monday.
+    In the 1900 date system serials before 61 take the weekdays that
+    spreadsheets give them, one day off the real calendar because of the
+    phantom 1900-02-29: serial 1 (1900-01-01) is a Sunday.
+    """
+
+    if date1904:
+        return _serialToDayNumber(s, True) % 7
+
+    return (int(s) - 2) % 7
+
+
+# Columns
+
+
+def serials(years, months, days, date1904=False):
+
+    """Returns the serial numbers of whole columns of years, months and
+    days (an array.array, or a NumPy array when NumPy is available).
+    Years must fall between FIRST_YEAR and LAST_YEAR and months in 1..12.
+    """
+
+    if numpy is not None:
+
+        y = numpy.asarray(years, dtype=numpy.int64) - FIRST_YEAR
+        m = numpy.asarray(months, dtype=numpy.int64)
+        d = numpy.asarray(days, dtype=numpy.int64)
+
+        if len(y) and (y.min() < 0 or y.max() > LAST_YEAR - FIRST_YEAR or
+                       m.min() < 1 or m.max() > 12):
+            raise ValueError, 'date out of the table range'
+
+        yearStart = numpy.frombuffer(_YEAR_START, dtype=numpy.dtype('l'))
+        leap = numpy.frombuffer(_LEAP, dtype=numpy.uint8)
+        monthStart = numpy.array([_MONTH_START[0], _MONTH_START[1]])
+
+        n = yearStart[y] + monthStart[leap[y], m - 1] + d - 1
+
+        if date1904:
+            return n - _OFFSET_1904
+
+        s = numpy.where(n < _MARCH_1900, n + 1, n + 2)
+        phantom = (y == 0) & (m <= 2)
+
+        if phantom.any():
+            s = numpy.where(phantom & (_phantomSerial(m, d) >= 1),
+                            _phantomSerial(m, d), s)
+
+        return s
+
+    out = array.array('l')
+    top = LAST_YEAR - FIRST_YEAR
+    yearStart = _YEAR_START
+    leap = _LEAP
+    monthStart = _MONTH_START
+
+    for y, m, d in zip(years, months, days):
+
+        i = y - FIRST_YEAR
+
+        if i < 0 or i > top or m < 1 or m > 12:
+            raise ValueError, 'date out of the table range'
+
+        n = yearStart[i] + monthStart[leap[i]][m - 1] + d - 1
+
+        if date1904:
+            out.append(n - _OFFSET_1904)
+        elif i == 0 and m <= 2 and _phantomSerial(m, d) >= 1:
+            out.append(_phantomSerial(m, d))
+        else:
+            out.append(n + 1 if n < _MARCH_1900 else n + 2)
+
+    return out
+
+
+def fromSerials(column, date1904=False):
+
+    """Returns (years, months, days) columns for a column of serial
+    numbers, which must fall between FIRST_YEAR and LAST_YEAR.
+    """
+
+    if numpy is not None:
+
+        s = numpy.asarray(column).astype(numpy.int64)
+
+        if date1904:
+            n = s + _OFFSET_1904
+        else:
+            n = numpy.where(s < 60, s - 1, s - 2)
+
+        if len(n) and (n.min() < 0 or n.max() >= _LAST_DAY):
+            raise ValueError, 'date out of the table range'
+
+        yearStart = numpy.frombuffer(_YEAR_START, dtype=numpy.dtype('l'))
+        i = numpy.searchsorted(yearStart, n, side='right') - 1
+        doy = n - yearStart[i]
+        leap = numpy.frombuffer(_LEAP, dtype=numpy.uint8)[i]
+        monthOfDay = numpy.array([_MONTH_OF_DAY[0].tolist() + [0],
+                                  _MONTH_OF_DAY[1].tolist()])
+        dayOfDay = numpy.array([_DAY_OF_DAY[0].tolist() + [0],
+                                _DAY_OF_DAY[1].tolist()])
+
+        months = monthOfDay[leap, doy]
+        days = dayOfDay[leap, doy]
+
+        if not date1904:
+            phantom = s == 60
+            months[phantom] = 2
+            days[phantom] = 29
+
+        return i + FIRST_YEAR, months, days
+
+    years = array.array('l')
+    months = array.array('B')
+    days = array.array('B')
+
+    for s in column:
+
+        y, m, d = fromSerial(s, date1904)
+
+        if y < FIRST_YEAR or y > LAST_YEAR:
+            raise ValueError, 'date out of the table range'
+
+        years.append(y)
+        months.append(m)
+        days.append(d)
+
+    return years, months, days
@@ -0,0 +1,296 @@
+"""daycount.py -- day count conventions (the spreadsheet basis argument).
+
+basis 0 -- US (NASD) 30/360
+basis 1 -- actual/actual
+basis 2 -- actual/360
+basis 3 -- actual/365
+basis 4 -- European 30/360
+
+Dates are spreadsheet serial numbers (see dates.py).  The column
+functions take whole arrays of start and end dates; with NumPy every
+rule below becomes a masked select over the columns instead of a branch
+per date pair.
+"""
+
+import array
+
+import dates
+
+from errors import NumError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+BASES = (0, 1, 2, 3, 4)
+
+
+def isColumn(x):
+
+    """Returns True if x is a list, tuple, array.array or NumPy array."""
+
+    if isinstance(x, (list, tuple, array.array)):
+        return True
+
+    return numpy is not None and isinstance(x, numpy.ndarray)
+
+
+def _isLastOfFebruary(y, m, d):
+    return m == 2 and d == dates.daysInMonth(y, 2)
+
+
+def days360(y1, m1, d1, y2, m2, d2, european=False):
+
+    """Returns the number of days between two dates in a 360-day year.
+
+    european -- False for the US (NASD) method of DAYS360, True for the
+                European method
+    """
+
+    if european:
+
+        d1 = min(d1, 30)
+        d2 = min(d2, 30)
+
+    else:
+
+        if d1 == 31 or _isLastOfFebruary(y1, m1, d1):
+            d1 = 30
+
+        if d2 == 31 and d1 == 30:
+            d2 = 30
+
+    return (y2 - y1) * 360 + (m2 - m1) * 30 + d2 - d1
+
+
+def _days360Basis0(y1, m1, d1, y2, m2, d2):
+
+    # YEARFRAC's flavour of US 30/360: the end date moves off the 31st only
+    # when the start date was the 30th or 31st (not the end of February),
+    # and the end of February moves when both dates fall on it
+    feb1 = _isLastOfFebruary(y1, m1, d1)
+
+    if d2 == 31 and d1 >= 30:
+        d2 = 30
+    elif feb1 and _isLastOfFebruary(y2, m2, d2):
+        d2 = 30
+
+    if d1 == 31 or feb1:
+        d1 = 30
+
+    return (y2 - y1) * 360 + (m2 - m1) * 30 + d2 - d1
+
+
+def _actualYearLength(y1, m1, d1, y2, m2, d2):
+
+    """Returns the year length actual/actual uses between two ordered
+    dates."""
+
+    if y1 == y2:
+        return 366.0 if dates.isLeap(y1) else 365.0
+
+    if y2 == y1 + 1 and (m1, d1) >= (m2, d2):
+
+        # less than a year apart: 366 if a February 29th lies between
+        if dates.isLeap(y1) and (m1, d1) <= (2, 29):
+            return 366.0
+
+        if dates.isLeap(y2) and (m2, d2) >= (2, 29):
+            return 366.0
+
+        return 365.0
+
+    days = dates.dayNumber(y2 + 1, 1, 1) - dates.dayNumber(y1, 1, 1)
+
+    return days * 1.0 / (y2 - y1 + 1)
+
+
+def yearFraction(start, end, basis=0, date1904=False):
+
+    """Returns the fraction of a year between two serial numbers."""
+
+    if basis not in BASES:
+        raise NumError, 'basis must be 0 to 4'
+
+    start = int(start)
+    end = int(end)
+
+    if start > end:
+        start, end = end, start
+
+    if basis == 2:
+        return (end - start) / 360.0
+
+    if basis == 3:
+        return (end - start) / 365.0
+
+    y1, m1, d1 = dates.fromSerial(start, date1904)
+    y2, m2, d2 = dates.fromSerial(end, date1904)
+
+    if basis == 0:
+        return _days360Basis0(y1, m1, d1, y2, m2, d2) / 360.0
+
+    if basis == 4:
+        return days360(y1, m1, d1, y2, m2, d2, True) / 360.0
+
+    return (end - start) / _actualYearLength(y1, m1, d1, y2, m2, d2)
+
+
+def days360Serial(start, end, european=False, date1904=False):
+
+    """Returns DAYS360 between two serial numbers."""
+
+    y1, m1, d1 = dates.fromSerial(start, date1904)
+    y2, m2, d2 = dates.fromSerial(end, date1904)
+
+    return days360(y1, m1, d1, y2, m2, d2, european)
+
+
+def days(start, end, basis=0, date1904=False):
+
+    """Returns the day count between two serial numbers under basis: 30/360
+    days for bases 0 and 4, actual days otherwise.
+    """
+
+    if basis == 0:
+        return days360Serial(start, end, False, date1904)
+
+    if basis == 4:
+        return days360Serial(start, end, True, date1904)
+
+    if basis not in BASES:
+        raise NumError, 'basis must be 0 to 4'
+
+    return int(end) - int(start)
+
+
+def yearDays(year, basis=0):
+
+    """Returns the length of the given year under basis."""
+
+    if basis in (0, 2, 4):
+        return 360
+
+    if basis == 3:
+        return 365
+
+    if basis == 1:
+        return 366 if dates.isLeap(year) else 365
+
+    raise NumError, 'basis must be 0 to 4'
+
+
+# Columns
+
+
+def _columns(starts, ends):
+
+    if len(starts) != len(ends):
+        raise NumError, 'start and end columns differ in length'
+
+
+def days360Column(starts, ends, european=False, date1904=False):
+
+    """Returns DAYS360 for every pair of start and end serial numbers."""
+
+    _columns(starts, ends)
+
+    if numpy is None:
+        return array.array('l', [days360Serial(s, e, european, date1904)
+                                 for s, e in zip(starts, ends)])
+
+    y1, m1, d1 = dates.fromSerials(starts, date1904)
+    y2, m2, d2 = dates.fromSerials(ends, date1904)
+
+    return _days360Numpy(y1, m1, d1, y2, m2, d2, european, False)
+
+
+def _lastOfFebruaryNumpy(y, m, d):
+
+    leap = (y % 4 == 0) & ((y % 100 != 0) | (y % 400 == 0))
+
+    return (m == 2) & (d == numpy.where(leap, 29, 28))
+
+
+def _days360Numpy(y1, m1, d1, y2, m2, d2, european, basis0):
+
+    y1, m1, d1, y2, m2, d2 = [numpy.asarray(c, dtype=numpy.int64)
+                              for c in (y1, m1, d1, y2, m2, d2)]
+
+    if european:
+
+        d1 = numpy.minimum(d1, 30)
+        d2 = numpy.minimum(d2, 30)
+
+    else:
+
+        feb1 = _lastOfFebruaryNumpy(y1, m1, d1)
+
+        if basis0:
+            d2 = numpy.where((d2 == 31) & (d1 >= 30), 30, numpy.where(
+                feb1 & _lastOfFebruaryNumpy(y2, m2, d2), 30, d2))
+            d1 = numpy.where((d1 == 31) | feb1, 30, d1)
+        else:
+            d1 = numpy.where((d1 == 31) | feb1, 30, d1)
+            d2 = numpy.where((d2 == 31) & (d1 == 30), 30, d2)
+
+    return (y2 - y1) * 360 + (m2 - m1) * 30 + d2 - d1
+
+
+def yearFractionColumn(starts, ends, basis=0, date1904=False):
+
+    """Returns YEARFRAC for every pair of start and end serial numbers."""
+
+    _columns(starts, ends)
+
+    if basis not in BASES:
+        raise NumError, 'basis must be 0 to 4'
+
+    if numpy is None:
+        return array.array('d', [yearFraction(s, e, basis, date1904)
+                                 for s, e in zip(starts, ends)])
+
+    a = numpy.asarray(starts).astype(numpy.int64)
+    b = numpy.asarray(ends).astype(numpy.int64)
+    s = numpy.minimum(a, b)
+    e = numpy.maximum(a, b)
+
+    if basis == 2:
+        return (e - s) / 360.0
+
+    if basis == 3:
+        return (e - s) / 365.0
+
+    y1, m1, d1 = [c.astype(numpy.int64)
+                  for c in dates.fromSerials(s, date1904)]
+    y2, m2, d2 = [c.astype(numpy.int64)
+                  for c in dates.fromSerials(e, date1904)]
+
+    if basis in (0, 4):
+        return _days360Numpy(y1, m1, d1, y2, m2, d2, basis == 4,
+                             basis == 0) / 360.0
+
+    leap1 = (y1 % 4 == 0) & ((y1 % 100 != 0) | (y1 % 400 == 0))
+    leap2 = (y2 % 4 == 0) & ((y2 % 100 != 0) | (y2 % 400 == 0))
+    md1 = m1 * 100 + d1
+    md2 = m2 * 100 + d2
+
+    sameYear = y1 == y2
+    withinYear = (y2 == y1 + 1) & (md1 >= md2)
+    feb29 = (leap1 & (md1 <= 229)) | (leap2 & (md2 >= 229))
+
+    # average year length over y1..y2, from the days before each January 1st
+    def yearStart(y):
+        y = y - 1
+        return y * 365 + y // 4 - y // 100 + y // 400
+
+    average = (yearStart(y2 + 1) - yearStart(y1)) * 1.0 / (y2 - y1 + 1)
+
+    length = numpy.where(sameYear, numpy.where(leap1, 366.0, 365.0),
+                         numpy.where(withinYear,
+                                     numpy.where(feb29, 366.0, 365.0),
+                                     average))
+
+    return (e - s) / length
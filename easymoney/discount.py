@@ -0,0 +1,246 @@
+"""discount.py -- present and future values for many rates at once.
+
+A DiscountGrid holds the discount factors (1 + rate) ** -t for a vector
+of rates and a vector of times, computed once.  NPV and XNPV of any cash
+flow on those times are then a single matrix-vector product per call,
+which is what rate sensitivity runs need: the same flows (or many flows
+on the same schedule) at hundreds of rates.  PV and FV take the growth
+factor (1 + rate) ** nper of each rate from a grid with one time.  The
+scalar EasyMoney functions use a one-rate grid, so both entry points
+share the kernel, and return a float (a list of floats for a sequence of
+rates) with or without NumPy.
+
+For whole periods the factors are built by repeated multiplication
+rather than pow() calls.  NumPy is used when it is available.
+"""
+
+import operator
+
+from itertools import imap
+
+from errors import NumError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _isSequence(x):
+    return hasattr(x, '__len__')
+
+
+def _days(d):
+    return d.toordinal() if hasattr(d, 'toordinal') else d
+
+
+def yearTimes(dates):
+
+    """Returns the dates as years after the first one (365-day years), as
+    XNPV and XIRR count them.
+    """
+
+    days = [_days(d) for d in dates]
+
+    if not days:
+        return []
+
+    start = days[0]
+
+    for d in days:
+        if d < start:
+            raise NumError, 'date before the first date'
+
+    return [(d - start) / 365.0 for d in days]
+
+
+class DiscountGrid(object):
+
+    """Discount factors for every (rate, time) pair.
+
+    rates -- a rate or a sequence of rates (fractions)
+    times -- an int n for periods 1..n (as NPV counts them), or a
+             sequence of times in periods or years
+
+    factors[i][j] is (1 + rates[i]) ** -times[j].
+    """
+
+    def __init__(self, rates, times):
+
+        if not _isSequence(rates):
+            rates = [rates]
+
+        rates = [float(r) for r in rates]
+
+        for r in rates:
+            if r <= -1.0:
+                raise NumError, 'rate must be greater than -1'
+
+        if _isSequence(times):
+            times = [float(t) for t in times]
+            periods = None
+        else:
+            periods = int(times)
+            times = [float(t) for t in xrange(1, periods + 1)]
+
+        self.rates = rates
+        self.times = times
+
+        if numpy is not None:
+
+            g = 1.0 + numpy.asarray(rates)
+            self.factors = g[:, numpy.newaxis] ** -numpy.asarray(times)
+
+        elif periods is not None:
+
+            self.factors = []
+
+            for r in rates:
+                x = 1.0 / (1.0 + r)
+                row = [0.0] * periods
+                v = 1.0
+                for j in xrange(periods):
+                    v = v * x
+                    row[j] = v
+                self.factors.append(row)
+
+        else:
+
+            self.factors = [[(1.0 + r) ** -t for t in times] for r in rates]
+
+    def __len__(self):
+        return len(self.rates)
+
+    def npv(self, flows):
+
+        """Returns the present value of flows at every rate (a list, or a
+        NumPy array).  flows[j] is paid at times[j].
+        """
+
+        if len(flows) != len(self.times):
+            raise NumError, 'flows and times differ in length'
+
+        if numpy is not None:
+            return self.factors.dot(numpy.asarray(flows, dtype=numpy.float64))
+
+        mul = operator.mul
+
+        return [sum(imap(mul, row, flows)) for row in self.factors]
+
+    def npvMatrix(self, streams):
+
+        """Returns result[i][k], the present value of streams[k] at
+        rates[i].  All streams share the grid's times.
+        """
+
+        if numpy is not None:
+            m = numpy.asarray(streams, dtype=numpy.float64)
+            if m.ndim != 2 or m.shape[1] != len(self.times):
+                raise NumError, 'streams and times differ in length'
+            return self.factors.dot(m.T)
+
+        cols = [self.npv(s) for s in streams]
+
+        return [list(row) for row in zip(*cols)] if cols else \
+            [[] for r in self.rates]
+
+
+def _result(rate, result):
+
+    """Returns result, the values of a grid, as one float for a scalar
+    rate and as a list of floats for a sequence of rates, whichever
+    backend computed them."""
+
+    if hasattr(result, 'tolist'):
+        result = result.tolist()
+
+    if _isSequence(rate):
+        return [float(x) for x in result]
+
+    return float(result[0])
+
+
+def npv(rate, values):
+
+    """Returns NPV(rate, values): values[j] is paid at the end of period
+    j + 1.  rate may be a sequence, giving one NPV per rate.
+    """
+
+    return _result(rate, DiscountGrid(rate, len(values)).npv(values))
+
+
+def xnpv(rate, values, dates):
+
+    """Returns XNPV(rate, values, dates): values[j] is paid on dates[j],
+    discounted to the first date.  rate may be a sequence.
+    """
+
+    if len(values) != len(dates):
+        raise NumError, 'values and dates differ in length'
+
+    return _result(rate, DiscountGrid(rate, yearTimes(dates)).npv(values))
+
+
+def _annuities(rate, nper, type):
+
+    """Returns (g, a) for every rate: g the growth factor (1 + rate) **
+    nper and a the annuity factor of the payments, both derived from the
+    discount factors of a one-time grid."""
+
+    grid = DiscountGrid(rate, [nper])
+
+    if numpy is not None:
+
+        r = numpy.asarray(grid.rates)
+        g = 1.0 / grid.factors[:, 0]
+        zero = r == 0
+        safe = numpy.where(zero, 1.0, r)
+        a = numpy.where(zero, float(nper), (1.0 + r * type) * (g - 1.0) / safe)
+
+        return g, a
+
+    g = [1.0 / row[0] for row in grid.factors]
+    a = [float(nper) if r == 0 else (1.0 + r * type) * (x - 1.0) / r
+         for r, x in zip(grid.rates, g)]
+
+    return g, a
+
+
+def fv(rate, nper, pmt, pv=0.0, type=0):
+
+    """Returns the future value of pv plus nper payments of pmt.  rate may
+    be a sequence, giving one value per rate.
+    """
+
+    g, a = _annuities(rate, nper, type)
+
+    if numpy is not None:
+        return _result(rate, -(pv * g + pmt * a))
+
+    return _result(rate, [-(pv * x + pmt * y) for x, y in zip(g, a)])
+
+
+def pv(rate, nper, pmt, fv=0.0, type=0):
+
+    """Returns the present value of nper payments of pmt and a final fv.
+    rate may be a sequence, giving one value per rate.
+    """
+
+    g, a = _annuities(rate, nper, type)
+
+    if numpy is not None:
+        return _result(rate, -(fv + pmt * a) / g)
+
+    return _result(rate, [-(fv + pmt * y) / x for x, y in zip(g, a)])
+
+
+def fvSchedule(principal, schedule):
+
+    """Returns principal compounded through the rates in schedule."""
+
+    g = reduce(operator.mul, [1.0 + r for r in schedule], 1.0)
+
+    if _isSequence(principal):
+        return [p * g for p in principal]
+
+    return principal * g
@@ -33,14 +33,102 @@ without prior written authorization from Jacek Artymiak.
 For more information write to jacek@artymiak.com.
 """
 
-import calendar
+import decimal
+import math
 import types
 import time
 
-# TODO: clean up the following three defs
-class EasyMoneyError(Exception): pass
-class TypeError(EasyMoneyError): pass
-class ZeroDivisionError(EasyMoneyError): pass
+from errors import EasyMoneyError, TypeError, ZeroDivisionError, NumError
+
+import accumulators
+import amortization
+import bonds
+import businessdays
+import cells
+import coercion
+import dates
+import daycount
+import discount
+import matrix
+import money
+import quantiles
+import reductions
+import regression
+import rolling
+import solver
+import tables
+
+
+_NUMBER_TYPES = frozenset([int, long, float])
+
+
+def _amounts(nLst, strict):
+
+    """Returns the amounts in nLst for money mode: its numbers and
+    Decimals.  Other items raise TypeError when strict and are skipped
+    otherwise, as SUM skips them.  Columns and lists of numbers are
+    returned as they are, for Context.unitsMany() to convert in one go."""
+
+    if isinstance(nLst, basestring) or not hasattr(nLst, '__iter__'):
+
+        raise TypeError, 'nLst argument not a list'
+
+    col = coercion.column(nLst)
+
+    if col is not None:
+        return col
+
+    if type(nLst) is list and set(map(type, nLst)) <= _NUMBER_TYPES:
+        return nLst
+
+    amounts = []
+
+    for x in nLst:
+
+        if type(x) in (int, long, float) or isinstance(x, decimal.Decimal):
+            amounts.append(x)
+        elif strict:
+            raise TypeError, 'non-numeric list item'
+
+    return amounts
+
+
+def _stream(cls, nLst, skip=False):
+
+    """Returns an accumulator of class cls fed with the values of a
+    non-list iterable (a generator, a tuple, a file of numbers, ...).
+    With skip, items that are not numbers are left out (as SUM does).
+
+    Raises TypeError for strings and other non-iterables.
+    """
+
+    if isinstance(nLst, basestring) or not hasattr(nLst, '__iter__'):
+
+        raise TypeError, 'nLst argument not a list'
+
+    if skip:
+
+        items = [0]
+
+        def numbers(values):
+            for x in values:
+                items[0] += 1
+                if type(x) in (int, long, float):
+                    yield x
+
+        acc = cls(numbers(nLst))
+        count = items[0]
+
+    else:
+
+        acc = cls(nLst)
+        count = acc.count
+
+    if not count:
+
+        raise ZeroDivisionError, 'nLst has zero length'
+
+    return acc
 
 
 class EasyMoney:
@@ -50,29 +138,36 @@ class EasyMoney:
     to port existing spreadsheet formulas to Python.
     """
 
+    # exposed on the class so that callers holding an instance can catch them
+    EasyMoneyError = EasyMoneyError
+    TypeError = TypeError
+    ZeroDivisionError = ZeroDivisionError
+    NumError = NumError
+
+    # serial numbers count days from 1904-01-01 instead of 1900-01-01
+    date1904 = False
+
+    # a money.Context for exact money: the simple and compound interest
+    # functions, SUM and AVERAGE then work on integer minor units and
+    # return Decimals rounded as the context says
+    money = None
 
     def fDATE(self, y, m, d):
 
         """Implements: DATE(y, m, d)
 
-        Returns internal serial number (aka. timestamp) that 
-        represents a date written as year, month, day. 
+        Returns the serial number that represents a date written as
+        year, month, day, counted the way spreadsheets count them: day 1
+        is 1900-01-01 (or day 0 is 1904-01-01 when date1904 is set).
 
-        y -- year
-        m -- month
-        d -- day
+        y -- year (0 to 1899 mean 1900 to 3799)
+        m -- month (values outside 1..12 roll over into other years)
+        d -- day (values outside the month roll over into other months)
 
-        The range of y is architecture-dependent as is the timestamp 
-        returned by fDATE().  Do *not* assume that timestamps from two
-        different systems will be the same.  Always check timezones,
-        epochs, etc.
-
-        ###
-        ### TODO: Verify
-        ###
+        See dates.py for the details, including the phantom 1900-02-29.
         """
 
-        return calendar.timegm((y, m, d, 0, 0, 0))
+        return dates.serial(y, m, d, self.date1904)
 
     def fINT(self, n):
 
@@ -141,34 +236,80 @@ class EasyMoney:
         Returns simple future value of money
         """
 
+        if self.money is not None:
+            m = self.money
+            units = m.units(pv)
+            return m.decimal(units + m.percent(units, ir))
+
         fv = pv + pv * ir / 100.0
 
         return fv
 
     def iSimple(self, pv, ir):
+        if self.money is not None:
+            return self.money.decimal(self.money.percent(self.money.units(pv), ir))
         i = pv * ir / 100.0
         return i
 
     def iSimpleFromFV(self, pv, fv):
+        if self.money is not None:
+            m = self.money
+            return m.decimal(m.units(fv) - m.units(pv))
         i = fv - pv
         return i
 
     def irSimple(self, pv, fv):
+        if self.money is not None:
+            m = self.money
+            pv, fv = m.units(pv), m.units(fv)
         ir = 100.0 * (fv - pv) / pv
         return ir
 
     def pvSimple(self, fv, i):
+        if self.money is not None:
+            m = self.money
+            return m.decimal(m.units(fv) - m.units(i))
         pv = fv - i
         return pv
 
     def pvSimpleFromIR(self, fv, ir):
+        if self.money is not None:
+            m = self.money
+            n, d = money.ratio(ir)
+            return m.decimal(m.divide(m.units(fv) * 100 * d, 100 * d + n))
         pv = 100.0 * fv / (100.0 + 1.0 * ir)
         return pv
 
     def fvAdjusted(self, pv, ir, days, diy):
+        if self.money is not None:
+            m = self.money
+            units = m.units(pv)
+            return m.decimal(units + m.percent(units, ir, days, diy))
         fv = pv + pv * ir * days / (100.0 * diy)
         return fv
 
+    def fvCompound(self, pv, ir, n):
+        """pv -- present value of money
+        ir -- interest rate per period (percent value)
+        n -- number of periods
+
+        Returns future value of money with interest compounded each period
+        """
+
+        if self.money is not None:
+            m = self.money
+            return m.decimal(m.compound(m.units(pv), ir, n))
+
+        fv = -discount.fv(ir / 100.0, n, 0.0, pv)
+        return fv
+
+    def pvCompound(self, fv, ir, n):
+        if self.money is not None:
+            m = self.money
+            return m.decimal(m.compound(m.units(fv), ir, -n))
+        pv = -discount.pv(ir / 100.0, n, 0.0, fv)
+        return pv
+
     def isLeapYear(self, year):
 
         leapYear = None
@@ -178,364 +319,290 @@ class EasyMoney:
         if (year < 0):
             return leapYear
 
-        if (year % 4 == 0):
-            if (year % 100 != 0):
-                leapYear = True
-            else:
-                if (year % 400 == 0):
-                    leapYear = True 
-                else:
-                    leapYear = False
-        else:
-            leapYear = False
+        leapYear = dates.isLeap(year)
 
         return leapYear
     
 
-def daysInA360DayYear(self, dStart, mStart, yStart, dEnd, mEnd, yEnd):
-
-    days = None
-
-    if (yStart < 0 or yEnd < 0):
-        return days
-
-    if (mStart < 1 or mEnd < 1):
-        return days
-
-    if (mStart > 12 or mEnd > 12):
-        return days
+    def daysInA360DayYear(self, dStart, mStart, yStart, dEnd, mEnd, yEnd):
 
-    if (dStart < 1 or dEnd < 1):
-        return days
-
-    if (dStart > 31 or dEnd > 31):
-        return days
+        """Returns the number of days between two dates counted in a
+        360-day year (US/NASD 30/360, as DAYS360 does).
 
-    if (mStart == 1):
-
-        if (dStart == 31):
-
-            mStart = 2
-            dStart = 1
-
-    if (mStart == 2):
+        Returns None if either date is invalid.
+        """
 
-        if (leapYear(yStart)):
+        days = None
 
-            if (dStart > 29):
+        for y, m, d in ((yStart, mStart, dStart), (yEnd, mEnd, dEnd)):
 
+            if (y < 0 or m < 1 or m > 12 or d < 1):
                 return days
 
-        else:
-
-            if (dStart > 28):
-
+            if (d > dates.daysInMonth(y, m)):
                 return days
 
-    if (mStart == 3):
-
-        if (dStart == 31):
-
-            mStart = 4
-            dStart = 1
-
-    if (mStart == 4):
-
-        if (dStart > 30):
-
-            return days
-
-    if (mStart == 5):
-
-        if (dStart == 31):
-
-            mStart = 6
-            dStart = 1
-
-    if (mStart == 6):
-
-        if (dStart > 30):
-
-            return days
+        days = daycount.days360(yStart, mStart, dStart, yEnd, mEnd, dEnd)
 
-    if (mStart == 7):
+        return days
 
-        if (dStart == 31):
 
-            mStart = 8
-            dStart = 1
+    # Array Functions
 
-    if (mStart == 8):
 
-        if (dStart == 31):
+    def fEXPAND(self, eae):
+        """EXPAND() (Array Function)
+        eae -- enabled array expression
+        """
+        pass
 
-            mStart = 9
-            dStart = 1
+    def fFREQUENCY(self, data, clases):
+        """TODO
+        """
+        pass
 
-    if (mStart == 9):
+    def fGROWTH(self, data_Y, data_X=None, new_data_X=None,
+                function_type=True):
 
-        if (dStart > 30):
+        """Returns the values of the exponential fit of data_Y on data_X
+        (see fLOGEST) at the rows of new_data_X (data_X by default).
+        """
 
-            return days
+        f = regression.fit(data_Y, data_X, function_type, True)
 
-    if (mStart == 10):
+        if new_data_X is None:
+            return f.predictMany(regression.design(data_Y, data_X))
 
-        if (dStart == 31):
+        return f.predictMany(regression.rows(new_data_X))
 
-            mStart = 11
-            dStart = 1
+    def fLINEST(self, data_Y, data_X=None, linear_type=True, stats=False):
 
-    if (mStart == 11):
+        """Returns the least squares fit y = m1 * x1 + ... + b as a list of
+        rows, the first [mk, ..., m1, b].
 
-        if (dStart > 30):
+        data_X -- a list of numbers, a list of rows of regressors, or None
+                  for 1, 2, ... n
+        linear_type -- False to force b to zero
+        stats -- True to add four rows of regression statistics (see
+                 regression.Fit.linest)
 
-            return days
+        Fits are cached, so fTREND on the same data reuses this one.
+        """
 
-    if (mStart == 12):
+        return regression.fit(data_Y, data_X, linear_type).linest(stats)
 
-        if (dStart == 31):
+    def fLOGEST(self, data_Y, data_X=None, function_type=True, stats=False):
 
-            yStart = yStart + 1
-            mStart = 1
-            dStart = 1
+        """Returns the exponential fit y = b * m1 ** x1 * ... as a list of
+        rows, the first [mk, ..., m1, b].  The statistics are those of the
+        linear fit of ln(y), as spreadsheets report them.
+        """
 
-    if (mEnd == 1):
+        return regression.fit(data_Y, data_X, function_type,
+                              True).linest(stats)
 
-        if (dEnd == 31):
+    def fMDETERM(self, array):
 
-            mEnd = 2
-            dEnd = 1
+        """Returns the determinant of a square matrix (a list of rows).
 
-    if (mEnd == 2):
+        The LU factorization is cached (see matrix.FactorCache), so
+        fMINVERSE of the same matrix does not factor it again.
+        """
 
-        if (leapYear(yEnd)):
+        return matrix.determinant(array)
 
-            if (dEnd > 29):
+    def fMINVERSE(self, array):
 
-                return days
+        """Returns the inverse of a square matrix (a list of rows).
 
-            else:
+        Raises NumError if the matrix is singular.
+        """
 
-                if (dEnd > 28):
+        return matrix.inverse(array)
 
-                    return days
+    def fMMULT(self, array1, array2):
 
-    if (mEnd == 3):
+        """Returns the matrix product of array1 and array2 (lists of rows,
+        NumPy arrays or matrix.Matrix objects).
 
-        if (dEnd == 31):
+        The result is a NumPy array, or a matrix.Matrix without NumPy;
+        both index as result[i][j].
+        """
 
-            mEnd = 4
-            dEnd = 1
+        return matrix.mmult(array1, array2)
 
-    if (mEnd == 4):
+    def fNOEXPAND(self, eae):
+        """NOEXPAND() (Array Function)
+        eae -- enabled array expression
+        """
+        pass
 
-        if (dEnd > 30):
+    def fSUMPRODUCT(self, *arrays):
 
-            return days
+        """Returns the sum of the products of corresponding items of the
+        arrays.  Spreadsheets take up to 30 arrays; any number is accepted
+        here.
 
-    if (mEnd == 5):
+        The arrays may be lists, array.array, memoryview or NumPy arrays,
+        or generators, and must all have the same length.  They are
+        reduced together in one pass (see reductions.py).  Items that are
+        not numbers (text, blanks, booleans) count as 0.
+        """
 
-        if (dEnd == 31):
+        return reductions.sumProduct(*arrays)
 
-            mEnd = 6
-            dEnd = 1
+    def fSUMX2MY2(self, array_x, array_y):
 
-    if (mEnd == 6):
+        """Returns the sum of the differences of squares of corresponding
+        items, sum(x ** 2 - y ** 2)."""
 
-        if (dEnd > 30):
+        return reductions.sumX2mY2(array_x, array_y)
 
-            return days
+    def fSUMX2PY2(self, array_x, array_y):
 
-    if (mEnd == 7):
+        """Returns the sum of the sums of squares of corresponding items,
+        sum(x ** 2 + y ** 2)."""
 
-        if (dEnd == 31):
+        return reductions.sumX2pY2(array_x, array_y)
 
-            mEnd = 8
-            dEnd = 1
+    def fSUMXMY2(self, array_x, array_y):
 
-    if (mEnd == 8):
+        """Returns the sum of squares of the differences of corresponding
+        items, sum((x - y) ** 2)."""
 
-        if (dEnd == 31):
+        return reductions.sumXmY2(array_x, array_y)
 
-            mEnd = 9
-            dEnd = 1
+    def fTRANSPOSE(self, array):
 
-    if (mEnd == 9):
+        """Returns the transpose of a matrix.  NumPy arrays and
+        matrix.Matrix objects are transposed as views, without copying.
+        """
 
-        if (dEnd > 30):
+        return matrix.transpose(array)
 
-            return days
+    def fTREND(self, data_Y, data_X=None, new_data_X=None, linear_Type=True):
 
-    if (mEnd == 10):
+        """Returns the values of the linear fit of data_Y on data_X (see
+        fLINEST) at the rows of new_data_X (data_X by default).
+        """
 
-        if (dEnd == 31):
+        f = regression.fit(data_Y, data_X, linear_Type)
 
-            mEnd = 11
-            dEnd = 1
+        if new_data_X is None:
+            return f.predictMany(regression.design(data_Y, data_X))
 
-    if (mEnd == 11):
+        return f.predictMany(regression.rows(new_data_X))
 
-        if (dEnd > 30):
 
-            return days
+    # Database Functions
 
-    if (mEnd == 12):
 
-        if (dEnd == 31):
+    def DAVERAGE(self, database, field, criteria):
 
-            yEnd = yEnd + 1
-            mEnd = 1
-            dEnd = 1
+        """Returns the average of the numbers in field of the records that
+        match criteria.
 
-    yAdjust = (yEnd - yStart) * 360
-    
-    # check if the month is February
-        # check if the day is 29
-        # check if the year is a special year
-            # yes? keep
-            # no?  adjust accordingly
-    # check if day is > 28
+        database -- a list of rows, labels first, or a tables.Table
+        field -- a column label or a 1-based column number
+        criteria -- a list of rows, labels first; the conditions of a
+                    row must all hold, and any row may match
 
-    days = days + yAdjust 
+        Pass a tables.Table to query the same data repeatedly: it keeps
+        its column indexes and recent selections between calls, and its
+        aggregate() method computes several D-functions in one pass.
+        """
 
-    return period
+        return tables.aggregate(database, field, criteria, 'average')
 
+    def DCOUNT(self, database, field, criteria):
 
-    # Array Functions
+        """Returns the number of cells in field of the records that match
+        criteria that hold numbers (the number of matching records when
+        field is None).
+        """
 
+        return tables.aggregate(database, field, criteria, 'count')
 
-    def fEXPAND(self, eae):
-        """EXPAND() (Array Function)
-        eae -- enabled array expression
-        """
-        pass
+    def DCOUNTA(self, database, field, criteria):
 
-    def fFREQUENCY(self, data, clases):
-        """TODO
+        """Returns the number of non-blank cells in field of the records
+        that match criteria.
         """
-        pass
 
-    def fGROWTH(self, data_Y, data_X, new_data_X, function_type):
-        """TODO
-        """
-        pass
+        return tables.aggregate(database, field, criteria, 'counta')
 
-    def fLINEST(self, data_Y, data_X, linear_type, stats):
-        """TODO
-        """
-        pass
+    def DGET(self, database, field, criteria):
 
-    def fLOGEST(self, data_Y, data_X, function_type, stats):
-        """TODO
+        """Returns the value of field in the one record that matches
+        criteria.  Raises TypeError if no record matches and NumError if
+        several do.
         """
-        pass
 
-    def fMDETERM(self, array):
-        """TODO
-        """
-        pass
+        return tables.aggregate(database, field, criteria, 'get')
 
-    def fMINVERSE(self, array):
-        """TODO
-        """
-        pass
+    def DMAX(self, database, field, criteria):
 
-    def fMMULT(self, array1, array2):
-        """TODO
+        """Returns the largest number in field of the records that match
+        criteria (0 if there is none).
         """
-        pass
 
-    def fNOEXPAND(self, eae):
-        """NOEXPAND() (Array Function)
-        eae -- enabled array expression
-        """
-        pass
+        return tables.aggregate(database, field, criteria, 'max')
 
-    def fSUMPRODUCT(self, arrays):
-        """TODO -- this functions typically takes up to 30 arrays, but we don't have to obey that rule.
-        """
-        pass
+    def DMIN(self, database, field, criteria):
 
-    def fSUMX2MY2(self, array_x, array_y):
-        """TODO
+        """Returns the smallest number in field of the records that match
+        criteria (0 if there is none).
         """
-        pass
 
-    def fSUMX2PY2(self, array_x, array_y):
-        """TODO
-        """
-        pass
+        return tables.aggregate(database, field, criteria, 'min')
 
-    def fSUMXMY2(self, array_x, array_y):
-        """TODO
-        """
-        pass
+    def DPRODUCT(self, database, field, criteria):
 
-    def fTRANSPOSE(self, array):
-        """TODO
+        """Returns the product of the numbers in field of the records that
+        match criteria.
         """
-        pass
 
-    def fTREND(self, data_Y, data_X, new_data_X, linear_Type):
-        """TODO
-        """
-        pass
+        return tables.aggregate(database, field, criteria, 'product')
 
+    def DSTDEV(self, database, field, criteria):
 
-    # Database Functions
+        """Returns the sample standard deviation of the numbers in field of
+        the records that match criteria.
+        """
 
+        return tables.aggregate(database, field, criteria, 'stdev')
 
-    def DAVERAGE(self):
-        pass
+    def DSTDEVP(self, database, field, criteria):
 
-    def DCOUNT(self):
-        pass
+        """Returns the population standard deviation of the numbers in
+        field of the records that match criteria.
+        """
 
-    def DCOUNTA(self):
-        pass
+        return tables.aggregate(database, field, criteria, 'stdevp')
 
-    def DGET(self):
-        pass
+    def DSUM(self, database, field, criteria):
 
-    def DMAX(self):
-        """TODO
+        """Returns the sum of the numbers in field of the records that match
+        criteria.
         """
-        pass
 
-    def DMIN(self):
-        """TODO
-        """
-        pass
+        return tables.aggregate(database, field, criteria, 'sum')
 
-    def DPRODUCT(self):
-        """TODO
-        """
-        pass
+    def DVAR(self, database, field, criteria):
 
-    def DSTDEV(self):
-        """TODO
+        """Returns the sample variance of the numbers in field of the
+        records that match criteria.
         """
-        pass
 
-    def DSTDEVP(self):
-        """TODO
-        """
-        pass
+        return tables.aggregate(database, field, criteria, 'var')
 
-    def DSUM(self):
-        """TODO
-        """
-        pass
+    def DVARP(self, database, field, criteria):
 
-    def DVAR(self):
-        """TODO
+        """Returns the population variance of the numbers in field of the
+        records that match criteria.
         """
-        pass
 
-    def DVARP(self):
-        """TODO
-        """
-        pass
+        return tables.aggregate(database, field, criteria, 'varp')
 
 
     # XXXFIXMEXXX Functions
@@ -544,38 +611,17 @@ def daysInA360DayYear(self, dStart, mStart, yStart, dEnd, mEnd, yEnd):
     def AVERAGE(self, nLst):
         """Returns the arithmetic mean (average) value from the list of the arguments."""
 
-        if type(nLst) is not types.ListType:
-
-            raise TypeError, 'nLst argument not a list'
-
-        size = len(nLst)
-
-        if size < 1:
-            raise ZeroDivisionError, 'nLst has zero length'
+        if self.money is not None:
+            m = self.money
+            return m.decimal(m.mean(m.unitsMany(_amounts(nLst, True))))
 
-        a = 0
+        if coercion.isStream(nLst):
 
-        for x in nLst[:]:
+            return _stream(accumulators.Moments, nLst).value()
 
-            if type(x) is types.IntType:
+        values = coercion.numbers(nLst)
 
-                pass
-
-            elif type(x) is types.LongType:
-
-                pass
-
-            elif type(x) is types.FloatType:
-
-                pass
-
-            else:
-
-                raise TypeError, 'non-numeric list item'
-
-        a = a + x
-
-        return a * 1.0 / size
+        return values.sum() * 1.0 / len(values)
 
     def ABS(self, x):
 
@@ -605,73 +651,19 @@ def daysInA360DayYear(self, dStart, mStart, yStart, dEnd, mEnd, yEnd):
 
         """Returns the arithmetic mean (average) value from the list of the arguments.  Arguments may be non-numeric."""
 
-        if type(nLst) is not types.ListType:
-
-            raise TypeError, 'nLst argument not a list'
-
-            size = len(nLst)
-
-            if size < 1:
+        values = coercion.numbers(nLst, coercion.ZERO)
 
-                raise ZeroDivisionError, 'nLst has zero length'
-
-                a = 0
-
-        for x in nLst[:]:
-
-            if type(x) is types.IntType:
-
-                pass
-
-            elif type(x) is types.LongType:
-
-                pass
-
-            elif type(x) is types.FloatType:
-
-                pass
-
-            else:
-
-                continue 
-        a = a + x
-
-        return a * 1.0 / size
+        return values.sum() * 1.0 / len(values)
 
     def COUNT(self, nLst):
 
         """Returns the number of arguments in a list. Arguments must be numeric."""
 
-        if type(nLst) is not types.ListType:
+        if coercion.isStream(nLst):
 
-            raise TypeError, 'nLst argument not a list'
+            return _stream(accumulators.Sum, nLst).count
 
-        if len(nLst) < 1:
-
-            raise ZeroDivisionError, 'nLst has zero length'
-
-        a = 0
-
-        for x in nLst[:]:
-
-            if type(x) is types.IntType:
-
-                pass
-
-            elif type(x) is types.LongType:
-
-                pass
-
-            elif type(x) is types.FloatType:
-
-                pass
-
-            else:
-
-                raise TypeError, 'non-numeric list item'
-        a = a + 1
-
-        return a
+        return len(coercion.numbers(nLst))
 
 # the definition of A in COUNTA is slightly extended. Calc or Excel allow us to
 # use text strings, EasyMoney lets us use any non-numeric argument.  I don't
@@ -681,11 +673,12 @@ def daysInA360DayYear(self, dStart, mStart, yStart, dEnd, mEnd, yEnd):
 
         """Returns the number of arguments in a list. Arguments must be numeric."""
 
-        if type(nLst) is not types.ListType:
+        if type(nLst) is not types.ListType and \
+                not isinstance(nLst, cells.Range):
 
             raise TypeError, 'nLst argument not a list'
 
-        return size(nLst)
+        return len(nLst)
 
 
     # Date Functions
@@ -698,19 +691,37 @@ def daysInA360DayYear(self, dStart, mStart, yStart, dEnd, mEnd, yEnd):
 
         return time.localtime()[2]
 
-    def fDAY(self):
+    def fDAY(self, serial=None):
 
-        """Returns current day.  Server localtime is used to determine the
-        current day.  TODO: add timezone argument.
+        """Returns the day of the month of the date serial number.
+
+        Without an argument returns current day.  Server localtime is used
+        to determine the current day.  TODO: add timezone argument.
         """
 
-        return time.localtime()[2]
+        if serial is None:
+            return time.localtime()[2]
 
-    def fDAYS360(self):
+        return dates.fromSerial(serial, self.date1904)[2]
 
-        """Returns current day."""
+    def fDAYS360(self, start_date, end_date, method=False):
 
-        return time.localtime()[2]
+        """Returns the number of days between two date serial numbers in a
+        360-day year.
+
+        method -- False for the US (NASD) method, True for the European
+                  method
+
+        start_date and end_date may also be columns (lists or arrays) of
+        serial numbers, giving a column of results.
+        """
+
+        if daycount.isColumn(start_date):
+            return daycount.days360Column(start_date, end_date, method,
+                                          self.date1904)
+
+        return daycount.days360Serial(start_date, end_date, method,
+                                      self.date1904)
 
     def fEDATE(self):
 
@@ -736,17 +747,44 @@ def daysInA360DayYear(self, dStart, mStart, yStart, dEnd, mEnd, yEnd):
 
         return time.localtime()[2]
 
-    def fMONTH(self):
+    def fMONTH(self, serial=None):
 
-        """Returns current day."""
+        """Returns the month of the date serial number (current month
+        without an argument)."""
 
-        return time.localtime()[2]
+        if serial is None:
+            return time.localtime()[1]
 
-    def fNETWORKDAYS(self):
+        return dates.fromSerial(serial, self.date1904)[1]
 
-        """Returns current day."""
+    def fNETWORKDAYS(self, start_date, end_date, holidays=None):
 
-        return time.localtime()[2]
+        """Returns the number of working days (Monday to Friday, not in
+        holidays) from start_date to end_date, both included.
+
+        holidays -- serial numbers of holidays, or a HolidayCalendar
+
+        start_date and end_date may also be columns of serial numbers.
+        """
+
+        return self.fNETWORKDAYS_INTL(start_date, end_date, 1, holidays)
+
+    def fNETWORKDAYS_INTL(self, start_date, end_date, weekend=1,
+                          holidays=None):
+
+        """Returns NETWORKDAYS with a custom weekend.
+
+        weekend -- a weekend number (1: Saturday and Sunday, 2: Sunday and
+                   Monday, ..., 11: Sunday only, ...) or a string of seven
+                   0/1 characters from Monday to Sunday, 1 for days off
+        """
+
+        cal = businessdays.calendar(holidays, weekend, self.date1904)
+
+        if daycount.isColumn(start_date):
+            return cal.networkDaysColumn(start_date, end_date)
+
+        return cal.networkDays(start_date, end_date)
 
     def fNOW(self):
 
@@ -772,397 +810,529 @@ def daysInA360DayYear(self, dStart, mStart, yStart, dEnd, mEnd, yEnd):
 
         return time.localtime()[2]
 
-    def fWEEKDAY(self):
+    def fWEEKDAY(self, serial=None, return_type=1):
 
-        """Returns current day."""
+        """Returns the day of the week of the date serial number (today
+        without a serial number).
 
-        return time.localtime()[2]
+        return_type -- 1: Sunday is 1, Saturday is 7
+                       2: Monday is 1, Sunday is 7
+                       3: Monday is 0, Sunday is 6
+        """
 
-    def fWORKDAY(self):
+        if serial is None:
+            day = time.localtime()[6]
+        else:
+            day = dates.weekday(serial, self.date1904)
 
-        """Returns current day."""
+        if return_type == 1:
+            return (day + 1) % 7 + 1
 
-        return time.localtime()[2]
+        if return_type == 2:
+            return day + 1
 
-    def fYEAR(self):
+        if return_type == 3:
+            return day
 
-        """Returns current day."""
+        raise NumError, 'return_type must be 1, 2 or 3'
 
-        return time.localtime()[2]
+    def fWORKDAY(self, start_date, days, holidays=None):
 
-    def fYEARFRAC(self):
+        """Returns the serial number of the working day that is days
+        working days after start_date (before it for negative days).
 
-        """Returns current day."""
+        holidays -- serial numbers of holidays, or a HolidayCalendar
 
-        return time.localtime()[2]
+        start_date may also be a column of serial numbers, and days a
+        column or a single number.
+        """
 
-    # Engineering Functions
-    # Filter Functions
-    # Financial Functions
-    # Info Functions
-    # Logical Functions
-    # Lookup Functions
-    # Math Functions
-    # Operator Functions
-    # Parser Functions
-    # Statistical Functions
-    # Text Functions
+        return self.fWORKDAY_INTL(start_date, days, 1, holidays)
 
-    def fGEOMEAN(self, nLst):
+    def fWORKDAY_INTL(self, start_date, days, weekend=1, holidays=None):
 
-        """Returns the geometric mean value from the list of the arguments."""
+        """Returns WORKDAY with a custom weekend (see fNETWORKDAYS_INTL)."""
 
-        if type(nLst) is not types.ListType:
+        cal = businessdays.calendar(holidays, weekend, self.date1904)
 
-            raise TypeError, 'nLst argument not a list'
+        if daycount.isColumn(start_date):
+            return cal.workdayColumn(start_date, days)
 
-        size = len(nLst)
+        return cal.workday(start_date, days)
 
-        if size < 1:
+    def fYEAR(self, serial=None):
 
-            raise ZeroDivisionError, 'nLst has zero length'
+        """Returns the year of the date serial number (current year
+        without an argument)."""
 
-        a = 1.0 
+        if serial is None:
+            return time.localtime()[0]
 
-        for x in nLst[:]:
+        return dates.fromSerial(serial, self.date1904)[0]
 
-            if type(x) is types.IntType:
+    def fYEARFRAC(self, start_date, end_date, basis=0):
 
-                pass
+        """Returns the fraction of a year between two date serial numbers.
 
-            elif type(x) is types.LongType:
+        basis -- 0: US 30/360, 1: actual/actual, 2: actual/360,
+                 3: actual/365, 4: European 30/360
 
-                pass
+        start_date and end_date may also be columns of serial numbers.
+        """
 
-            elif type(x) is types.FloatType:
+        if daycount.isColumn(start_date):
+            return daycount.yearFractionColumn(start_date, end_date, basis,
+                                               self.date1904)
 
-                pass
+        return daycount.yearFraction(start_date, end_date, basis,
+                                     self.date1904)
 
-            else:
+    # Engineering Functions
+    # Filter Functions
 
-                raise TypeError, 'non-numeric list item'
 
-            a = a * x
+    # Financial Functions
 
-        return pow(a, 1.0 / size)
 
-    def HARMEAN(self, nLst):
+    def PMT(self, rate, nper, pv, fv=0.0, type=0):
 
-        """Returns the harmonic mean value from the list of the arguments."""
+        """Returns the payment per period of a loan.
 
-        if type(nLst) is not types.ListType:
+        rate -- periodic interest rate (fraction, e.g. 0.05 / 12)
+        nper -- number of payment periods
+        pv -- present value (the amount borrowed)
+        fv -- future value left after the last payment
+        type -- 0 (payments at the end of periods) or 1 (at the beginning)
 
-            raise TypeError, 'nLst argument not a list'
+        Payments are returned as negative numbers.
+        """
 
-            size = len(nLst)
+        return amortization.payment(rate, nper, pv, fv, type)
 
-        if size < 1:
+    def IPMT(self, rate, per, nper, pv, fv=0.0, type=0):
 
-            raise ZeroDivisionError, 'nLst has zero length'
+        """Returns the interest part of the payment in period per."""
 
-        a = 0
+        return amortization.period(rate, per, nper, pv, fv, type)[0]
 
-        for x in nLst[:]:
+    def PPMT(self, rate, per, nper, pv, fv=0.0, type=0):
 
-            if type(x) is types.IntType:
+        """Returns the principal part of the payment in period per."""
 
-                pass
+        return amortization.period(rate, per, nper, pv, fv, type)[1]
 
-            elif type(x) is types.LongType:
+    def CUMIPMT(self, rate, nper, pv, start, end, type):
 
-                pass
+        """Returns the interest paid between periods start and end
+        (inclusive)."""
 
-            elif type(x) is types.FloatType:
+        return amortization.cumulative(rate, nper, pv, start, end, type)[0]
 
-                pass
+    def CUMPRINC(self, rate, nper, pv, start, end, type):
 
-            else:
+        """Returns the principal paid between periods start and end
+        (inclusive)."""
 
-                raise TypeError, 'non-numeric list item'
+        return amortization.cumulative(rate, nper, pv, start, end, type)[1]
 
-            a = a + 1.0 / x
+    def AMORTIZE(self, rate, nper, pv, fv=0.0, type=0):
 
-            a = a * (1.0 / size)
+        """Returns the amortization schedules of one or more loans as an
+        amortization.Schedule of columns.  Each argument is a scalar or a
+        sequence with one item per loan.
+        """
 
-        return 1.0 / a
+        return amortization.amortize(rate, nper, pv, fv, type)
 
-    def HOUR(self):
+    def IRR(self, values, guess=None):
 
-        """Returns current hour."""
+        """Returns the internal rate of return of cash flows that occur at
+        regular periods.
 
-        return time.localtime()[3]
+        values -- cash flows, at least one positive and one negative
+        guess -- starting rate; estimated from the cash flows when omitted
 
-    def LEN(self, s):
+        Convergence statistics accumulate in solver.defaultStats.
+        """
 
-        """Returns the length of the given string."""
+        return solver.irr(values, guess)
 
-        return len(s)
+    def XIRR(self, values, dates, guess=None):
 
-    def LOWER(self, s):
+        """Returns the internal rate of return of cash flows paid on the
+        given dates (date objects or day numbers).
+        """
 
-        """Returns the lowercase version of the given string."""
+        return solver.xirr(values, dates, guess)
 
-        return s.lower()
+    def MIRR(self, values, finance_rate, reinvest_rate):
 
-    def MAX(self, nLst):
+        """Returns the modified internal rate of return of cash flows:
+        payments are financed at finance_rate and receipts reinvested at
+        reinvest_rate.
+        """
 
-        """Returns the maximum value from the list of the numeric arguments."""
+        return solver.mirr(values, finance_rate, reinvest_rate)
 
-        if type(nLst) is not types.ListType:
+    def NPV(self, rate, values):
 
-            raise TypeError, 'nLst argument not a list'
+        """Returns the net present value of values paid at the end of
+        periods 1, 2, ...  rate may be a list of rates, in which case the
+        discount factors are computed once for all of them and one NPV per
+        rate is returned (see discount.DiscountGrid).
+        """
 
-        if len(nLst) < 1:
+        return discount.npv(rate, values)
 
-            raise ZeroDivisionError, 'nLst has zero length'
+    def XNPV(self, rate, values, dates):
 
-        for x in nLst[:]:
+        """Returns the net present value of values paid on dates, discounted
+        to the first date.  rate may be a list of rates.
+        """
 
-            if type(x) is types.IntType:
+        return discount.xnpv(rate, values, dates)
 
-                pass
+    def PV(self, rate, nper, pmt, fv=0.0, type=0):
 
-            elif type(x) is types.LongType:
+        """Returns the present value of nper payments of pmt and a final
+        fv.  rate may be a list of rates.
+        """
 
-                pass
+        return discount.pv(rate, nper, pmt, fv, type)
 
-            elif type(x) is types.FloatType:
+    def FV(self, rate, nper, pmt, pv=0.0, type=0):
 
-                pass
+        """Returns the future value of pv and nper payments of pmt.  rate
+        may be a list of rates.
+        """
 
-            else:
+        return discount.fv(rate, nper, pmt, pv, type)
 
-                raise TypeError, 'non-numeric list item'
+    def FVSCHEDULE(self, principal, schedule):
 
-        return max(nLst)
+        """Returns principal compounded through the list of rates in
+        schedule."""
 
-    def MAXA(self, nLst):
+        return discount.fvSchedule(principal, schedule)
 
-        """Returns the maximum value from the list of arguments with non-numeric arguments treated as 0."""
+    def COUPDAYBS(self, settlement, maturity, frequency, basis=0):
 
-        if type(nLst) is not types.ListType:
+        """Returns the number of days from the beginning of the coupon
+        period to the settlement date.
 
-            raise TypeError, 'nLst argument not a list'
+        settlement, maturity -- date serial numbers
+        frequency -- coupons per year: 1, 2 or 4
+        basis -- day count basis, 0 to 4 (see fYEARFRAC)
 
-        if len(nLst) < 1:
+        The coupon schedules of all the COUP*, PRICE, YIELD and DURATION
+        functions come from the cache in bonds.defaultCache.
+        """
 
-            raise ZeroDivisionError, 'nLst has zero length'
+        return bonds.schedule(settlement, maturity, frequency, basis,
+                              self.date1904).daysBefore
 
-        a = 0
+    def COUPDAYS(self, settlement, maturity, frequency, basis=0):
 
-        for x in nLst[:]:
+        """Returns the number of days in the coupon period that contains
+        the settlement date."""
 
-            if type(x) is types.IntType:
+        return bonds.schedule(settlement, maturity, frequency, basis,
+                              self.date1904).days
 
-                pass
+    def COUPDAYSNC(self, settlement, maturity, frequency, basis=0):
 
-            elif type(x) is types.LongType:
+        """Returns the number of days from the settlement date to the next
+        coupon date."""
 
-                pass
+        return bonds.schedule(settlement, maturity, frequency, basis,
+                              self.date1904).daysToNext
 
-            elif type(x) is types.FloatType:
+    def COUPNCD(self, settlement, maturity, frequency, basis=0):
 
-                pass
+        """Returns the serial number of the next coupon date after the
+        settlement date."""
 
-            else:
+        return bonds.schedule(settlement, maturity, frequency, basis,
+                              self.date1904).ncd
 
-                nLst[a] = 0
+    def COUPNUM(self, settlement, maturity, frequency, basis=0):
 
-            a = a + 1
+        """Returns the number of coupons payable between the settlement
+        date and the maturity date."""
 
-        return max(nLst)
+        return bonds.schedule(settlement, maturity, frequency, basis,
+                              self.date1904).num
 
-    def MEDIAN(self, nLst):
+    def COUPPCD(self, settlement, maturity, frequency, basis=0):
 
-        """Returns the median value from the list of the numeric arguments."""
+        """Returns the serial number of the last coupon date on or before
+        the settlement date."""
 
-        if type(nLst) is not types.ListType:
+        return bonds.schedule(settlement, maturity, frequency, basis,
+                              self.date1904).pcd
 
-            raise TypeError, 'nLst argument not a list'
+    def PRICE(self, settlement, maturity, rate, yld, redemption, frequency,
+              basis=0):
 
-            size = len(nLst)
+        """Returns the price per 100 of face value of a bond that pays
+        periodic interest.
 
-        if size < 1:
+        rate -- annual coupon rate (fraction)
+        yld -- annual yield (fraction)
+        redemption -- redemption value per 100 of face value
 
-            raise ZeroDivisionError, 'nLst has zero length'
+        settlement, maturity, rate, yld and redemption may also be columns
+        describing a whole book of bonds (see bonds.prices()).
+        """
 
-        for x in nLst[:]:
+        if daycount.isColumn(settlement) or daycount.isColumn(maturity):
+            return bonds.prices(settlement, maturity, rate, yld, redemption,
+                                frequency, basis, self.date1904)
 
-            if type(x) is types.IntType:
+        s = bonds.schedule(settlement, maturity, frequency, basis,
+                           self.date1904)
 
-                pass
+        return bonds.price(s, rate, yld, redemption)
 
-            elif type(x) is types.LongType:
+    def YIELD(self, settlement, maturity, rate, pr, redemption, frequency,
+              basis=0):
 
-                pass
+        """Returns the annual yield of a bond that pays periodic interest
+        and sells at the price pr per 100 of face value.  Accepts columns
+        like PRICE.
+        """
 
-            elif type(x) is types.FloatType:
+        if daycount.isColumn(settlement) or daycount.isColumn(maturity):
+            return bonds.yields(settlement, maturity, rate, pr, redemption,
+                                frequency, basis, self.date1904)
 
-                pass
+        s = bonds.schedule(settlement, maturity, frequency, basis,
+                           self.date1904)
 
-            else:
+        return bonds.bondYield(s, rate, pr, redemption)
 
-                raise TypeError, 'non-numeric list item'
+    def DURATION(self, settlement, maturity, coupon, yld, frequency,
+                 basis=0):
 
-        if size == 1:
+        """Returns the Macaulay duration in years of a bond with a face
+        value of 100.  Accepts columns like PRICE.
+        """
 
-            return nLst[0]
+        if daycount.isColumn(settlement) or daycount.isColumn(maturity):
+            return bonds.durations(settlement, maturity, coupon, yld,
+                                   frequency, basis, self.date1904)
 
-        a = size % 2
+        s = bonds.schedule(settlement, maturity, frequency, basis,
+                           self.date1904)
 
-        if a == 0:
+        return bonds.duration(s, coupon, yld)
 
-            b = (nLst[size / 2] * 1.0 + nLst[(size / 2) - 1] * 1.0) / 2.0
+    def MDURATION(self, settlement, maturity, coupon, yld, frequency,
+                  basis=0):
 
-        if a == 1:
+        """Returns the modified duration in years of a bond with a face
+        value of 100.  Accepts columns like PRICE.
+        """
 
-            b = nLst[size / 2]
+        if daycount.isColumn(settlement) or daycount.isColumn(maturity):
+            return bonds.durations(settlement, maturity, coupon, yld,
+                                   frequency, basis, self.date1904, True)
 
-        return b
+        s = bonds.schedule(settlement, maturity, frequency, basis,
+                           self.date1904)
 
-    def MIN(self, nLst):
+        return bonds.modifiedDuration(s, coupon, yld)
 
-        """Returns the minimum value from the list of the numeric arguments."""
+    # Info Functions
+    # Logical Functions
+    # Lookup Functions
+    # Math Functions
+    # Operator Functions
+    # Parser Functions
+    # Statistical Functions
+    # Text Functions
 
-        if type(nLst) is not types.ListType:
+    def fGEOMEAN(self, nLst):
 
-            raise TypeError, 'nLst argument not a list'
+        """Returns the geometric mean value from the list of the arguments."""
 
-        if len(nLst) < 1:
+        if coercion.isStream(nLst):
 
-            raise ZeroDivisionError, 'nLst has zero length'
+            return _stream(accumulators.GeoMean, nLst).value()
 
-        for x in nLst[:]:
+        values = coercion.numbers(nLst).positive()
 
-            if type(x) is types.IntType:
+        # in log space, as the streaming GeoMean: no product to overflow
+        return math.exp(values.sumLog() / len(values))
 
-                pass
+    def HARMEAN(self, nLst):
 
-            elif type(x) is types.LongType:
+        """Returns the harmonic mean value from the list of the arguments."""
 
-                pass
+        if coercion.isStream(nLst):
 
-            elif type(x) is types.FloatType:
+            return _stream(accumulators.HarMean, nLst).value()
 
-                pass
+        values = coercion.numbers(nLst).positive()
 
-            else:
+        return len(values) / values.sumInv()
 
-                raise TypeError, 'non-numeric list item'
+    def HOUR(self):
 
-        return min(nLst)
+        """Returns current hour."""
 
-    def MINA(self, nLst):
+        return time.localtime()[3]
 
-        """Returns the maximum value from the list of arguments with non-numeric arguments treated as 0."""
+    def LEN(self, s):
 
-        if type(nLst) is not types.ListType:
+        """Returns the length of the given string."""
 
-            raise TypeError, 'nLst argument not a list'
+        return len(s)
 
-        if len(nLst) < 1:
+    def LOWER(self, s):
 
-            raise ZeroDivisionError, 'nLst has zero length'
+        """Returns the lowercase version of the given string."""
 
-            a = 0
+        return s.lower()
 
-        for x in nLst[:]:
+    def MAX(self, nLst):
 
-            if type(x) is types.IntType:
+        """Returns the maximum value from the list of the numeric arguments."""
 
-                pass
+        if coercion.isStream(nLst):
 
-            elif type(x) is types.LongType:
+            return _stream(accumulators.Max, nLst).value()
 
-                pass
+        return coercion.numbers(nLst).max()
 
-            elif type(x) is types.FloatType:
+    def MAXA(self, nLst):
 
-                pass
+        """Returns the maximum value from the list of arguments with non-numeric arguments treated as 0."""
 
-            else:
+        return coercion.numbers(nLst, coercion.ZERO).max()
 
-                nLst[a] = 0
+    def MEDIAN(self, nLst):
 
-            a = a + 1
+        """Returns the median value from the list of the numeric arguments.
 
-        return min(nLst)
+        The middle values are found by selection (see quantiles.py), not
+        by sorting the list; nLst itself is left as it is.
+        """
 
-    def SUM(self, nLst):
+        return quantiles.median(nLst)
 
-        """Returns the sum of the arguments."""
+    def fPERCENTILE(self, nLst, k):
 
-        if type(nLst) is not types.ListType:
+        """Returns the k-th percentile of the values, 0 <= k <= 1,
+        interpolating between the two nearest ranks.
+        """
 
-            raise TypeError, 'nLst argument not a list'
+        return quantiles.quantile(nLst, k)
 
-            size = len(nLst)
+    def fPERCENTILE_INC(self, nLst, k):
 
-        if size < 1:
+        """PERCENTILE.INC -- the same as PERCENTILE."""
 
-            raise ZeroDivisionError, 'nLst has zero length'
+        return quantiles.quantile(nLst, k)
 
-        a = 0
+    def fPERCENTILE_EXC(self, nLst, k):
 
-        for x in nLst[:]:
+        """PERCENTILE.EXC -- the k-th percentile of the values, with k
+        between 1/(n+1) and n/(n+1) exclusive of the ends of the range.
+        """
 
-            if type(x) is types.IntType:
+        return quantiles.quantile(nLst, k, 'exclusive')
 
-                pass
+    def fQUARTILE(self, nLst, quart):
 
-            elif type(x) is types.LongType:
+        """Returns a quartile of the values: the minimum (quart 0), the
+        first quartile (1), the median (2), the third quartile (3) or the
+        maximum (4).
+        """
 
-                pass
+        quart = int(quart)
 
-            elif type(x) is types.FloatType:
+        if not 0 <= quart <= 4:
+            raise NumError, 'quart must be between 0 and 4'
 
-                pass
+        return quantiles.quantile(nLst, quart / 4.0)
 
-            else:
+    def fQUARTILE_INC(self, nLst, quart):
 
-                continue
+        """QUARTILE.INC -- the same as QUARTILE."""
 
-            a = a + x
+        return self.fQUARTILE(nLst, quart)
 
-        return a
+    def fQUARTILE_EXC(self, nLst, quart):
 
-    def SUMSQ(self, nLst):
+        """QUARTILE.EXC -- the first, second or third quartile of the
+        values, computed as PERCENTILE.EXC does.
+        """
 
-        """Returns the sum of the squares of arguments."""
+        quart = int(quart)
 
-        if type(nLst) is not types.ListType:
+        if not 1 <= quart <= 3:
+            raise NumError, 'quart must be between 1 and 3'
 
-            raise TypeError, 'nLst argument not a list'
+        return quantiles.quantile(nLst, quart / 4.0, 'exclusive')
+
+    def fROLLING(self, nLst, window, function='AVERAGE', out=None):
+
+        """Returns function applied to each window of window consecutive
+        values of nLst, n - window + 1 results in all.
+
+        function -- AVERAGE, SUM, MIN, MAX, MEDIAN, VAR or STDEV
+        out -- a preallocated array.array, NumPy array or list for the
+               results; a new array.array('d') when not given
 
-            size = len(nLst)
+        Each window is updated from the one before it, not recomputed
+        (see rolling.py).
+        """
+
+        return rolling.rolling(nLst, window, function, out)
+
+    def MIN(self, nLst):
+
+        """Returns the minimum value from the list of the numeric arguments."""
 
-        if size < 1:
+        if coercion.isStream(nLst):
 
-            raise ZeroDivisionError, 'nLst has zero length'
+            return _stream(accumulators.Min, nLst).value()
 
-        a = 0
+        return coercion.numbers(nLst).min()
 
-        for x in nLst[:]:
+    def MINA(self, nLst):
+
+        """Returns the maximum value from the list of arguments with non-numeric arguments treated as 0."""
+
+        return coercion.numbers(nLst, coercion.ZERO).min()
+
+    def SUM(self, nLst):
 
-            if type(x) is types.IntType:
+        """Returns the sum of the arguments."""
 
-                pass
+        if self.money is not None:
+            m = self.money
+            amounts = _amounts(nLst, False)
+            if not len(amounts):
+                raise ZeroDivisionError, 'nLst has zero length'
+            return m.decimal(m.total(m.unitsMany(amounts)))
 
-            elif type(x) is types.LongType:
+        if coercion.isStream(nLst):
 
-                pass
+            return _stream(accumulators.Sum, nLst, True).value()
 
-            elif type(x) is types.FloatType:
+        return coercion.numbers(nLst, coercion.SKIP).sum()
 
-                pass
+    def SUMSQ(self, nLst):
 
-            else:
+        """Returns the sum of the squares of arguments."""
 
-                continue
+        if coercion.isStream(nLst):
 
-        a = a + pow(x, 2)
+            return _stream(accumulators.SumSq, nLst).value()
 
-        return a
+        return coercion.numbers(nLst).sumSq()
 
     def MINUTE(self):
 
@@ -1210,28 +1380,12 @@ def daysInA360DayYear(self, dStart, mStart, yStart, dEnd, mEnd, yEnd):
 
     def TRIMMEAN(self, nLst, trim):
 
-        """Returns the trimmed mean value from the list of the arguments.
+        """Returns the mean of the values without the trim fraction of
+        them, half taken from the top and half from the bottom.  The
+        number of values excluded is rounded down to an even number.
         """
 
-        if type(nLst) is not types.ListType:
-
-            raise TypeError, 'nLst argument not a list'
-
-        size = len(nLst)
-
-        if size < 1:
-            raise ZeroDivisionError, 'nLst has zero length'
-
-            if trim >= 0.5:
-                raise ArithmeticError, 'trim greater or equal 50%'
-
-        if trim == 0.0:
-            return self.AVERAGE(nLst)
-
-        a = int(round(size * (trim / 2.0)))
-        nLst = nLst[a:-a]
-        return self.AVERAGE(nLst)
-
+        return quantiles.trimmedMean(nLst, trim)
 
     def fUPPER(self, s):
 
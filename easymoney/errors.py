@@ -0,0 +1,10 @@
+"""errors.py -- exceptions raised by the easymoney modules.
+"""
+
+# TODO: clean up the following three defs
+class EasyMoneyError(Exception): pass
+class TypeError(EasyMoneyError): pass
+class ZeroDivisionError(EasyMoneyError): pass
+
+# invalid numeric arguments, reported as #NUM! by spreadsheets
+class NumError(EasyMoneyError): pass
@@ -0,0 +1,526 @@
+"""formula.py -- compiles spreadsheet formulas into Python closures.
+
+A cell is a dict with a required 'value' and 'type' and an optional
+'label' (see README).  A value that is a string starting with '=' is a
+formula:
+
+    {'value': '=AVERAGE(A1:A3) * 2', 'type': 'number'}
+
+Formulas are parsed once into a tree of closures that call the EasyMoney
+methods directly.  Method lookup, constant folding and range expansion all
+happen at compile time, so evaluating a compiled formula is a plain
+sequence of Python calls.  Compiled formulas are cached by their text.
+"""
+
+import operator
+import re
+import types
+
+from easymoney import EasyMoney, EasyMoneyError
+
+
+class FormulaError(EasyMoneyError): pass
+
+
+_TOKENS = re.compile(r'''
+    \s*(?:
+    (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?) |
+    (?P<string>"(?:[^"]|"")*") |
+    (?P<range>\$?[A-Za-z]+\$?\d+:\$?[A-Za-z]+\$?\d+) |
+    (?P<name>\$?[A-Za-z_][A-Za-z0-9_.$]*) |
+    (?P<op><=|>=|<>|[-+*/^&=<>(),%])
+    )''', re.VERBOSE)
+
+_CELL = re.compile(r'^\$?([A-Za-z]+)\$?(\d+)$')
+
+_COMPARE = {'=': operator.eq, '<>': operator.ne, '<': operator.lt,
+            '>': operator.gt, '<=': operator.le, '>=': operator.ge}
+_ADD = {'+': operator.add, '-': operator.sub}
+_MUL = {'*': operator.mul, '/': operator.truediv}
+
+_CONSTANTS = {'TRUE': True, 'FALSE': False}
+
+
+def isFormula(value):
+
+    """Returns True if the given cell value is a formula."""
+
+    return isinstance(value, basestring) and value[:1] == '='
+
+
+def columnIndex(letters):
+
+    """Returns the 1-based index of a column written as letters (A, B, ..., AA)."""
+
+    n = 0
+
+    for c in letters.upper():
+        n = n * 26 + ord(c) - 64
+
+    return n
+
+
+def columnLetters(n):
+
+    """Returns the letters of the 1-based column index n."""
+
+    s = ''
+
+    while n > 0:
+        n, r = divmod(n - 1, 26)
+        s = chr(65 + r) + s
+
+    return s
+
+
+def expandRange(first, last):
+
+    """Returns the names of the cells in the rectangular range first:last,
+    row by row.
+    """
+
+    a = _CELL.match(first)
+    b = _CELL.match(last)
+
+    if a is None or b is None:
+        raise FormulaError, 'bad range %s:%s' % (first, last)
+
+    c1, c2 = sorted((columnIndex(a.group(1)), columnIndex(b.group(1))))
+    r1, r2 = sorted((int(a.group(2)), int(b.group(2))))
+
+    return tuple('%s%d' % (columnLetters(c), r)
+                 for r in xrange(r1, r2 + 1)
+                 for c in xrange(c1, c2 + 1))
+
+
+def _flatten(args):
+
+    """Returns a flat list of the values in args; ranges arrive as lists."""
+
+    out = []
+
+    for a in args:
+
+        if type(a) is types.ListType:
+            out.extend(a)
+        else:
+            out.append(a)
+
+    return out
+
+
+class Formula(object):
+
+    """A compiled formula.
+
+    text -- the formula source, including the leading '='
+    refs -- names of the cells the formula reads, in order of appearance
+    fn -- closure taking a get(name) callable and returning the value
+    """
+
+    __slots__ = ('text', 'refs', 'fn')
+
+    def __init__(self, text, refs, fn):
+        self.text = text
+        self.refs = refs
+        self.fn = fn
+
+    def __call__(self, get):
+        return self.fn(get)
+
+    def __repr__(self):
+        return 'Formula(%r)' % self.text
+
+
+class _Parser(object):
+
+    """Recursive descent parser producing (closure, constant) pairs.
+
+    constant is True when the closure does not read any cell, which lets
+    operators fold it into a value at compile time.
+    """
+
+    def __init__(self, engine, text):
+
+        self.engine = engine
+        self.text = text
+        self.tokens = self._tokenize(text)
+        self.pos = 0
+        self.refs = []
+
+    def _tokenize(self, text):
+
+        tokens = []
+        pos = 0
+        end = len(text.rstrip())
+
+        while pos < end:
+
+            m = _TOKENS.match(text, pos)
+
+            if m is None or m.end() == pos:
+                raise FormulaError, 'unexpected %r in %r' % (text[pos:], text)
+
+            tokens.append((m.lastgroup, m.group(m.lastgroup)))
+            pos = m.end()
+
+        return tokens
+
+    def _peek(self):
+
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+
+        return (None, None)
+
+    def _take(self, value=None):
+
+        tok = self._peek()
+
+        if value is not None and tok[1] != value:
+            raise FormulaError, 'expected %r in %r' % (value, self.text)
+
+        if tok[0] is None:
+            raise FormulaError, 'unexpected end of %r' % self.text
+
+        self.pos += 1
+
+        return tok
+
+    def parse(self):
+
+        fn = self._binary(self._concat, _COMPARE)
+
+        if self.pos != len(self.tokens):
+            raise FormulaError, 'unexpected %r in %r' % (self._peek()[1],
+                                                         self.text)
+
+        return fn
+
+    def _binary(self, operand, ops):
+
+        left = operand()
+
+        while self._peek()[0] == 'op' and self._peek()[1] in ops:
+
+            op = ops[self._take()[1]]
+            right = operand()
+            left = _apply(op, left, right)
+
+        return left
+
+    def _concat(self):
+        return self._binary(self._additive, {'&': _concatenate})
+
+    def _additive(self):
+        return self._binary(self._multiplicative, _ADD)
+
+    def _multiplicative(self):
+        return self._binary(self._power, _MUL)
+
+    def _power(self):
+        return self._binary(self._unary, {'^': operator.pow})
+
+    def _unary(self):
+
+        tok = self._peek()
+
+        if tok == ('op', '-'):
+            self._take()
+            return _apply(operator.neg, self._unary())
+
+        if tok == ('op', '+'):
+            self._take()
+            return self._unary()
+
+        return self._percent()
+
+    def _percent(self):
+
+        fn = self._primary()
+
+        while self._peek() == ('op', '%'):
+            self._take()
+            fn = _apply(operator.truediv, fn, _const(100.0))
+
+        return fn
+
+    def _primary(self):
+
+        kind, value = self._take()
+
+        if kind == 'number':
+            return _const(float(value) if '.' in value or 'e' in value.lower()
+                          else int(value))
+
+        if kind == 'string':
+            return _const(value[1:-1].replace('""', '"'))
+
+        if kind == 'range':
+            first, last = value.split(':')
+            names = expandRange(first, last)
+            self.refs.extend(names)
+            return (lambda get, names=names: [get(n) for n in names]), False
+
+        if kind == 'name':
+
+            if self._peek() == ('op', '('):
+                return self._call(value)
+
+            if value.upper() in _CONSTANTS:
+                return _const(_CONSTANTS[value.upper()])
+
+            name = value.replace('$', '')
+            self.refs.append(name)
+            return (lambda get, name=name: get(name)), False
+
+        if value == '(':
+            fn = self._binary(self._concat, _COMPARE)
+            self._take(')')
+            return fn
+
+        raise FormulaError, 'unexpected %r in %r' % (value, self.text)
+
+    def _call(self, name):
+
+        method, packs = self.engine.function(name)
+        args = []
+
+        self._take('(')
+
+        if self._peek() != ('op', ')'):
+
+            args.append(self._binary(self._concat, _COMPARE))
+
+            while self._peek() == ('op', ','):
+                self._take()
+                args.append(self._binary(self._concat, _COMPARE))
+
+        self._take(')')
+
+        fns = tuple(a[0] for a in args)
+
+        if packs == 'list':
+
+            # the aggregates take a single list; ranges and scalars are
+            # flattened into it, as spreadsheets do with SUM(A1:A3, 4)
+            if len(fns) == 1:
+                f = fns[0]
+                return (lambda get: method(_flatten([f(get)]))), False
+
+            return (lambda get: method(_flatten([f(get) for f in fns]))), False
+
+        if packs == 'head':
+
+            # nLst first, scalars after (TRIMMEAN(A1:A9, 0.2))
+            head, rest = fns[0], fns[1:]
+            return (lambda get: method(_flatten([head(get)]),
+                                       *[f(get) for f in rest])), False
+
+        if len(fns) == 0:
+            return (lambda get: method()), False
+
+        if len(fns) == 1:
+            f = fns[0]
+            return (lambda get: method(f(get))), False
+
+        return (lambda get: method(*[f(get) for f in fns])), False
+
+
+def _const(value):
+    return (lambda get: value), True
+
+
+def _concatenate(a, b):
+    return u'%s%s' % (a, b)
+
+
+def _apply(op, *operands):
+
+    """Combines operand (closure, constant) pairs with op, folding the
+    result into a constant when every operand is constant.
+    """
+
+    fns = tuple(o[0] for o in operands)
+
+    if all(o[1] for o in operands):
+        value = op(*[f(None) for f in fns])
+        return _const(value)
+
+    if len(fns) == 1:
+        f = fns[0]
+        return (lambda get: op(f(get))), False
+
+    l, r = fns
+    return (lambda get: op(l(get), r(get))), False
+
+
+class FormulaEngine(object):
+
+    """Compiles formulas against an EasyMoney instance and evaluates cells.
+
+    Function names are resolved to bound EasyMoney methods once, when a
+    formula is compiled: AVERAGE resolves to EasyMoney.AVERAGE and INT to
+    EasyMoney.fINT.
+    """
+
+    def __init__(self, emoney=None):
+
+        if emoney is None:
+            emoney = EasyMoney()
+
+        self.emoney = emoney
+        self._formulas = {}
+        self._functions = {}
+
+    def function(self, name):
+
+        """Returns (method, packing) for the spreadsheet function name.
+
+        packing is 'list' when all arguments go into the method's nLst
+        argument, 'head' when only the first one does, None otherwise.
+        """
+
+        key = name.upper()
+
+        if key in self._functions:
+            return self._functions[key]
+
+        method = None
+
+        # NETWORKDAYS.INTL and the like are methods fNETWORKDAYS_INTL
+        attrs = (key, 'f' + key, name, 'f' + name)
+        attrs += tuple(a.replace('.', '_') for a in attrs if '.' in a)
+
+        for attr in attrs:
+
+            method = getattr(self.emoney, attr, None)
+
+            if callable(method):
+                break
+
+            method = None
+
+        if method is None:
+            raise FormulaError, 'unknown function %s' % name
+
+        packs = None
+        code = getattr(method, 'func_code', None)
+
+        if code is not None:
+
+            params = code.co_varnames[1:code.co_argcount]
+
+            if params[:1] == ('nLst',):
+                packs = 'list' if len(params) == 1 else 'head'
+
+        self._functions[key] = (method, packs)
+
+        return method, packs
+
+    def compile(self, text):
+
+        """Returns the compiled Formula for text, which must start with '='.
+
+        Formulas are cached; compiling the same text twice is a dict lookup.
+        """
+
+        formula = self._formulas.get(text)
+
+        if formula is not None:
+            return formula
+
+        if not isFormula(text):
+            raise FormulaError, 'not a formula: %r' % (text,)
+
+        parser = _Parser(self, text[1:])
+        fn, constant = parser.parse()
+
+        formula = Formula(text, tuple(parser.refs), fn)
+        self._formulas[text] = formula
+
+        return formula
+
+    def evaluate(self, sheet, name):
+
+        """Returns the value of the cell name in sheet.
+
+        sheet -- dict mapping cell names (A1, B2, or labels) to cell dicts
+        """
+
+        return self.evaluateSheet(sheet, [name])[name]
+
+    def evaluateSheet(self, sheet, names=None):
+
+        """Returns a dict of cell name to value for names (default: all
+        cells in the sheet).  Each cell is evaluated at most once.
+        """
+
+        values = {}
+        pending = set()
+        compile = self.compile
+
+        def evaluate(name):
+
+            # depth first with an explicit stack, so long chains of
+            # references do not hit the recursion limit: a formula cell is
+            # expanded (its refs pushed) on its first visit and computed on
+            # its second, when every ref above it has a value
+            stack = [name]
+            expanded = set()
+
+            while stack:
+
+                n = stack[-1]
+
+                if n in values:
+                    stack.pop()
+                    continue
+
+                try:
+                    value = sheet[n]['value']
+                except KeyError:
+                    raise FormulaError, 'unknown cell %s' % n
+
+                if not isFormula(value):
+                    values[n] = value
+                    stack.pop()
+                    continue
+
+                formula = compile(value)
+
+                if n in expanded:
+                    values[n] = formula.fn(get)
+                    pending.discard(n)
+                    stack.pop()
+                    continue
+
+                if n in pending:
+                    raise FormulaError, 'circular reference at %s' % n
+
+                pending.add(n)
+                expanded.add(n)
+
+                for r in reversed(formula.refs):
+
+                    if r in pending:
+                        raise FormulaError, 'circular reference at %s' % r
+
+                    # unknown cells fail only if the formula reads them
+                    if r not in values and r in sheet:
+                        stack.append(r)
+
+        def get(name):
+
+            if name not in values:
+                evaluate(name)
+
+            return values[name]
+
+        if names is None:
+            names = sheet.keys()
+
+        for name in names:
+            get(name)
+
+        return dict((name, values[name]) for name in names)
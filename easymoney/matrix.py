@@ -0,0 +1,557 @@
+"""matrix.py -- matrix kernels for MMULT, MINVERSE, MDETERM and TRANSPOSE.
+
+Two backends implement the kernels:
+
+    NumpyBackend -- NumPy arrays, products through NumPy's BLAS
+    PythonBackend -- Matrix objects over a flat array.array('d'), with a
+                     cache-blocked product
+
+The default is the NumPy backend when NumPy is available; setBackend()
+switches it.  Both return matrices that can be indexed m[i][j], have
+len() rows and a tolist() method.
+
+Transposes are views: a Matrix keeps its data in row-major order with a
+pair of strides, and transposing swaps the strides without copying (as
+NumPy's .T does).  LU factorizations with partial pivoting are kept in a
+small least recently used cache keyed by the contents of the matrix, so
+MDETERM and MINVERSE of the same matrix factor it once.
+"""
+
+import __builtin__
+import array
+import hashlib
+import operator
+
+from collections import OrderedDict
+from itertools import imap
+
+from errors import EasyMoneyError, NumError, TypeError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+BLOCK = 64
+PIVOT_TOLERANCE = 1e-13
+
+
+class Matrix(object):
+
+    """A dense matrix of floats with zero-copy transposes.
+
+    data -- array.array('d') holding the elements
+    rows, cols -- shape
+    rowStride, colStride -- element (i, j) is at
+                            data[offset + i * rowStride + j * colStride]
+    """
+
+    __slots__ = ('data', 'rows', 'cols', 'rowStride', 'colStride', 'offset')
+
+    def __init__(self, data, rows, cols, rowStride=None, colStride=1,
+                 offset=0):
+
+        self.data = data
+        self.rows = rows
+        self.cols = cols
+        self.rowStride = cols if rowStride is None else rowStride
+        self.colStride = colStride
+        self.offset = offset
+
+    @classmethod
+    def fromRows(cls, rows):
+
+        """Returns a Matrix copied from a sequence of rows."""
+
+        rows = [list(r) for r in rows]
+
+        if not rows or not rows[0]:
+            raise TypeError, 'empty matrix'
+
+        cols = len(rows[0])
+        data = array.array('d')
+
+        for r in rows:
+
+            if len(r) != cols:
+                raise TypeError, 'rows differ in length'
+
+            try:
+                data.extend(r)
+            except __builtin__.TypeError:
+                raise TypeError, 'non-numeric matrix item'
+
+        return cls(data, len(rows), cols)
+
+    @property
+    def shape(self):
+        return (self.rows, self.cols)
+
+    @property
+    def T(self):
+
+        """The transpose, sharing this matrix's data."""
+
+        return Matrix(self.data, self.cols, self.rows, self.colStride,
+                      self.rowStride, self.offset)
+
+    def isContiguous(self):
+        return self.colStride == 1 and self.rowStride == self.cols
+
+    def row(self, i):
+
+        """Returns row i as a list."""
+
+        start = self.offset + i * self.rowStride
+
+        if self.colStride == 1:
+            return self.data[start:start + self.cols].tolist()
+
+        return self.data[start:start + self.cols * self.colStride:
+                         self.colStride].tolist()
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, i):
+
+        if isinstance(i, tuple):
+            r, c = i
+            return self.data[self.offset + r * self.rowStride +
+                             c * self.colStride]
+
+        if i < 0:
+            i += self.rows
+
+        if not 0 <= i < self.rows:
+            raise IndexError, 'row index out of range'
+
+        return self.row(i)
+
+    def __iter__(self):
+        return (self.row(i) for i in xrange(self.rows))
+
+    def tolist(self):
+        return [self.row(i) for i in xrange(self.rows)]
+
+    def copy(self):
+
+        """Returns a contiguous row-major copy."""
+
+        if self.isContiguous():
+            start = self.offset
+            return Matrix(self.data[start:start + self.rows * self.cols],
+                          self.rows, self.cols)
+
+        data = array.array('d')
+
+        for i in xrange(self.rows):
+            data.extend(self.row(i))
+
+        return Matrix(data, self.rows, self.cols)
+
+    def __eq__(self, other):
+        return self.tolist() == _rows(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'Matrix(%r)' % self.tolist()
+
+
+def _rows(m):
+
+    if hasattr(m, 'tolist'):
+        return m.tolist()
+
+    return [list(r) for r in m]
+
+
+class LU(object):
+
+    """An LU factorization with partial pivoting, P * A = L * U.
+
+    lu -- rows of L (below the diagonal, unit diagonal implied) and U
+    perm -- perm[i] is the row of A that became row i
+    sign -- +1 or -1, the sign of the permutation
+    singular -- True if a pivot vanished
+    """
+
+    def __init__(self, lu, perm, sign, singular, backend):
+
+        self.lu = lu
+        self.perm = perm
+        self.sign = sign
+        self.singular = singular
+        self.backend = backend
+        self._inverse = None
+
+    def determinant(self):
+
+        """Returns the determinant of the factored matrix."""
+
+        if self.singular:
+            return 0.0
+
+        return self.backend.determinant(self)
+
+    def inverse(self):
+
+        """Returns the inverse of the factored matrix.  It is computed
+        once; every call returns a fresh copy."""
+
+        if self.singular:
+            raise NumError, 'matrix is singular'
+
+        if self._inverse is None:
+            self._inverse = self.backend.inverse(self)
+
+        return self._inverse.copy()
+
+
+class PythonBackend(object):
+
+    """Pure-Python kernels over Matrix objects."""
+
+    name = 'python'
+
+    def asMatrix(self, m):
+
+        if isinstance(m, Matrix):
+            return m
+
+        return Matrix.fromRows(_rows(m))
+
+    def transpose(self, m):
+        return self.asMatrix(m).T
+
+    def mmult(self, a, b):
+
+        a = self.asMatrix(a)
+        b = self.asMatrix(b)
+
+        if a.cols != b.rows:
+            raise TypeError, 'matrix shapes %dx%d and %dx%d do not conform' % (
+                a.rows, a.cols, b.rows, b.cols)
+
+        # rows of a against rows of b's transpose; both lists of lists so
+        # each dot product is one C-level pass, and the i/j blocks keep a
+        # tile of rows of both operands in use while it is hot
+        arows = a.tolist()
+        bcols = b.T.tolist()
+        n, m = a.rows, b.cols
+        out = array.array('d', [0.0]) * (n * m)
+        mul = operator.mul
+
+        for i0 in xrange(0, n, BLOCK):
+            for j0 in xrange(0, m, BLOCK):
+
+                bblock = bcols[j0:j0 + BLOCK]
+
+                for i in xrange(i0, min(i0 + BLOCK, n)):
+
+                    arow = arows[i]
+                    base = i * m
+
+                    for j, bcol in enumerate(bblock, j0):
+                        out[base + j] = sum(imap(mul, arow, bcol))
+
+        return Matrix(out, n, m)
+
+    def factor(self, a):
+
+        a = self.asMatrix(a)
+
+        if a.rows != a.cols:
+            raise TypeError, 'matrix is not square'
+
+        n = a.rows
+        lu = a.tolist()
+        perm = range(n)
+        sign = 1
+        singular = False
+        scale = max([abs(x) for x in a.data]) or 1.0
+
+        for k in xrange(n):
+
+            p = max(xrange(k, n), key=lambda i: abs(lu[i][k]))
+
+            if abs(lu[p][k]) <= PIVOT_TOLERANCE * scale:
+                singular = True
+                continue
+
+            if p != k:
+                lu[k], lu[p] = lu[p], lu[k]
+                perm[k], perm[p] = perm[p], perm[k]
+                sign = -sign
+
+            pivotRow = lu[k]
+            pivot = pivotRow[k]
+
+            for i in xrange(k + 1, n):
+
+                r = lu[i]
+                f = r[k] / pivot
+
+                r[k] = f
+
+                if f:
+                    r[k + 1:] = [x - f * y for x, y in
+                                 zip(r[k + 1:], pivotRow[k + 1:])]
+
+        return LU(lu, perm, sign, singular, self)
+
+    def determinant(self, f):
+
+        d = float(f.sign)
+
+        for i in xrange(len(f.lu)):
+            d *= f.lu[i][i]
+
+        return d
+
+    def inverse(self, f):
+
+        lu = f.lu
+        n = len(lu)
+        columns = []
+
+        for c in xrange(n):
+
+            # solve L y = P e_c, then U x = y
+            y = [1.0 if f.perm[i] == c else 0.0 for i in xrange(n)]
+
+            for i in xrange(n):
+                r = lu[i]
+                y[i] -= sum([r[j] * y[j] for j in xrange(i)])
+
+            for i in xrange(n - 1, -1, -1):
+                r = lu[i]
+                y[i] = (y[i] - sum([r[j] * y[j]
+                                    for j in xrange(i + 1, n)])) / r[i]
+
+            columns.append(y)
+
+        return Matrix(array.array('d', [x for col in columns for x in col]),
+                      n, n).T.copy()
+
+    def digest(self, a):
+
+        a = self.asMatrix(a).copy()
+
+        return a.shape, hashlib.sha1(a.data.tostring()).digest()
+
+
+class NumpyBackend(object):
+
+    """NumPy kernels over 2-D float arrays."""
+
+    name = 'numpy'
+
+    def asMatrix(self, m):
+
+        if isinstance(m, Matrix):
+            m = m.tolist()
+
+        try:
+            a = numpy.asarray(m, dtype=numpy.float64)
+        except (ValueError, __builtin__.TypeError):
+            raise TypeError, 'non-numeric or ragged matrix'
+
+        if a.ndim != 2 or 0 in a.shape:
+            raise TypeError, 'matrix must be a non-empty list of rows'
+
+        return a
+
+    def transpose(self, m):
+        return self.asMatrix(m).T
+
+    def mmult(self, a, b):
+
+        a = self.asMatrix(a)
+        b = self.asMatrix(b)
+
+        if a.shape[1] != b.shape[0]:
+            raise TypeError, 'matrix shapes %dx%d and %dx%d do not conform' % (
+                a.shape + b.shape)
+
+        return a.dot(b)
+
+    def factor(self, a):
+
+        a = self.asMatrix(a)
+
+        if a.shape[0] != a.shape[1]:
+            raise TypeError, 'matrix is not square'
+
+        n = a.shape[0]
+        lu = a.copy()
+        perm = numpy.arange(n)
+        sign = 1
+        singular = False
+        scale = numpy.abs(a).max() or 1.0
+
+        for k in xrange(n):
+
+            p = k + int(numpy.argmax(numpy.abs(lu[k:, k])))
+
+            if abs(lu[p, k]) <= PIVOT_TOLERANCE * scale:
+                singular = True
+                continue
+
+            if p != k:
+                lu[[k, p]] = lu[[p, k]]
+                perm[[k, p]] = perm[[p, k]]
+                sign = -sign
+
+            lu[k + 1:, k] /= lu[k, k]
+            lu[k + 1:, k + 1:] -= numpy.outer(lu[k + 1:, k], lu[k, k + 1:])
+
+        return LU(lu, perm, sign, singular, self)
+
+    def determinant(self, f):
+        return float(f.sign * numpy.prod(numpy.diag(f.lu)))
+
+    def inverse(self, f):
+
+        lu = f.lu
+        n = lu.shape[0]
+        x = numpy.eye(n)[f.perm]
+
+        # forward and back substitution for all columns at once
+        for i in xrange(1, n):
+            x[i] -= lu[i, :i].dot(x[:i])
+
+        for i in xrange(n - 1, -1, -1):
+            x[i] = (x[i] - lu[i, i + 1:].dot(x[i + 1:])) / lu[i, i]
+
+        return x
+
+    def digest(self, a):
+
+        a = numpy.ascontiguousarray(self.asMatrix(a))
+
+        return a.shape, hashlib.sha1(a.tostring()).digest()
+
+
+BACKENDS = {'python': PythonBackend()}
+
+if numpy is not None:
+    BACKENDS['numpy'] = NumpyBackend()
+
+_backend = BACKENDS['numpy' if numpy is not None else 'python']
+
+
+def getBackend():
+
+    """Returns the backend in use."""
+
+    return _backend
+
+
+def setBackend(name):
+
+    """Selects the backend by name ('numpy' or 'python') and clears the
+    factorization cache."""
+
+    global _backend
+
+    if name not in BACKENDS:
+        raise EasyMoneyError, 'unknown matrix backend %r' % name
+
+    _backend = BACKENDS[name]
+    defaultCache.clear()
+
+
+class FactorCache(object):
+
+    """A least recently used cache of LU factorizations keyed by matrix
+    contents.
+
+    maxsize -- the number of factorizations kept
+    hits, misses -- lookups served from and missing the cache
+    """
+
+    def __init__(self, maxsize=16):
+
+        self.maxsize = maxsize
+        self.clear()
+
+    def clear(self):
+
+        self._factors = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._factors)
+
+    def get(self, a, backend=None):
+
+        """Returns the LU factorization of a, factoring it on a miss."""
+
+        if backend is None:
+            backend = _backend
+
+        key = (backend.name,) + backend.digest(a)
+        found = self._factors.pop(key, None)
+
+        if found is None:
+
+            self.misses += 1
+            found = backend.factor(a)
+
+            if len(self._factors) >= self.maxsize:
+                self._factors.popitem(last=False)
+
+        else:
+
+            self.hits += 1
+
+        self._factors[key] = found
+
+        return found
+
+    def __repr__(self):
+        return 'FactorCache(size=%d, maxsize=%d, hits=%d, misses=%d)' % (
+            len(self), self.maxsize, self.hits, self.misses)
+
+
+defaultCache = FactorCache()
+
+
+def lu(a):
+
+    """Returns the (cached) LU factorization of the square matrix a."""
+
+    return defaultCache.get(a)
+
+
+def mmult(a, b):
+
+    """Returns the matrix product of a and b."""
+
+    return _backend.mmult(a, b)
+
+
+def transpose(a):
+
+    """Returns the transpose of a, as a view where the backend allows."""
+
+    return _backend.transpose(a)
+
+
+def determinant(a):
+
+    """Returns the determinant of the square matrix a."""
+
+    return lu(a).determinant()
+
+
+def inverse(a):
+
+    """Returns the inverse of the square matrix a."""
+
+    return lu(a).inverse()
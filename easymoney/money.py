@@ -0,0 +1,448 @@
+"""money.py -- exact fixed-point money: amounts as integer minor units.
+
+A Context fixes the number of decimal places of an amount (2: cents)
+and a rounding mode.  Amounts are held as integers counting minor units
+(12.34 is 1234), so adding them is exact, and everything else --
+scaling by a rate, dividing by a count -- is one exact integer product
+followed by a single integer division rounded the way the Context says.
+Rates are taken as exact ratios of integers (0.075 is 75/1000), never as
+binary floats.
+
+Decimal only appears at the edges: units() turns a Decimal, int, string
+or float (by its shortest repr) into minor units, decimal() turns minor
+units back into a Decimal with exactly `places` digits.
+
+Arrays of amounts stay in integer arithmetic as well: with NumPy they
+are int64 arrays, scaled and rounded with vectorized integer operations
+as long as the products cannot overflow 63 bits, and lists of Python
+integers (which cannot overflow) otherwise.  Float and int columns, and
+lists of floats, are turned into minor units with array operations too:
+a float whose shortest repr has at most places decimals is exactly
+rint(x * scale), which is checked for all of them at once, and only the
+floats that fail the check go through units() one by one.
+
+The rounding modes are the decimal module's.
+"""
+
+import array
+import decimal
+import numbers
+
+from decimal import Decimal, ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, \
+    ROUND_HALF_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_UP
+
+from errors import TypeError, ZeroDivisionError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+ROUNDINGS = (ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, ROUND_HALF_DOWN,
+             ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_UP)
+
+# products of int64 amounts and rate numerators must stay below this
+_INT64_SAFE = 2 ** 62
+
+# below this a float has fewer than one double per 2 ** -52, so at most
+# one decimal of up to places digits reads back as it
+_FLOAT_EXACT = 2.0 ** 52
+
+_INTS = frozenset([int, long])
+_COLUMN_TYPECODES = 'bBhHiIlLfd'
+
+
+def ratio(x):
+
+    """Returns x as an exact (numerator, denominator) pair of integers,
+    the denominator positive.  Floats (and NumPy floats) are read by their
+    shortest repr, so 0.1 is 1/10, not the binary fraction nearest to it.
+    Booleans are not numbers here, as they are not for the aggregates."""
+
+    if type(x) is bool:
+        raise TypeError, 'not a number: %r' % (x,)
+
+    if type(x) in _INTS:
+        return x, 1
+
+    if isinstance(x, numbers.Integral):
+        return int(x), 1
+
+    if isinstance(x, float) or isinstance(x, numbers.Real) and \
+            not hasattr(x, 'numerator'):
+        x = Decimal(repr(float(x)))
+    elif isinstance(x, basestring):
+        try:
+            x = Decimal(x.strip())
+        except decimal.InvalidOperation:
+            raise TypeError, 'not a number: %r' % (x,)
+    elif hasattr(x, 'numerator') and hasattr(x, 'denominator'):
+        return int(x.numerator), int(x.denominator)
+
+    if not isinstance(x, Decimal):
+        raise TypeError, 'not a number: %r' % (x,)
+
+    if not x.is_finite():
+        raise TypeError, 'not a finite number: %r' % (x,)
+
+    sign, digits, exponent = x.as_tuple()
+    n = int(''.join(map(str, digits)) or '0')
+
+    if sign:
+        n = -n
+
+    if exponent >= 0:
+        return n * 10 ** exponent, 1
+
+    return n, 10 ** -exponent
+
+
+def divide(n, d, rounding=ROUND_HALF_EVEN):
+
+    """Returns the integer n / d rounded by rounding."""
+
+    if not d:
+        raise ZeroDivisionError, 'division by zero'
+
+    if d < 0:
+        n, d = -n, -d
+
+    q, r = divmod(n, d)
+
+    if not r or rounding == ROUND_FLOOR:
+        return q
+
+    if rounding == ROUND_CEILING:
+        return q + 1
+
+    if rounding == ROUND_DOWN:
+        return q + (n < 0)
+
+    if rounding == ROUND_UP:
+        return q + (n >= 0)
+
+    twice = 2 * r
+
+    if twice < d:
+        return q
+
+    if twice > d:
+        return q + 1
+
+    if rounding == ROUND_HALF_UP:
+        return q + (n >= 0)
+
+    if rounding == ROUND_HALF_DOWN:
+        return q + (n < 0)
+
+    return q + (q & 1)
+
+
+def _divideArray(n, d, rounding):
+
+    """divide() over an int64 array n and a positive integer d."""
+
+    q, r = numpy.floor_divide(n, d), numpy.remainder(n, d)
+    up = r != 0
+
+    if rounding == ROUND_FLOOR:
+        return q
+
+    if rounding == ROUND_CEILING:
+        return q + up
+
+    negative = n < 0
+
+    if rounding == ROUND_DOWN:
+        return q + (up & negative)
+
+    if rounding == ROUND_UP:
+        return q + (up & ~negative)
+
+    twice = 2 * r
+    above = twice > d
+    tie = twice == d
+
+    if rounding == ROUND_HALF_UP:
+        tieUp = ~negative
+    elif rounding == ROUND_HALF_DOWN:
+        tieUp = negative
+    else:
+        tieUp = (q & 1) == 1
+
+    return q + (above | (tie & tieUp))
+
+
+class Context(object):
+
+    """Places and rounding of amounts of money.
+
+    places -- decimal places of an amount (2 counts cents)
+    rounding -- one of ROUNDINGS, applied whenever a result falls between
+                two minor units
+    """
+
+    def __init__(self, places=2, rounding=ROUND_HALF_EVEN):
+
+        if type(places) not in (int, long) or places < 0:
+            raise TypeError, 'places must be a non-negative integer'
+
+        if rounding not in ROUNDINGS:
+            raise TypeError, 'unknown rounding %r' % (rounding,)
+
+        self.places = places
+        self.rounding = rounding
+        self.scale = 10 ** places
+
+    def __repr__(self):
+        return 'Context(%d, %r)' % (self.places, self.rounding)
+
+    # the edges
+
+    def units(self, x):
+
+        """Returns the amount x in minor units, rounded."""
+
+        n, d = ratio(x)
+
+        return divide(n * self.scale, d, self.rounding)
+
+    def decimal(self, units):
+
+        """Returns minor units as a Decimal with exactly places digits."""
+
+        sign, digits, exponent = Decimal(units).as_tuple()
+
+        return Decimal((sign, digits, -self.places))
+
+    def unitsMany(self, values):
+
+        """Returns amounts in minor units: an int64 array with NumPy (when
+        they fit), a list of integers otherwise."""
+
+        if numpy is not None:
+
+            col = _column(values)
+
+            if col is not None:
+
+                units = self._unitsColumn(col)
+
+                if units is not None:
+                    return units
+
+        if type(values) is list and set(map(type, values)) <= _INTS:
+            scale = self.scale
+            units = [x * scale for x in values]
+        else:
+            units = [self.units(x) for x in values]
+
+        if numpy is not None and units and \
+                max(abs(min(units)), abs(max(units))) < _INT64_SAFE:
+            return numpy.array(units, dtype=numpy.int64)
+
+        return units
+
+    def _unitsColumn(self, col):
+
+        """unitsMany() of a 1-d NumPy array of numbers with array
+        operations; None where the minor units may not fit int64."""
+
+        scale = self.scale
+
+        if col.dtype.kind in 'iu':
+
+            if not len(col):
+                return col.astype(numpy.int64)
+
+            if col.dtype == numpy.uint64 or max(abs(int(col.min())),
+                                                abs(int(col.max()))) * \
+                    scale >= _INT64_SAFE:
+                return None
+
+            return col.astype(numpy.int64) * scale
+
+        if scale >= _FLOAT_EXACT:
+            return None
+
+        col = col.astype(numpy.float64)
+
+        with numpy.errstate(invalid='ignore', over='ignore'):
+            scaled = numpy.rint(col * scale)
+            exact = (numpy.abs(scaled) < _FLOAT_EXACT) & \
+                (scaled / scale == col)
+
+        units = numpy.where(exact, scaled, 0.0).astype(numpy.int64)
+
+        for i in numpy.nonzero(~exact)[0]:
+
+            u = self.units(float(col[i]))
+
+            if abs(u) >= _INT64_SAFE:
+                return None
+
+            units[i] = u
+
+        return units
+
+    def decimals(self, units):
+        return [self.decimal(int(u)) for u in units]
+
+    # integer arithmetic on minor units
+
+    def divide(self, n, d):
+        return divide(n, d, self.rounding)
+
+    def multiply(self, units, rate):
+
+        """Returns units * rate, rounded once."""
+
+        n, d = ratio(rate)
+
+        return divide(units * n, d, self.rounding)
+
+    def percent(self, units, ir, times=1, per=1):
+
+        """Returns ir percent of units, times / per of it (interest for
+        days / days in year), rounded once."""
+
+        n, d = ratio(ir)
+        tn, td = ratio(times)
+        pn, pd = ratio(per)
+
+        return divide(units * n * tn * pd, d * 100 * td * pn, self.rounding)
+
+    def compound(self, units, ir, periods):
+
+        """Returns units grown by ir percent a period for an integer number
+        of periods (shrunk for negative periods), rounded once: the exact
+        (100 d + n) ** periods / (100 d) ** periods is kept as integers.
+        A float with an integral value (2.0) counts as that integer."""
+
+        if type(periods) is float and periods.is_integer():
+            periods = int(periods)
+
+        if type(periods) not in (int, long):
+            raise TypeError, 'periods must be an integer'
+
+        n, d = ratio(ir)
+        growth, base = 100 * d + n, 100 * d
+
+        if periods < 0:
+            growth, base, periods = base, growth, -periods
+
+        return divide(units * growth ** periods, base ** periods,
+                      self.rounding)
+
+    def multiplyMany(self, units, rate):
+
+        """multiply() over an array of minor units."""
+
+        n, d = ratio(rate)
+
+        return self._scaleMany(units, n, d)
+
+    def percentMany(self, units, ir):
+
+        """percent() over an array of minor units."""
+
+        n, d = ratio(ir)
+
+        return self._scaleMany(units, n, d * 100)
+
+    def _scaleMany(self, units, n, d):
+
+        if numpy is not None and isinstance(units, numpy.ndarray) and \
+                len(units) and d < _INT64_SAFE and \
+                int(numpy.abs(units).max()) * abs(n) < _INT64_SAFE:
+            return _divideArray(units * n, d, self.rounding)
+
+        return [divide(int(u) * n, d, self.rounding) for u in units]
+
+    def total(self, units):
+
+        """Returns the exact sum of minor units."""
+
+        if numpy is not None and isinstance(units, numpy.ndarray):
+
+            if len(units) and \
+                    int(numpy.abs(units).max()) * len(units) < _INT64_SAFE:
+                return int(units.sum())
+
+            return sum(units.tolist())
+
+        return sum(units)
+
+    def mean(self, units):
+
+        """Returns the mean of minor units, rounded."""
+
+        if not len(units):
+            raise ZeroDivisionError, 'no amounts'
+
+        return divide(self.total(units), len(units), self.rounding)
+
+    def allocate(self, units, weights):
+
+        """Splits units in proportion to weights, so that the parts add up
+        to units exactly; the minor units left over after rounding down go
+        to the parts with the largest remainders."""
+
+        ratios = [ratio(w) for w in weights]
+        common = 1
+
+        for n, d in ratios:
+            common = common * d // _gcd(common, d)
+
+        shares = [n * (common // d) for n, d in ratios]
+        whole = sum(shares)
+
+        if whole <= 0 or min(shares) < 0:
+            raise TypeError, 'weights must be non-negative, not all zero'
+
+        parts, remainders = [], []
+
+        for i, share in enumerate(shares):
+            q, r = divmod(units * share, whole)
+            parts.append(q)
+            remainders.append((-r, i))
+
+        for r, i in sorted(remainders)[:units - sum(parts)]:
+            parts[i] += 1
+
+        return parts
+
+
+def _column(values):
+
+    """Returns values as a 1-d NumPy array of numbers if they are a float
+    or int column or a list of floats, None otherwise."""
+
+    if isinstance(values, numpy.ndarray):
+
+        if values.ndim == 1 and values.dtype.kind in 'iuf':
+            return values
+
+        return None
+
+    if isinstance(values, array.array):
+
+        if values.typecode in _COLUMN_TYPECODES:
+            return numpy.array(values)
+
+        return None
+
+    if type(values) is list and values and \
+            set(map(type, values)) == set([float]):
+        return numpy.array(values, dtype=numpy.float64)
+
+    return None
+
+
+def _gcd(a, b):
+
+    while b:
+        a, b = b, a % b
+
+    return a
@@ -0,0 +1,345 @@
+"""parallel.py -- independent calculations evaluated on a process pool.
+
+    with parallel.Pool() as pool:
+        results = pool.map([('AVERAGE', [prices]), ('MEDIAN', [prices]),
+                            ('TRIMMEAN', [prices, 0.2]), ('IRR', [flows])])
+        values = pool.evaluate(sheets)
+
+map() takes (function, args) jobs -- function is a spreadsheet function
+name as formulas use it (MEDIAN, PERCENTILE.INC) or an EasyMoney method
+-- and returns their results in job order.  evaluate() takes independent
+sheets and returns the values of each (see FormulaEngine.evaluateSheet).
+Jobs are sent to the workers in chunks, a few per worker, so each trip
+through the pool carries many calculations.
+
+Numeric arguments of at least shared items (lists of floats or of ints,
+array.arrays, 1-d NumPy arrays, numeric cells.Ranges) are not pickled: they
+are written once to a store file (see store.py) in shared memory
+(/dev/shm where there is one), and the workers map it and pass each
+argument back in its own type: array.arrays and NumPy arrays as NumPy
+views of the shared pages, so the aggregates read them in place, Ranges
+as Ranges, and lists as lists (functions such as COUNTA and the A
+variants take only lists), so a result never depends on whether an
+argument went through shared memory.
+
+A job that fails makes map() raise its error, the first in job order,
+once all jobs are done; with errors=True the errors are returned in the
+results instead.  Pool(processes=0) runs everything in this process,
+with the same results (and no shared memory, which it does not need).
+"""
+
+import multiprocessing
+import os
+import tempfile
+
+from cells import Range
+from easymoney import EasyMoney
+from formula import FormulaEngine, FormulaError
+
+import store
+import wire
+
+
+SHARED = 4096
+CHUNKS_PER_WORKER = 4
+
+_SHM = '/dev/shm'
+
+
+class _Shared(object):
+
+    """An argument that workers read from the shared store file; kind is
+    the type it is given back as: 'list', 'range' (with the type and label
+    of the Range) or 'column'."""
+
+    def __init__(self, name, kind, type=None, label=None):
+
+        self.name = name
+        self.kind = kind
+        self.type = type
+        self.label = label
+
+    def value(self, book):
+
+        column = book.column(self.name)
+
+        if self.kind == 'list':
+            return column.tolist()
+
+        if self.kind == 'range':
+            return Range(column, self.type, self.label)
+
+        return column
+
+
+def _column(x):
+
+    """Returns x as something store.write() takes as a column, or None."""
+
+    if isinstance(x, Range):
+
+        if not x.isNumeric():
+            return None
+
+        x = x.values
+
+    # a store column is flat: matrices keep their rows by being pickled
+    if getattr(x, 'ndim', 1) != 1 or wire.columnBytes(None, x) is None:
+        return None
+
+    return x
+
+
+def _shared(name, x):
+
+    """Returns the _Shared that stands for the argument x."""
+
+    if isinstance(x, Range):
+        return _Shared(name, 'range', x.type, x.label)
+
+    if isinstance(x, list):
+        return _Shared(name, 'list')
+
+    return _Shared(name, 'column')
+
+
+class _Worker(object):
+
+    """The state of a worker: an engine on its EasyMoney instance and the
+    store files it has mapped."""
+
+    def __init__(self, emoney):
+
+        self.emoney = emoney
+        self.engine = FormulaEngine(emoney)
+        self.stores = {}
+
+    def _store(self, path):
+
+        book = self.stores.get(path)
+
+        if book is None:
+            # the files of earlier calls are gone; drop their mappings
+            for old in self.stores.values():
+                old.close()
+            self.stores = {path: store.Store(path)}
+            book = self.stores[path]
+
+        return book
+
+    def run(self, path, jobs):
+
+        """Returns the outcomes, (True, value) or (False, error), of
+        jobs, a list of (method name, args)."""
+
+        out = []
+
+        for name, args in jobs:
+
+            try:
+                if path is not None:
+                    args = [a.value(self._store(path))
+                            if isinstance(a, _Shared) else a for a in args]
+                out.append((True, getattr(self.emoney, name)(*args)))
+            except Exception, e:
+                out.append((False, e))
+
+        return out
+
+    def evaluate(self, sheets, names):
+
+        out = []
+
+        for sheet in sheets:
+            try:
+                out.append((True, self.engine.evaluateSheet(sheet, names)))
+            except Exception, e:
+                out.append((False, e))
+
+        return out
+
+
+_worker = None
+
+
+def _init(emoney):
+
+    global _worker
+    _worker = _Worker(emoney)
+
+
+def _run(task):
+    return _worker.run(*task)
+
+
+def _evaluate(task):
+    return _worker.evaluate(*task)
+
+
+def _chunks(items, count):
+
+    """Splits items into about count lists of consecutive items."""
+
+    size = max(1, -(-len(items) // max(1, count)))
+
+    return [items[i:i + size] for i in xrange(0, len(items), size)]
+
+
+class Pool(object):
+
+    """A pool of worker processes for map() and evaluate().
+
+    processes -- number of workers; None for one per CPU, 0 to run in
+                 this process
+    emoney -- EasyMoney instance whose settings (date1904, money mode)
+              the workers use
+    shared -- arguments with at least this many numbers go through shared
+              memory
+    """
+
+    def __init__(self, processes=None, emoney=None, shared=SHARED):
+
+        if emoney is None:
+            emoney = EasyMoney()
+
+        self.emoney = emoney
+        self.shared = shared
+        self._engine = FormulaEngine(emoney)
+        self._local = None
+        self._pool = None
+
+        if processes == 0:
+            self._local = _Worker(emoney)
+            self.processes = 1
+        else:
+            self._pool = multiprocessing.Pool(processes, _init, (emoney,))
+            self.processes = processes or multiprocessing.cpu_count()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _name(self, function):
+
+        """Returns the EasyMoney method name of function (a function name
+        or an EasyMoney method)."""
+
+        if isinstance(function, basestring):
+            return self._engine.function(function)[0].__name__
+
+        name = getattr(function, '__name__', None)
+
+        if name is None or not callable(getattr(self.emoney, name, None)):
+            raise FormulaError, 'not an EasyMoney function: %r' % (function,)
+
+        return name
+
+    def _share(self, jobs):
+
+        """Replaces the big numeric arguments of jobs with _Shared ones;
+        returns the path of the store file that holds them, or None."""
+
+        if self._local is not None:
+            return None
+
+        columns = {}
+        seen = {}   # id of an argument -> its _Shared, for one copy each
+
+        for job in jobs:
+
+            args = job[1]
+
+            for i, a in enumerate(args):
+
+                if id(a) in seen:
+                    args[i] = seen[id(a)]
+                    continue
+
+                if not hasattr(a, '__len__') or len(a) < self.shared:
+                    continue
+
+                column = _column(a)
+
+                if column is not None:
+                    name = 'c%d' % len(columns)
+                    columns[name] = column
+                    args[i] = seen[id(a)] = _shared(name, a)
+
+        if not columns:
+            return None
+
+        directory = _SHM if os.path.isdir(_SHM) else None
+        fd, path = tempfile.mkstemp('.ems', 'easymoney-', directory)
+        os.close(fd)
+
+        try:
+            store.write(path, columns=columns)
+        except:
+            os.remove(path)
+            raise
+
+        return path
+
+    def _dispatch(self, function, tasks):
+
+        if self._local is not None:
+            local = {_run: self._local.run, _evaluate: self._local.evaluate}
+            return [local[function](*task) for task in tasks]
+
+        return self._pool.map(function, tasks, 1)
+
+    def _results(self, outcomes, errors):
+
+        results = []
+        first = None
+
+        for chunk in outcomes:
+            for ok, value in chunk:
+                if not ok and first is None:
+                    first = value
+                results.append(value)
+
+        if first is not None and not errors:
+            raise first
+
+        return results
+
+    def map(self, jobs, errors=False):
+
+        """Returns the results of jobs, (function, args) pairs, in order.
+
+        errors -- return the errors of failed jobs in their place instead
+                  of raising the first one
+        """
+
+        jobs = [(self._name(function), list(args)) for function, args in jobs]
+        path = self._share(jobs)
+
+        try:
+            tasks = [(path, chunk) for chunk in
+                     _chunks(jobs, self.processes * CHUNKS_PER_WORKER)]
+            outcomes = self._dispatch(_run, tasks)
+        finally:
+            if path is not None:
+                os.remove(path)
+
+        return self._results(outcomes, errors)
+
+    def evaluate(self, sheets, names=None, errors=False):
+
+        """Returns the values of each of the independent sheets, as dicts
+        of cell name to value for names (default: all cells)."""
+
+        tasks = [(chunk, names) for chunk in
+                 _chunks(list(sheets), self.processes * CHUNKS_PER_WORKER)]
+
+        return self._results(self._dispatch(_evaluate, tasks), errors)
+
+    def close(self):
+
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
@@ -0,0 +1,451 @@
+"""quantiles.py -- order statistics (MEDIAN, PERCENTILE, QUARTILE,
+TRIMMEAN) by selection, and a mergeable streaming quantile sketch.
+
+Quantiles only need a few ranks of the data in order, not all of it, so
+the values are partitioned around those ranks instead of sorted: the
+NumPy path uses numpy.partition (introselect), the pure-Python path an
+introselect of its own (quickselect with a three-way partition, sorting
+what is left once the recursion gets too deep or the range too small).
+Several quantiles are answered from one partitioning, each rank selected
+within the part left over by the previous one.
+
+The values are copied once into a buffer that is partitioned in place:
+a new one, the caller's scratch buffer (a list or NumPy array at least
+as long as the values, reusable across calls), or the values themselves
+when overwrite is set.
+
+Digest is a t-digest style sketch for data that does not fit in memory:
+it keeps a bounded number of weighted centroids, small near the tails
+and larger in the middle, and like the accumulators it takes values one
+at a time, by the chunk or from another Digest (merge).
+"""
+
+import math
+
+from heapq import merge as _sortedMerge
+
+from accumulators import Accumulator
+from errors import NumError, TypeError, ZeroDivisionError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+_NUMBER_TYPES = (int, long, float)
+
+_SMALL = 16
+
+
+def _checked(values):
+
+    for x in values:
+        if type(x) not in _NUMBER_TYPES:
+            raise TypeError, 'non-numeric list item'
+
+
+def _buffer(values, scratch=None, overwrite=False):
+
+    """Returns (buffer, n): the values in a buffer that may be reordered."""
+
+    if numpy is not None and isinstance(values, numpy.ndarray):
+
+        if values.dtype.kind not in 'iuf':
+            raise TypeError, 'non-numeric column dtype'
+
+        values = values.ravel()
+        n = len(values)
+
+        if overwrite:
+            return values, n
+
+        if scratch is None:
+            return values.copy(), n
+
+        scratch[:n] = values
+
+        return scratch, n
+
+    if isinstance(values, basestring) or not hasattr(values, '__iter__'):
+        raise TypeError, 'nLst argument not a list'
+
+    if isinstance(values, list) and overwrite:
+        _checked(values)
+        return values, len(values)
+
+    if scratch is None:
+
+        buf = list(values)
+        _checked(buf)
+
+        return buf, len(buf)
+
+    n = 0
+
+    if isinstance(scratch, list):
+
+        for n, x in enumerate(values, 1):
+
+            if type(x) not in _NUMBER_TYPES:
+                raise TypeError, 'non-numeric list item'
+
+            if n > len(scratch):
+                raise TypeError, 'scratch buffer too short'
+
+            scratch[n - 1] = x
+
+        return scratch, n
+
+    values = list(values)
+    _checked(values)
+    n = len(values)
+
+    if n > len(scratch):
+        raise TypeError, 'scratch buffer too short'
+
+    scratch[:n] = values
+
+    return scratch, n
+
+
+def select(a, k, lo=0, hi=None):
+
+    """Reorders the list a[lo:hi] so that a[k] is the item that would be
+    there if it were sorted, smaller or equal items before it and larger
+    or equal ones after it, and returns a[k]."""
+
+    if hi is None:
+        hi = len(a)
+
+    depth = 2 * max(1, hi - lo).bit_length()
+
+    while hi - lo > _SMALL and depth:
+
+        depth -= 1
+
+        mid = (lo + hi) // 2
+        x, y, z = a[lo], a[mid], a[hi - 1]
+
+        if x > y:
+            x, y = y, x
+        if y > z:
+            y = x if x > z else z
+
+        # three-way partition: < pivot, == pivot, > pivot
+        lt, i, gt = lo, lo, hi
+
+        while i < gt:
+
+            v = a[i]
+
+            if v < y:
+                a[lt], a[i] = v, a[lt]
+                lt += 1
+                i += 1
+            elif v > y:
+                gt -= 1
+                a[gt], a[i] = v, a[gt]
+            else:
+                i += 1
+
+        if k < lt:
+            hi = lt
+        elif k >= gt:
+            lo = gt
+        else:
+            return a[k]
+
+    a[lo:hi] = sorted(a[lo:hi])
+
+    return a[k]
+
+
+def selectMany(a, ranks, n=None):
+
+    """Reorders a[:n] so that every rank in ranks holds its sorted item;
+    the items between two ranks are then the ones that sort between
+    them."""
+
+    if n is None:
+        n = len(a)
+
+    ranks = sorted(set(ranks))
+
+    if numpy is not None and isinstance(a, numpy.ndarray):
+
+        if ranks:
+            a[:n].partition(ranks)
+
+        return a
+
+    lo = 0
+
+    for k in ranks:
+        select(a, k, lo, n)
+        lo = k + 1
+
+    return a
+
+
+def _ranks(n, ps, method):
+
+    """Returns the (floor rank, fraction) of each probability in ps."""
+
+    result = []
+
+    for p in ps:
+
+        if method == 'inclusive':
+
+            if not 0 <= p <= 1:
+                raise NumError, 'k must be between 0 and 1'
+
+            h = (n - 1) * p
+
+        elif method == 'exclusive':
+
+            if not 1.0 / (n + 1) <= p <= float(n) / (n + 1):
+                raise NumError, 'k outside 1/(n+1) .. n/(n+1)'
+
+            h = (n + 1) * p - 1
+
+        else:
+            raise TypeError, 'unknown quantile method %r' % (method,)
+
+        k = min(int(math.floor(h)), n - 1)
+        result.append((k, h - k))
+
+    return result
+
+
+def quantiles(values, ps, method='inclusive', scratch=None, overwrite=False):
+
+    """Returns the quantiles of values at each probability in ps, from one
+    partitioning of the values.
+
+    method -- 'inclusive' (PERCENTILE, PERCENTILE.INC) or 'exclusive'
+              (PERCENTILE.EXC)
+    scratch -- a list or NumPy array to partition instead of a new copy
+    overwrite -- partition values (a list or NumPy array) themselves
+    """
+
+    a, n = _buffer(values, scratch, overwrite)
+
+    if n < 1:
+        raise NumError, 'no values'
+
+    ranks = _ranks(n, ps, method)
+    needed = set()
+
+    for k, f in ranks:
+        needed.add(k)
+        if f and k + 1 < n:
+            needed.add(k + 1)
+
+    selectMany(a, needed, n)
+
+    result = []
+
+    for k, f in ranks:
+
+        x = a[k]
+
+        if f and k + 1 < n:
+            x = x + f * (a[k + 1] - x)
+
+        result.append(_number(x))
+
+    return result
+
+
+def quantile(values, p, method='inclusive', scratch=None, overwrite=False):
+    return quantiles(values, (p,), method, scratch, overwrite)[0]
+
+
+def median(values, scratch=None, overwrite=False):
+
+    """Returns the median; the mean of the middle two for even counts."""
+
+    a, n = _buffer(values, scratch, overwrite)
+
+    if n < 1:
+        raise ZeroDivisionError, 'nLst has zero length'
+
+    if n % 2:
+        return _number(selectMany(a, (n // 2,), n)[n // 2])
+
+    selectMany(a, (n // 2 - 1, n // 2), n)
+
+    return (_number(a[n // 2 - 1]) + _number(a[n // 2])) / 2.0
+
+
+def trimmedMean(values, trim, scratch=None, overwrite=False):
+
+    """Returns the mean of values without the trim fraction of them,
+    half from each end; the number trimmed is rounded down to an even
+    number, as spreadsheets do."""
+
+    if not 0 <= trim < 1:
+        raise NumError, 'trim must be at least 0 and less than 1'
+
+    a, n = _buffer(values, scratch, overwrite)
+
+    if n < 1:
+        raise ZeroDivisionError, 'nLst has zero length'
+
+    k = int(math.floor(n * trim / 2.0))
+
+    if k:
+        selectMany(a, (k, n - k - 1), n)
+
+    middle = a[k:n - k]
+
+    if numpy is not None and isinstance(middle, numpy.ndarray):
+        return float(middle.astype(numpy.float64).mean())
+
+    return math.fsum(middle) / (n - 2 * k)
+
+
+def _number(x):
+    return x.item() if hasattr(x, 'item') else x
+
+
+class Digest(Accumulator):
+
+    """t-digest style quantile sketch.
+
+    compression -- bounds the number of centroids (about compression
+                   of them at most); larger is more accurate
+    """
+
+    def __init__(self, values=None, compression=100):
+
+        self.compression = compression
+        self.means = []
+        self.weights = []
+        self.pending = []
+        self.lo = self.hi = None
+
+        Accumulator.__init__(self, values)
+
+    def _addList(self, chunk):
+
+        if not chunk:
+            return
+
+        self.count += len(chunk)
+        self.pending.extend(chunk)
+
+        lo, hi = min(chunk), max(chunk)
+
+        if self.lo is None or lo < self.lo:
+            self.lo = lo
+        if self.hi is None or hi > self.hi:
+            self.hi = hi
+
+        if len(self.pending) >= 8 * self.compression:
+            self._compress()
+
+    def _merge(self, other):
+
+        if not other.count:
+            return
+
+        self._addList(other.pending)
+        self.count += sum(other.weights)
+        self.lo = other.lo if self.lo is None else min(self.lo, other.lo)
+        self.hi = other.hi if self.hi is None else max(self.hi, other.hi)
+
+        points = zip(self.means, self.weights)
+        self._rebuild(list(_sortedMerge(points, zip(other.means, other.weights))))
+
+    def _compress(self):
+
+        if self.pending:
+
+            self.pending.sort()
+            points = _sortedMerge(zip(self.means, self.weights),
+                                  ((x, 1) for x in self.pending))
+            self.pending = []
+            self._rebuild(list(points))
+
+    def _scale(self, q):
+
+        """The k1 scale function of the t-digest: a centroid may span one
+        unit of it, which keeps the tails in small centroids."""
+
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _rebuild(self, points):
+
+        """Merges sorted (mean, weight) points into centroids."""
+
+        if not points:
+            return
+
+        total = float(sum(w for m, w in points))
+        means, weights = [], []
+        before = 0.0
+        left = self._scale(0.0)
+        mean, weight = points[0]
+
+        for m, w in points[1:]:
+
+            q = min(1.0, (before + weight + w) / total)
+
+            if self._scale(q) - left <= 1:
+                weight += w
+                mean += (m - mean) * w / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                before += weight
+                left = self._scale(before / total)
+                mean, weight = m, w
+
+        means.append(mean)
+        weights.append(weight)
+
+        self.means, self.weights = means, weights
+
+    def quantile(self, p):
+
+        """Returns the estimated quantile at probability p."""
+
+        if not 0 <= p <= 1:
+            raise NumError, 'k must be between 0 and 1'
+
+        self._empty()
+        self._compress()
+
+        means, weights = self.means, self.weights
+        target = p * self.count
+
+        if len(means) == 1:
+            return means[0]
+
+        # centroid i stands for the ranks around its center
+        if target <= weights[0] / 2.0:
+            return self.lo + (means[0] - self.lo) * target / (weights[0] / 2.0)
+
+        if target >= self.count - weights[-1] / 2.0:
+            left = self.count - target
+            return self.hi - (self.hi - means[-1]) * left / (weights[-1] / 2.0)
+
+        center = weights[0] / 2.0
+
+        for i in xrange(1, len(means)):
+
+            step = (weights[i - 1] + weights[i]) / 2.0
+
+            if target <= center + step:
+                return means[i - 1] + (means[i] - means[i - 1]) * \
+                    (target - center) / step
+
+            center += step
+
+        return means[-1]
+
+    def value(self):
+        return self.quantile(0.5)
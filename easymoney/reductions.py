@@ -0,0 +1,259 @@
+"""reductions.py -- fused reductions over several arrays (SUMPRODUCT, SUMX2MY2,
+SUMX2PY2, SUMXMY2).
+
+Each reduction walks all of its input arrays together, once, and never
+builds a list of intermediate products.  Sized inputs (lists, tuples,
+array.array, memoryview, NumPy arrays) are checked for equal lengths up
+front; with NumPy they are reduced CHUNK items at a time, slicing
+array.array and NumPy inputs in place, so the temporaries stay small
+however long the arrays are.  Other iterables (generators) are consumed
+CHUNK items at a time as well, so memory stays constant for them too.
+Without NumPy the sized path is a single imap() over the arrays.
+
+SUMPRODUCT counts the items that are not numbers (text, blanks, booleans)
+as 0, as spreadsheets do and as the ZERO policy of coercion.py does;
+SUMX2MY2, SUMX2PY2 and SUMXMY2 raise TypeError for them.
+"""
+
+import __builtin__
+import numbers
+import operator
+
+from itertools import imap, islice
+
+from errors import TypeError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+CHUNK = 65536
+
+_BUFFER_TYPECODES = 'bBhHiIlLfd'
+
+_NUMBERS = frozenset([int, long, float])
+
+# bool arrays are not numbers, as booleans in lists are not
+_NUMPY_KINDS = 'iuf'
+
+
+def _isSized(a):
+    return hasattr(a, '__len__')
+
+
+def _numpyView(a):
+
+    """Returns a as a 1-d NumPy array (a view of array.array and NumPy
+    inputs), or None for other sequences."""
+
+    if isinstance(a, numpy.ndarray):
+        return a.ravel()
+
+    if isinstance(a, memoryview):
+        return numpy.frombuffer(a.tobytes(), dtype=a.format)
+
+    if hasattr(a, 'typecode') and a.typecode in _BUFFER_TYPECODES:
+        return numpy.frombuffer(a, dtype=a.typecode) if len(a) else \
+            numpy.zeros(0)
+
+    return None
+
+
+def _asFloat(chunk):
+
+    try:
+        col = numpy.asarray(chunk, dtype=numpy.float64)
+    except (ValueError, __builtin__.TypeError):
+        raise TypeError, 'non-numeric array item'
+
+    # NumPy reads None as NaN
+    if numpy.isnan(col).any() and any(x is None for x in chunk):
+        raise TypeError, 'non-numeric array item'
+
+    return col
+
+
+def _zero(x):
+
+    """Returns x if it is a number, else 0."""
+
+    if type(x) in _NUMBERS or isinstance(x, numbers.Number) and \
+            not isinstance(x, (bool, complex)):
+        return x
+
+    return 0
+
+
+def _asZeroed(chunk):
+    return numpy.fromiter(imap(_zero, chunk), numpy.float64, len(chunk))
+
+
+def _mismatch():
+    raise TypeError, 'arrays differ in length'
+
+
+def fused(arrays, scalar, vector, zero=False):
+
+    """Returns sum(scalar(a[i], b[i], ...)) over the arrays.
+
+    scalar -- the per-item function, for the pure-Python path
+    vector -- returns the sum over a chunk given one NumPy array per input
+    zero -- count items that are not numbers as 0 instead of raising
+            TypeError
+    """
+
+    if not arrays:
+        raise TypeError, 'no arrays given'
+
+    if all(_isSized(a) for a in arrays):
+
+        n = len(arrays[0])
+
+        for a in arrays:
+            if len(a) != n:
+                _mismatch()
+
+        if numpy is None:
+
+            arrays = [a.tolist() if isinstance(a, memoryview) else a
+                      for a in arrays]
+
+            if zero:
+                arrays = [imap(_zero, a) for a in arrays]
+
+            try:
+                return float(sum(imap(scalar, *arrays)))
+            except __builtin__.TypeError:
+                raise TypeError, 'non-numeric array item'
+
+        views = [_numpyView(a) for a in arrays]
+        asFloat = _asZeroed if zero else _asFloat
+        total = 0.0
+
+        if zero:
+            views = [v if v is None or v.dtype.kind in _NUMPY_KINDS else None
+                     for v in views]
+
+        for start in xrange(0, n, CHUNK):
+
+            stop = start + CHUNK
+            total += float(vector([
+                v[start:stop].astype(numpy.float64)
+                if v is not None else asFloat(a[start:stop])
+                for v, a in zip(views, arrays)]))
+
+        return total
+
+    iterators = [iter(a) for a in arrays]
+    total = 0.0
+
+    while True:
+
+        chunks = [list(islice(it, CHUNK)) for it in iterators]
+        size = len(chunks[0])
+
+        for c in chunks:
+            if len(c) != size:
+                _mismatch()
+
+        if not size:
+            return total
+
+        if zero and numpy is None:
+            chunks = [map(_zero, c) for c in chunks]
+
+        if numpy is None:
+
+            try:
+                total += sum(imap(scalar, *chunks))
+            except __builtin__.TypeError:
+                raise TypeError, 'non-numeric array item'
+        else:
+            total += float(vector([_asZeroed(c) if zero else _asFloat(c)
+                                   for c in chunks]))
+
+
+def _product(*xs):
+    return reduce(operator.mul, xs)
+
+
+def _productVector(cols):
+
+    if len(cols) == 1:
+        return cols[0].sum()
+
+    if len(cols) == 2:
+        return cols[0].dot(cols[1])
+
+    p = cols[0] * cols[1]
+
+    for c in cols[2:]:
+        p *= c
+
+    return p.sum()
+
+
+def sumProduct(*arrays):
+
+    """Returns the sum of the products of corresponding items; items that
+    are not numbers count as 0."""
+
+    if len(arrays) == 1:
+        scalar = float
+    elif len(arrays) == 2:
+        scalar = operator.mul
+    else:
+        scalar = _product
+
+    return fused(arrays, scalar, _productVector, True)
+
+
+def _x2my2(x, y):
+    return x * x - y * y
+
+
+def _x2py2(x, y):
+    return x * x + y * y
+
+
+def _xmy2(x, y):
+    d = x - y
+    return d * d
+
+
+def _x2my2Vector(cols):
+    return cols[0].dot(cols[0]) - cols[1].dot(cols[1])
+
+
+def _x2py2Vector(cols):
+    return cols[0].dot(cols[0]) + cols[1].dot(cols[1])
+
+
+def sumX2mY2(x, y):
+
+    """Returns the sum of x[i] ** 2 - y[i] ** 2."""
+
+    return fused((x, y), _x2my2, _x2my2Vector)
+
+
+def sumX2pY2(x, y):
+
+    """Returns the sum of x[i] ** 2 + y[i] ** 2."""
+
+    return fused((x, y), _x2py2, _x2py2Vector)
+
+
+def _xmy2Vector(cols):
+
+    d = cols[0] - cols[1]
+
+    return d.dot(d)
+
+
+def sumXmY2(x, y):
+
+    """Returns the sum of (x[i] - y[i]) ** 2."""
+
+    return fused((x, y), _xmy2, _xmy2Vector)
@@ -0,0 +1,402 @@
+"""regression.py -- least squares fits for LINEST, LOGEST, TREND and GROWTH.
+
+LeastSquares accumulates the sufficient statistics of a linear fit in one
+pass over the data: the number of rows, the sums of x and y and the
+cross products x'x, x'y and y'y.  Rows can be added and removed at any
+time (a rolling window is one add and one remove per step) and fit()
+solves the normal equations from the sums alone, by Cholesky
+factorization of the k x k cross-product matrix.
+
+With an intercept the sums are kept relative to the first row seen and
+the intercept is eliminated before factoring (the centered cross
+products are the covariance matrix), which keeps the normal equations
+well conditioned for data such as date serial numbers.
+
+LOGEST and GROWTH fit ln(y).  fit() caches recent fits by their data, so
+TREND and GROWTH after LINEST and LOGEST on the same data reuse the model
+instead of refitting.  Whole columns are accumulated with NumPy when it
+is available.
+"""
+
+import math
+
+from collections import OrderedDict
+
+from errors import NumError, TypeError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _cholesky(a):
+
+    """Returns the lower triangular L with L * L' == a, or None if a is not
+    positive definite."""
+
+    n = len(a)
+    l = [[0.0] * n for i in xrange(n)]
+    scale = max([abs(a[i][i]) for i in xrange(n)] or [1.0]) or 1.0
+
+    for j in xrange(n):
+
+        d = a[j][j] - sum([l[j][p] ** 2 for p in xrange(j)])
+
+        if d <= 1e-12 * scale:
+            return None
+
+        l[j][j] = math.sqrt(d)
+
+        for i in xrange(j + 1, n):
+            l[i][j] = (a[i][j] - sum([l[i][p] * l[j][p]
+                                      for p in xrange(j)])) / l[j][j]
+
+    return l
+
+
+def _choleskySolve(l, b):
+
+    n = len(l)
+    y = list(b)
+
+    for i in xrange(n):
+        y[i] = (y[i] - sum([l[i][p] * y[p] for p in xrange(i)])) / l[i][i]
+
+    for i in xrange(n - 1, -1, -1):
+        y[i] = (y[i] - sum([l[p][i] * y[p]
+                            for p in xrange(i + 1, n)])) / l[i][i]
+
+    return y
+
+
+class Fit(object):
+
+    """A fitted model y = m[0] * x[0] + ... + m[k-1] * x[k-1] + b (for a
+    log fit, ln y).
+
+    slopes, intercept -- m and b
+    seSlopes, seIntercept -- their standard errors (seIntercept is None
+                             without an intercept)
+    r2 -- coefficient of determination
+    sey -- standard error of the y estimate
+    f -- F statistic
+    df -- degrees of freedom
+    ssreg, ssresid -- regression and residual sums of squares
+    """
+
+    def __init__(self, slopes, intercept, seSlopes, seIntercept, r2, sey, f,
+                 df, ssreg, ssresid, log=False):
+
+        self.slopes = slopes
+        self.intercept = intercept
+        self.seSlopes = seSlopes
+        self.seIntercept = seIntercept
+        self.r2 = r2
+        self.sey = sey
+        self.f = f
+        self.df = df
+        self.ssreg = ssreg
+        self.ssresid = ssresid
+        self.log = log
+
+    def predict(self, x):
+
+        """Returns the fitted value at x (a number or a row of numbers)."""
+
+        if not hasattr(x, '__len__'):
+            x = [x]
+
+        if len(x) != len(self.slopes):
+            raise TypeError, 'expected %d x values' % len(self.slopes)
+
+        v = self.intercept + sum([m * xi for m, xi in zip(self.slopes, x)])
+
+        return math.exp(v) if self.log else v
+
+    def predictMany(self, xs):
+
+        """Returns the fitted values at every row of xs."""
+
+        return [self.predict(x) for x in xs]
+
+    def linest(self, stats=False):
+
+        """Returns the LINEST (LOGEST for a log fit) result: a list of
+        rows, the first [m[k-1], ..., m[0], b].  With stats, four more
+        rows of standard errors, r2 and sey, F and df, ssreg and ssresid,
+        padded with None (#N/A).
+        """
+
+        k = len(self.slopes)
+
+        if self.log:
+            first = [math.exp(m) for m in reversed(self.slopes)] + \
+                [math.exp(self.intercept)]
+        else:
+            first = list(reversed(self.slopes)) + [self.intercept]
+
+        if not stats:
+            return [first]
+
+        pad = [None] * (k - 1)
+
+        return [first,
+                list(reversed(self.seSlopes)) + [self.seIntercept],
+                [self.r2, self.sey] + pad,
+                [self.f, self.df] + pad,
+                [self.ssreg, self.ssresid] + pad]
+
+
+class LeastSquares(object):
+
+    """Sufficient statistics of a least squares fit with k regressors.
+
+    const -- True to fit an intercept, False to force it to zero
+    log -- True to fit ln(y) (LOGEST, GROWTH)
+    """
+
+    def __init__(self, k, const=True, log=False):
+
+        self.k = k
+        self.const = const
+        self.log = log
+        self.n = 0
+        self._shiftX = None
+        self._shiftY = 0.0
+        self._sx = [0.0] * k
+        self._sy = 0.0
+        self._xx = [[0.0] * k for i in xrange(k)]
+        self._xy = [0.0] * k
+        self._yy = 0.0
+
+    def _y(self, y):
+
+        if self.log:
+
+            if y <= 0:
+                raise NumError, 'y values must be positive for a log fit'
+
+            return math.log(y)
+
+        return float(y)
+
+    def _row(self, x):
+
+        if not hasattr(x, '__len__'):
+            x = [x]
+
+        if len(x) != self.k:
+            raise TypeError, 'expected %d x values' % self.k
+
+        return [float(v) for v in x]
+
+    def _update(self, x, y, sign):
+
+        x = self._row(x)
+        y = self._y(y)
+
+        if self._shiftX is None:
+
+            if self.const:
+                self._shiftX = x
+                self._shiftY = y
+            else:
+                self._shiftX = [0.0] * self.k
+
+        z = [a - b for a, b in zip(x, self._shiftX)]
+        w = y - self._shiftY
+        k = self.k
+
+        self.n += sign
+        self._sy += sign * w
+        self._yy += sign * w * w
+
+        for i in xrange(k):
+
+            zi = sign * z[i]
+            self._sx[i] += zi
+            self._xy[i] += zi * w
+            row = self._xx[i]
+
+            for j in xrange(k):
+                row[j] += zi * z[j]
+
+    def add(self, x, y):
+
+        """Adds the row x (a number or k numbers) with value y."""
+
+        self._update(x, y, 1)
+
+    def remove(self, x, y):
+
+        """Removes a row added before, as a rolling window does."""
+
+        self._update(x, y, -1)
+
+    def extend(self, xs, ys):
+
+        """Adds the rows xs with values ys, in one pass (one matrix
+        product with NumPy)."""
+
+        if len(xs) != len(ys):
+            raise TypeError, 'x and y columns differ in length'
+
+        if numpy is None or not len(xs):
+
+            for x, y in zip(xs, ys):
+                self.add(x, y)
+
+            return
+
+        if self._shiftX is None:
+            self.add(xs[0], ys[0])
+            xs, ys = xs[1:], ys[1:]
+
+            if not len(xs):
+                return
+
+        x = numpy.asarray(xs, dtype=numpy.float64).reshape(len(xs), -1)
+        y = numpy.asarray(ys, dtype=numpy.float64)
+
+        if x.shape[1] != self.k:
+            raise TypeError, 'expected %d x values' % self.k
+
+        if self.log:
+
+            if (y <= 0).any():
+                raise NumError, 'y values must be positive for a log fit'
+
+            y = numpy.log(y)
+
+        z = x - numpy.asarray(self._shiftX)
+        w = y - self._shiftY
+
+        self.n += len(w)
+        self._sy += float(w.sum())
+        self._yy += float(w.dot(w))
+        self._sx = (numpy.asarray(self._sx) + z.sum(axis=0)).tolist()
+        self._xy = (numpy.asarray(self._xy) + z.T.dot(w)).tolist()
+        self._xx = (numpy.asarray(self._xx) + z.T.dot(z)).tolist()
+
+    def fit(self):
+
+        """Returns the Fit of the rows added so far."""
+
+        k = self.k
+        n = self.n
+        const = self.const
+        df = n - k - (1 if const else 0)
+
+        if n == 0 or df < 0:
+            raise NumError, 'not enough rows for %d regressors' % k
+
+        if const:
+
+            zbar = [s / n for s in self._sx]
+            wbar = self._sy / n
+            a = [[self._xx[i][j] - n * zbar[i] * zbar[j] for j in xrange(k)]
+                 for i in xrange(k)]
+            b = [self._xy[i] - n * zbar[i] * wbar for i in xrange(k)]
+            sst = self._yy - n * wbar * wbar
+
+        else:
+
+            a = self._xx
+            b = self._xy
+            sst = self._yy
+
+        l = _cholesky(a)
+
+        if l is None:
+            raise NumError, 'regressors are collinear'
+
+        slopes = _choleskySolve(l, b)
+        ssresid = max(sst - sum([m * v for m, v in zip(slopes, b)]), 0.0)
+        ssreg = sst - ssresid
+
+        if const:
+            xbar = [z + s for z, s in zip(zbar, self._shiftX)]
+            intercept = wbar + self._shiftY - \
+                sum([m * x for m, x in zip(slopes, xbar)])
+        else:
+            intercept = 0.0
+
+        # diagonal of the inverse cross-product matrix, and x' A^-1 x
+        inv = [_choleskySolve(l, [float(i == j) for j in xrange(k)])
+               for i in xrange(k)]
+        s2 = ssresid / df if df else 0.0
+        sey = math.sqrt(s2)
+        seSlopes = [math.sqrt(inv[i][i] * s2) for i in xrange(k)]
+
+        if const:
+            q = sum([xbar[i] * inv[i][j] * xbar[j]
+                     for i in xrange(k) for j in xrange(k)])
+            seIntercept = math.sqrt(s2 * (1.0 / n + q))
+        else:
+            seIntercept = None
+
+        r2 = ssreg / sst if sst else 1.0
+        f = (ssreg / k) / s2 if s2 else float('inf')
+
+        return Fit(slopes, intercept, seSlopes, seIntercept, r2, sey, f, df,
+                   ssreg, ssresid, self.log)
+
+
+def design(ys, xs=None):
+
+    """Returns the rows of regressors for ys: xs itself when it is a list
+    of rows, one-item rows for a list of numbers and 1, 2, ... n when xs
+    is None (as LINEST defaults known_x's)."""
+
+    if xs is None:
+        return [[float(i)] for i in xrange(1, len(ys) + 1)]
+
+    if len(xs) != len(ys):
+        raise TypeError, 'x and y columns differ in length'
+
+    return rows(xs)
+
+
+def rows(xs):
+
+    """Returns xs as a list of rows of regressors (one-item rows for a
+    list of numbers)."""
+
+    if len(xs) and hasattr(xs[0], '__len__'):
+        return [list(x) for x in xs]
+
+    return [[x] for x in xs]
+
+
+_fits = OrderedDict()
+_CACHE_SIZE = 16
+
+
+def fit(ys, xs=None, const=True, log=False):
+
+    """Returns the Fit of ys on xs (see design()).  The last few fits are
+    cached by their data, so a TREND after a LINEST of the same data does
+    not refit.
+    """
+
+    xs = design(ys, xs)
+
+    if not xs:
+        raise NumError, 'no data to fit'
+
+    key = (tuple(ys), tuple(tuple(r) for r in xs), bool(const), bool(log))
+    found = _fits.pop(key, None)
+
+    if found is None:
+
+        ls = LeastSquares(len(xs[0]), const, log)
+        ls.extend(xs, list(ys))
+        found = ls.fit()
+
+        if len(_fits) >= _CACHE_SIZE:
+            _fits.popitem(last=False)
+
+    _fits[key] = found
+
+    return found
@@ -0,0 +1,431 @@
+"""rolling.py -- sliding-window (rolling) sums, means, minima, maxima,
+medians and variances over a series.
+
+A window of the last w values moves along the series one value at a
+time, and each window's statistic is updated from the previous one
+rather than recomputed from a slice:
+
+    sums, means -- a compensated running sum, O(1) per step
+    variances -- running mean and sum of squared deviations (Welford's
+                 update, with its inverse for the value leaving, and
+                 an exact recomputation when a removal cancels most of
+                 the sum and once per window length)
+    min, max -- a monotonic deque of window positions, O(1) amortized
+    medians -- two heaps around the median with lazy deletion,
+               O(log w) per step
+
+The series may be a list, an array.array, a NumPy array or any iterable
+(a generator reading a file, ...); only the current window is kept.
+There are n - w + 1 results, one per full window, and they are written
+into out, a preallocated array.array, NumPy array or list, or into a new
+array.array('d') when out is not given.
+"""
+
+import array
+import heapq
+import math
+
+from collections import deque
+
+from errors import NumError, TypeError, ZeroDivisionError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+_NUMBER_TYPES = (int, long, float)
+
+
+def _series(values):
+
+    """Returns the values, as a list for NumPy arrays, and their count
+    (None when unknown)."""
+
+    if numpy is not None and isinstance(values, numpy.ndarray):
+
+        if values.dtype.kind not in 'iuf':
+            raise TypeError, 'non-numeric column dtype'
+
+        values = values.ravel().tolist()
+
+    if isinstance(values, basestring) or not hasattr(values, '__iter__'):
+        raise TypeError, 'nLst argument not a list'
+
+    n = len(values) if hasattr(values, '__len__') else None
+
+    return values, n
+
+
+def _checked(x):
+
+    if type(x) not in _NUMBER_TYPES:
+        raise TypeError, 'non-numeric list item'
+
+    return x
+
+
+class _Output(object):
+
+    """Writes the results into out, or into a new array.array('d')."""
+
+    def __init__(self, out, n, window):
+
+        size = None if n is None else max(0, n - window + 1)
+
+        if out is None:
+            out = array.array('d', [0.0]) * size if size is not None \
+                else array.array('d')
+            self.grow = size is None
+        else:
+            if size is not None and len(out) < size:
+                raise TypeError, 'out too short for %d windows' % size
+            self.grow = False
+
+        self.out = out
+        self.i = 0
+
+    def write(self, value):
+
+        if self.grow:
+            self.out.append(value)
+        else:
+            try:
+                self.out[self.i] = value
+            except IndexError:
+                raise TypeError, 'out too short'
+
+        self.i += 1
+
+
+def _window(window):
+
+    if type(window) not in (int, long) or window < 1:
+        raise NumError, 'window must be a positive integer'
+
+    return window
+
+
+def _run(values, window, out, state):
+
+    """Slides the window over values; state gets every value entering
+    (add) and leaving (remove) the window and answers value()."""
+
+    window = _window(window)
+    values, n = _series(values)
+    output = _Output(out, n, window)
+    add, remove, value, write = state.add, state.remove, state.value, \
+        output.write
+
+    if isinstance(values, (list, tuple, array.array)):
+
+        # the value leaving is read back from the series itself
+        for i, x in enumerate(values):
+
+            if type(x) not in _NUMBER_TYPES:
+                raise TypeError, 'non-numeric list item'
+
+            add(x)
+
+            if i >= window:
+                remove(values[i - window])
+
+            if i >= window - 1:
+                write(value())
+
+        return output.out
+
+    held = deque()
+
+    for x in values:
+
+        held.append(_checked(x))
+        add(x)
+
+        if len(held) > window:
+            remove(held.popleft())
+
+        if len(held) == window:
+            write(value())
+
+    return output.out
+
+
+class _Sum(object):
+
+    """Neumaier-compensated running sum."""
+
+    def __init__(self, window):
+
+        self.window = window
+        self.total = 0.0
+        self.error = 0.0
+
+    def _add(self, x):
+
+        t = self.total + x
+
+        if abs(self.total) >= abs(x):
+            self.error += (self.total - t) + x
+        else:
+            self.error += (x - t) + self.total
+
+        self.total = t
+
+    def add(self, x):
+        self._add(x)
+
+    def remove(self, x):
+        self._add(-x)
+
+    def value(self):
+        return self.total + self.error
+
+
+class _Mean(_Sum):
+
+    def value(self):
+        return (self.total + self.error) / self.window
+
+
+class _Variance(object):
+
+    """Welford's running mean and sum of squared deviations, with the
+    inverse update for the value that leaves the window.
+
+    The inverse update loses the digits that a large value leaving the
+    window held in m2, so both are recomputed exactly from the window
+    when a removal cancels most of m2 (by more than CANCEL), and once
+    every window length in any case, against a slow drift.
+    """
+
+    CANCEL = 1e-3
+
+    def __init__(self, window, sample=True):
+
+        if sample and window < 2:
+            raise ZeroDivisionError, 'window of fewer than two values'
+
+        self.window = window
+        self.divisor = window - 1 if sample else window
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.held = deque()
+        self.removed = 0
+
+    def add(self, x):
+
+        self.held.append(x)
+        self.count += 1
+        d = x - self.mean
+        self.mean += d / self.count
+        self.m2 += d * (x - self.mean)
+
+    def remove(self, x):
+
+        self.held.popleft()
+        self.count -= 1
+        self.removed += 1
+        m2 = self.m2
+        d = x - self.mean
+        self.mean -= d / self.count
+        self.m2 -= d * (x - self.mean)
+
+        if self.m2 < m2 * self.CANCEL or self.removed >= self.window:
+            self._recompute()
+
+    def _recompute(self):
+
+        held = self.held
+        mean = math.fsum(held) / len(held)
+
+        self.mean = mean
+        self.m2 = math.fsum((x - mean) * (x - mean) for x in held)
+        self.removed = 0
+
+    def value(self):
+        return max(0.0, self.m2) / self.divisor
+
+
+class _Stdev(_Variance):
+
+    def value(self):
+        return _Variance.value(self) ** 0.5
+
+
+class _Extreme(object):
+
+    """Monotonic deque: the window positions whose values are still
+    candidates, their values in order, so the front is the extreme."""
+
+    def __init__(self, window, better):
+
+        self.better = better
+        self.candidates = deque()
+        self.added = 0
+        self.removed = 0
+
+    def add(self, x):
+
+        candidates = self.candidates
+
+        while candidates and not self.better(candidates[-1][1], x):
+            candidates.pop()
+
+        candidates.append((self.added, x))
+        self.added += 1
+
+    def remove(self, x):
+
+        if self.candidates[0][0] == self.removed:
+            self.candidates.popleft()
+
+        self.removed += 1
+
+    def value(self):
+        return self.candidates[0][1]
+
+
+def _less(a, b):
+    return a < b
+
+
+def _greater(a, b):
+    return a > b
+
+
+class _Median(object):
+
+    """Two heaps around the median: a max-heap (of negated values) holding
+    the lower half and a min-heap the upper half.  Values leaving the
+    window are only counted, and dropped when they reach a heap top."""
+
+    def __init__(self, window):
+
+        self.low = []
+        self.high = []
+        self.lowSize = 0
+        self.highSize = 0
+        self.delayed = {}
+
+    def _prune(self, heap, sign):
+
+        delayed = self.delayed
+
+        while heap and delayed.get(sign * heap[0]):
+            delayed[sign * heap[0]] -= 1
+            heapq.heappop(heap)
+
+    def _balance(self):
+
+        if self.lowSize > self.highSize + 1:
+            heapq.heappush(self.high, -heapq.heappop(self.low))
+            self.lowSize -= 1
+            self.highSize += 1
+            self._prune(self.low, -1)
+
+        elif self.lowSize < self.highSize:
+            heapq.heappush(self.low, -heapq.heappop(self.high))
+            self.lowSize += 1
+            self.highSize -= 1
+            self._prune(self.high, 1)
+
+    def add(self, x):
+
+        if not self.low or x <= -self.low[0]:
+            heapq.heappush(self.low, -x)
+            self.lowSize += 1
+        else:
+            heapq.heappush(self.high, x)
+            self.highSize += 1
+
+        self._balance()
+
+    def remove(self, x):
+
+        self.delayed[x] = self.delayed.get(x, 0) + 1
+
+        if x <= -self.low[0]:
+            self.lowSize -= 1
+            self._prune(self.low, -1)
+        else:
+            self.highSize -= 1
+            self._prune(self.high, 1)
+
+        self._balance()
+
+    def value(self):
+
+        if self.lowSize > self.highSize:
+            return -self.low[0]
+
+        return (-self.low[0] + self.high[0]) / 2.0
+
+
+def rollingSum(values, window, out=None):
+
+    """Returns the sum of each window of values."""
+
+    return _run(values, window, out, _Sum(window))
+
+
+def rollingMean(values, window, out=None):
+
+    """Returns the mean (AVERAGE) of each window of values."""
+
+    return _run(values, window, out, _Mean(window))
+
+
+def rollingVar(values, window, out=None, sample=True):
+
+    """Returns the variance of each window of values, the sample variance
+    (VAR) or, when sample is False, the population variance (VARP)."""
+
+    return _run(values, window, out, _Variance(_window(window), sample))
+
+
+def rollingStdev(values, window, out=None, sample=True):
+
+    """Returns the standard deviation (STDEV, or STDEVP) of each window."""
+
+    return _run(values, window, out, _Stdev(_window(window), sample))
+
+
+def rollingMin(values, window, out=None):
+
+    """Returns the smallest value of each window of values."""
+
+    return _run(values, window, out, _Extreme(window, _less))
+
+
+def rollingMax(values, window, out=None):
+
+    """Returns the largest value of each window of values."""
+
+    return _run(values, window, out, _Extreme(window, _greater))
+
+
+def rollingMedian(values, window, out=None):
+
+    """Returns the median of each window of values."""
+
+    return _run(values, window, out, _Median(window))
+
+
+FUNCTIONS = {'AVERAGE': rollingMean, 'MAX': rollingMax, 'MEDIAN': rollingMedian,
+             'MIN': rollingMin, 'STDEV': rollingStdev, 'SUM': rollingSum,
+             'VAR': rollingVar}
+
+
+def rolling(values, window, function, out=None):
+
+    """Returns the rolling statistic named by function (see FUNCTIONS)."""
+
+    try:
+        f = FUNCTIONS[function.upper()]
+    except (KeyError, AttributeError):
+        raise TypeError, 'no rolling version of %r' % (function,)
+
+    return f(values, window, out)
@@ -0,0 +1,654 @@
+"""server.py -- the RESTful API: EasyMoney functions and cells over HTTP.
+
+    GET  /functions                 -> {"functions": [names]}
+    POST /functions/NAME            {"args": [...]} -> {"value": ...}
+    POST /evaluate                  {"cells": {...}, "names": [...]}
+                                    -> {"values": {...}}
+
+NAME is a spreadsheet function name as formulas use it (AVERAGE, DAYS360,
+NETWORKDAYS.INTL); args are passed to the EasyMoney method positionally,
+so AVERAGE takes {"args": [[1, 2, 3]]}.  cells is a sheet of cell dicts
+as in the README, and names the cells to return (all by default).  Errors
+come back as {"error": class name, "message": ...} with status 404 for
+unknown functions, 422 for EasyMoneyError (bad values, #NUM!) and 400 for
+malformed requests.
+
+Bodies are JSON or, with Content-Type application/x-easymoney, binary
+messages (see wire.py), whose number lists arrive as columns without a
+parse per item.  Responses use the format of the request unless the
+Accept header asks for the other one.
+
+The server speaks HTTP/1.1 and keeps connections alive, one thread per
+connection.  Function calls do not run on the connection threads: they
+are queued to a batcher, which collects the calls that arrive within a
+short window and runs them grouped by function.  Functions with a column
+mode (PRICE, YIELD, DURATION, DAYS360, YEARFRAC) evaluate a group of
+concurrent scalar calls as one column call; a call gets the same value
+as it would on its own.  Batches and sheets larger
+than the heavy limit go to a process pool, so a long calculation neither
+holds up the batcher nor, through the GIL, the connection threads.
+A call without an outcome after the timeout is answered with status 500.
+
+    python server.py --port 8000
+"""
+
+import BaseHTTPServer
+import SocketServer
+import argparse
+import datetime
+import errno
+import json
+import math
+import multiprocessing
+import Queue
+import re
+import socket
+import sys
+import threading
+import time
+import urlparse
+
+from decimal import Decimal
+
+from easymoney import EasyMoney, EasyMoneyError
+from formula import FormulaEngine, FormulaError
+
+import wire
+
+
+WINDOW = 0.002
+MAX_BATCH = 512
+HEAVY = 20000
+TIMEOUT = 60.0
+
+_NAME = re.compile(r'^[A-Za-z][A-Za-z0-9_.]*$')
+
+
+class _Vector(object):
+
+    """The column mode of a function: the first columns arguments of
+    concurrent calls become columns, the others must be equal within a
+    group and are passed as they are."""
+
+    def __init__(self, columns):
+
+        self.columns = columns
+
+    def key(self, args):
+
+        """Returns the group key of a call, or None if it cannot join a
+        column call."""
+
+        n = self.columns
+
+        if len(args) < n or \
+                [a for a in args[:n] if not isinstance(a, (int, long, float))]:
+            return None
+
+        try:
+            return json.dumps(args[n:])
+        except (TypeError, ValueError):
+            return None
+
+    def run(self, method, argsList):
+
+        n = self.columns
+        columns = [list(c) for c in zip(*[args[:n] for args in argsList])]
+
+        return method(*(columns + list(argsList[0][n:])))
+
+
+# method name -> column mode
+VECTORS = {'PRICE': _Vector(5),
+           'YIELD': _Vector(5),
+           'DURATION': _Vector(4),
+           'MDURATION': _Vector(4),
+           'fDAYS360': _Vector(2),
+           'fYEARFRAC': _Vector(2)}
+
+
+def _size(args):
+
+    return sum(len(a) if hasattr(a, '__len__') and
+               not isinstance(a, basestring) else 1 for a in args)
+
+
+def _failed(x):
+
+    return isinstance(x, float) and math.isnan(x)
+
+
+def _call(method, args):
+
+    """Returns the outcome of one call as (True, value) or (False, error
+    class name, message, status)."""
+
+    try:
+        return (True, method(*args))
+    except EasyMoneyError, e:
+        return (False, e.__class__.__name__, str(e), 422)
+    except Exception, e:
+        return (False, e.__class__.__name__, str(e), 400)
+
+
+def runBatch(emoney, name, argsList):
+
+    """Returns the outcomes (see _call()) of calling the EasyMoney method
+    name with each of argsList.
+
+    Calls that share a column mode group are evaluated as one column call;
+    a call whose column result is missing (NaN) or whose group failed is
+    repeated on its own, so it gets the same value or error as a single
+    call would.
+    """
+
+    method = getattr(emoney, name)
+    vector = VECTORS.get(name)
+    out = [None] * len(argsList)
+    groups = {}
+
+    if vector is not None and len(argsList) > 1:
+        for i, args in enumerate(argsList):
+            key = vector.key(args)
+            if key is not None:
+                groups.setdefault(key, []).append(i)
+
+    for rows in groups.itervalues():
+
+        if len(rows) < 2:
+            continue
+
+        try:
+            values = vector.run(method, [argsList[i] for i in rows])
+        except Exception:
+            continue
+
+        for i, value in zip(rows, values):
+            if not _failed(value):
+                out[i] = (True, value)
+
+    for i, args in enumerate(argsList):
+        if out[i] is None:
+            out[i] = _call(method, args)
+
+    return out
+
+
+def evaluate(engine, cells, names=None):
+
+    """Returns the values of the cells names (all by default) of the sheet
+    cells, as (True, values) or an error outcome (see _call())."""
+
+    if not isinstance(cells, dict) or \
+            [c for c in cells.itervalues() if not isinstance(c, dict)]:
+        return (False, 'TypeError', 'cells must map names to cell objects',
+                400)
+
+    return _call(engine.evaluateSheet, (cells, names))
+
+
+# Process pool workers
+
+
+_worker = None
+
+
+def _initWorker(emoney):
+
+    global _worker
+    _worker = FormulaEngine(emoney)
+
+
+def _poolBatch(name, argsList):
+
+    try:
+        return runBatch(_worker.emoney, name, argsList)
+    except Exception, e:
+        return [(False, e.__class__.__name__, str(e), 500)] * len(argsList)
+
+
+def _poolEvaluate(cells, names):
+
+    try:
+        return evaluate(_worker, cells, names)
+    except Exception, e:
+        return (False, e.__class__.__name__, str(e), 500)
+
+
+class _Call(object):
+
+    """A queued function call; done is set once outcome is known."""
+
+    __slots__ = ('name', 'args', 'outcome', 'done')
+
+    def __init__(self, name, args):
+
+        self.name = name
+        self.args = args
+        self.outcome = None
+        self.done = threading.Event()
+
+    def finish(self, outcome):
+
+        self.outcome = outcome
+        self.done.set()
+
+
+class Batcher(object):
+
+    """Collects the calls queued within window seconds (at most maxBatch
+    of them) and runs them grouped by function, inline or, for groups with
+    more than heavy arguments, in the process pool.  A call waits at most
+    timeout seconds (None: without limit) for its outcome.
+
+    batches, calls and pooled count what it has done so far.
+    """
+
+    def __init__(self, emoney, window=WINDOW, maxBatch=MAX_BATCH, pool=None,
+                 heavy=HEAVY, timeout=TIMEOUT):
+
+        self.emoney = emoney
+        self.window = window
+        self.maxBatch = maxBatch
+        self.pool = pool
+        self.heavy = heavy
+        self.timeout = timeout
+        self.batches = 0
+        self.calls = 0
+        self.pooled = 0
+
+        self._queue = Queue.Queue()
+        self._thread = threading.Thread(target=self._loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def call(self, name, args):
+
+        """Returns the outcome (see _call()) of the method name on args,
+        waiting for the batch it joins; a timeout is an outcome with status
+        500 (a pool worker that died never finishes its calls)."""
+
+        c = _Call(name, args)
+        self._queue.put(c)
+
+        if not c.done.wait(self.timeout):
+            return (False, 'Timeout',
+                    'no result within %g seconds' % self.timeout, 500)
+
+        return c.outcome
+
+    def close(self):
+
+        self._queue.put(None)
+        self._thread.join()
+
+    def _loop(self):
+
+        get = self._queue.get
+
+        while True:
+
+            c = get()
+
+            if c is None:
+                return
+
+            batch = [c]
+            deadline = time.time() + self.window
+
+            while len(batch) < self.maxBatch:
+
+                timeout = deadline - time.time()
+
+                if timeout <= 0:
+                    break
+
+                try:
+                    c = get(True, timeout)
+                except Queue.Empty:
+                    break
+
+                if c is None:
+                    self._run(batch)
+                    return
+
+                batch.append(c)
+
+            self._run(batch)
+
+    def _run(self, batch):
+
+        groups = {}
+
+        for c in batch:
+            groups.setdefault(c.name, []).append(c)
+
+        self.batches += 1
+        self.calls += len(batch)
+
+        for name, calls in groups.iteritems():
+
+            argsList = [c.args for c in calls]
+
+            if self.pool is not None and \
+                    sum(_size(args) for args in argsList) > self.heavy:
+                self.pooled += 1
+                self.pool.apply_async(_poolBatch, (name, argsList),
+                                      callback=self._finisher(calls))
+                continue
+
+            try:
+                outcomes = runBatch(self.emoney, name, argsList)
+            except Exception, e:
+                outcomes = [(False, e.__class__.__name__, str(e), 500)] * \
+                    len(calls)
+
+            self._finisher(calls)(outcomes)
+
+    @staticmethod
+    def _finisher(calls):
+
+        def finish(outcomes):
+            for c, outcome in zip(calls, outcomes):
+                c.finish(outcome)
+
+        return finish
+
+
+def _default(x):
+
+    """Converts the values json cannot write: Decimals (money mode) become
+    strings, arrays and NumPy values lists and numbers."""
+
+    if isinstance(x, Decimal):
+        return str(x)
+
+    if hasattr(x, 'tolist'):
+        return x.tolist()
+
+    if isinstance(x, (datetime.date, datetime.time)):
+        return x.isoformat()
+
+    if hasattr(x, '__dict__'):
+        return vars(x)
+
+    return repr(x)
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'easymoney'
+
+    # write each response in one piece: with small writes, Nagle's
+    # algorithm and delayed ACKs hold keep-alive replies for ~40 ms
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+
+        self._binary = self._wantsBinary()
+
+        if urlparse.urlparse(self.path).path.rstrip('/') == '/functions':
+            return self._send(200, {'functions': self.server.functions()})
+
+        self._error(404, 'NotFound', 'no such resource')
+
+    def do_POST(self):
+
+        path = urlparse.urlparse(self.path).path
+        self._binary = self._wantsBinary()
+        body = self._body()
+
+        if body is None:
+            return
+
+        if path == '/evaluate':
+            return self._evaluate(body)
+
+        if path.startswith('/functions/'):
+            return self._function(path[len('/functions/'):], body)
+
+        self._error(404, 'NotFound', 'no such resource')
+
+    def _body(self):
+
+        try:
+            length = int(self.headers.getheader('content-length', 0))
+        except ValueError:
+            self._error(400, 'ValueError', 'bad Content-Length')
+            return None
+
+        try:
+            body = wire.loads(self.rfile.read(length) or '{}')
+        except wire.WireError:
+            self._error(400, 'WireError',
+                        'request body is neither JSON nor a binary message')
+            return None
+
+        if not isinstance(body, dict):
+            self._error(400, 'ValueError', 'request body is not an object')
+            return None
+
+        return body
+
+    def _function(self, name, body):
+
+        method = self.server.method(name)
+
+        if method is None:
+            return self._error(404, 'FormulaError',
+                               'unknown function %s' % name)
+
+        args = body.get('args', [])
+
+        # binary messages carry a list of numbers as a column
+        if hasattr(args, 'tolist'):
+            args = args.tolist()
+
+        if not isinstance(args, list):
+            return self._error(400, 'TypeError', 'args must be a list')
+
+        self._outcome(self.server.batcher.call(method, args), 'value')
+
+    def _evaluate(self, body):
+
+        self._outcome(self.server.evaluate(body.get('cells'),
+                                           body.get('names')), 'values')
+
+    def _outcome(self, outcome, field):
+
+        if outcome[0]:
+            return self._send(200, {field: outcome[1]})
+
+        self._error(outcome[3], outcome[1], outcome[2])
+
+    def _error(self, status, name, message):
+
+        self._send(status, {'error': name, 'message': message})
+
+    def _wantsBinary(self):
+
+        accept = self.headers.getheader('accept', '')
+
+        if wire.CONTENT_TYPE in accept:
+            return True
+
+        if 'application/json' in accept:
+            return False
+
+        return self.headers.getheader('content-type', '').startswith(
+            wire.CONTENT_TYPE)
+
+    def _send(self, status, obj):
+
+        if self._binary:
+            data = wire.dumps(obj, _default)
+            contentType = wire.CONTENT_TYPE
+        else:
+            data = json.dumps(obj, default=_default)
+            contentType = 'application/json'
+
+        self.send_response(status)
+        self.send_header('Content-Type', contentType)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+
+        if self.server.verbose:
+            BaseHTTPServer.BaseHTTPRequestHandler.log_message(self, format,
+                                                              *args)
+
+
+class Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    """The easymoney HTTP server.
+
+    address -- (host, port); port 0 picks a free port (see server_address)
+    emoney -- EasyMoney instance the functions run on
+    window, maxBatch, heavy, timeout -- see Batcher
+    processes -- size of the process pool; None for one per CPU, 0 to run
+                 everything in this process
+    verbose -- log requests and unexpected errors of the connections
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 8000), emoney=None,
+                 window=WINDOW, maxBatch=MAX_BATCH, processes=None,
+                 heavy=HEAVY, verbose=False, timeout=TIMEOUT):
+
+        if emoney is None:
+            emoney = EasyMoney()
+
+        self.emoney = emoney
+        self.engine = FormulaEngine(emoney)
+        self.heavy = heavy
+        self.verbose = verbose
+        self._methods = {}
+
+        # fork the workers before this process starts any threads
+        self.pool = None
+
+        if processes != 0:
+            self.pool = multiprocessing.Pool(processes, _initWorker, (emoney,))
+
+        try:
+            BaseHTTPServer.HTTPServer.__init__(self, address, Handler)
+        except:
+            if self.pool is not None:
+                self.pool.terminate()
+            raise
+
+        self.batcher = Batcher(emoney, window, maxBatch, self.pool, heavy,
+                               timeout)
+
+    def handle_error(self, request, client_address):
+
+        """Ignores clients that went away (connection reset, broken pipe);
+        prints the traceback of other errors when verbose."""
+
+        e = sys.exc_info()[1]
+
+        if isinstance(e, socket.error) and e.args and \
+                e.args[0] in (errno.ECONNRESET, errno.EPIPE):
+            return
+
+        if self.verbose:
+            BaseHTTPServer.HTTPServer.handle_error(self, request,
+                                                   client_address)
+
+    def method(self, name):
+
+        """Returns the EasyMoney method name of the function name, or None
+        if there is no such function."""
+
+        method = self._methods.get(name)
+
+        if method is not None or not _NAME.match(name):
+            return method
+
+        try:
+            method = self.engine.function(name)[0].__name__
+        except (FormulaError, AttributeError):
+            return None
+
+        self._methods[name] = method
+
+        return method
+
+    def functions(self):
+
+        """Returns the names of the functions the server offers."""
+
+        names = set()
+
+        for attr in dir(self.emoney):
+
+            if attr[:1] == '_' or not callable(getattr(self.emoney, attr)):
+                continue
+
+            if attr[0] == 'f' and attr[1:2].isupper():
+                attr = attr[1:]
+
+            names.add(attr)
+
+        return sorted(names)
+
+    def evaluate(self, cells, names=None):
+
+        if self.pool is not None and isinstance(cells, dict) and \
+                len(cells) > self.heavy:
+            return self.pool.apply(_poolEvaluate, (cells, names))
+
+        return evaluate(self.engine, cells, names)
+
+    def server_close(self):
+
+        BaseHTTPServer.HTTPServer.server_close(self)
+        self.batcher.close()
+
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='easymoney HTTP server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--processes', type=int, default=None,
+                        help='process pool size (default: one per CPU, '
+                             '0: no pool)')
+    parser.add_argument('--window', type=float, default=WINDOW,
+                        help='batching window in seconds '
+                             '(default %(default)s)')
+    parser.add_argument('--heavy', type=int, default=HEAVY,
+                        help='arguments per batch above which it runs in '
+                             'the pool (default %(default)s)')
+    parser.add_argument('--timeout', type=float, default=TIMEOUT,
+                        help='seconds a call may wait for its result '
+                             '(default %(default)s)')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    server = Server((args.host, args.port), window=args.window,
+                    processes=args.processes, heavy=args.heavy,
+                    verbose=args.verbose, timeout=args.timeout)
+
+    print 'easymoney serving on http://%s:%d' % server.server_address[:2]
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
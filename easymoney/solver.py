@@ -0,0 +1,516 @@
+"""solver.py -- internal rate of return solvers (IRR, XIRR, MIRR).
+
+The rate of return is the root of the net present value of a cash flow.
+The solver runs Newton's method on the NPV with its analytic derivative,
+both evaluated in a single Horner pass over the flows, starting from a
+cheap estimate of the rate.  It keeps track of any sign change it sees;
+once the root is bracketed, Newton steps that leave the bracket are
+replaced by bisection.  If Newton stalls before a bracket is found, a
+coarse scan of rates brackets the root and the safeguarded iteration
+carries on from there.
+
+irrBatch() solves many cash flows together.  With NumPy the flows are
+padded into one matrix and every portfolio takes the step solve() would
+take in the same vectorized pass, so it finds the root irr() finds;
+without NumPy the portfolios are solved one by one.
+
+Every solve is recorded in a SolverStats object (defaultStats unless
+another one is passed in), which counts calls, iterations, bisections,
+bracket scans and failures.
+"""
+
+from discount import yearTimes
+from errors import NumError, ZeroDivisionError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+MAXITER = 100
+XTOL = 1e-12
+FTOL = 1e-10
+
+# rates tried when Newton's method needs a bracket
+_SCAN = (-0.99, -0.9, -0.75, -0.5, -0.3, -0.2, -0.1, -0.05, 0.0, 0.02,
+         0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0,
+         10.0, 100.0)
+
+
+class SolverStats(object):
+
+    """Convergence statistics of the solver.
+
+    calls -- number of solves
+    iterations -- total NPV evaluations spent in Newton/bisection steps
+    bisections -- steps that fell back to bisection
+    scans -- solves that needed a bracket scan
+    failures -- solves that did not converge
+    maxIterations -- iterations of the slowest solve
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+
+        self.calls = 0
+        self.iterations = 0
+        self.bisections = 0
+        self.scans = 0
+        self.failures = 0
+        self.maxIterations = 0
+
+    def record(self, iterations, bisections, scanned, converged):
+
+        self.calls += 1
+        self.iterations += iterations
+        self.bisections += bisections
+        self.scans += 1 if scanned else 0
+        self.failures += 0 if converged else 1
+        self.maxIterations = max(self.maxIterations, iterations)
+
+    def meanIterations(self):
+
+        if self.calls == 0:
+            return 0.0
+
+        return self.iterations * 1.0 / self.calls
+
+    def __repr__(self):
+        return ('SolverStats(calls=%d, iterations=%d, mean=%.2f, max=%d, '
+                'bisections=%d, scans=%d, failures=%d)' % (
+                    self.calls, self.iterations, self.meanIterations(),
+                    self.maxIterations, self.bisections, self.scans,
+                    self.failures))
+
+
+defaultStats = SolverStats()
+
+
+def npv(rate, values):
+
+    """Returns (NPV, dNPV/drate) of values at periods 0, 1, 2, ...
+
+    Both come from one Horner pass in x = 1 / (1 + rate).
+    """
+
+    x = 1.0 / (1.0 + rate)
+    f = 0.0
+    d = 0.0
+
+    for v in reversed(values):
+        d = d * x + f
+        f = f * x + v
+
+    return f, -d * x * x
+
+
+def xnpv(rate, values, times):
+
+    """Returns (XNPV, dXNPV/drate) of values at times (in years)."""
+
+    g = 1.0 + rate
+    f = 0.0
+    d = 0.0
+
+    for v, t in zip(values, times):
+        a = v * g ** -t
+        f += a
+        d -= t * a
+
+    return f, d / g
+
+
+def initialGuess(values, times=None):
+
+    """Returns a cheap estimate of the rate of return: the rate at which
+    the outflows, gathered at their mean time, grow into the inflows,
+    gathered at theirs.
+    """
+
+    if times is None:
+        times = xrange(len(values))
+
+    pos = neg = tp = tn = 0.0
+
+    for v, t in zip(values, times):
+
+        if v > 0:
+            pos += v
+            tp += v * t
+        elif v < 0:
+            neg -= v
+            tn -= v * t
+
+    if pos > 0 and neg > 0:
+
+        span = tp / pos - tn / neg
+
+        if span > 0:
+
+            guess = (pos / neg) ** (1.0 / span) - 1.0
+
+            # a short span can round the growth down to -1, where the NPV
+            # is not defined
+            if guess > -1.0:
+                return guess
+
+    return 0.1
+
+
+def _checkSigns(values):
+
+    pos = neg = False
+
+    for v in values:
+
+        if v > 0:
+            pos = True
+        elif v < 0:
+            neg = True
+
+    if not (pos and neg):
+        raise NumError, 'values need at least one positive and one negative'
+
+
+def _scan(fn, guess):
+
+    """Returns the bracket (a, fa, b, fb) from _SCAN closest to guess, or
+    None when the NPV does not change sign on the scanned rates.
+    """
+
+    best = None
+    prev = None
+
+    for r in _SCAN:
+
+        f = fn(r)[0]
+
+        if prev is not None and (prev[1] < 0) != (f < 0):
+
+            distance = min(abs(prev[0] - guess), abs(r - guess))
+
+            if best is None or distance < best[0]:
+                best = (distance, (prev[0], prev[1], r, f))
+
+        prev = (r, f)
+
+    return best and best[1]
+
+
+def solve(fn, guess, scale=1.0, stats=None):
+
+    """Returns the rate r > -1 at which fn(r)[0] is zero.
+
+    fn -- returns (f, df/dr) for a rate
+    guess -- starting rate
+    scale -- magnitude of the flows, for the residual tolerance
+    stats -- SolverStats to record the solve in (defaultStats when None)
+
+    Raises NumError if the iteration does not converge.
+    """
+
+    if stats is None:
+        stats = defaultStats
+
+    ftol = FTOL * max(scale, 1.0)
+    bracket = None
+    prev = None
+    scanned = False
+    bisections = 0
+    r = guess
+
+    for i in xrange(1, MAXITER + 1):
+
+        f, df = fn(r)
+
+        if abs(f) < ftol:
+            stats.record(i, bisections, scanned, True)
+            return r
+
+        if bracket is not None:
+
+            a, fa, b, fb = bracket
+
+            if (f < 0) == (fa < 0):
+                bracket = (r, f, b, fb)
+            else:
+                bracket = (a, fa, r, f)
+
+        elif prev is not None and (prev[1] < 0) != (f < 0):
+
+            bracket = (prev[0], prev[1], r, f)
+
+        prev = (r, f)
+
+        step = f / df if df else None
+        nxt = r - step if step is not None else None
+
+        if nxt != nxt:
+            nxt = None
+
+        if bracket is not None:
+
+            lo, hi = sorted((bracket[0], bracket[2]))
+
+            if nxt is None or not lo < nxt < hi:
+                nxt = (lo + hi) / 2.0
+                bisections += 1
+
+        elif nxt is None or nxt <= -1.0 or abs(nxt) > 1e6 or i > 20:
+
+            # Newton is wandering off; bracket the root by scanning
+            if not scanned:
+
+                scanned = True
+                bracket = _scan(fn, r)
+
+                if bracket is not None:
+                    a, fa, b, fb = bracket
+                    nxt = (a + b) / 2.0
+                    bisections += 1
+
+            if bracket is None:
+                break
+
+        if abs(nxt - r) <= XTOL * (1.0 + abs(r)):
+            stats.record(i, bisections, scanned, True)
+            return nxt
+
+        r = nxt
+
+    stats.record(i, bisections, scanned, False)
+
+    raise NumError, 'rate of return did not converge'
+
+
+def irr(values, guess=None, stats=None):
+
+    """Returns the internal rate of return of values at periods 0, 1, ...
+
+    guess -- starting rate; estimated from the flows when None
+    """
+
+    values = list(values)
+
+    _checkSigns(values)
+
+    if guess is None:
+        guess = initialGuess(values)
+
+    scale = sum(abs(v) for v in values)
+
+    return solve(lambda r: npv(r, values), guess, scale, stats)
+
+
+def xirr(values, dates, guess=None, stats=None):
+
+    """Returns the internal rate of return of values paid on dates.
+
+    dates -- date objects or day numbers; the first one is the start
+    """
+
+    values = list(values)
+
+    if len(values) != len(dates):
+        raise NumError, 'values and dates differ in length'
+
+    _checkSigns(values)
+
+    times = yearTimes(dates)
+
+    if guess is None:
+        guess = initialGuess(values, times)
+
+    scale = sum(abs(v) for v in values)
+
+    return solve(lambda r: xnpv(r, values, times), guess, scale, stats)
+
+
+def mirr(values, financeRate, reinvestRate):
+
+    """Returns the modified internal rate of return of values: outflows
+    are financed at financeRate, inflows reinvested at reinvestRate.
+    """
+
+    values = list(values)
+    n = len(values)
+
+    neg = npv(financeRate, [v if v < 0 else 0.0 for v in values])[0]
+    pos = npv(reinvestRate, [v if v > 0 else 0.0 for v in values])[0]
+
+    if neg == 0 or pos == 0 or n < 2:
+        raise ZeroDivisionError, 'values need positive and negative flows'
+
+    fvPos = pos * (1.0 + reinvestRate) ** (n - 1)
+
+    return (-fvPos / neg) ** (1.0 / (n - 1)) - 1.0
+
+
+def irrBatch(flows, offsets=None, guess=None, stats=None):
+
+    """Returns the internal rates of return of many cash flows.
+
+    flows -- a sequence of cash flow sequences, or one flat sequence of
+             flows when offsets is given
+    offsets -- flows[offsets[i]:offsets[i + 1]] is cash flow i
+    guess -- starting rate for all flows; estimated per flow when None
+
+    Flows that do not converge (or lack a sign change) get NaN and are
+    counted as failures in stats.  The result is a list, or a NumPy array
+    when NumPy is available.
+    """
+
+    if stats is None:
+        stats = defaultStats
+
+    if offsets is not None:
+        flows = [flows[offsets[i]:offsets[i + 1]]
+                 for i in xrange(len(offsets) - 1)]
+
+    if numpy is not None:
+        return _irrBatchNumpy(flows, guess, stats)
+
+    out = []
+
+    for values in flows:
+
+        calls = stats.calls
+
+        try:
+            out.append(irr(values, guess, stats))
+        except NumError:
+            if stats.calls == calls:
+                # rejected before the solver ran
+                stats.record(0, 0, False, False)
+            out.append(float('nan'))
+
+    return out
+
+
+def _irrBatchNumpy(flows, guess, stats):
+
+    """irrBatch() with NumPy: the steps of solve(), taken for all flows in
+    one vectorized pass each, so every flow gets the root irr() finds.
+    Only the flows whose Newton iteration wanders off are scanned for a
+    bracket, one by one."""
+
+    # pad with trailing zeros, which do not change the NPV
+    count = len(flows)
+    width = max(len(v) for v in flows) if count else 0
+    m = numpy.zeros((count, width))
+
+    for i, v in enumerate(flows):
+        m[i, :len(v)] = v
+
+    def evaluate(r, rows):
+        x = 1.0 / (1.0 + r)
+        f = numpy.zeros(len(r))
+        d = numpy.zeros(len(r))
+        for j in xrange(width - 1, -1, -1):
+            d = d * x + f
+            f = f * x + m[rows, j]
+        return f, -d * x * x
+
+    def empty():
+        a = numpy.empty(count)
+        a.fill(numpy.nan)
+        return a
+
+    ok = (m > 0).any(axis=1) & (m < 0).any(axis=1)
+    ftol = FTOL * numpy.maximum(numpy.abs(m).sum(axis=1), 1.0)
+
+    if guess is None:
+        r = numpy.array([initialGuess(v) for v in flows], dtype=float)
+    else:
+        r = numpy.empty(count)
+        r.fill(guess)
+
+    # the bracket (a, fa, b, fb) of each flow, NaN until there is one,
+    # and the previous point, as solve() keeps them
+    a, fa, b, fb = empty(), empty(), empty(), empty()
+    prevR, prevF = empty(), empty()
+    scanned = numpy.zeros(count, dtype=bool)
+    done = ~ok
+    iterations = numpy.zeros(count, dtype=int)
+    bisections = numpy.zeros(count, dtype=int)
+    result = empty()
+
+    with numpy.errstate(all='ignore'):
+
+        for i in xrange(1, MAXITER + 1):
+
+            rows = numpy.nonzero(~done)[0]
+
+            if not len(rows):
+                break
+
+            ra = r[rows]
+            f, df = evaluate(ra, rows)
+            iterations[rows] = i
+
+            hit = numpy.abs(f) < ftol[rows]
+            result[rows[hit]] = ra[hit]
+            done[rows[hit]] = True
+            rows, ra, f, df = rows[~hit], ra[~hit], f[~hit], df[~hit]
+
+            # move the bracket's end of the same sign to the current point
+            bracketed = ~numpy.isnan(a[rows])
+            same = bracketed & ((f < 0) == (fa[rows] < 0))
+            other = bracketed & ~same
+            a[rows[same]], fa[rows[same]] = ra[same], f[same]
+            b[rows[other]], fb[rows[other]] = ra[other], f[other]
+
+            # or bracket the root between the previous point and this one
+            pf = prevF[rows]
+            new = ~bracketed & ~numpy.isnan(pf) & ((pf < 0) != (f < 0))
+            a[rows[new]], fa[rows[new]] = prevR[rows[new]], pf[new]
+            b[rows[new]], fb[rows[new]] = ra[new], f[new]
+            prevR[rows], prevF[rows] = ra, f
+
+            nxt = ra - f / df
+            none = (df == 0) | numpy.isnan(nxt)
+
+            bracketed = ~numpy.isnan(a[rows])
+            lo = numpy.minimum(a[rows], b[rows])
+            hi = numpy.maximum(a[rows], b[rows])
+            bisect = bracketed & (none | ~((lo < nxt) & (nxt < hi)))
+            nxt = numpy.where(bisect, (lo + hi) / 2.0, nxt)
+            bisections[rows] += bisect
+
+            wandering = ~bracketed & (none | (nxt <= -1.0) |
+                                      (numpy.abs(nxt) > 1e6) | (i > 20))
+
+            for k in numpy.nonzero(wandering)[0]:
+
+                row = rows[k]
+                bracket = None
+
+                if not scanned[row]:
+                    scanned[row] = True
+                    values = list(flows[row])
+                    bracket = _scan(lambda rate: npv(rate, values), ra[k])
+
+                if bracket is None:
+                    done[row] = True
+                    continue
+
+                a[row], fa[row], b[row], fb[row] = bracket
+                nxt[k] = (bracket[0] + bracket[2]) / 2.0
+                bisections[row] += 1
+
+            small = ~done[rows] & \
+                (numpy.abs(nxt - ra) <= XTOL * (1.0 + numpy.abs(ra)))
+            result[rows[small]] = nxt[small]
+            done[rows[small]] = True
+            r[rows] = nxt
+
+    failed = numpy.isnan(result)
+
+    for i in xrange(count):
+        stats.record(int(iterations[i]), int(bisections[i]), scanned[i],
+                     not failed[i])
+
+    return result
@@ -0,0 +1,330 @@
+"""store.py -- workbook files with memory-mapped numeric columns.
+
+A store file keeps the numeric columns of a sheet as raw little-endian
+blocks and everything else (formulas, text, scattered numbers) as one
+binary sheet message (see wire.py):
+
+    'EMS1', 4 zero bytes
+    column blocks  -- float64 or int64 items, each starting at a multiple
+                      of 8 bytes
+    cells          -- a wire message with the sheet of the other cells
+    directory      -- a wire message: {'columns': {name: [type, offset,
+                      count]}, 'cells': [offset, length]}
+    footer         -- uint64 directory offset, uint64 directory length,
+                      'EMS1'
+
+Store opens a file by mapping it and reading the footer and the
+directory, so opening takes the same time for any file size.  A column
+is mapped on first access as a NumPy array over the mapping: nothing is
+read until the pages are touched, and the aggregates (SUM, AVERAGE, ...)
+run over the mapped buffer itself.  Without NumPy a column is read into
+an array.array on first access.  The other cells are decoded on first
+access too.
+
+    store.write('book.ems', sheet)
+    book = store.Store('book.ems')
+    emoney.SUM(book.column('A'))
+    emoney.AVERAGE(book.range('B2:B1000'))
+"""
+
+import mmap
+import os
+import re
+import struct
+
+from errors import EasyMoneyError
+
+import wire
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class StoreError(EasyMoneyError): pass
+
+
+MAGIC = 'EMS1'
+
+_FOOTER = struct.Struct('<QQ4s')
+_CELL = re.compile(r'^\$?([A-Za-z]+)\$?(\d+)$')
+_RANGE = re.compile(r'^\$?([A-Za-z]+)\$?(\d+):\$?([A-Za-z]+)\$?(\d+)$')
+_NUMBER_TYPES = (None, 'number')
+
+
+def splitSheet(cells):
+
+    """Returns (columns, rest) of a sheet: columns maps the letters of each
+    sheet column whose cells are exactly rows 1 to n, all float or all int
+    numbers without a label and with type 'number' (or none), to the list
+    of their values; rest holds the other cells."""
+
+    rows = {}
+
+    for name, cell in cells.iteritems():
+
+        m = _CELL.match(name)
+
+        if m is None or not isinstance(cell, dict) or \
+                cell.get('type') not in _NUMBER_TYPES or 'label' in cell or \
+                type(cell.get('value')) not in (int, long, float):
+            continue
+
+        rows.setdefault(m.group(1).upper(), {})[int(m.group(2))] = name
+
+    columns = {}
+    taken = set()
+
+    for letters, names in rows.iteritems():
+
+        n = len(names)
+
+        if min(names) != 1 or max(names) != n:
+            continue
+
+        ordered = [names[i] for i in xrange(1, n + 1)]
+        values = [cells[name]['value'] for name in ordered]
+
+        if wire.columnBytes(None, values) is None:
+            continue
+
+        columns[letters] = values
+        taken.update(ordered)
+
+    rest = dict((name, cell) for name, cell in cells.iteritems()
+                if name not in taken)
+
+    return columns, rest
+
+
+def _writeColumn(f, values):
+
+    """Writes values as a column block; returns (type, count)."""
+
+    if numpy is not None and isinstance(values, numpy.ndarray):
+
+        if values.dtype.kind == 'f':
+            code, dtype = 'd', '<f8'
+        elif values.dtype.kind in 'iu' and values.dtype != numpy.uint64:
+            code, dtype = 'q', '<i8'
+        else:
+            raise StoreError, 'unsupported column dtype %s' % values.dtype
+
+        # tofile() writes without another copy of the column in memory
+        numpy.ascontiguousarray(values.ravel(), dtype).tofile(f)
+
+        return code, values.size
+
+    column = wire.columnBytes(None, values)
+
+    if column is None:
+        raise StoreError, 'columns must hold only floats or only ints'
+
+    code, data = column
+    f.write(data)
+
+    return code, len(data) // 8
+
+
+def write(path, cells=None, columns=None):
+
+    """Writes a store file.
+
+    cells -- a sheet (dict of cell name to cell dict); the columns that
+             splitSheet() finds in it are stored as columns
+    columns -- dict of column name to a list, array.array or NumPy array
+               of numbers, stored as given (in addition to those of cells)
+
+    Raises StoreError if a name of columns is the column of a cell of
+    cells, whose cells it would hide.
+    """
+
+    sheet = {}
+    allColumns = {}
+
+    if cells:
+        allColumns, sheet = splitSheet(cells)
+
+    if columns:
+
+        used = set(m.group(1).upper() for m in map(_CELL.match, cells or ())
+                   if m is not None)
+        clashes = sorted(name for name in columns if name.upper() in used)
+
+        if clashes:
+            raise StoreError, 'columns %s are sheet columns' % \
+                ', '.join(clashes)
+
+        allColumns.update(columns)
+
+    directory = {'columns': {}}
+
+    with open(path, 'wb') as f:
+
+        f.write(MAGIC + '\0' * 4)
+
+        for name in sorted(allColumns):
+            offset = f.tell()
+            code, count = _writeColumn(f, allColumns[name])
+            directory['columns'][name] = [code, offset, count]
+            f.write('\0' * (-f.tell() % 8))
+
+        data = wire.dumps(sheet)
+        directory['cells'] = [f.tell(), len(data)]
+        f.write(data)
+
+        data = wire.dumps(directory)
+        offset = f.tell()
+        f.write(data)
+        f.write(_FOOTER.pack(offset, len(data), MAGIC))
+
+
+class Store(object):
+
+    """A store file opened for reading.
+
+    Columns are mapped and the other cells decoded on first access;
+    column() and range() return NumPy arrays that read the file through
+    the mapping.  close() only drops the store's references: the mapping
+    lives on as long as a column that uses it does.
+    """
+
+    def __init__(self, path):
+
+        self.path = path
+        self._columns = {}
+        self._cells = None
+
+        with open(path, 'rb') as f:
+
+            size = os.fstat(f.fileno()).st_size
+
+            if size < 8 + _FOOTER.size:
+                raise StoreError, 'not a store file: %s' % path
+
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        m = self._map
+        offset, length, magic = _FOOTER.unpack_from(m, size - _FOOTER.size)
+
+        if m[:4] != MAGIC or magic != MAGIC or \
+                offset + length > size - _FOOTER.size:
+            raise StoreError, 'not a store file: %s' % path
+
+        directory = wire.loads(m[offset:offset + length])
+        self._directory = directory['columns']
+        self._cellBlock = directory['cells']
+
+        for name, (code, start, count) in self._directory.iteritems():
+            if code not in ('d', 'q') or start + 8 * count > offset:
+                raise StoreError, 'bad column %s in %s' % (name, path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __contains__(self, name):
+        return name in self._directory
+
+    def names(self):
+
+        """Returns the names of the columns."""
+
+        return sorted(self._directory)
+
+    def loaded(self):
+
+        """Returns the names of the columns mapped so far."""
+
+        return sorted(self._columns)
+
+    def size(self, name):
+
+        """Returns the number of items of the column name, without mapping
+        it."""
+
+        return self._entry(name)[2]
+
+    def _entry(self, name):
+
+        try:
+            return self._directory[name]
+        except KeyError:
+            raise StoreError, 'no column %s' % name
+
+    def column(self, name):
+
+        """Returns the column name, mapping it on first access."""
+
+        column = self._columns.get(name)
+
+        if column is not None:
+            return column
+
+        code, start, count = self._entry(name)
+
+        column = wire.column(self._map, code, count, start)
+
+        self._columns[name] = column
+
+        return column
+
+    def range(self, ref):
+
+        """Returns the cells of a range within one column, e.g. 'A2:A100',
+        as a slice of the column (a view with NumPy)."""
+
+        m = _RANGE.match(ref)
+
+        if m is None or m.group(1).upper() != m.group(3).upper():
+            raise StoreError, 'not a range within one column: %s' % ref
+
+        first, last = int(m.group(2)), int(m.group(4))
+        name = m.group(1).upper()
+
+        if not 1 <= first <= last <= self.size(name):
+            raise StoreError, 'range %s is outside column %s' % (ref, name)
+
+        return self.column(name)[first - 1:last]
+
+    def cells(self):
+
+        """Returns the cells that are not in columns (a sheet), decoding
+        them on first access."""
+
+        if self._cells is None:
+            offset, length = self._cellBlock
+            self._cells = wire.loads(self._map[offset:offset + length])
+
+        return self._cells
+
+    def cell(self, name):
+
+        """Returns the cell dict of name, from a column or from the other
+        cells."""
+
+        m = _CELL.match(name)
+
+        if m is not None:
+
+            letters, row = m.group(1).upper(), int(m.group(2))
+
+            if letters in self._directory and 1 <= row <= self.size(letters):
+                value = self.column(letters)[row - 1]
+                if hasattr(value, 'item'):
+                    value = value.item()
+                return {'value': value, 'type': 'number'}
+
+        try:
+            return self.cells()[name]
+        except KeyError:
+            raise StoreError, 'no cell %s' % name
+
+    def close(self):
+
+        self._columns = {}
+        self._cells = None
+        self._map = None
@@ -0,0 +1,691 @@
+"""tables.py -- tables, criteria and the database functions (DSUM, DGET, ...).
+
+A Table stores a database range column by column: a list of labels and
+one list of values per label.  Criteria ranges are compiled once into a
+Criteria object, a list of alternatives (rows of the range, OR-ed) each
+holding conditions on columns (the cells of a row, AND-ed).
+
+Conditions are answered from per-column indexes that a Table builds the
+first time a column is queried and then keeps:
+
+    hash index -- normalized value -> rows, for = and <> conditions
+    sorted indexes -- numbers and texts in order with their rows, for <,
+                      <=, >, >= and text prefixes (binary search)
+
+so a query is a few dictionary lookups and bisections followed by set
+intersections, and the selected rows of recent criteria are cached as
+well.  aggregate() then computes any number of the D-aggregates over the
+selected values of a field in a single pass.  The D-functions keep the
+Tables of the last few list databases they were given (see table()), so
+repeated calls on one database reuse its indexes as well.
+
+Criteria cells follow the spreadsheets: a number or "=value" matches
+equal values, "<>value", "<value", "<=value", ">value" and ">=value"
+compare, plain text matches texts that begin with it, "=" alone matches
+blank cells and "<>" alone non-blank ones.  Texts compare without regard
+to case and may contain the wildcards * and ?.  Blank cells are None or
+the empty string.
+"""
+
+import math
+import operator
+import re
+
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import imap
+
+from errors import NumError, TypeError, ZeroDivisionError
+
+
+AGGREGATES = ('average', 'count', 'counta', 'get', 'max', 'min', 'product',
+              'stdev', 'stdevp', 'sum', 'var', 'varp')
+
+_OPERATORS = ('<>', '>=', '<=', '=', '>', '<')
+
+# number of list databases whose Tables table() keeps
+TABLE_CACHE = 8
+
+_BLANK = ('b', None)
+
+
+def isNumber(v):
+
+    """Returns True if v is a number (booleans are not)."""
+
+    return isinstance(v, (int, long, float)) and not isinstance(v, bool)
+
+
+def isBlank(v):
+    return v is None or v == ''
+
+
+def _key(v):
+
+    """Returns the hash index key of a cell value."""
+
+    if isBlank(v):
+        return _BLANK
+
+    if isNumber(v):
+        return ('n', float(v))
+
+    if isinstance(v, basestring):
+        return ('s', v.lower())
+
+    return ('o', v)
+
+
+def _number(text):
+
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _wildcards(text, prefix=False):
+
+    """Returns a compiled pattern for a text with * and ? wildcards (~ quotes
+    the next character), or None if it has none.  With prefix the pattern
+    matches texts that begin with the text.
+    """
+
+    if '*' not in text and '?' not in text:
+        return None
+
+    out = []
+    i = 0
+
+    while i < len(text):
+
+        c = text[i]
+
+        if c == '~' and i + 1 < len(text):
+            out.append(re.escape(text[i + 1]))
+            i += 2
+            continue
+
+        out.append('.*' if c == '*' else '.' if c == '?' else re.escape(c))
+        i += 1
+
+    if prefix:
+        out.append('.*')
+
+    return re.compile(''.join(out) + r'\Z', re.DOTALL)
+
+
+class Condition(object):
+
+    """One criteria cell: op applied to value.
+
+    op -- '=', '<>', '<', '<=', '>', '>=' or 'begins'
+    value -- a float, a lowercase text or None (blank)
+    pattern -- compiled wildcard pattern of a text value, or None
+    """
+
+    __slots__ = ('op', 'value', 'pattern')
+
+    def __init__(self, op, value, pattern=None):
+
+        self.op = op
+        self.value = value
+        self.pattern = pattern
+
+    @classmethod
+    def parse(cls, cell):
+
+        """Returns the Condition of a criteria cell, or None for a blank
+        cell (no condition)."""
+
+        if isBlank(cell):
+            return None
+
+        if isNumber(cell):
+            return cls('=', float(cell))
+
+        if not isinstance(cell, basestring):
+            return cls('=', cell)
+
+        op = None
+
+        for o in _OPERATORS:
+            if cell.startswith(o):
+                op = o
+                cell = cell[len(o):]
+                break
+
+        if cell == '':
+            return cls(op or '=', None)
+
+        n = _number(cell)
+
+        if n is not None:
+            return cls(op or '=', n)
+
+        text = cell.lower()
+        pattern = None
+
+        if op in (None, '=', '<>'):
+            pattern = _wildcards(text, op is None)
+
+        return cls(op or 'begins', text, pattern)
+
+    def matches(self, v):
+
+        """Returns True if the cell value v satisfies the condition (the
+        reference for the indexed evaluation)."""
+
+        op = self.op
+        value = self.value
+
+        if op == '<>':
+            return not Condition('=', value, self.pattern).matches(v)
+
+        if value is None:
+            return isBlank(v)
+
+        if isinstance(value, float):
+
+            if not isNumber(v):
+                return False
+
+            return _compare(op, v, value)
+
+        if not isinstance(value, basestring):
+            return _key(v) == ('o', value)
+
+        if not isinstance(v, basestring) or v == '':
+            return False
+
+        v = v.lower()
+
+        if self.pattern is not None:
+            return self.pattern.match(v) is not None
+
+        if op == 'begins':
+            return v.startswith(value)
+
+        return _compare(op, v, value)
+
+
+def _compare(op, a, b):
+
+    if op == '=':
+        return a == b
+    if op == '<':
+        return a < b
+    if op == '<=':
+        return a <= b
+    if op == '>':
+        return a > b
+    if op == '>=':
+        return a >= b
+
+    raise NumError, 'unknown operator %s' % op
+
+
+class Criteria(object):
+
+    """A compiled criteria range.
+
+    alternatives -- list of lists of (label, Condition); a row matches if
+                    it satisfies every condition of some alternative
+    """
+
+    def __init__(self, criteria):
+
+        rows = [list(r) for r in criteria]
+
+        if not rows:
+            raise TypeError, 'criteria range has no labels'
+
+        labels = rows[0]
+        self.alternatives = []
+
+        for r in rows[1:]:
+
+            conditions = []
+
+            for label, cell in zip(labels, r):
+
+                c = Condition.parse(cell)
+
+                if c is not None:
+                    conditions.append((label, c))
+
+            self.alternatives.append(conditions)
+
+        self.key = tuple(tuple(r) for r in rows)
+
+
+class _Index(object):
+
+    """The hash and sorted indexes of one column."""
+
+    def __init__(self, column):
+
+        self.hash = {}
+        numbers = []
+        texts = []
+
+        for row, v in enumerate(column):
+
+            key = _key(v)
+            self.hash.setdefault(key, []).append(row)
+
+            if key[0] == 'n':
+                numbers.append((key[1], row))
+            elif key[0] == 's':
+                texts.append((key[1], row))
+
+        numbers.sort()
+        texts.sort()
+
+        self.numbers = [v for v, r in numbers]
+        self.numberRows = [r for v, r in numbers]
+        self.texts = [v for v, r in texts]
+        self.textRows = [r for v, r in texts]
+
+    def _range(self, values, rows, op, value):
+
+        if op == '<':
+            return rows[:bisect_left(values, value)]
+        if op == '<=':
+            return rows[:bisect_right(values, value)]
+        if op == '>':
+            return rows[bisect_right(values, value):]
+        if op == '>=':
+            return rows[bisect_left(values, value):]
+
+        return rows[bisect_left(values, value):bisect_right(values, value)]
+
+    def select(self, c, n):
+
+        """Returns the set of rows (out of n) that satisfy Condition c."""
+
+        op = c.op
+        value = c.value
+
+        if op == '<>':
+            return set(xrange(n)) - self.select(Condition('=', value,
+                                                          c.pattern), n)
+
+        if value is None:
+            return set(self.hash.get(_BLANK, ()))
+
+        if isinstance(value, float):
+
+            if op == '=':
+                return set(self.hash.get(('n', value), ()))
+
+            return set(self._range(self.numbers, self.numberRows, op, value))
+
+        if not isinstance(value, basestring):
+            return set(self.hash.get(('o', value), ()))
+
+        if c.pattern is not None:
+
+            # wildcards: test each distinct text once
+            rows = set()
+
+            for key, found in self.hash.iteritems():
+                if key[0] == 's' and c.matches(key[1]):
+                    rows.update(found)
+
+            return rows
+
+        if op == '=':
+            return set(self.hash.get(('s', value), ()))
+
+        if op == 'begins':
+
+            texts = self.texts
+            lo = hi = bisect_left(texts, value)
+
+            while hi < len(texts) and texts[hi].startswith(value):
+                hi += 1
+
+            return set(self.textRows[lo:hi])
+
+        return set(self._range(self.texts, self.textRows, op, value))
+
+
+class Table(object):
+
+    """A database range stored column by column.
+
+    labels -- column labels (matched without regard to case)
+    columns -- one list of values per label
+    """
+
+    def __init__(self, rows=None, cacheSize=64):
+
+        rows = [list(r) for r in rows or [[]]]
+        self.labels = list(rows[0])
+        width = len(self.labels)
+
+        for r in rows[1:]:
+            if len(r) != width:
+                raise TypeError, 'database rows differ in length'
+
+        self.columns = [list(c) for c in zip(*rows[1:])] if rows[1:] else \
+            [[] for label in self.labels]
+        self.cacheSize = cacheSize
+        self._clear()
+
+    @classmethod
+    def fromColumns(cls, labels, columns):
+
+        """Returns a Table of the given columns (lists are not copied)."""
+
+        if len(labels) != len(columns) or \
+                len(set(len(c) for c in columns)) > 1:
+            raise TypeError, 'columns differ in length'
+
+        t = cls([labels])
+        t.columns = list(columns)
+
+        return t
+
+    def _clear(self):
+
+        self._positions = {}
+
+        for i, label in enumerate(self.labels):
+            self._positions.setdefault(_label(label), i)
+
+        self._indexes = {}
+        self._criteria = OrderedDict()
+        self._selections = OrderedDict()
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def append(self, row):
+
+        """Appends a record.  Indexes and cached selections are dropped."""
+
+        if len(row) != len(self.labels):
+            raise TypeError, 'record length differs from the labels'
+
+        for c, v in zip(self.columns, row):
+            c.append(v)
+
+        self._clear()
+
+    def position(self, field):
+
+        """Returns the column number of field: a label, or a 1-based
+        column number as in the spreadsheets."""
+
+        if isNumber(field):
+
+            i = int(field) - 1
+
+            if not 0 <= i < len(self.labels):
+                raise TypeError, 'field %r out of range' % field
+
+            return i
+
+        try:
+            return self._positions[_label(field)]
+        except KeyError:
+            raise TypeError, 'no field %r' % field
+
+    def index(self, field):
+
+        """Returns the (cached) index of a column."""
+
+        i = self.position(field)
+        found = self._indexes.get(i)
+
+        if found is None:
+            found = self._indexes[i] = _Index(self.columns[i])
+
+        return found
+
+    def compile(self, criteria):
+
+        """Returns criteria as a Criteria object, compiled once per
+        criteria range."""
+
+        if isinstance(criteria, Criteria):
+            return criteria
+
+        key = tuple(tuple(r) for r in criteria)
+        found = _lru(self._criteria, key, self.cacheSize)
+
+        if found is None:
+            found = self._criteria[key] = Criteria(criteria)
+
+        return found
+
+    def select(self, criteria):
+
+        """Returns the sorted list of the rows that match criteria."""
+
+        c = self.compile(criteria)
+        found = _lru(self._selections, c.key, self.cacheSize)
+
+        if found is not None:
+            return found
+
+        n = len(self)
+        selected = set()
+
+        for conditions in c.alternatives:
+
+            if not conditions:
+                selected = set(xrange(n))
+                break
+
+            sets = sorted([self.index(label).select(cond, n)
+                           for label, cond in conditions], key=len)
+            rows = sets[0]
+
+            for s in sets[1:]:
+                if not rows:
+                    break
+                rows = rows & s
+
+            selected |= rows
+
+        found = self._selections[c.key] = sorted(selected)
+
+        return found
+
+    def values(self, field, criteria):
+
+        """Returns the values of field in the rows that match criteria."""
+
+        column = self.columns[self.position(field)]
+
+        return [column[r] for r in self.select(criteria)]
+
+    def aggregate(self, field, criteria, names=AGGREGATES):
+
+        """Returns a dict of the named aggregates (see AGGREGATES) of field
+        over the rows that match criteria, all computed in one pass over
+        the selected values.  Aggregates that are undefined for the
+        selection (an average of nothing) map to the exception they would
+        raise.
+        """
+
+        for name in names:
+            if name not in AGGREGATES:
+                raise TypeError, 'unknown aggregate %s' % name
+
+        if field is None:
+
+            # without a field only the records themselves can be counted
+            for name in names:
+                if name not in ('count', 'counta'):
+                    raise TypeError, 'aggregate %s needs a field' % name
+
+            rows = self.select(criteria)
+
+            return dict((name, len(rows)) for name in names)
+
+        count = counta = 0
+        total = 0.0
+        product = 1.0
+        lo = hi = None
+        mean = m2 = 0.0
+
+        for v in self.values(field, criteria):
+
+            if not isBlank(v):
+                counta += 1
+
+            if not isNumber(v):
+                continue
+
+            count += 1
+            total += v
+            product *= v
+
+            if lo is None or v < lo:
+                lo = v
+            if hi is None or v > hi:
+                hi = v
+
+            # Welford's update, for the variances
+            d = v - mean
+            mean += d / count
+            m2 += d * (v - mean)
+
+        result = {}
+
+        for name in names:
+
+            if name == 'count':
+                result[name] = count
+            elif name == 'counta':
+                result[name] = counta
+            elif name == 'sum':
+                result[name] = total
+            elif name == 'product':
+                result[name] = product if count else 0.0
+            elif name == 'max':
+                result[name] = hi if count else 0.0
+            elif name == 'min':
+                result[name] = lo if count else 0.0
+            elif name == 'average':
+                result[name] = total / count if count else \
+                    ZeroDivisionError('no numbers to average')
+            elif name in ('var', 'stdev'):
+                v = m2 / (count - 1) if count > 1 else \
+                    ZeroDivisionError('fewer than two numbers')
+                result[name] = v if name == 'var' or \
+                    isinstance(v, Exception) else math.sqrt(v)
+            elif name in ('varp', 'stdevp'):
+                v = m2 / count if count else \
+                    ZeroDivisionError('no numbers')
+                result[name] = v if name == 'varp' or \
+                    isinstance(v, Exception) else math.sqrt(v)
+
+        if 'get' in names:
+            result['get'] = self._get(field, criteria)
+
+        return result
+
+    def _get(self, field, criteria):
+
+        rows = self.select(criteria)
+
+        if not rows:
+            return TypeError('no record matches')
+
+        if len(rows) > 1:
+            return NumError('more than one record matches')
+
+        return self.columns[self.position(field)][rows[0]]
+
+
+def _label(label):
+    return label.lower() if isinstance(label, basestring) else label
+
+
+def _lru(cache, key, size):
+
+    """Returns cache[key] moved to the most recent end, or None after making
+    room for a new entry."""
+
+    found = cache.pop(key, None)
+
+    if found is not None:
+        cache[key] = found
+    elif len(cache) >= size:
+        cache.popitem(last=False)
+
+    return found
+
+
+# id(database) -> (database, copy of its rows, Table)
+_tables = OrderedDict()
+
+
+def _rows(database):
+
+    """Returns a shallow copy of the rows of a list (or tuple) database of
+    list or tuple rows, or None for other databases."""
+
+    if not isinstance(database, (list, tuple)):
+        return None
+
+    rows = []
+
+    for r in database:
+        if not isinstance(r, (list, tuple)):
+            return None
+        rows.append(r[:])
+
+    return rows
+
+
+def table(database):
+
+    """Returns database as a Table (a Table is returned as is).
+
+    The Tables of the last TABLE_CACHE list databases are kept, with their
+    indexes and cached selections, for the next calls on the same database
+    object.  Each call compares the rows of the database with a copy taken
+    when its Table was built, and builds a new Table if they have changed.
+    Pass a Table to skip even that comparison.
+    """
+
+    if isinstance(database, Table):
+        return database
+
+    key = id(database)
+    found = _lru(_tables, key, TABLE_CACHE)
+
+    if found is not None:
+
+        # the entry holds database, so its id cannot have been reused
+        kept, rows, t = found
+
+        if kept is database and len(database) == len(rows) and \
+                all(imap(operator.eq, database, rows)):
+            return t
+
+    rows = _rows(database)
+    t = Table(database)
+
+    if rows is not None:
+        _tables[key] = (database, rows, t)
+
+    return t
+
+
+def aggregate(database, field, criteria, name):
+
+    """Returns one aggregate, raising the exception of an undefined one."""
+
+    value = table(database).aggregate(field, criteria, (name,))[name]
+
+    if isinstance(value, Exception):
+        raise value
+
+    return value
@@ -0,0 +1,632 @@
+"""wire.py -- a compact binary encoding of sheets and function arguments.
+
+The JSON cell format wraps every value in an object, so a column of a
+million numbers becomes a million dicts to write and to parse.  dumps()
+writes the same data in blocks instead:
+
+    message  -- 'EMW1' then one value
+    value    -- a one-byte tag and its payload:
+                N T F                 None, True, False
+                i  int64              int (n: longer ints, as text)
+                d  float64            float
+                s  string             unicode or str (UTF-8)
+                z  string             Decimal (money mode)
+                l  count, values      list or tuple
+                m  count, (string, value) pairs
+                                      dict
+                c  type, count, data  column (see below)
+                S  sheet              dict of cell name to cell dict
+    column   -- a type byte ('d' float64, 'q' int64, 'B' uint8), a uint64
+                item count, zero padding up to a multiple of 8 bytes from
+                the start of the message, and the items
+    strings  -- a uint64 count and a uint64 byte length, then the UTF-8
+                strings joined by NUL bytes (or, when a string holds NUL,
+                a column of their lengths and the strings)
+
+All numbers are little-endian.  Lists of floats, lists of ints that fit
+in 64 bits, array.arrays and 1-d NumPy arrays are written as columns;
+other NumPy arrays as (nested) lists, so matrices keep their rows.  A
+sheet is written column-wise: its cell names as strings, a uint8 column
+with the kind of each value, one column for the float values, one for
+the int values, strings for the text (and formulas), and the types and
+labels dictionary-encoded -- the distinct strings once, then a column of
+codes (0 for a missing one).
+
+loads() reads a column as a NumPy array that is a view of the message
+(no copy, read-only when the message is a str) or, without NumPy, as an
+array.array.  These are columns for the EasyMoney aggregates as they
+are.  A sheet comes back as the dict of cell dicts the FormulaEngine and
+Workbook take.  Messages that do not start with 'EMW1' are read as JSON,
+so a reader can take either.
+"""
+
+import array
+import decimal
+import json
+import struct
+import sys
+
+from decimal import Decimal
+from itertools import imap, izip, repeat
+from operator import itemgetter
+
+from errors import EasyMoneyError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class WireError(EasyMoneyError): pass
+
+
+MAGIC = 'EMW1'
+CONTENT_TYPE = 'application/x-easymoney'
+
+_INT64 = 2 ** 63
+_LITTLE = sys.byteorder == 'little'
+
+# sheet value kinds
+_FLOAT, _INT, _TEXT, _FALSE, _TRUE, _NONE, _OTHER, _BIGINT, _DECIMAL = \
+    range(9)
+
+_KINDS = {float: _FLOAT, int: _INT, long: _INT, str: _TEXT, unicode: _TEXT,
+          bool: _FALSE, type(None): _NONE, Decimal: _DECIMAL}
+_TEXTUAL = frozenset([_TEXT, _BIGINT, _DECIMAL])
+
+_CELL_KEYS = frozenset(['value', 'type', 'label'])
+_DICT = set([dict])
+_STRINGS = frozenset([str, unicode, type(None)])
+
+# array.array typecodes by wire type, where the item sizes match
+_ARRAY = {'d': 'd', 'B': 'B'}
+
+for _code in 'lq':
+    try:
+        if array.array(_code).itemsize == 8:
+            _ARRAY['q'] = _code
+            break
+    except ValueError:
+        pass
+
+_DTYPE = {'d': '<f8', 'q': '<i8', 'B': 'u1'}
+_SIZE = {'d': 8, 'q': 8, 'B': 1}
+_INTEGRAL = 'qB'
+
+
+def isWire(data):
+
+    """Returns True if data (a str or buffer) is a binary message."""
+
+    return data[:4] == MAGIC
+
+
+# Writing
+
+
+class _Writer(object):
+
+    def __init__(self, default):
+
+        self.parts = [MAGIC]
+        self.size = len(MAGIC)
+        self.default = default
+
+    def write(self, data):
+
+        self.parts.append(data)
+        self.size += len(data)
+
+    def pack(self, fmt, *values):
+
+        self.write(struct.pack(fmt, *values))
+
+    def align(self):
+
+        pad = -self.size % 8
+
+        if pad:
+            self.write('\0' * pad)
+
+    def column(self, code, data, count):
+
+        """Writes a column block; data is its little-endian items."""
+
+        self.pack('<ccQ', 'c', code, count)
+        self.align()
+        self.write(data)
+
+    def strings(self, strings):
+
+        try:
+            blob = '\0'.join(strings)
+        except UnicodeDecodeError:
+            # str items that are not ASCII next to unicode ones
+            blob = '\0'.join([s.encode('utf-8') if isinstance(s, unicode)
+                               else s for s in strings])
+
+        if isinstance(blob, unicode):
+            blob = blob.encode('utf-8')
+
+        if blob.count('\0') == max(len(strings) - 1, 0):
+            self.pack('<BQQ', 0, len(strings), len(blob))
+            self.write(blob)
+            return
+
+        data = [s.encode('utf-8') if isinstance(s, unicode) else s
+                for s in strings]
+
+        self.pack('<BQQ', 1, len(data), len(data))
+        self.column(*columnBytes('q', map(len, data)) + (len(data),))
+        self.write(''.join(data))
+
+    def value(self, x):
+
+        t = type(x)
+
+        if x is None:
+            self.write('N')
+        elif t is bool:
+            self.write('T' if x else 'F')
+        elif t is int or t is long:
+            if -_INT64 <= x < _INT64:
+                self.pack('<cq', 'i', x)
+            else:
+                self.write('n')
+                self.strings([str(x)])
+        elif t is float:
+            self.pack('<cd', 'd', x)
+        elif isinstance(x, basestring):
+            self.write('s')
+            self.strings([x])
+        elif isinstance(x, Decimal):
+            self.write('z')
+            self.strings([str(x)])
+        elif isinstance(x, dict):
+            if not self.sheet(x):
+                self.pack('<cQ', 'm', len(x))
+                for k, v in x.iteritems():
+                    if not isinstance(k, basestring):
+                        raise WireError, 'map keys must be strings'
+                    self.strings([k])
+                    self.value(v)
+        else:
+            col = columnBytes(None, x)
+            if col is not None:
+                code, data = col
+                self.column(code, data, len(data) // _SIZE[code])
+            elif t is list or t is tuple:
+                self.pack('<cQ', 'l', len(x))
+                for item in x:
+                    self.value(item)
+            elif numpy is not None and isinstance(x, numpy.ndarray):
+                # bool and other non-numeric arrays go as lists of values,
+                # matrices as lists of rows
+                self.value(x.tolist())
+            elif self.default is not None:
+                self.value(self.default(x))
+            else:
+                raise WireError, 'cannot encode %s' % t.__name__
+
+    def sheet(self, cells):
+
+        """Writes cells as a sheet block, if they are a sheet: a dict of
+        cell dicts with a value, and a type and a label that are strings
+        when present.  Returns False (having written nothing) if not."""
+
+        names = cells.keys()
+        cellList = cells.values()
+        n = len(names)
+
+        if not n or set(map(type, cellList)) != _DICT or \
+                not all(imap(_CELL_KEYS.issuperset, cellList)):
+            return False
+
+        try:
+            values = map(itemgetter('value'), cellList)
+        except KeyError:
+            return False
+
+        types = map(dict.get, cellList, repeat('type', n))
+        labels = map(dict.get, cellList, repeat('label', n))
+
+        if not _STRINGS.issuperset(map(type, types)) or \
+                not _STRINGS.issuperset(map(type, labels)):
+            return False
+
+        kinds = [_KINDS.get(t, _OTHER) for t in map(type, values)]
+        present = set(kinds)
+
+        if present == set([_FLOAT]):
+            floats, ints, texts, others = values, [], [], []
+        else:
+            floats = [v for v, k in izip(values, kinds) if k == _FLOAT]
+            ints = [v for v, k in izip(values, kinds) if k == _INT]
+
+            if ints and (min(ints) < -_INT64 or max(ints) >= _INT64):
+                for i, v in enumerate(values):
+                    if kinds[i] == _INT and not -_INT64 <= v < _INT64:
+                        kinds[i] = _BIGINT
+                ints = [v for v, k in izip(values, kinds) if k == _INT]
+
+            if _FALSE in present:
+                for i, v in enumerate(values):
+                    if v is True:
+                        kinds[i] = _TRUE
+
+            texts = [v if k == _TEXT else str(v)
+                     for v, k in izip(values, kinds) if k in _TEXTUAL]
+            others = [v for v, k in izip(values, kinds) if k == _OTHER]
+
+        self.pack('<cQ', 'S', n)
+        self.strings(names)
+        self.column('B', array.array('B', kinds).tostring(), n)
+        self.column(*columnBytes('d', floats) + (len(floats),))
+        self.column(*columnBytes('q', ints) + (len(ints),))
+        self.strings(texts)
+        self.dictionary(types)
+        self.dictionary(labels)
+
+        for v in others:
+            self.value(v)
+
+        return True
+
+    def dictionary(self, strings):
+
+        """Writes strings dictionary-encoded: the distinct strings, then a
+        column of codes, 0 for None and i + 1 for the i-th distinct one."""
+
+        distinct = list(set(strings) - set([None]))
+        index = dict(izip(distinct, xrange(1, len(distinct) + 1)))
+        index[None] = 0
+        codes = [index[s] for s in strings]
+
+        self.strings(distinct)
+
+        if len(distinct) < 256:
+            self.column('B', array.array('B', codes).tostring(), len(codes))
+        else:
+            self.column(*columnBytes('q', codes) + (len(codes),))
+
+
+def columnBytes(code, x):
+
+    """Returns (wire type, little-endian items) of x, or None if x is not a
+    column: a float or int list, an array.array or a 1-d NumPy array.  code
+    forces the type of a list."""
+
+    if numpy is not None and isinstance(x, numpy.ndarray):
+        if x.ndim != 1:
+            return None
+        if x.dtype.kind == 'f':
+            return 'd', x.astype('<f8').tostring()
+        if x.dtype.kind in 'iu' and x.dtype != numpy.uint64:
+            return 'q', x.astype('<i8').tostring()
+        return None
+
+    if isinstance(x, array.array):
+        if x.typecode in 'fd':
+            code, x = 'd', x.tolist()
+        elif x.typecode in 'bBhHiIlL' and x.typecode != 'L':
+            code, x = 'q', x.tolist()
+        else:
+            return None
+
+    elif code is None:
+
+        if type(x) is not list or not x:
+            return None
+
+        types = set(map(type, x))
+
+        if types == set([float]):
+            code = 'd'
+        elif types <= set([int, long]) and \
+                -_INT64 <= min(x) and max(x) < _INT64:
+            code = 'q'
+        else:
+            return None
+
+    if code == 'd':
+        a = array.array('d', x)
+    elif code in _ARRAY:
+        a = array.array(_ARRAY[code], x)
+    else:
+        return code, struct.pack('<%dq' % len(x), *x)
+
+    if not _LITTLE:
+        a.byteswap()
+
+    return code, a.tostring()
+
+
+def column(data, code, count, start):
+
+    """Returns the column of count items of wire type code that starts at
+    start in data (a str or buffer such as an mmap): a NumPy array that is
+    a view of data or, without NumPy, an array.array copy."""
+
+    if numpy is not None:
+        return numpy.frombuffer(data, _DTYPE[code], count, start)
+
+    if code not in _ARRAY:
+        return list(struct.unpack_from('<%dq' % count, data, start))
+
+    a = array.array(_ARRAY[code])
+    a.fromstring(buffer(data, start, count * _SIZE[code]))
+
+    if not _LITTLE:
+        a.byteswap()
+
+    return a
+
+
+def dumps(x, default=None):
+
+    """Returns the binary message of x.
+
+    default -- called with objects there is no encoding for; returns a
+               value to encode instead (like json.dumps' default)
+    """
+
+    w = _Writer(default)
+    w.value(x)
+
+    return ''.join(w.parts)
+
+
+# Reading
+
+
+class _Reader(object):
+
+    def __init__(self, data):
+
+        self.data = data
+        self.pos = len(MAGIC)
+
+    def unpack(self, fmt):
+
+        size = struct.calcsize(fmt)
+
+        if self.pos + size > len(self.data):
+            raise WireError, 'truncated message'
+
+        values = struct.unpack_from(fmt, self.data, self.pos)
+        self.pos += size
+
+        return values
+
+    def take(self, size):
+
+        start = self.pos
+        self.pos += size
+
+        if self.pos > len(self.data) or size < 0:
+            raise WireError, 'truncated message'
+
+        return start
+
+    def count(self, size=1):
+
+        """Reads an item count; each item takes at least size bytes of the
+        rest of the message."""
+
+        n = self.unpack('<Q')[0]
+
+        if n * size > len(self.data) - self.pos:
+            raise WireError, 'count beyond the end of the message'
+
+        return n
+
+    def codes(self, n):
+
+        """Reads a column of dictionary codes, each 0 to n."""
+
+        codes = _tolist(self.column(_INTEGRAL))
+
+        if codes and (min(codes) < 0 or max(codes) > n):
+            raise WireError, 'bad dictionary code'
+
+        return codes
+
+    def column(self, codes=_SIZE):
+
+        """Reads a column block of one of the wire types codes."""
+
+        tag, code, n = self.unpack('<ccQ')
+
+        if tag != 'c' or code not in codes:
+            raise WireError, 'bad column block'
+
+        self.take(-self.pos % 8)
+        start = self.take(n * _SIZE[code])
+
+        return column(self.data, code, n, start)
+
+    def strings(self):
+
+        mode, n, size = self.unpack('<BQQ')
+
+        if mode not in (0, 1) or n > len(self.data) - self.pos + 1:
+            raise WireError, 'bad string block'
+
+        if mode == 1:
+            lengths = _tolist(self.column(_INTEGRAL))
+            if len(lengths) != n or lengths and min(lengths) < 0:
+                raise WireError, 'bad string block'
+            start = self.take(sum(lengths))
+            out = []
+            for k in lengths:
+                out.append(self.data[start:start + k].decode('utf-8'))
+                start += k
+            return out
+
+        start = self.take(size)
+
+        if n == 0:
+            return []
+
+        out = self.data[start:start + size].decode('utf-8').split(u'\0')
+
+        if len(out) != n:
+            raise WireError, 'bad string block'
+
+        return out
+
+    def string(self):
+
+        strings = self.strings()
+
+        if len(strings) != 1:
+            raise WireError, 'bad string block'
+
+        return strings[0]
+
+    def value(self):
+
+        tag = self.unpack('c')[0]
+
+        if tag == 'N':
+            return None
+        if tag == 'T':
+            return True
+        if tag == 'F':
+            return False
+        if tag == 'i':
+            return self.unpack('<q')[0]
+        if tag == 'd':
+            return self.unpack('<d')[0]
+        if tag == 's':
+            return self.string()
+        if tag == 'n':
+            return int(self.string())
+        if tag == 'z':
+            return Decimal(self.string())
+        if tag == 'l':
+            return [self.value() for i in xrange(self.count())]
+        if tag == 'm':
+            out = {}
+            for i in xrange(self.count()):
+                k = self.string()
+                out[k] = self.value()
+            return out
+        if tag == 'c':
+            self.pos -= 1
+            return self.column()
+        if tag == 'S':
+            return self.sheet()
+
+        raise WireError, 'unknown tag %r' % tag
+
+    def sheet(self):
+
+        n = self.count()
+        names = self.strings()
+        kinds = self.column('B')
+        floats = self.column()
+        ints = self.column()
+        texts = self.strings()
+        typeNames = [None] + self.strings()
+        typeCodes = self.codes(len(typeNames) - 1)
+        labelNames = [None] + self.strings()
+        labelCodes = self.codes(len(labelNames) - 1)
+
+        if len(names) != n or len(kinds) != n or len(typeCodes) != n or \
+                len(labelCodes) != n:
+            raise WireError, 'bad sheet block'
+
+        values = _sheetValues(self, _tolist(kinds), _tolist(floats),
+                              _tolist(ints), texts)
+        types = [typeNames[c] for c in typeCodes]
+        labels = [labelNames[c] for c in labelCodes]
+
+        if any(labelCodes):
+            cells = [{'value': v, 'type': t, 'label': l}
+                     for v, t, l in izip(values, types, labels)]
+            for cell in cells:
+                if cell['label'] is None:
+                    del cell['label']
+        else:
+            cells = [{'value': v, 'type': t} for v, t in izip(values, types)]
+
+        if 0 in typeCodes:
+            for cell in cells:
+                if cell['type'] is None:
+                    del cell['type']
+
+        return dict(izip(names, cells))
+
+
+def _tolist(col):
+
+    return col.tolist() if hasattr(col, 'tolist') else col
+
+
+def _sheetValues(reader, kinds, floats, ints, texts):
+
+    if not [k for k in kinds if k != _FLOAT]:
+        return floats
+
+    floats = iter(floats)
+    ints = iter(ints)
+    texts = iter(texts)
+    constants = {_FALSE: False, _TRUE: True, _NONE: None}
+    values = []
+
+    for k in kinds:
+        if k == _FLOAT:
+            values.append(next(floats))
+        elif k == _INT:
+            values.append(next(ints))
+        elif k == _TEXT:
+            values.append(next(texts))
+        elif k in constants:
+            values.append(constants[k])
+        elif k == _BIGINT:
+            values.append(int(next(texts)))
+        elif k == _DECIMAL:
+            values.append(Decimal(next(texts)))
+        else:
+            values.append(None)
+
+    # values of other kinds follow the sheet
+    for i, k in enumerate(kinds):
+        if k == _OTHER:
+            values[i] = reader.value()
+
+    return values
+
+
+def loads(data):
+
+    """Returns the value of a binary message, or of a JSON text.
+
+    data -- str, bytearray, buffer or mmap (read in place); a memoryview
+            is copied once
+    """
+
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+
+    if not isWire(data):
+        try:
+            return json.loads(str(data))
+        except ValueError, e:
+            raise WireError, 'neither a binary message nor JSON: %s' % e
+
+    reader = _Reader(data)
+
+    try:
+        value = reader.value()
+    except (struct.error, UnicodeDecodeError, ValueError, StopIteration,
+            OverflowError, IndexError, MemoryError,
+            decimal.InvalidOperation), e:
+        raise WireError, 'bad message: %s' % e
+
+    if reader.pos != len(data):
+        raise WireError, 'trailing bytes after the message'
+
+    return value
@@ -0,0 +1,368 @@
+"""workbook.py -- cells with formulas and incremental recalculation.
+
+A Workbook keeps the cells of a sheet together with the dependency graph
+between them.  Editing a cell marks it and everything downstream of it
+dirty; recalculation evaluates only the dirty cells, in topological order,
+so every formula runs once per edit no matter how the dirty cells are
+connected.  Formulas that would close a cycle are rejected when they are
+set.
+
+A formula that fails (a division by zero, a reference to a missing cell)
+does not stop the recalculation: its cell holds a CellError, as a
+spreadsheet shows #DIV/0! or #REF!, and so does every cell that reads it.
+The other cells recalculate as usual.
+"""
+
+import __builtin__
+
+from collections import deque
+
+from errors import NumError, ZeroDivisionError
+from formula import FormulaEngine, FormulaError, isFormula
+
+
+class CycleError(FormulaError): pass
+class RefError(FormulaError): pass
+
+
+class CellError(object):
+
+    """The value of a cell whose formula failed.
+
+    code -- the spreadsheet error: #DIV/0!, #REF!, #NUM! or #VALUE!
+    error -- the exception, of this cell or of the precedent it read
+    """
+
+    __slots__ = ('code', 'error')
+
+    def __init__(self, code, error):
+
+        self.code = code
+        self.error = error
+
+    @classmethod
+    def fromException(cls, error):
+
+        if isinstance(error, (ZeroDivisionError,
+                              __builtin__.ZeroDivisionError)):
+            code = '#DIV/0!'
+        elif isinstance(error, RefError):
+            code = '#REF!'
+        elif isinstance(error, (NumError, OverflowError)):
+            code = '#NUM!'
+        else:
+            code = '#VALUE!'
+
+        return cls(code, error)
+
+    def __eq__(self, other):
+        return isinstance(other, CellError) and self.code == other.code
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __str__(self):
+        return self.code
+
+    def __repr__(self):
+        return 'CellError(%r, %r)' % (self.code, self.error)
+
+
+class _Failed(Exception):
+
+    """Raised when a formula reads a cell that holds a CellError."""
+
+    def __init__(self, value):
+
+        Exception.__init__(self, value.code)
+        self.value = value
+
+
+class Workbook(object):
+
+    """A sheet of cells with a dependency graph.
+
+    cells -- optional dict of cell name to cell dict to load
+    engine -- FormulaEngine used to compile formulas (a new one by default)
+
+    set() and delete() return the number of cells the edit marked dirty;
+    recalculate() returns the number of cells it evaluated.  Both counts
+    for the last edit are also kept in lastDirty and lastEvaluated.
+    """
+
+    def __init__(self, cells=None, engine=None):
+
+        if engine is None:
+            engine = FormulaEngine()
+
+        self.engine = engine
+        self.cells = {}
+        self.lastDirty = 0
+        self.lastEvaluated = 0
+
+        self._values = {}
+        self._formulas = {}
+        self._precedents = {}
+        self._dependents = {}
+        self._dirty = set()
+
+        if cells:
+            for name, cell in cells.iteritems():
+                self.setCell(name, cell)
+
+    def __contains__(self, name):
+        return name in self.cells
+
+    def __len__(self):
+        return len(self.cells)
+
+    def set(self, name, value, type=None, label=None):
+
+        """Sets the value (a constant or a formula) of the cell name.
+
+        Returns the number of cells marked dirty by the edit.
+        """
+
+        cell = dict(self.cells.get(name, ()))
+        cell['value'] = value
+
+        if type is not None:
+            cell['type'] = type
+
+        if label is not None:
+            cell['label'] = label
+
+        cell.setdefault('type', 'string' if isinstance(value, basestring)
+                        and not isFormula(value) else 'number')
+
+        return self.setCell(name, cell)
+
+    def setCell(self, name, cell):
+
+        """Stores the cell dict under name.  Returns the number of cells
+        marked dirty by the edit.
+
+        Raises CycleError, leaving the workbook unchanged, if the cell's
+        formula refers to the cell itself or to anything downstream of it.
+        """
+
+        value = cell['value']
+
+        if isFormula(value):
+            formula = self.engine.compile(value)
+            refs = frozenset(formula.refs)
+            self._checkCycle(name, refs)
+        else:
+            formula = None
+            refs = frozenset()
+
+        self._link(name, refs)
+        self.cells[name] = cell
+
+        if formula is None:
+            self._formulas.pop(name, None)
+        else:
+            self._formulas[name] = formula
+
+        self.lastDirty = self._markDirty(name)
+
+        return self.lastDirty
+
+    def delete(self, name):
+
+        """Removes the cell name.  Cells that refer to it stay in the
+        graph and hold #REF! errors until the cell is set again.
+
+        Returns the number of cells marked dirty by the edit.
+        """
+
+        if name not in self.cells:
+            raise FormulaError, 'unknown cell %s' % name
+
+        self.lastDirty = self._markDirty(name)
+        self._link(name, frozenset())
+        self._dirty.discard(name)
+
+        del self.cells[name]
+        self._formulas.pop(name, None)
+        self._values.pop(name, None)
+
+        return self.lastDirty
+
+    def get(self, name):
+
+        """Returns the value of the cell name, recalculating dirty cells
+        first.  The value is a CellError if the cell's formula failed.
+        """
+
+        if self._dirty:
+            self.recalculate()
+
+        try:
+            return self._values[name]
+        except KeyError:
+            raise FormulaError, 'unknown cell %s' % name
+
+    def values(self):
+
+        """Returns a dict of cell name to value for the whole workbook."""
+
+        if self._dirty:
+            self.recalculate()
+
+        return dict(self._values)
+
+    def dirty(self):
+
+        """Returns the set of cells waiting for recalculation."""
+
+        return set(self._dirty)
+
+    def precedents(self, name):
+
+        """Returns the names of the cells that name refers to."""
+
+        return set(self._precedents.get(name, ()))
+
+    def dependents(self, name):
+
+        """Returns the names of the cells that refer to name."""
+
+        return set(self._dependents.get(name, ()))
+
+    def recalculate(self):
+
+        """Evaluates the dirty cells in topological order.  Returns the
+        number of cells evaluated.
+        """
+
+        dirty = self._dirty
+        dependents = self._dependents
+        values = self._values
+        formulas = self._formulas
+        cells = self.cells
+
+        # in-degree counted over dirty precedents only; clean precedents
+        # already hold their values
+        pending = dict((name, 0) for name in dirty)
+
+        for name in dirty:
+            for d in dependents.get(name, ()):
+                if d in pending:
+                    pending[d] += 1
+
+        ready = deque(name for name, n in pending.iteritems() if n == 0)
+
+        def get(name):
+
+            try:
+                value = values[name]
+            except KeyError:
+                raise RefError, 'unknown cell %s' % name
+
+            if isinstance(value, CellError):
+                raise _Failed(value)
+
+            return value
+
+        count = 0
+
+        while ready:
+
+            name = ready.popleft()
+            formula = formulas.get(name)
+
+            if formula is None:
+                values[name] = cells[name]['value']
+            else:
+                try:
+                    values[name] = formula.fn(get)
+                except _Failed, e:
+                    values[name] = e.value
+                except Exception, e:
+                    values[name] = CellError.fromException(e)
+
+            dirty.discard(name)
+            count += 1
+
+            for d in dependents.get(name, ()):
+                if d in pending:
+                    pending[d] -= 1
+                    if pending[d] == 0:
+                        ready.append(d)
+
+        if dirty:
+            # set() refuses cycles, so this only happens if the graph was
+            # modified behind the workbook's back
+            raise CycleError, 'circular reference among %s' % (
+                ', '.join(sorted(dirty)))
+
+        self.lastEvaluated = count
+
+        return count
+
+    def _link(self, name, refs):
+
+        old = self._precedents.get(name, frozenset())
+
+        for r in old - refs:
+            users = self._dependents[r]
+            users.discard(name)
+            if not users:
+                del self._dependents[r]
+
+        for r in refs - old:
+            self._dependents.setdefault(r, set()).add(name)
+
+        if refs:
+            self._precedents[name] = refs
+        else:
+            self._precedents.pop(name, None)
+
+    def _checkCycle(self, name, refs):
+
+        if name in refs:
+            raise CycleError, 'circular reference at %s' % name
+
+        if not refs:
+            return
+
+        # a cycle closes when one of the new precedents is downstream of name
+        seen = set([name])
+        stack = [name]
+        dependents = self._dependents
+
+        while stack:
+
+            for d in dependents.get(stack.pop(), ()):
+
+                if d in refs:
+                    raise CycleError, 'circular reference: %s and %s' % (
+                        name, d)
+
+                if d not in seen:
+                    seen.add(d)
+                    stack.append(d)
+
+    def _markDirty(self, name):
+
+        # everything downstream of a dirty cell is already dirty, so the
+        # walk stops there
+        dirty = self._dirty
+        dependents = self._dependents
+        count = 0
+        stack = [name]
+
+        while stack:
+
+            n = stack.pop()
+
+            if n in dirty:
+                continue
+
+            dirty.add(n)
+            count += 1
+
+            stack.extend(dependents.get(n, ()))
+
+        return count
@@ -0,0 +1,142 @@
+"""Unit test for accumulators.py and the streaming EasyMoney aggregates
+"""
+
+import accumulators
+import array
+import cells
+import easymoney
+import math
+import random
+import unittest
+
+emoney = easymoney.EasyMoney()
+
+VALUES = [3, 1.5, 4, 1, 5.5, 9, 2.5, 6]
+
+
+class KnownValues(unittest.TestCase):
+
+    def testGeneratorsMatchLists(self):
+        for f in (emoney.SUM, emoney.COUNT, emoney.AVERAGE, emoney.SUMSQ, emoney.MIN,
+                  emoney.MAX, emoney.fGEOMEAN, emoney.HARMEAN):
+            self.assertAlmostEqual(f(VALUES), f(v for v in VALUES), 12)
+            self.assertAlmostEqual(f(VALUES), f(tuple(VALUES)), 12)
+
+    # values as computed by spreadsheet software
+    def testGEOMEAN(self):
+        self.assertAlmostEqual(5.476986970, emoney.fGEOMEAN(iter([4, 5, 8, 7, 11, 4, 3])), 9)
+
+    def testGEOMEANOfManyItems(self):
+        items = [100.0] * 1000
+        for x in (items, iter(items), array.array('d', items), cells.Range(items)):
+            self.assertAlmostEqual(100.0, emoney.fGEOMEAN(x), 9)
+        if cells.numpy is not None:
+            self.assertAlmostEqual(100.0, emoney.fGEOMEAN(cells.numpy.array(items)), 9)
+
+    def testHARMEAN(self):
+        self.assertAlmostEqual(5.028375962, emoney.HARMEAN(iter([4, 5, 8, 7, 11, 4, 3])), 9)
+
+    def testBadIterators(self):
+        self.assertRaises(easymoney.ZeroDivisionError, emoney.AVERAGE, iter([]))
+        self.assertRaises(easymoney.TypeError, emoney.MAX, iter([1, '2']))
+        self.assertRaises(easymoney.TypeError, emoney.SUMSQ, 7)
+        self.assertRaises(easymoney.NumError, emoney.fGEOMEAN, iter([1, -2]))
+
+    def testSUMSkipsTextInIterators(self):
+        self.assertEqual(7, emoney.SUM(iter([3, 'x', 4])))
+        self.assertEqual(0, emoney.SUM(('x',)))
+        self.assertRaises(easymoney.ZeroDivisionError, emoney.SUM, iter([]))
+        self.assertRaises(easymoney.TypeError, emoney.COUNT, (1, 'x'))
+
+    def testMeansRejectNonPositiveForEveryInput(self):
+        kinds = [list, iter, tuple, lambda v: array.array('d', v)]
+        if accumulators.numpy is not None:
+            kinds.append(accumulators.numpy.array)
+        for values in ([1, -1, 2], [1, 0, 2], [-1, -2]):
+            for kind in kinds:
+                for f in (emoney.fGEOMEAN, emoney.HARMEAN):
+                    self.assertRaises(easymoney.NumError, f, kind(values))
+
+
+class Accuracy(unittest.TestCase):
+
+    def testCompensatedSum(self):
+        values = [1e16, 1.0, -1e16] * 1000
+        self.assertEqual(1000.0, accumulators.Sum(values).value())
+
+    def testIntegersStayExact(self):
+        s = accumulators.Sum(iter([10 ** 20, 1, -10 ** 20]))
+        self.assertEqual(1, s.value())
+        self.assertTrue(isinstance(s.value(), (int, long)))
+        self.assertEqual(14, accumulators.SumSq(array.array('l', [1, 2, 3])).value())
+
+    def testVarianceOfLargeOffset(self):
+        m = accumulators.Moments(1e9 + x for x in [4, 7, 13, 16])
+        self.assertAlmostEqual(30.0, m.variance(), 6)
+        self.assertAlmostEqual(22.5, m.variancep(), 6)
+
+    def testGeoMeanDoesNotOverflow(self):
+        values = [1e300] * 10
+        self.assertEqual(float('inf'), reduce(lambda a, b: a * b, values))
+        self.assertAlmostEqual(1.0, accumulators.GeoMean(values).value() / 1e300, 12)
+
+
+class Streaming(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = accumulators.CHUNK
+        accumulators.CHUNK = 7
+
+    def tearDown(self):
+        accumulators.CHUNK = self.saved
+
+    def testChunksAndMerges(self):
+        rng = random.Random(15)
+        values = [rng.uniform(0.5, 100.0) for i in xrange(500)]
+        n = len(values)
+        mean = sum(values) / n
+        expected = {accumulators.Sum: math.fsum(values),
+                    accumulators.SumSq: math.fsum(x * x for x in values),
+                    accumulators.Moments: mean,
+                    accumulators.Min: min(values),
+                    accumulators.Max: max(values),
+                    accumulators.GeoMean: math.exp(math.fsum(map(math.log, values)) / n),
+                    accumulators.HarMean: n / math.fsum(1.0 / x for x in values)}
+        for cls, want in expected.items():
+            whole = cls(iter(values))
+            merged = cls(values[:123]).merge(cls(array.array('d', values[123:400])))
+            merged.merge(cls().extend(v for v in values[400:]))
+            for acc in (whole, merged):
+                self.assertEqual(n, acc.count)
+                self.assertAlmostEqual(1.0, acc.value() / want, 12)
+
+        parts = [accumulators.Moments(values[i:i + 50]) for i in xrange(0, n, 50)]
+        total = reduce(lambda a, b: a.merge(b), parts, accumulators.Moments())
+        ss = math.fsum((x - mean) ** 2 for x in values)
+        self.assertAlmostEqual(ss / (n - 1), total.variance(), 9)
+        self.assertAlmostEqual(math.sqrt(ss / n), total.stdevp(), 9)
+
+    def testAddAndCopy(self):
+        m = accumulators.Max()
+        for x in (3, 9, 2):
+            m.add(x)
+        c = m.copy().add(11)
+        self.assertEqual(9, m.value())
+        self.assertEqual(11, c.value())
+
+    def testConsume(self):
+        s, lo, hi = accumulators.consume(iter(VALUES), accumulators.Sum(),
+                                         accumulators.Min(), accumulators.Max())
+        self.assertEqual((32.5, 1, 9), (s.value(), lo.value(), hi.value()))
+
+    def testMergeKinds(self):
+        self.assertRaises(easymoney.TypeError, accumulators.Min().merge, accumulators.Max())
+
+    def testEmpty(self):
+        self.assertEqual(0, accumulators.Sum().value())
+        self.assertRaises(easymoney.ZeroDivisionError, accumulators.Moments().value)
+        self.assertRaises(easymoney.ZeroDivisionError, accumulators.Moments([1]).variance)
+
+
+if __name__ == "__main__":
+    unittest.main()
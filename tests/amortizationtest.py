@@ -0,0 +1,77 @@
+"""Unit test for amortization.py and the EasyMoney loan functions
+"""
+
+import amortization
+import easymoney
+import unittest
+
+emoney = easymoney.EasyMoney()
+
+
+class KnownValues(unittest.TestCase):
+
+    # values as computed by spreadsheet software
+    def testPMT(self):
+        self.assertAlmostEqual(-1037.03208935915, emoney.PMT(0.08 / 12, 10, 10000), 8)
+        self.assertAlmostEqual(-1030.16432717797, emoney.PMT(0.08 / 12, 10, 10000, 0, 1), 8)
+        self.assertAlmostEqual(-1000.0, emoney.PMT(0, 10, 10000))
+
+    def testIPMTandPPMT(self):
+        self.assertAlmostEqual(-66.6666666666667, emoney.IPMT(0.1 / 12, 1, 36, 8000), 8)
+        self.assertAlmostEqual(-292.447129909366, emoney.IPMT(0.1, 3, 3, 8000), 8)
+        self.assertAlmostEqual(-75.62, emoney.PPMT(0.1 / 12, 1, 24, 2000), 2)
+        self.assertEqual(0.0, emoney.IPMT(0.1 / 12, 1, 36, 8000, 0, 1))
+
+    def testCUMIPMT(self):
+        self.assertAlmostEqual(-11135.2321307508, emoney.CUMIPMT(0.09 / 12, 360, 125000, 13, 24, 0), 6)
+        self.assertAlmostEqual(-937.5, emoney.CUMIPMT(0.09 / 12, 360, 125000, 1, 1, 0), 8)
+
+    def testCUMPRINC(self):
+        self.assertAlmostEqual(-934.107123420873, emoney.CUMPRINC(0.09 / 12, 360, 125000, 13, 24, 0), 6)
+        self.assertAlmostEqual(-68.2782711809784, emoney.CUMPRINC(0.09 / 12, 360, 125000, 1, 1, 0), 8)
+
+
+class TestSchedule(unittest.TestCase):
+
+    def testScheduleMatchesScalarFunctions(self):
+        for type in (0, 1):
+            s = emoney.AMORTIZE(0.01, 24, 5000, 0, type)
+            self.assertEqual(24, len(s))
+            for per in (1, 2, 12, 24):
+                self.assertAlmostEqual(emoney.IPMT(0.01, per, 24, 5000, 0, type),
+                                       s.interest[per - 1], 8)
+                self.assertAlmostEqual(emoney.PPMT(0.01, per, 24, 5000, 0, type),
+                                       s.principal[per - 1], 8)
+
+    def testScheduleRepaysLoan(self):
+        s = emoney.AMORTIZE(0.005, 360, 200000)
+        self.assertAlmostEqual(0.0, s.balance[-1], 6)
+        self.assertAlmostEqual(-200000.0, sum(s.principal), 6)
+
+    def testBatch(self):
+        s = amortization.amortize([0.01, 0.0, 0.02], [12, 6, 3], 1000)
+        self.assertEqual(21, len(s))
+        self.assertEqual([0, 12, 18, 21], list(s.offsets))
+        rows = s.rows(1)
+        self.assertEqual([1] * 6, list(s.loan[rows]))
+        self.assertEqual(range(1, 7), list(s.period[rows]))
+        self.assertAlmostEqual(emoney.PMT(0.02, 3, 1000), s.pmt[2])
+
+    def testMismatchedLengths(self):
+        self.assertRaises(emoney.NumError, amortization.amortize,
+                          [0.01, 0.02], [12, 6, 3], 1000)
+
+
+class BadInput(unittest.TestCase):
+
+    def testPeriodOutOfRange(self):
+        self.assertRaises(emoney.NumError, emoney.IPMT, 0.01, 0, 12, 1000)
+        self.assertRaises(emoney.NumError, emoney.PPMT, 0.01, 13, 12, 1000)
+
+    def testCumulativeArguments(self):
+        self.assertRaises(emoney.NumError, emoney.CUMIPMT, 0, 12, 1000, 1, 2, 0)
+        self.assertRaises(emoney.NumError, emoney.CUMPRINC, 0.01, 12, 1000, 3, 2, 0)
+        self.assertRaises(emoney.NumError, emoney.CUMPRINC, 0.01, 12, 1000, 1, 2, 2)
+
+if __name__ == "__main__":
+    unittest.main()
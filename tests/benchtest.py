@@ -0,0 +1,52 @@
+"""Unit test for benchmarks/bench.py
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, 'benchmarks'))
+
+import bench
+
+
+class Compare(unittest.TestCase):
+
+    baseline = {'SUM/list/10': {'seconds': 1.0, 'throughput': 10.0},
+                'MIN/list/10': {'seconds': 1.0, 'throughput': 10.0}}
+
+    def testThreshold(self):
+        results = {'SUM/list/10': {'seconds': 1.25, 'throughput': 8.0},
+                   'MIN/list/10': {'seconds': 2.0, 'throughput': 5.0},
+                   'MAX/list/10': {'seconds': 9.0, 'throughput': 1.0}}
+        regressions = bench.compare(results, self.baseline, 0.25)
+        self.assertEqual(['MIN/list/10'], [r[0] for r in regressions])
+        self.assertEqual(-0.5, regressions[0][3])
+        self.assertEqual([], bench.compare(results, self.baseline, 0.6))
+
+
+class Run(unittest.TestCase):
+
+    def testKindsAndSizes(self):
+        cases = bench.select(['sum', 'MEDIAN', 'ROLLING*'])
+        self.assertEqual(['SUM', 'MEDIAN', 'ROLLING AVERAGE', 'ROLLING MEDIAN'],
+                         [c.name for c in cases])
+        results = bench.run(cases[:1], [10, 20], ['list', 'generator'], 0.001)
+        # SUM takes no generators
+        self.assertEqual(['SUM/list/10', 'SUM/list/20'], sorted(results))
+        self.assertTrue(results['SUM/list/20']['throughput'] > 0)
+
+    def testEveryMethodHasACase(self):
+        self.assertEqual([], bench.uncovered())
+
+    def testEveryCaseRuns(self):
+        for case in bench.CASES:
+            for kind in case.kinds:
+                f = case.runs(10, kind)
+                if f is not None:
+                    f()
+
+
+if __name__ == "__main__":
+    unittest.main()
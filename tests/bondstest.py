@@ -0,0 +1,140 @@
+"""Unit test for bonds.py and the EasyMoney bond functions
+"""
+
+import bonds
+import easymoney
+import unittest
+
+emoney = easymoney.EasyMoney()
+D = emoney.fDATE
+
+
+class KnownValues(unittest.TestCase):
+
+    # values as computed by spreadsheet software
+    def testCOUP(self):
+        settlement, maturity = D(2011, 1, 25), D(2011, 11, 15)
+        self.assertEqual(71, emoney.COUPDAYBS(settlement, maturity, 2, 1))
+        self.assertEqual(181, emoney.COUPDAYS(settlement, maturity, 2, 1))
+        self.assertEqual(110, emoney.COUPDAYSNC(settlement, maturity, 2, 1))
+        self.assertEqual(D(2011, 5, 15), emoney.COUPNCD(settlement, maturity, 2, 1))
+        self.assertEqual(D(2010, 11, 15), emoney.COUPPCD(settlement, maturity, 2, 1))
+        self.assertEqual(4, emoney.COUPNUM(D(2007, 1, 25), D(2008, 11, 15), 2, 1))
+
+    def testCOUPBasis0(self):
+        settlement, maturity = D(2011, 1, 25), D(2011, 11, 15)
+        self.assertEqual(70, emoney.COUPDAYBS(settlement, maturity, 2))
+        self.assertEqual(180, emoney.COUPDAYS(settlement, maturity, 2))
+        self.assertEqual(110, emoney.COUPDAYSNC(settlement, maturity, 2))
+
+    def testEndOfMonthMaturity(self):
+        settlement, maturity = D(2011, 3, 1), D(2011, 8, 31)
+        self.assertEqual(D(2011, 2, 28), emoney.COUPPCD(settlement, maturity, 2))
+        self.assertEqual(D(2011, 5, 31), emoney.COUPNCD(settlement, maturity, 4))
+        self.assertEqual(D(2011, 5, 31), emoney.COUPNCD(settlement, D(2011, 11, 30), 4))
+
+    def testPRICE(self):
+        self.assertAlmostEqual(94.63436, emoney.PRICE(D(2008, 2, 15), D(2017, 11, 15),
+                                                      0.0575, 0.065, 100, 2, 0), 5)
+
+    def testYIELD(self):
+        self.assertAlmostEqual(0.065, emoney.YIELD(D(2008, 2, 15), D(2016, 11, 15),
+                                                   0.0575, 95.04287, 100, 2, 0), 7)
+
+    def testDURATION(self):
+        self.assertAlmostEqual(10.9191453, emoney.DURATION(D(2018, 7, 1), D(2048, 1, 1),
+                                                           0.08, 0.09, 2, 1), 7)
+
+    def testMDURATION(self):
+        self.assertAlmostEqual(5.73567, emoney.MDURATION(D(2008, 1, 1), D(2016, 1, 1),
+                                                         0.08, 0.09, 2, 1), 5)
+
+    def testLastCouponPeriod(self):
+        settlement, maturity = D(2011, 1, 25), D(2011, 5, 15)
+        pr = emoney.PRICE(settlement, maturity, 0.05, 0.04, 100, 2)
+        self.assertAlmostEqual(0.04, emoney.YIELD(settlement, maturity, 0.05, pr, 100, 2), 10)
+
+
+class RoundTrips(unittest.TestCase):
+
+    def testYieldInvertsPrice(self):
+        for basis in range(5):
+            for frequency in (1, 2, 4):
+                pr = emoney.PRICE(D(2010, 3, 31), D(2025, 8, 31), 0.04, 0.07, 105, frequency, basis)
+                self.assertAlmostEqual(0.07, emoney.YIELD(D(2010, 3, 31), D(2025, 8, 31),
+                                                          0.04, pr, 105, frequency, basis), 9)
+
+    def testParBond(self):
+        self.assertAlmostEqual(100.0, emoney.PRICE(D(2010, 5, 15), D(2020, 5, 15),
+                                                   0.06, 0.06, 100, 2), 9)
+
+
+class BadValues(unittest.TestCase):
+
+    def testSettlementAfterMaturity(self):
+        self.assertRaises(easymoney.NumError, emoney.COUPNUM, D(2012, 1, 1), D(2011, 1, 1), 2)
+
+    def testBadFrequencyAndBasis(self):
+        self.assertRaises(easymoney.NumError, emoney.COUPDAYS, D(2011, 1, 1), D(2012, 1, 1), 3)
+        self.assertRaises(easymoney.NumError, emoney.COUPDAYS, D(2011, 1, 1), D(2012, 1, 1), 2, 5)
+
+    def testNegativeValues(self):
+        self.assertRaises(easymoney.NumError, emoney.PRICE, D(2011, 1, 1), D(2020, 1, 1),
+                          -0.01, 0.05, 100, 2)
+        self.assertRaises(easymoney.NumError, emoney.YIELD, D(2011, 1, 1), D(2020, 1, 1),
+                          0.05, 0, 100, 2)
+
+
+class Cache(unittest.TestCase):
+
+    def testScheduleIsReused(self):
+        cache = bonds.ScheduleCache(2)
+        a = cache.get(D(2011, 1, 25), D(2020, 11, 15))
+        self.assertTrue(a is cache.get(D(2011, 1, 25), D(2020, 11, 15)))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def testLeastRecentlyUsedIsEvicted(self):
+        cache = bonds.ScheduleCache(2)
+        a = cache.get(D(2011, 1, 25), D(2020, 11, 15))
+        cache.get(D(2011, 1, 26), D(2020, 11, 15))
+        cache.get(D(2011, 1, 25), D(2020, 11, 15))
+        cache.get(D(2011, 1, 27), D(2020, 11, 15))
+        self.assertEqual(2, len(cache))
+        self.assertTrue(a is cache.get(D(2011, 1, 25), D(2020, 11, 15)))
+        self.assertEqual(2, cache.hits)
+
+
+class Books(unittest.TestCase):
+
+    settlements = [D(2008, 2, 15), D(2011, 1, 25), D(2010, 3, 31), D(2011, 1, 25)]
+    maturities = [D(2017, 11, 15), D(2011, 5, 15), D(2025, 8, 31), D(2030, 2, 28)]
+    rates = [0.0575, 0.05, 0.04, 0.0]
+
+    def testPrices(self):
+        for basis in range(5):
+            expected = [emoney.PRICE(s, m, c, 0.06, 100, 2, basis) for s, m, c in
+                        zip(self.settlements, self.maturities, self.rates)]
+            for got, want in zip(emoney.PRICE(self.settlements, self.maturities,
+                                              self.rates, 0.06, 100, 2, basis), expected):
+                self.assertAlmostEqual(want, got, 9)
+
+    def testYields(self):
+        prs = emoney.PRICE(self.settlements, self.maturities, self.rates, 0.06, 100, 2)
+        for got in emoney.YIELD(self.settlements, self.maturities, self.rates, prs, 100, 2):
+            self.assertAlmostEqual(0.06, got, 9)
+
+    def testDurations(self):
+        for fn in (emoney.DURATION, emoney.MDURATION):
+            expected = [fn(s, m, c, 0.06, 4, 1) for s, m, c in
+                        zip(self.settlements, self.maturities, self.rates)]
+            for got, want in zip(fn(self.settlements, self.maturities,
+                                    self.rates, 0.06, 4, 1), expected):
+                self.assertAlmostEqual(want, got, 9)
+
+    def testMismatchedColumns(self):
+        self.assertRaises(easymoney.NumError, emoney.PRICE, self.settlements,
+                          self.maturities[:2], 0.05, 0.06, 100, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
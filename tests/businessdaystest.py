@@ -0,0 +1,129 @@
+"""Unit test for businessdays.py and the EasyMoney NETWORKDAYS/WORKDAY functions
+"""
+
+import businessdays
+import easymoney
+import formula
+import random
+import unittest
+
+emoney = easymoney.EasyMoney()
+D = emoney.fDATE
+
+HOLIDAYS = [D(2008, 11, 26), D(2008, 12, 4), D(2009, 1, 21)]
+
+
+def bruteNetworkDays(cal, start, end):
+    lo, hi = min(start, end), max(start, end)
+    n = len([s for s in xrange(lo, hi + 1) if cal.isWorkday(s)])
+    return -n if start > end else n
+
+
+def bruteWorkday(cal, start, days):
+    step = 1 if days > 0 else -1
+    s = start
+    while days:
+        s += step
+        if cal.isWorkday(s):
+            days -= step
+    return s
+
+
+class KnownValues(unittest.TestCase):
+
+    # values as computed by spreadsheet software
+    def testNETWORKDAYS(self):
+        self.assertEqual(108, emoney.fNETWORKDAYS(D(2008, 10, 1), D(2009, 3, 1)))
+        self.assertEqual(105, emoney.fNETWORKDAYS(D(2008, 10, 1), D(2009, 3, 1), HOLIDAYS))
+
+    def testNETWORKDAYS_INTL(self):
+        self.assertEqual(22, emoney.fNETWORKDAYS_INTL(D(2006, 1, 1), D(2006, 1, 31)))
+        self.assertEqual(-21, emoney.fNETWORKDAYS_INTL(D(2006, 2, 28), D(2006, 1, 31)))
+        self.assertEqual(22, emoney.fNETWORKDAYS_INTL(D(2006, 1, 1), D(2006, 2, 1), 7,
+                                                      [D(2006, 1, 2), D(2006, 1, 16)]))
+        self.assertEqual(20, emoney.fNETWORKDAYS_INTL(D(2006, 1, 1), D(2006, 2, 1), '0010001',
+                                                      [D(2006, 1, 2), D(2006, 1, 16)]))
+
+    def testWORKDAY(self):
+        self.assertEqual(D(2009, 4, 30), emoney.fWORKDAY(D(2008, 10, 1), 151))
+        self.assertEqual(D(2009, 5, 5), emoney.fWORKDAY(D(2008, 10, 1), 151, HOLIDAYS))
+
+    def testWORKDAY_INTL(self):
+        self.assertEqual(41013, emoney.fWORKDAY_INTL(D(2012, 1, 1), 90, 11))
+        self.assertEqual(D(2012, 2, 5), emoney.fWORKDAY_INTL(D(2012, 1, 1), 30, 17))
+
+    def testWORKDAYZeroDays(self):
+        self.assertEqual(D(2012, 1, 1), emoney.fWORKDAY(D(2012, 1, 1), 0))
+
+    def testBadWeekend(self):
+        self.assertRaises(easymoney.NumError, emoney.fWORKDAY_INTL, D(2012, 1, 1), 30, 0)
+        self.assertRaises(easymoney.NumError, emoney.fNETWORKDAYS_INTL,
+                          D(2012, 1, 1), D(2012, 2, 1), '1111111')
+        self.assertRaises(easymoney.NumError, businessdays.weekendMask, '00x0011')
+
+
+class HolidayCalendar(unittest.TestCase):
+
+    def testHolidaysOnWeekendsAreDropped(self):
+        cal = businessdays.HolidayCalendar([D(2012, 1, 7), D(2012, 1, 9), D(2012, 1, 9)])
+        self.assertEqual([D(2012, 1, 9)], cal.holidays.tolist())
+
+    def testCalendarIsReused(self):
+        self.assertTrue(businessdays.calendar(HOLIDAYS) is businessdays.calendar(HOLIDAYS))
+        cal = businessdays.HolidayCalendar(HOLIDAYS)
+        self.assertTrue(businessdays.calendar(cal) is cal)
+
+    def testCalendarFollowsWeekendAndDateSystem(self):
+        holidays = [D(2006, 1, 2), D(2006, 1, 7), D(2006, 1, 16)]
+        cal = businessdays.HolidayCalendar(holidays)
+        start, end = D(2006, 1, 1), D(2006, 1, 31)
+        self.assertEqual(emoney.fNETWORKDAYS_INTL(start, end, 11, holidays),
+                         emoney.fNETWORKDAYS_INTL(start, end, 11, cal))
+        self.assertEqual(23, emoney.fNETWORKDAYS_INTL(start, end, 11, cal))
+        self.assertTrue(businessdays.calendar(cal, '0000011') is cal)
+        self.assertTrue(businessdays.calendar(cal, 1, True).date1904)
+
+    def testAgainstDayByDay(self):
+        rng = random.Random(9)
+        for weekend in (1, 3, 11, '0101010'):
+            holidays = [rng.randint(39000, 39400) for i in xrange(60)]
+            cal = businessdays.HolidayCalendar(holidays, weekend)
+            for i in xrange(200):
+                start = rng.randint(38950, 39450)
+                end = rng.randint(38950, 39450)
+                days = rng.randint(-120, 120)
+                self.assertEqual(bruteNetworkDays(cal, start, end),
+                                 cal.networkDays(start, end))
+                self.assertEqual(bruteWorkday(cal, start, days),
+                                 cal.workday(start, days))
+
+    def testColumns(self):
+        rng = random.Random(10)
+        cal = businessdays.HolidayCalendar([rng.randint(40000, 40500) for i in xrange(50)])
+        starts = [rng.randint(39900, 40600) for i in xrange(300)]
+        ends = [rng.randint(39900, 40600) for i in xrange(300)]
+        days = [rng.randint(-200, 200) for i in xrange(300)]
+        self.assertEqual([cal.networkDays(s, e) for s, e in zip(starts, ends)],
+                         list(emoney.fNETWORKDAYS(starts, ends, cal)))
+        self.assertEqual([cal.workday(s, n) for s, n in zip(starts, days)],
+                         list(emoney.fWORKDAY(starts, days, cal)))
+        self.assertEqual([cal.workday(s, 5) for s in starts],
+                         list(cal.workdayColumn(starts, 5)))
+
+    def testEmptyColumns(self):
+        self.assertEqual([], list(emoney.fNETWORKDAYS([], [])))
+        self.assertEqual([], list(emoney.fWORKDAY([], [])))
+
+
+class Formulas(unittest.TestCase):
+
+    def testINTLName(self):
+        engine = formula.FormulaEngine(emoney)
+        sheet = {'A1': {'value': D(2006, 1, 1), 'type': 'number'},
+                 'A2': {'value': D(2006, 1, 31), 'type': 'number'},
+                 'B1': {'value': '=NETWORKDAYS.INTL(A1, A2, 1)', 'type': 'number'}}
+        self.assertEqual(22, engine.evaluate(sheet, 'B1'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""Unit test for cells.py and the aggregates on ranges
+"""
+
+import array
+import cells
+import easymoney
+import unittest
+
+emoney = easymoney.EasyMoney()
+
+
+class Cells(unittest.TestCase):
+
+    def testCell(self):
+        cell = cells.Cell(1.5, 'number', 'rate')
+        self.assertEqual({'value': 1.5, 'type': 'number', 'label': 'rate'}, cell.toDict())
+        self.assertEqual(cell, cells.Cell.fromDict(cell.toDict()))
+        self.assertEqual({'value': None}, cells.Cell().toDict())
+        self.assertRaises(AttributeError, setattr, cell, 'note', 'x')
+
+
+class Ranges(unittest.TestCase):
+
+    def testHomogeneous(self):
+        r = cells.Range([1.5, 2.5, 3.0], 'number')
+        self.assertEqual(('d', [0, 0, 0]), (r.values.typecode, list(r.tags)))
+        r = cells.Range([1, 2, 2 ** 62])
+        self.assertEqual([1, 2, 2 ** 62], list(r))
+        self.assertEqual(8, r.values.itemsize)
+
+    def testMixedValues(self):
+        values = [1, 2.5, True, None, 'text', '=A1', 2 ** 70, 3]
+        r = cells.Range(values)
+        self.assertEqual(values, list(r))
+        self.assertEqual([type(v) for v in values], [type(v) for v in r])
+        # 2 ** 70 is still a number, kept in a list
+        self.assertEqual([1, 0, 2, 3, 4, 4, 1, 1], list(r.tags))
+        self.assertFalse(r.isNumeric())
+        self.assertEqual([1, 2.5, 2 ** 70, 3], list(r.numbers()))
+        self.assertEqual([1, 2.5, 0, 0, 0, 0, 2 ** 70, 3], list(r.numbers(True)))
+
+    def testChanges(self):
+        r = cells.Range([1, 2 ** 60 + 1, 3])
+        r.append(0.5)
+        # 2 ** 60 + 1 has no exact float
+        self.assertEqual([1, 2 ** 60 + 1, 3, 0.5], list(r))
+        r[1] = 'x'
+        r[1] = 4
+        self.assertTrue(r.isNumeric())
+        self.assertEqual([1, 4, 3, 0.5], list(r))
+        self.assertEqual(cells.Range([3, 0.5]), r[-2:])
+        self.assertEqual(cells.Cell(0.5, None, None), r.cell(-1))
+
+    def testFromCells(self):
+        sheet = {'A1': {'value': 1, 'type': 'number'}, 'A3': cells.Cell(2.5)}
+        self.assertEqual([1, None, 2.5], list(cells.Range.fromCells(sheet, ['A1', 'A2', 'A3'])))
+
+    def testColumns(self):
+        self.assertEqual([1.0, 2.0], list(cells.Range(array.array('d', [1, 2]))))
+        if cells.numpy is not None:
+            self.assertEqual([1, 2], list(cells.Range(cells.numpy.array([1, 2]))))
+            flags = cells.Range(cells.numpy.array([True, False]))
+            self.assertEqual([True, False], list(flags))
+            self.assertFalse(flags.isNumeric())
+
+
+class Aggregates(unittest.TestCase):
+
+    def testSameResultsAsLists(self):
+        for values in ([3, 1, 4, 1, 5], [3.5, 1.0, 4.0, 1.5], [2, 2.5, 8]):
+            r = cells.Range(values)
+            self.assertTrue(easymoney.coercion.column(r) is r.values)
+            for name in ('SUM', 'AVERAGE', 'MIN', 'MAX', 'COUNT', 'SUMSQ', 'fGEOMEAN',
+                         'HARMEAN', 'MEDIAN', 'AVERAGEA', 'MINA', 'MAXA', 'COUNTA'):
+                self.assertAlmostEqual(getattr(emoney, name)(values), getattr(emoney, name)(r))
+
+    def testIntsTooBigForTheArray(self):
+        cases = [([2 ** 70, 1], ('SUM', 'MIN', 'MAX', 'SUMSQ', 'AVERAGE', 'MAXA')),
+                 ([1, 2 ** 60 + 1, 0.5], ('SUM', 'MIN', 'MAX', 'SUMSQ', 'AVERAGE', 'MAXA')),
+                 ([3, 'x', -2 ** 64, None], ('SUM', 'AVERAGEA', 'MINA', 'MAXA', 'COUNTA'))]
+        for values, names in cases:
+            r = cells.Range(values)
+            self.assertEqual(values, list(r))
+            for name in names:
+                self.assertEqual(getattr(emoney, name)(values), getattr(emoney, name)(r))
+        r = cells.Range([1, 2])
+        r[0] = 10 ** 30
+        self.assertEqual(10 ** 30 + 2, emoney.SUM(r))
+
+    def testPolicies(self):
+        items = [4, 'x', None, 2.0, True]
+        r = cells.Range(items)
+        self.assertEqual(emoney.SUM(items), emoney.SUM(r))
+        self.assertEqual(emoney.AVERAGEA(items), emoney.AVERAGEA(r))
+        self.assertEqual(emoney.MINA(items), emoney.MINA(r))
+        self.assertRaises(easymoney.TypeError, emoney.AVERAGE, r)
+        self.assertRaises(easymoney.ZeroDivisionError, emoney.AVERAGE, cells.Range())
+
+
+if __name__ == "__main__":
+    unittest.main()
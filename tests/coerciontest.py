@@ -0,0 +1,103 @@
+"""Unit test for coercion.py and the EasyMoney aggregates built on it
+"""
+
+import array
+import coercion
+import easymoney
+import unittest
+
+emoney = easymoney.EasyMoney()
+
+
+class Classification(unittest.TestCase):
+
+    def testKinds(self):
+        self.assertEqual(coercion.INT, coercion.numbers([1, 2L, 3]).kind)
+        self.assertEqual(coercion.FLOAT, coercion.numbers([1.0, 2.5]).kind)
+        self.assertEqual(coercion.MIXED, coercion.numbers([1, 2.5]).kind)
+        self.assertEqual(coercion.COLUMN, coercion.numbers(array.array('d', [1.0])).kind)
+
+    def testPolicies(self):
+        items = [3, 'x', 4.5, None, True]
+        self.assertRaises(easymoney.TypeError, coercion.numbers, items)
+        skipped = coercion.numbers(items, coercion.SKIP)
+        self.assertEqual(([3, 4.5], coercion.MIXED), (skipped.values, skipped.kind))
+        zeroed = coercion.numbers(items, coercion.ZERO)
+        self.assertEqual([3, 0, 4.5, 0, 0], zeroed.values)
+
+    def testListIsUsedAsIs(self):
+        items = [1, 2, 3]
+        self.assertTrue(coercion.numbers(items).values is items)
+
+    def testBadArguments(self):
+        self.assertRaises(easymoney.TypeError, coercion.numbers, '123')
+        self.assertRaises(easymoney.TypeError, coercion.numbers, (1, 2))
+        self.assertRaises(easymoney.ZeroDivisionError, coercion.numbers, [])
+
+    def testBooleanColumns(self):
+        if coercion.numpy is not None:
+            flags = coercion.numpy.array([True, False])
+            for f in (emoney.AVERAGE, emoney.SUM, emoney.MEDIAN, emoney.SUMSQ):
+                self.assertRaises(easymoney.TypeError, f, flags)
+        self.assertRaises(easymoney.TypeError, emoney.AVERAGE, [True, False])
+
+
+class AVariants(unittest.TestCase):
+
+    def testCallerListIsNotChanged(self):
+        items = [5, 'text', -2, None]
+        saved = list(items)
+        self.assertEqual(5, emoney.MAXA(items))
+        self.assertEqual(-2, emoney.MINA(items))
+        self.assertEqual(0.75, emoney.AVERAGEA(items))
+        self.assertEqual(saved, items)
+
+    def testNonNumericCountsAsZero(self):
+        self.assertEqual(0, emoney.MAXA([-5, 'text', -2]))
+        self.assertEqual(0, emoney.MINA([5, 'text', 2]))
+
+    def testCOUNTA(self):
+        self.assertEqual(4, emoney.COUNTA([1, 'a', None, 2.0]))
+
+
+class Aggregates(unittest.TestCase):
+
+    def testSameResultsForEveryKind(self):
+        for items in ([3, 1, 4, 1, 5], [3.0, 1.0, 4.0, 1.0, 5.0], [3, 1.0, 4, 1.0, 5]):
+            self.assertEqual(14, emoney.SUM(items))
+            self.assertEqual(2.8, emoney.AVERAGE(items))
+            self.assertEqual(52, emoney.SUMSQ(items))
+            self.assertEqual((1, 5), (emoney.MIN(items), emoney.MAX(items)))
+            self.assertEqual(5, emoney.COUNT(items))
+
+    def testIntegersStayExact(self):
+        big = [10 ** 20, 1]
+        self.assertEqual(10 ** 20 + 1, emoney.SUM(big))
+        self.assertEqual(10 ** 40 + 1, emoney.SUMSQ(big))
+
+    def testSUMSQDoesNotOverflowIntegerColumns(self):
+        self.assertEqual(2 * 50000 ** 2, emoney.SUMSQ(array.array('i', [50000, 50000])))
+        if coercion.numpy is not None:
+            np = coercion.numpy
+            self.assertEqual(2 * 50000 ** 2, emoney.SUMSQ(np.array([50000, 50000], np.int32)))
+            self.assertEqual(2 * 3000000000 ** 2,
+                             emoney.SUMSQ(np.array([3000000000, 3000000000], np.int64)))
+            self.assertEqual(1 + 2 ** 80, emoney.SUMSQ(np.array([1, 2 ** 40], np.int64)))
+            self.assertEqual(14, emoney.SUMSQ(np.array([1, 2, 3], np.uint8)))
+
+    def testSUMDoesNotOverflowIntegerColumns(self):
+        if coercion.numpy is not None:
+            np = coercion.numpy
+            big = np.array([2 ** 62] * 3)
+            self.assertEqual(3 * 2 ** 62, emoney.SUM(big))
+            self.assertEqual(2 ** 62, emoney.AVERAGE(big))
+            self.assertEqual(3 * 255, emoney.SUM(np.array([255] * 3, np.uint8)))
+            self.assertEqual(2 ** 64 - 2, emoney.SUM(np.array([2 ** 63 - 1] * 2, np.uint64)))
+
+    def testSUMSkipsText(self):
+        self.assertEqual(7, emoney.SUM([3, 'x', 4]))
+        self.assertEqual(0, emoney.SUM(['x']))
+
+
+if __name__ == "__main__":
+    unittest.main()
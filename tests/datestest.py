@@ -0,0 +1,74 @@
+"""Unit test for dates.py
+"""
+
+import dates
+import datetime
+import unittest
+
+
+class TestTables(unittest.TestCase):
+
+    def testEveryDayOfTheTables(self):
+        """serials should round-trip and agree with datetime"""
+        start = datetime.date(1900, 3, 1).toordinal()
+        end = datetime.date(dates.LAST_YEAR, 12, 31).toordinal()
+        zero = datetime.date(1899, 12, 30).toordinal()
+        for o in xrange(start, end + 1):
+            d = datetime.date.fromordinal(o)
+            s = dates.serial(d.year, d.month, d.day)
+            self.assertEqual(o - zero, s)
+            self.assertEqual((d.year, d.month, d.day), dates.fromSerial(s))
+
+    def testOutsideTheTables(self):
+        s = dates.serial(2500, 6, 15)
+        self.assertEqual((2500, 6, 15), dates.fromSerial(s))
+        self.assertEqual(datetime.date(2500, 6, 15), dates.toDate(s))
+
+
+class TestEpochs(unittest.TestCase):
+
+    def testPhantomLeapDay(self):
+        self.assertEqual(59, dates.serial(1900, 2, 28))
+        self.assertEqual((1900, 2, 29), dates.fromSerial(60))
+        self.assertEqual((1900, 3, 1), dates.fromSerial(61))
+        self.assertEqual(60, dates.serial(1900, 2, 29))
+        self.assertEqual(61, dates.serial(1900, 3, 1))
+        self.assertEqual(60, dates.serial(1900, 1, 60))
+        self.assertEqual([1, 60, 61], list(dates.serials([1900] * 3, [1, 2, 3], [1, 29, 1])))
+
+    def testPhantomWeekdays(self):
+        """serials before 61 take the weekdays spreadsheets give them"""
+        self.assertEqual(6, dates.weekday(1))
+        self.assertEqual(2, dates.weekday(60))
+        self.assertEqual(3, dates.weekday(61))
+        self.assertEqual(datetime.date(1900, 3, 1).weekday(), dates.weekday(61))
+        self.assertEqual(5, dates.weekday(0))
+
+    def test1904(self):
+        self.assertEqual(0, dates.serial(1904, 1, 1, True))
+        self.assertEqual(dates.serial(2008, 1, 1) - 1462,
+                         dates.serial(2008, 1, 1, True))
+        self.assertEqual((2008, 1, 1), dates.fromSerial(37986, True))
+        self.assertRaises(ValueError, dates.serial, 1903, 12, 31, True)
+
+
+class TestColumns(unittest.TestCase):
+
+    def testColumnsMatchScalars(self):
+        ymd = [(1900, 1, 1), (1900, 2, 28), (1900, 3, 1), (2000, 2, 29),
+               (2199, 12, 31), (2024, 7, 4)]
+        years, months, days = zip(*ymd)
+        for epoch in (False, True):
+            if epoch:
+                ymd, years, months, days = ymd[3:], years[3:], months[3:], days[3:]
+            column = dates.serials(years, months, days, epoch)
+            self.assertEqual([dates.serial(y, m, d, epoch) for y, m, d in ymd],
+                             list(column))
+            back = dates.fromSerials(column, epoch)
+            self.assertEqual(ymd, zip(*[list(c) for c in back]))
+
+    def testColumnOutOfRange(self):
+        self.assertRaises(ValueError, dates.serials, [1899], [1], [1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Unit test for daycount.py and the EasyMoney DAYS360/YEARFRAC functions
+"""
+
+import array
+import daycount
+import easymoney
+import unittest
+
+emoney = easymoney.EasyMoney()
+D = emoney.fDATE
+
+
+class KnownValues(unittest.TestCase):
+
+    # values as computed by spreadsheet software
+    def testDAYS360(self):
+        self.assertEqual(330, emoney.fDAYS360(D(2011, 1, 30), D(2011, 12, 31)))
+        self.assertEqual(360, emoney.fDAYS360(D(2011, 1, 1), D(2011, 12, 31)))
+        self.assertEqual(-330, emoney.fDAYS360(D(2011, 12, 31), D(2011, 1, 30)))
+
+    def testDAYS360EndOfFebruary(self):
+        self.assertEqual(30, emoney.fDAYS360(D(2008, 2, 29), D(2008, 3, 31)))
+        self.assertEqual(31, emoney.fDAYS360(D(2008, 2, 29), D(2008, 3, 31), True))
+
+    def testYEARFRAC(self):
+        start, end = D(2012, 1, 1), D(2012, 7, 30)
+        self.assertAlmostEqual(0.580555556, emoney.fYEARFRAC(start, end), 8)
+        self.assertAlmostEqual(0.576502732, emoney.fYEARFRAC(start, end, 1), 8)
+        self.assertAlmostEqual(0.586111111, emoney.fYEARFRAC(start, end, 2), 8)
+        self.assertAlmostEqual(0.578082192, emoney.fYEARFRAC(start, end, 3), 8)
+        self.assertAlmostEqual(0.580555556, emoney.fYEARFRAC(start, end, 4), 8)
+        self.assertAlmostEqual(emoney.fYEARFRAC(start, end, 1),
+                               emoney.fYEARFRAC(end, start, 1))
+
+    def testYEARFRACBasis0EndOfFebruary(self):
+        self.assertAlmostEqual(31 / 360.0, emoney.fYEARFRAC(D(2007, 2, 28), D(2007, 3, 31)))
+        self.assertAlmostEqual(1.0, emoney.fYEARFRAC(D(2007, 2, 28), D(2008, 2, 29)))
+
+    def testYEARFRACActualOverYears(self):
+        self.assertAlmostEqual(911 / (1096 / 3.0),
+                               emoney.fYEARFRAC(D(2000, 1, 1), D(2002, 6, 30), 1))
+        self.assertAlmostEqual(366 / 366.0,
+                               emoney.fYEARFRAC(D(2008, 1, 1), D(2009, 1, 1), 1))
+
+    def testBadBasis(self):
+        self.assertRaises(emoney.NumError, emoney.fYEARFRAC, 1, 2, 5)
+
+
+class TestColumns(unittest.TestCase):
+
+    starts = [D(2007, 2, 28), D(2008, 2, 29), D(2011, 1, 30), D(2012, 1, 1),
+              D(2000, 1, 1), D(2010, 5, 31), D(2012, 7, 30)]
+    ends = [D(2007, 3, 31), D(2008, 3, 31), D(2011, 12, 31), D(2012, 7, 30),
+            D(2002, 6, 30), D(2011, 2, 28), D(2012, 1, 1)]
+
+    def testDAYS360Column(self):
+        for method in (False, True):
+            column = emoney.fDAYS360(self.starts, self.ends, method)
+            expected = [emoney.fDAYS360(s, e, method)
+                        for s, e in zip(self.starts, self.ends)]
+            self.assertEqual(expected, list(column))
+
+    def testYEARFRACColumn(self):
+        for basis in daycount.BASES:
+            column = emoney.fYEARFRAC(array.array('l', self.starts),
+                                      array.array('l', self.ends), basis)
+            for s, e, value in zip(self.starts, self.ends, column):
+                self.assertAlmostEqual(emoney.fYEARFRAC(s, e, basis), value, 12)
+
+if __name__ == "__main__":
+    unittest.main()
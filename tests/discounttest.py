@@ -0,0 +1,84 @@
+"""Unit test for discount.py and the EasyMoney present value functions
+"""
+
+import datetime
+import discount
+import easymoney
+import unittest
+
+emoney = easymoney.EasyMoney()
+
+
+class KnownValues(unittest.TestCase):
+
+    # values as computed by spreadsheet software
+    def testNPV(self):
+        self.assertAlmostEqual(1188.44341233522,
+                               emoney.NPV(0.1, [-10000, 3000, 4200, 6800]), 8)
+
+    def testXNPV(self):
+        values = [-10000, 2750, 4250, 3250, 2750]
+        dates = [datetime.date(2008, 1, 1), datetime.date(2008, 3, 1),
+                 datetime.date(2008, 10, 30), datetime.date(2009, 2, 15),
+                 datetime.date(2009, 4, 1)]
+        self.assertAlmostEqual(2086.64760203, emoney.XNPV(0.09, values, dates), 6)
+
+    def testPVandFV(self):
+        self.assertAlmostEqual(-59777.1458511595, emoney.PV(0.08 / 12, 240, 500), 6)
+        self.assertAlmostEqual(2581.40337406012, emoney.FV(0.06 / 12, 10, -200, -500, 1), 6)
+        self.assertAlmostEqual(-1000.0, emoney.FV(0, 10, 100))
+
+    def testFVSCHEDULE(self):
+        self.assertAlmostEqual(1.33089, emoney.FVSCHEDULE(1, [0.09, 0.11, 0.1]), 10)
+
+    def testCompound(self):
+        self.assertAlmostEqual(121.0, emoney.fvCompound(100, 10, 2))
+        self.assertAlmostEqual(100.0, emoney.pvCompound(121, 10, 2))
+
+
+class TestGrid(unittest.TestCase):
+
+    flows = [-100, 30, 40, 50, 60]
+
+    def testRatesMatchScalar(self):
+        rates = [0.0, 0.05, 0.1, 0.2]
+        grid = emoney.NPV(rates, self.flows)
+        for r, value in zip(rates, grid):
+            self.assertAlmostEqual(emoney.NPV(r, self.flows), value, 10)
+
+    def testPeriodsMatchExplicitTimes(self):
+        a = discount.DiscountGrid([0.03, 0.07], 5).npv(self.flows)
+        b = discount.DiscountGrid([0.03, 0.07], [1, 2, 3, 4, 5]).npv(self.flows)
+        for x, y in zip(a, b):
+            self.assertAlmostEqual(x, y, 10)
+
+    def testMatrix(self):
+        grid = discount.DiscountGrid([0.05, 0.1], 5)
+        m = grid.npvMatrix([self.flows, [1, 1, 1, 1, 1]])
+        self.assertAlmostEqual(grid.npv(self.flows)[1], m[1][0], 10)
+        self.assertAlmostEqual(emoney.NPV(0.05, [1] * 5), m[0][1], 10)
+
+    def testVectorPVandFV(self):
+        values = emoney.PV([0.01, 0.02], 12, -100)
+        self.assertAlmostEqual(emoney.PV(0.02, 12, -100), values[1])
+        values = emoney.FV([0.0, 0.06 / 12], 10, -200, -500, 1)
+        self.assertAlmostEqual(2500.0, values[0])
+        self.assertAlmostEqual(2581.40337406012, values[1], 6)
+
+    def testResultTypes(self):
+        for value in (emoney.NPV(0.1, self.flows), emoney.PV(0.1, 5, 1), emoney.FV(0.1, 5, 1)):
+            self.assertTrue(type(value) is float)
+        for values in (emoney.NPV([0.1], self.flows), emoney.PV([0.1], 5, 1), emoney.FV([0.1], 5, 1)):
+            self.assertTrue(type(values) is list and type(values[0]) is float)
+
+
+class BadInput(unittest.TestCase):
+
+    def testRateAtMinusOne(self):
+        self.assertRaises(emoney.NumError, emoney.NPV, -1, [1, 2])
+
+    def testLengthMismatch(self):
+        self.assertRaises(emoney.NumError, emoney.XNPV, 0.1, [1, 2], [1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 """Unit test for easymoney.py
 """
 
+import array
 import easymoney
 import unittest
 
@@ -34,11 +35,63 @@ class GetMeanBadInput(unittest.TestCase):
     def testNonNumericInputStringElement(self):
         self.assertRaises(emoney.TypeError, emoney.AVERAGE, ["0"])
 
+class TestColumnMode(unittest.TestCase):
+
+    values = [3, 1.5, 4, 1, 5.5, 9, 2.5, 6]
+
+    def testColumnMatchesList(self):
+        """aggregates over array.array should match the list results"""
+        col = array.array('d', self.values)
+        for f in (emoney.SUM, emoney.AVERAGE, emoney.SUMSQ, emoney.MIN,
+                  emoney.MAX, emoney.COUNT, emoney.fGEOMEAN, emoney.HARMEAN):
+            self.assertAlmostEqual(f(self.values), f(col))
+
+    def testIntegerColumn(self):
+        self.assertEqual(emoney.SUM(array.array('i', [1, 2, 3])), 6)
+        self.assertEqual(emoney.MAX(array.array('l', [-1, 7, 3])), 7)
+
+    def testMemoryview(self):
+        self.assertEqual(emoney.SUM(memoryview(bytearray([1, 2, 3]))), 6)
+
+    def testNonNumericColumn(self):
+        self.assertRaises(emoney.TypeError, emoney.SUM, array.array('c', 'ab'))
+
+    def testEmptyColumn(self):
+        self.assertRaises(emoney.ZeroDivisionError, emoney.AVERAGE,
+                          array.array('d'))
+
 class TestDateFunctions(unittest.TestCase):
     def testDATEforNegativeYear(self):
         self.assertRaises(ValueError, emoney.fDATE, -1, 1, 1)
     def testDATEforNegativeFloatYear(self):
         self.assertRaises(TypeError, emoney.fDATE, -1.0, 1, 1)
+    def testDATEKnownSerials(self):
+        self.failUnlessEqual(emoney.fDATE(1900, 1, 1), 1)
+        self.failUnlessEqual(emoney.fDATE(1900, 3, 1), 61)
+        self.failUnlessEqual(emoney.fDATE(2008, 1, 1), 39448)
+        self.failUnlessEqual(emoney.fDATE(108, 1, 1), 39448)
+    def testDATERollsOver(self):
+        self.failUnlessEqual(emoney.fDATE(2008, 14, 2), emoney.fDATE(2009, 2, 2))
+        self.failUnlessEqual(emoney.fDATE(2008, 1, 35), emoney.fDATE(2008, 2, 4))
+    def testYEARMONTHDAY(self):
+        s = emoney.fDATE(2024, 2, 29)
+        self.failUnlessEqual(emoney.fYEAR(s), 2024)
+        self.failUnlessEqual(emoney.fMONTH(s), 2)
+        self.failUnlessEqual(emoney.fDAY(s), 29)
+    def testWEEKDAY(self):
+        s = emoney.fDATE(2008, 2, 14)
+        self.failUnlessEqual(emoney.fWEEKDAY(s), 5)
+        self.failUnlessEqual(emoney.fWEEKDAY(s, 2), 4)
+        self.failUnlessEqual(emoney.fWEEKDAY(s, 3), 3)
+        self.failUnlessEqual(emoney.fDATE(1900, 2, 29), 60)
+        self.failUnlessEqual([emoney.fWEEKDAY(s) for s in (1, 60, 61)], [1, 4, 5])
+    def testDaysInA360DayYear(self):
+        self.failUnlessEqual(emoney.daysInA360DayYear(30, 1, 2011, 31, 12, 2011), 330)
+        self.failUnlessEqual(emoney.daysInA360DayYear(30, 2, 2011, 1, 3, 2011), None)
+    def testIsLeapYear(self):
+        self.failUnlessEqual(emoney.isLeapYear(2000), True)
+        self.failUnlessEqual(emoney.isLeapYear(1900), False)
+        self.failUnlessEqual(emoney.isLeapYear(-4), None)
 
 class TestMathFunctions(unittest.TestCase):
     def testINTforZeroArgument(self):
@@ -0,0 +1,90 @@
+"""Unit test for formula.py
+"""
+
+import formula
+import unittest
+
+engine = formula.FormulaEngine()
+
+
+class KnownValues(unittest.TestCase):
+
+    knownValues = (('=1+2*3', 7),
+                   ('=(1+2)*3', 9),
+                   ('=-2^2', 4),
+                   ('=10/4', 2.5),
+                   ('=50%', 0.5),
+                   ('="a"&"b"', u'ab'),
+                   ('=1<2', True),
+                   ('=AVERAGE(1, 2, 3.0)', 2.0),
+                   ('=INT(1.7)', 1),
+                   ('=SUM(1, 2, 3) - 6', 0))
+
+    def testConstantFormulas(self):
+        """constant formulas should evaluate to the known values"""
+        for text, value in self.knownValues:
+            self.assertEqual(value, engine.compile(text)(None))
+
+    def testCompiledFormulasAreCached(self):
+        self.assertTrue(engine.compile('=A1+1') is engine.compile('=A1+1'))
+
+    def testRefs(self):
+        f = engine.compile('=SUM(A1:B2) + $C$3 + rate')
+        self.assertEqual(('A1', 'B1', 'A2', 'B2', 'C3', 'rate'), f.refs)
+
+
+class TestSheets(unittest.TestCase):
+
+    sheet = {'A1': {'value': 1, 'type': 'number'},
+             'A2': {'value': 2, 'type': 'number'},
+             'A3': {'value': '=A1+A2', 'type': 'number'},
+             'rate': {'value': 10.0, 'type': 'number', 'label': 'rate'},
+             'B1': {'value': '=AVERAGE(A1:A3) * rate', 'type': 'number'},
+             'B2': {'value': '=TRIMMEAN(A1:A3, 0)', 'type': 'number'}}
+
+    def testEvaluate(self):
+        self.assertEqual(20.0, engine.evaluate(self.sheet, 'B1'))
+
+    def testHeadPacking(self):
+        self.assertEqual(2.0, engine.evaluate(self.sheet, 'B2'))
+
+    def testEvaluateSheet(self):
+        values = engine.evaluateSheet(self.sheet)
+        self.assertEqual(3, values['A3'])
+        self.assertEqual(len(self.sheet), len(values))
+
+    def testUnknownCell(self):
+        sheet = {'A1': {'value': '=Z9', 'type': 'number'}}
+        self.assertRaises(formula.FormulaError, engine.evaluate, sheet, 'A1')
+
+    def testCircularReference(self):
+        sheet = {'A1': {'value': '=A2', 'type': 'number'},
+                 'A2': {'value': '=A1', 'type': 'number'}}
+        self.assertRaises(formula.FormulaError, engine.evaluate, sheet, 'A1')
+        sheet['A3'] = {'value': '=A3+1', 'type': 'number'}
+        self.assertRaises(formula.FormulaError, engine.evaluate, sheet, 'A3')
+
+    def testLongChain(self):
+        sheet = {'A1': {'value': 1, 'type': 'number'}}
+        for i in xrange(2, 5001):
+            sheet['A%d' % i] = {'value': '=A%d+1' % (i - 1), 'type': 'number'}
+        self.assertEqual(5000, engine.evaluate(sheet, 'A5000'))
+        self.assertEqual(5000, len(engine.evaluateSheet(sheet)))
+
+
+class BadFormulas(unittest.TestCase):
+
+    def testUnknownFunction(self):
+        self.assertRaises(formula.FormulaError, engine.compile, '=NOSUCH(1)')
+
+    def testSyntaxError(self):
+        self.assertRaises(formula.FormulaError, engine.compile, '=1+')
+
+    def testUnbalanced(self):
+        self.assertRaises(formula.FormulaError, engine.compile, '=(1+2')
+
+    def testNotAFormula(self):
+        self.assertRaises(formula.FormulaError, engine.compile, '1+2')
+
+if __name__ == "__main__":
+    unittest.main()
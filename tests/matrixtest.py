@@ -0,0 +1,133 @@
+"""Unit test for matrix.py and the EasyMoney matrix functions
+"""
+
+import easymoney
+import matrix
+import random
+import unittest
+
+emoney = easymoney.EasyMoney()
+
+A = [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]
+B = [[7.0, 8.0], [9.0, 10.0], [11.0, 12.0]]
+S = [[4.0, 7.0, 2.0], [3.0, 6.0, 1.0], [2.0, 5.0, 3.0]]
+
+
+def rows(m):
+    return [list(r) for r in m]
+
+
+class BackendCase(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = matrix.getBackend().name
+
+    def tearDown(self):
+        matrix.setBackend(self.saved)
+
+    def backends(self):
+        for name in sorted(matrix.BACKENDS):
+            matrix.setBackend(name)
+            yield name
+
+    def assertMatrixAlmostEqual(self, expected, got, places=9):
+        got = rows(got)
+        self.assertEqual(len(expected), len(got))
+        for r1, r2 in zip(expected, got):
+            self.assertEqual(len(r1), len(r2))
+            for x, y in zip(r1, r2):
+                self.assertAlmostEqual(x, y, places)
+
+
+class KnownValues(BackendCase):
+
+    # values as computed by spreadsheet software
+    def testMMULT(self):
+        for name in self.backends():
+            self.assertMatrixAlmostEqual([[58.0, 64.0], [139.0, 154.0]], emoney.fMMULT(A, B))
+
+    def testMDETERM(self):
+        for name in self.backends():
+            self.assertAlmostEqual(9.0, emoney.fMDETERM(S), 9)
+            self.assertAlmostEqual(88.0, emoney.fMDETERM([[1, 3, 8, 5], [1, 3, 6, 1],
+                                                          [1, 1, 1, 0], [7, 3, 10, 2]]), 9)
+
+    def testMINVERSE(self):
+        for name in self.backends():
+            self.assertMatrixAlmostEqual([[0.25, 0.25, -0.75], [0.0, 0.0, 0.5],
+                                          [0.75, -0.25, -0.25]],
+                                         emoney.fMINVERSE([[1, 2, 1], [3, 4, -1], [0, 2, 0]]))
+
+    def testTRANSPOSE(self):
+        for name in self.backends():
+            self.assertMatrixAlmostEqual(rows(zip(*A)), emoney.fTRANSPOSE(A))
+
+
+class Kernels(BackendCase):
+
+    def testInverseTimesMatrixIsIdentity(self):
+        rng = random.Random(11)
+        m = [[rng.uniform(-1, 1) for j in xrange(40)] for i in xrange(40)]
+        identity = [[float(i == j) for j in xrange(40)] for i in xrange(40)]
+        for name in self.backends():
+            self.assertMatrixAlmostEqual(identity, emoney.fMMULT(m, emoney.fMINVERSE(m)))
+
+    def testBlockedProduct(self):
+        rng = random.Random(12)
+        a = [[rng.randint(-9, 9) for j in xrange(70)] for i in xrange(150)]
+        b = [[rng.randint(-9, 9) for j in xrange(130)] for i in xrange(70)]
+        expected = [[sum(x * y for x, y in zip(r, c)) for c in zip(*b)] for r in a]
+        for name in self.backends():
+            self.assertEqual(expected, rows(emoney.fMMULT(a, b)))
+
+    def testSingular(self):
+        for name in self.backends():
+            self.assertEqual(0.0, emoney.fMDETERM([[1, 2], [2, 4]]))
+            self.assertRaises(easymoney.NumError, emoney.fMINVERSE, [[1, 2], [2, 4]])
+
+    def testShapes(self):
+        for name in self.backends():
+            self.assertRaises(easymoney.TypeError, emoney.fMMULT, A, A)
+            self.assertRaises(easymoney.TypeError, emoney.fMDETERM, A)
+            self.assertRaises(easymoney.TypeError, emoney.fMINVERSE, [[1, 2], [3]])
+
+
+class Views(unittest.TestCase):
+
+    def testTransposeSharesData(self):
+        m = matrix.Matrix.fromRows(A)
+        t = m.T
+        self.assertTrue(t.data is m.data)
+        self.assertEqual((3, 2), t.shape)
+        self.assertEqual([2.0, 5.0], t[1])
+        self.assertEqual(6.0, t[2, 1])
+        self.assertTrue(t.T.isContiguous())
+
+    def testProductOfViews(self):
+        m = matrix.Matrix.fromRows(A)
+        self.assertEqual([[14.0, 32.0], [32.0, 77.0]],
+                         matrix.PythonBackend().mmult(m, m.T).tolist())
+
+
+class Sharing(BackendCase):
+
+    def testDeterminantAndInverseFactorOnce(self):
+        for name in self.backends():
+            matrix.defaultCache.clear()
+            emoney.fMDETERM(S)
+            emoney.fMINVERSE(S)
+            emoney.fMINVERSE([list(r) for r in S])
+            self.assertEqual(1, matrix.defaultCache.misses)
+            self.assertEqual(2, matrix.defaultCache.hits)
+
+    def testCachedInverseIsNotShared(self):
+        for name in self.backends():
+            first = emoney.fMINVERSE(S)
+            self.assertFalse(first is emoney.fMINVERSE(S))
+
+    def testUnknownBackend(self):
+        self.assertRaises(easymoney.EasyMoneyError, matrix.setBackend, 'fortran')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+"""Unit test for money.py and the EasyMoney money mode
+"""
+
+import array
+import easymoney
+import money
+import random
+import unittest
+
+from decimal import Decimal, ROUND_HALF_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP
+
+
+class Rounding(unittest.TestCase):
+
+    def testAgainstDecimal(self):
+        rng = random.Random(18)
+        for rounding in money.ROUNDINGS:
+            for i in xrange(300):
+                n = rng.randint(-10 ** 6, 10 ** 6)
+                d = rng.choice([2, 3, 4, 7, 10, 100, 400])
+                want = (Decimal(n) / Decimal(d)).quantize(Decimal(1), rounding)
+                self.assertEqual(int(want), money.divide(n, d, rounding), (n, d, rounding))
+
+    def testTies(self):
+        self.assertEqual([2, 2, -2, -2], [money.divide(n, 2, ROUND_HALF_EVEN) for n in (3, 5, -3, -5)])
+        self.assertEqual([2, 3, -2, -3], [money.divide(n, 2, ROUND_HALF_UP) for n in (3, 5, -3, -5)])
+        self.assertEqual([1, 2, -1, -2], [money.divide(n, 2, ROUND_HALF_DOWN) for n in (3, 5, -3, -5)])
+
+    def testRatio(self):
+        self.assertEqual((1, 10), money.ratio(0.1))
+        self.assertEqual((-75, 1000), money.ratio(Decimal('-0.075')))
+        self.assertEqual((1200, 1), money.ratio('12E2'))
+        self.assertRaises(easymoney.TypeError, money.ratio, 'ten')
+        self.assertRaises(easymoney.TypeError, money.ratio, float('nan'))
+        self.assertRaises(easymoney.TypeError, money.ratio, True)
+        self.assertRaises(easymoney.TypeError, money.Context().units, False)
+
+
+class Context(unittest.TestCase):
+
+    def setUp(self):
+        self.m = money.Context()
+
+    def testEdges(self):
+        self.assertEqual(1234, self.m.units('12.34'))
+        self.assertEqual(1234, self.m.units(12.345))
+        self.assertEqual(1235, money.Context(2, ROUND_HALF_UP).units(12.345))
+        self.assertEqual(Decimal('-0.05'), self.m.decimal(-5))
+        self.assertEqual('1000.00', str(self.m.decimal(100000)))
+        self.assertEqual('12.345', str(money.Context(3).decimal(12345)))
+
+    def testArrays(self):
+        units = self.m.unitsMany(['0.10', '0.20', 0.3, Decimal('1.25')])
+        self.assertEqual(185, self.m.total(units))
+        self.assertEqual(46, self.m.mean(units))
+        self.assertEqual([1, 2, 3, 12], list(self.m.percentMany(units, 10)))
+        for rounding in money.ROUNDINGS:
+            m = money.Context(2, rounding)
+            values = range(-1000, 1000, 7)
+            units = m.unitsMany(values)
+            self.assertEqual([m.multiply(u, '0.3333') for u in m.unitsMany(values)],
+                             [int(u) for u in m.multiplyMany(units, '0.3333')])
+
+    def testColumnsMatchUnits(self):
+        rng = random.Random(3)
+        values = [round(rng.uniform(-1e6, 1e6), rng.randint(0, 4)) for i in xrange(500)]
+        values += [rng.uniform(-10, 10) for i in xrange(100)]
+        values += [0.125, -0.135, 1e15 + 0.25, 2.0 ** 60, 1e-9, 45035996273704.96]
+        columns = [values, array.array('d', values)]
+        if money.numpy is not None:
+            columns.append(money.numpy.array(values))
+        for places in (0, 2, 6):
+            for rounding in money.ROUNDINGS:
+                m = money.Context(places, rounding)
+                units = [m.units(x) for x in values]
+                for column in columns:
+                    self.assertEqual(units, [int(u) for u in m.unitsMany(column)])
+        self.assertEqual([100, -200], list(self.m.unitsMany(array.array('i', [1, -2]))))
+
+    def testNumpyScalars(self):
+        if money.numpy is not None:
+            self.assertEqual(money.ratio(1.5), money.ratio(money.numpy.float64(1.5)))
+            self.assertEqual((3, 1), money.ratio(money.numpy.int64(3)))
+            self.assertEqual(150, self.m.units(money.numpy.float64(1.5)))
+
+    def testNoOverflow(self):
+        big = self.m.unitsMany([10 ** 17] * 3)
+        self.assertEqual(3 * 10 ** 19, self.m.total(big))
+        self.assertEqual([10 ** 19 * 3] * 3, list(self.m.multiplyMany(big, 3)))
+
+    def testAllocate(self):
+        self.assertEqual([34, 33, 33], self.m.allocate(100, [1, 1, 1]))
+        self.assertEqual([50, 25, 25], self.m.allocate(100, [0.5, 0.25, 0.25]))
+        parts = self.m.allocate(1001, ['0.7', '0.2', '0.1'])
+        self.assertEqual(1001, sum(parts))
+        self.assertRaises(easymoney.TypeError, self.m.allocate, 100, [0, 0])
+
+    def testCompound(self):
+        self.assertEqual(116986, self.m.compound(100000, 4, 4))
+        self.assertEqual(100000, self.m.compound(116986, 4, -4))
+        self.assertRaises(easymoney.TypeError, self.m.compound, 100, 4, 1.5)
+        self.assertRaises(easymoney.TypeError, self.m.compound, 100, 4, float('inf'))
+        self.assertEqual(116986, self.m.compound(100000, 4, 4.0))
+
+
+class MoneyMode(unittest.TestCase):
+
+    def setUp(self):
+        self.emoney = easymoney.EasyMoney()
+        self.emoney.money = money.Context()
+
+    def testSimpleInterest(self):
+        e = self.emoney
+        self.assertEqual(Decimal('110.50'), e.fvSimple('100.00', 10.5))
+        self.assertEqual(Decimal('0.01'), e.iSimple('0.10', 10))
+        self.assertEqual(Decimal('0.20'), e.iSimpleFromFV(0.1, 0.3))
+        self.assertEqual(Decimal('0.10'), e.pvSimple(0.3, 0.2))
+        self.assertEqual(Decimal('100.00'), e.pvSimpleFromIR('110.50', 10.5))
+        self.assertEqual(Decimal('1004.11'), e.fvAdjusted(1000, 5, 30, 365))
+        self.assertEqual(10.5, e.irSimple(Decimal('100'), Decimal('110.50')))
+
+    def testCompoundInterest(self):
+        e = self.emoney
+        self.assertEqual(Decimal('1169.86'), e.fvCompound(1000, 4, 4))
+        self.assertEqual(Decimal('1000.00'), e.pvCompound('1169.86', 4, 4))
+        self.assertEqual(Decimal('110.25'), e.fvCompound(100, 5, 2.0))
+        self.assertEqual(Decimal('100.00'), e.pvCompound('110.25', 5, 2.0))
+
+    def testAggregates(self):
+        e = self.emoney
+        self.assertEqual(Decimal('0.60'), e.SUM([0.1, 0.2, 0.3, 'memo', None]))
+        self.assertNotEqual(0.6, easymoney.EasyMoney().SUM([0.1, 0.2, 0.3]))
+        self.assertEqual(Decimal('0.33'), e.AVERAGE([0, 0, 1]))
+        self.assertEqual(Decimal('3.00'), e.SUM(array.array('d', [1.5, 1.5])))
+        if money.numpy is not None:
+            self.assertEqual(Decimal('0.60'), e.SUM(money.numpy.array([0.1, 0.2, 0.3])))
+            self.assertEqual(Decimal('2.00'), e.AVERAGE(money.numpy.array([1, 3])))
+        self.assertRaises(easymoney.TypeError, e.AVERAGE, [1, 'x'])
+        self.assertRaises(easymoney.ZeroDivisionError, e.SUM, [])
+
+    def testModeIsPerInstance(self):
+        self.assertEqual(110.5, easymoney.EasyMoney().fvSimple(100, 10.5))
+
+
+if __name__ == "__main__":
+    unittest.main()
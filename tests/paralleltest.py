@@ -0,0 +1,102 @@
+"""Unit test for parallel.py
+"""
+
+import array
+import cells
+import easymoney
+import errors
+import formula
+import glob
+import parallel
+import unittest
+
+
+emoney = easymoney.EasyMoney()
+
+
+class Local(unittest.TestCase):
+
+    processes = 0
+
+    def setUp(self):
+        self.pool = parallel.Pool(self.processes, shared=100)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def testResultsInJobOrder(self):
+        prices = [100 + (i % 37) * 0.25 for i in xrange(1000)]
+        jobs = [('AVERAGE', [prices]), ('MEDIAN', [prices]),
+                ('TRIMMEAN', [prices, 0.2]), ('IRR', [[-100, 39, 59, 55, 20]]),
+                (emoney.NPV, [0.1, [-10000, 3000, 4200, 6800]]),
+                ('PERCENTILE.INC', [prices, 0.9])]
+        jobs += [('SUM', [[i, i]]) for i in xrange(50)]
+        results = self.pool.map(jobs)
+        self.assertEqual(len(jobs), len(results))
+        self.assertAlmostEqual(emoney.AVERAGE(prices), results[0])
+        self.assertAlmostEqual(emoney.MEDIAN(prices), results[1])
+        self.assertAlmostEqual(emoney.TRIMMEAN(prices, 0.2), results[2])
+        self.assertAlmostEqual(0.2809484211599611, results[3])
+        self.assertAlmostEqual(emoney.NPV(0.1, [-10000, 3000, 4200, 6800]), results[4])
+        self.assertAlmostEqual(emoney.fPERCENTILE_INC(prices, 0.9), results[5])
+        self.assertEqual([2 * i for i in xrange(50)], results[6:])
+
+    def testSharedKinds(self):
+        floats = [i * 0.5 for i in xrange(500)]
+        jobs = [('SUM', [floats]), ('SUM', [range(500)]),
+                ('SUM', [array.array('d', floats)]), ('SUM', [cells.Range(floats)]),
+                ('SUM', [[1.5, 'x'] * 300])]
+        self.assertEqual([62375.0, 124750, 62375.0, 62375.0, 450.0], self.pool.map(jobs))
+        self.assertEqual([], glob.glob('/dev/shm/easymoney-*'))
+
+    def testListFunctionsOnSharedLists(self):
+        items = [i * 0.5 for i in xrange(500)]
+        jobs = [('COUNTA', [items]), ('AVERAGEA', [items]), ('MAXA', [range(500)]),
+                ('SUM', [cells.Range(items, 'number')])]
+        self.assertEqual([500, emoney.AVERAGEA(items), 499, 62375.0], self.pool.map(jobs))
+
+    def testMatricesKeepTheirRows(self):
+        if cells.numpy is not None:
+            m = cells.numpy.eye(100) * 2
+            determinant, transposed = self.pool.map([('MDETERM', [m]), ('TRANSPOSE', [m])])
+            self.assertAlmostEqual(emoney.fMDETERM(m), determinant)
+            self.assertEqual((100, 100), transposed.shape)
+
+    def testFirstErrorIsRaised(self):
+        jobs = [('SUM', [[1, 2]]), ('IRR', [[100, 110]]), ('NOSUCH', [[1]])]
+        self.assertRaises(formula.FormulaError, self.pool.map, jobs)
+        jobs = [('SUM', [[1, 2]]), ('IRR', [[100, 110]]), ('AVERAGE', [[]])] * 30
+        self.assertRaises(errors.NumError, self.pool.map, jobs)
+
+    def testErrorsInPlace(self):
+        results = self.pool.map([('IRR', [[100, 110]]), ('IRR', [[-100, 110]])], errors=True)
+        self.assertTrue(isinstance(results[0], errors.NumError))
+        self.assertAlmostEqual(0.1, results[1])
+
+    def testSheets(self):
+        sheets = [{'A1': {'value': i}, 'A2': {'value': 2 * i},
+                   'A3': {'value': '=SUM(A1:A2)*2'}} for i in xrange(20)]
+        values = self.pool.evaluate(sheets, ['A3'])
+        self.assertEqual([{'A3': 6 * i} for i in xrange(20)], values)
+        self.assertEqual(3, len(self.pool.evaluate(sheets[:1])[0]))
+
+    def testEmpty(self):
+        self.assertEqual([], self.pool.map([]))
+        self.assertEqual([], self.pool.evaluate([]))
+
+
+class Processes(Local):
+
+    processes = 2
+
+    def testSameResultsAsLocal(self):
+        items = [i * 0.25 for i in xrange(5000)]
+        jobs = [('COUNTA', [items]), ('COUNT', [items]), ('MINA', [items]),
+                ('SUM', [array.array('d', items)]), ('MEDIAN', [cells.Range(items)]),
+                ('SUM', [range(5000)])]
+        local = parallel.Pool(0, shared=100)
+        self.assertEqual(local.map(jobs, errors=True), self.pool.map(jobs, errors=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
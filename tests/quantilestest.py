@@ -0,0 +1,126 @@
+"""Unit test for quantiles.py and the EasyMoney MEDIAN/PERCENTILE/QUARTILE/TRIMMEAN functions
+"""
+
+import array
+import easymoney
+import quantiles
+import random
+import unittest
+
+emoney = easymoney.EasyMoney()
+
+QUARTILES = [6, 7, 15, 36, 39, 40, 41, 42, 43, 47, 49]
+
+
+class KnownValues(unittest.TestCase):
+
+    # values as computed by spreadsheet software
+    def testMEDIAN(self):
+        self.assertEqual(3, emoney.MEDIAN([5, 1, 4, 2, 3]))
+        self.assertEqual(3.5, emoney.MEDIAN([6, 1, 5, 2, 4, 3]))
+        self.assertEqual(7, emoney.MEDIAN([7]))
+
+    def testPERCENTILE(self):
+        self.assertAlmostEqual(1.9, emoney.fPERCENTILE([1, 3, 2, 4], 0.3), 12)
+        self.assertEqual(4, emoney.fPERCENTILE_INC([1, 3, 2, 4], 1))
+        self.assertAlmostEqual(2.5, emoney.fPERCENTILE_EXC([1, 2, 3, 6, 6, 6, 7, 8, 9], 0.25), 12)
+        self.assertRaises(easymoney.NumError, emoney.fPERCENTILE_EXC, [1, 2, 3, 6, 6, 6, 7, 8, 9], 0)
+        self.assertRaises(easymoney.NumError, emoney.fPERCENTILE_EXC, [1, 2, 3, 6, 6, 6, 7, 8, 9], 0.01)
+        self.assertRaises(easymoney.NumError, emoney.fPERCENTILE, [1, 2], 1.5)
+
+    def testQUARTILE(self):
+        self.assertEqual(3.5, emoney.fQUARTILE([1, 2, 4, 7, 8, 9, 10, 12], 1))
+        self.assertEqual(25.5, emoney.fQUARTILE_INC(QUARTILES, 1))
+        self.assertEqual(42.5, emoney.fQUARTILE_INC(QUARTILES, 3))
+        self.assertEqual(15, emoney.fQUARTILE_EXC(QUARTILES, 1))
+        self.assertEqual(43, emoney.fQUARTILE_EXC(QUARTILES, 3))
+        self.assertRaises(easymoney.NumError, emoney.fQUARTILE, QUARTILES, 5)
+        self.assertRaises(easymoney.NumError, emoney.fQUARTILE_EXC, QUARTILES, 0)
+
+    def testTRIMMEAN(self):
+        self.assertAlmostEqual(3.777777778, emoney.TRIMMEAN([4, 5, 6, 7, 2, 3, 4, 5, 1, 2, 3], 0.2), 9)
+        self.assertEqual(2.0, emoney.TRIMMEAN([1, 2, 3], 0))
+        self.assertRaises(easymoney.NumError, emoney.TRIMMEAN, [1, 2, 3], 1)
+
+    def testBadInput(self):
+        self.assertRaises(easymoney.ZeroDivisionError, emoney.MEDIAN, [])
+        self.assertRaises(easymoney.TypeError, emoney.MEDIAN, '')
+        self.assertRaises(easymoney.TypeError, emoney.MEDIAN, [1, 'a'])
+
+
+class Selection(unittest.TestCase):
+
+    def testAgainstSorting(self):
+        rng = random.Random(16)
+        for n in (1, 2, 17, 100, 1000):
+            values = [rng.choice([rng.random(), rng.randint(0, 5)]) for i in xrange(n)]
+            ordered = sorted(values)
+            for k in set([0, n // 3, n // 2, n - 1]):
+                a = list(values)
+                self.assertEqual(ordered[k], quantiles.select(a, k))
+                self.assertTrue(max(a[:k] + [a[k]]) <= a[k] <= min(a[k:]))
+
+    def testManyRanksOnePartition(self):
+        rng = random.Random(17)
+        values = [rng.random() for i in xrange(2000)]
+        ordered = sorted(values)
+        ps = [0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0]
+        for got, p in zip(quantiles.quantiles(values, ps), ps):
+            h = 1999 * p
+            k = int(h)
+            want = ordered[k] + (h - k) * (ordered[min(k + 1, 1999)] - ordered[k])
+            self.assertAlmostEqual(want, got, 12)
+
+    def testInputIsLeftAlone(self):
+        values = [5, 3, 9, 1, 7, 2]
+        saved = list(values)
+        emoney.MEDIAN(values)
+        emoney.TRIMMEAN(values, 0.4)
+        self.assertEqual(saved, values)
+
+    def testScratchAndOverwrite(self):
+        values = [5, 3, 9, 1, 7, 2]
+        scratch = [0] * 10
+        self.assertEqual(4.0, quantiles.median(values, scratch))
+        self.assertEqual(4.0, quantiles.median(iter(values), scratch))
+        self.assertEqual([5, 3, 9, 1, 7, 2], values)
+        self.assertRaises(easymoney.TypeError, quantiles.median, values, [0] * 3)
+        self.assertEqual(4.0, quantiles.median(values, overwrite=True))
+        self.assertNotEqual([5, 3, 9, 1, 7, 2], values)
+
+    def testColumns(self):
+        self.assertEqual(4.0, emoney.MEDIAN(array.array('d', [5, 3, 9, 1, 7, 2])))
+        self.assertEqual(3, emoney.fQUARTILE((x for x in [1, 2, 3, 4, 5]), 2))
+
+
+class Sketch(unittest.TestCase):
+
+    def testQuantilesAreClose(self):
+        rng = random.Random(18)
+        values = [rng.gauss(0, 1) for i in xrange(20000)]
+        digest = quantiles.Digest(values)
+        ordered = sorted(values)
+        self.assertTrue(len(digest.means) < 200)
+        for p in (0.001, 0.01, 0.25, 0.5, 0.75, 0.99, 0.999):
+            got = digest.quantile(p)
+            rank = sum(1 for x in ordered if x <= got) / 20000.0
+            self.assertTrue(abs(rank - p) < 0.005 + p * (1 - p) * 0.02, (p, rank))
+        self.assertEqual(ordered[0], digest.quantile(0))
+        self.assertEqual(ordered[-1], digest.quantile(1))
+
+    def testMerge(self):
+        rng = random.Random(19)
+        values = [rng.uniform(0, 100) for i in xrange(10000)]
+        parts = [quantiles.Digest(values[i:i + 1000]) for i in xrange(0, 10000, 1000)]
+        merged = reduce(lambda a, b: a.merge(b), parts, quantiles.Digest())
+        self.assertEqual(10000, merged.count)
+        self.assertTrue(abs(merged.quantile(0.5) - 50.0) < 2.0)
+        self.assertTrue(abs(merged.value() - quantiles.median(values)) < 1.0)
+
+    def testEmpty(self):
+        self.assertRaises(easymoney.ZeroDivisionError, quantiles.Digest().quantile, 0.5)
+        self.assertEqual(3, quantiles.Digest([3]).quantile(0.9))
+
+
+if __name__ == "__main__":
+    unittest.main()
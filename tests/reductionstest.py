@@ -0,0 +1,86 @@
+"""Unit test for reductions.py and the EasyMoney SUMPRODUCT/SUMX* functions
+"""
+
+import array
+import easymoney
+import reductions
+import unittest
+
+emoney = easymoney.EasyMoney()
+
+X = [2, 3, 9, 1, 8, 7, 5]
+Y = [6, 5, 11, 7, 5, 4, 4]
+
+
+class KnownValues(unittest.TestCase):
+
+    # values as computed by spreadsheet software
+    def testSUMPRODUCT(self):
+        self.assertEqual(156.0, emoney.fSUMPRODUCT([3, 8, 1, 4, 6, 9], [2, 6, 5, 7, 7, 3]))
+        self.assertEqual(3.0 * 2 * 4 + 4 * 7 * 6 + 8 * 6 * 1 + 6 * 7 * 5 + 1 * 5 * 3 + 9 * 3 * 2,
+                         emoney.fSUMPRODUCT([3, 4, 8, 6, 1, 9], [2, 7, 6, 7, 5, 3],
+                                            [4, 6, 1, 5, 3, 2]))
+        self.assertEqual(31.0, emoney.fSUMPRODUCT([3, 8, 1, 4, 6, 9]))
+
+    def testSUMX2MY2(self):
+        self.assertEqual(-55.0, emoney.fSUMX2MY2(X, Y))
+
+    def testSUMX2PY2(self):
+        self.assertEqual(521.0, emoney.fSUMX2PY2([2, 3, 9, 1, 8, 7, 5], [6, 5, 11, 7, 5, 4, 4]))
+
+    def testSUMXMY2(self):
+        self.assertEqual(79.0, emoney.fSUMXMY2(X, Y))
+
+
+class Inputs(unittest.TestCase):
+
+    def testColumns(self):
+        x = array.array('l', X)
+        y = array.array('d', Y)
+        self.assertEqual(79.0, emoney.fSUMXMY2(x, y))
+
+    def testGenerators(self):
+        self.assertEqual(79.0, emoney.fSUMXMY2((v for v in X), iter(Y)))
+        self.assertEqual(-55.0, emoney.fSUMX2MY2(iter(X), Y))
+
+    def testChunks(self):
+        saved = reductions.CHUNK
+        reductions.CHUNK = 3
+        try:
+            n = 1000
+            expected = float(sum(i * (i % 7) for i in xrange(n)))
+            self.assertEqual(expected, emoney.fSUMPRODUCT(range(n), [i % 7 for i in xrange(n)]))
+            self.assertEqual(expected, emoney.fSUMPRODUCT(
+                xrange(n), (i % 7 for i in xrange(n))))
+            self.assertEqual(expected, emoney.fSUMPRODUCT(
+                array.array('d', range(n)), array.array('b', [i % 7 for i in xrange(n)])))
+        finally:
+            reductions.CHUNK = saved
+
+    def testMismatchedLengths(self):
+        self.assertRaises(easymoney.TypeError, emoney.fSUMPRODUCT, [1, 2], [1, 2, 3])
+        self.assertRaises(easymoney.TypeError, emoney.fSUMXMY2, iter([1, 2]), iter([1]))
+
+    def testNonNumeric(self):
+        self.assertRaises(easymoney.TypeError, emoney.fSUMXMY2, [1, 'a'], [1, 2])
+        self.assertRaises(easymoney.TypeError, emoney.fSUMX2PY2, iter([None]), iter([1]))
+
+    def testSUMPRODUCTCountsNonNumbersAsZero(self):
+        x = [3, 'a', None, 4, True, '5', 2.5]
+        y = [2, 6, 5, 7, 7, 3, 2]
+        self.assertEqual(39.0, emoney.fSUMPRODUCT(x, y))
+        self.assertEqual(39.0, emoney.fSUMPRODUCT(iter(x), iter(y)))
+        self.assertEqual(9.5, emoney.fSUMPRODUCT(x))
+        self.assertEqual(39.0, emoney.fSUMPRODUCT(x, array.array('d', y)))
+        if reductions.numpy is not None:
+            numpy = reductions.numpy
+            self.assertEqual(39.0, emoney.fSUMPRODUCT(numpy.array(x, dtype=object), numpy.array(y)))
+            self.assertEqual(0.0, emoney.fSUMPRODUCT(numpy.array([True, False]), [1, 2]))
+            self.assertEqual(5.0, emoney.fSUMPRODUCT([numpy.float64(1.5), numpy.int32(2)], [2, 1]))
+
+    def testNoArrays(self):
+        self.assertRaises(easymoney.TypeError, emoney.fSUMPRODUCT)
+
+
+if __name__ == "__main__":
+    unittest.main()
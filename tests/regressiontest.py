@@ -0,0 +1,111 @@
+"""Unit test for regression.py and the EasyMoney LINEST/LOGEST/TREND/GROWTH functions
+"""
+
+import easymoney
+import random
+import regression
+import unittest
+
+emoney = easymoney.EasyMoney()
+
+Y = [2.0, 4.0, 5.0, 4.0, 5.0]
+
+
+class KnownValues(unittest.TestCase):
+
+    def testLINEST(self):
+        [[m, b]] = emoney.fLINEST(Y)
+        self.assertAlmostEqual(0.6, m, 12)
+        self.assertAlmostEqual(2.2, b, 12)
+
+    def testLINESTStats(self):
+        result = emoney.fLINEST(Y, [1, 2, 3, 4, 5], True, True)
+        expected = [[0.6, 2.2], [0.282842712, 0.938083152], [0.6, 0.894427191],
+                    [4.5, 3], [3.6, 2.4]]
+        for row, want in zip(result, expected):
+            for x, y in zip(row, want):
+                self.assertAlmostEqual(y, x, 9)
+
+    # values as computed by spreadsheet software
+    def testLOGEST(self):
+        [[m, b]] = emoney.fLOGEST([33100, 47300, 69000, 102000, 150000, 220000],
+                                  [11, 12, 13, 14, 15, 16])
+        self.assertAlmostEqual(1.463275628, m, 9)
+        self.assertAlmostEqual(495.3047702, b, 6)
+
+    def testGROWTH(self):
+        units = [33100, 47300, 69000, 102000, 150000, 220000]
+        months = [11, 12, 13, 14, 15, 16]
+        self.assertAlmostEqual(320196.7184, emoney.fGROWTH(units, months, [17])[0], 4)
+        self.assertAlmostEqual(32618.20377, emoney.fGROWTH(units, months)[0], 5)
+
+    def testTREND(self):
+        for got, want in zip(emoney.fTREND(Y), [2.8, 3.4, 4.0, 4.6, 5.2]):
+            self.assertAlmostEqual(want, got, 12)
+        self.assertAlmostEqual(5.8, emoney.fTREND(Y, None, [6])[0], 12)
+
+    def testNoIntercept(self):
+        [[m, b]] = emoney.fLINEST([2.0, 4.1, 5.9], [1, 2, 3], False)
+        self.assertAlmostEqual((2.0 + 8.2 + 17.7) / 14.0, m, 12)
+        self.assertEqual(0.0, b)
+        self.assertEqual(None, emoney.fLINEST([2.0, 4.1, 5.9], [1, 2, 3], False, True)[1][1])
+
+
+class MultipleRegression(unittest.TestCase):
+
+    def testExactFit(self):
+        rng = random.Random(12)
+        xs = [[rng.uniform(0, 10), rng.uniform(0, 10)] for i in xrange(30)]
+        ys = [3.0 + 2.0 * a - b for a, b in xs]
+        [row] = emoney.fLINEST(ys, xs)
+        for got, want in zip(row, [-1.0, 2.0, 3.0]):
+            self.assertAlmostEqual(want, got, 9)
+
+    def testLargeRegressors(self):
+        # date serial numbers as x
+        xs = [40000 + i for i in xrange(100)]
+        ys = [0.5 * (x - 40000) + 7.0 for x in xs]
+        [[m, b]] = emoney.fLINEST(ys, xs)
+        self.assertAlmostEqual(0.5, m, 9)
+        self.assertAlmostEqual(7.0 - 20000.0, b, 5)
+
+    def testCollinear(self):
+        self.assertRaises(easymoney.NumError, emoney.fLINEST, [1, 2, 3, 4],
+                          [[1, 2], [2, 4], [3, 6], [4, 8]])
+
+    def testLogOfNonPositive(self):
+        self.assertRaises(easymoney.NumError, emoney.fLOGEST, [1, 0, 3])
+
+    def testTooFewRows(self):
+        self.assertRaises(easymoney.NumError, emoney.fLINEST, [1, 2], [[1, 2], [3, 5]])
+
+
+class Incremental(unittest.TestCase):
+
+    def testRollingWindowMatchesRefit(self):
+        rng = random.Random(13)
+        xs = [[rng.uniform(0, 5), rng.uniform(0, 5)] for i in xrange(60)]
+        ys = [1.0 + a - 2.0 * b + rng.gauss(0, 0.1) for a, b in xs]
+        window = 20
+        ls = regression.LeastSquares(2)
+        ls.extend(xs[:window], ys[:window])
+        for i in xrange(window, len(xs)):
+            ls.remove(xs[i - window], ys[i - window])
+            ls.add(xs[i], ys[i])
+            rolled = ls.fit()
+            fresh = regression.LeastSquares(2)
+            for x, y in zip(xs[i - window + 1:i + 1], ys[i - window + 1:i + 1]):
+                fresh.add(x, y)
+            fresh = fresh.fit()
+            for a, b in zip(rolled.slopes + [rolled.intercept, rolled.ssresid],
+                            fresh.slopes + [fresh.intercept, fresh.ssresid]):
+                self.assertAlmostEqual(a, b, 9)
+
+    def testFitIsReused(self):
+        xs = [1, 2, 3, 4, 5]
+        self.assertTrue(regression.fit(Y, xs) is regression.fit(list(Y), xs))
+        self.assertFalse(regression.fit(Y, xs) is regression.fit(Y, xs, False))
+
+
+if __name__ == "__main__":
+    unittest.main()
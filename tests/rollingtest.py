@@ -0,0 +1,105 @@
+"""Unit test for rolling.py and the EasyMoney fROLLING function
+"""
+
+import array
+import easymoney
+import math
+import random
+import rolling
+import unittest
+
+emoney = easymoney.EasyMoney()
+
+PRICES = [10, 11, 9, 12, 12, 8, 13, 10]
+
+
+def _variance(w):
+    m = math.fsum(w) / len(w)
+    return math.fsum((x - m) ** 2 for x in w) / (len(w) - 1)
+
+
+BRUTE = {'AVERAGE': lambda w: math.fsum(w) / len(w),
+         'SUM': math.fsum,
+         'MIN': min,
+         'MAX': max,
+         'MEDIAN': emoney.MEDIAN,
+         'VAR': _variance,
+         'STDEV': lambda w: math.sqrt(_variance(w))}
+
+
+class KnownValues(unittest.TestCase):
+
+    def testSmallSeries(self):
+        self.assertEqual([9, 9, 9, 8, 8, 8], list(emoney.fROLLING(PRICES, 3, 'MIN')))
+        self.assertEqual([11, 12, 12, 12, 13, 13], list(emoney.fROLLING(PRICES, 3, 'MAX')))
+        self.assertEqual([10, 11, 12, 12, 12, 10], list(emoney.fROLLING(PRICES, 3, 'MEDIAN')))
+        self.assertEqual([30, 32, 33, 32, 33, 31], list(emoney.fROLLING(PRICES, 3, 'SUM')))
+        self.assertEqual([10.5, 11.5, 10.5, 12, 11], list(emoney.fROLLING(PRICES, 4, 'MEDIAN')))
+
+    def testWholeSeriesWindow(self):
+        self.assertEqual([emoney.AVERAGE(PRICES)], list(emoney.fROLLING(PRICES, len(PRICES))))
+        self.assertEqual([], list(emoney.fROLLING(PRICES, len(PRICES) + 1)))
+
+    def testBadArguments(self):
+        self.assertRaises(easymoney.NumError, emoney.fROLLING, PRICES, 0)
+        self.assertRaises(easymoney.TypeError, emoney.fROLLING, PRICES, 3, 'IRR')
+        self.assertRaises(easymoney.TypeError, emoney.fROLLING, [1, 'a', 3], 2)
+        self.assertRaises(easymoney.ZeroDivisionError, emoney.fROLLING, PRICES, 1, 'VAR')
+
+
+class AgainstSlices(unittest.TestCase):
+
+    def testRandomWalk(self):
+        rng = random.Random(17)
+        series = [100.0]
+        for i in xrange(600):
+            series.append(round(series[-1] + rng.gauss(0, 1), 2))
+        for window in (1, 2, 5, 20, 60):
+            for name, f in BRUTE.items():
+                if window < 2 and name in ('VAR', 'STDEV'):
+                    continue
+                got = emoney.fROLLING(series, window, name)
+                self.assertEqual(len(series) - window + 1, len(got))
+                for i in xrange(0, len(got), 7):
+                    self.assertAlmostEqual(f(series[i:i + window]), got[i], 8)
+
+    def testVarianceAfterALargeValueLeaves(self):
+        series = [1e8] + [1, 2, 3] * 1000
+        got = emoney.fROLLING(series, 3, 'VAR')
+        self.assertEqual(1.0, got[-1])
+        for i in xrange(1, len(got)):
+            self.assertAlmostEqual(1.0, got[i], 12)
+        got = emoney.fROLLING(iter(series), 3, 'STDEV')
+        self.assertAlmostEqual(1.0, got[5], 12)
+
+    def testDuplicatesInMedian(self):
+        rng = random.Random(18)
+        series = [rng.randint(0, 4) for i in xrange(300)]
+        for window in (3, 4, 11):
+            got = rolling.rollingMedian(series, window)
+            for i in xrange(len(got)):
+                self.assertEqual(emoney.MEDIAN(series[i:i + window]), got[i])
+
+
+class Output(unittest.TestCase):
+
+    def testPreallocatedOut(self):
+        out = array.array('d', [0.0] * 10)
+        result = rolling.rollingSum(PRICES, 3, out)
+        self.assertTrue(result is out)
+        self.assertEqual([30.0, 32.0, 33.0, 32.0, 33.0, 31.0, 0.0, 0.0, 0.0, 0.0], list(out))
+        self.assertRaises(easymoney.TypeError, rolling.rollingSum, PRICES, 3, [0] * 5)
+
+    def testGeneratorInput(self):
+        got = rolling.rollingMax((x for x in PRICES), 3)
+        self.assertEqual([11, 12, 12, 12, 13, 13], list(got))
+        self.assertRaises(easymoney.TypeError, rolling.rollingMax, (x for x in PRICES), 3, [0] * 5)
+
+    def testCompensatedSumDoesNotDrift(self):
+        series = [1e8, 0.1] * 5000
+        got = rolling.rollingSum(series, 2)
+        self.assertEqual(1e8 + 0.1, got[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
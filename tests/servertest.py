@@ -0,0 +1,168 @@
+"""Unit test for server.py
+"""
+
+import StringIO
+import errno
+import easymoney
+import httplib
+import json
+import server
+import socket
+import sys
+import threading
+import time
+import unittest
+import wire
+
+
+emoney = easymoney.EasyMoney()
+
+
+class Batches(unittest.TestCase):
+
+    def testColumnCallsMatchSingleCalls(self):
+        cases = {'PRICE': [[39493, 43054, 0.0575, y, 100, 2, 0] for y in (0.06, 0.065, 0.07)],
+                 'fDAYS360': [[39448 + i, 39600, False] for i in xrange(5)],
+                 'fYEARFRAC': [[39448, 39600 + i, 1] for i in xrange(5)],
+                 'IRR': [[[-100, 39, 59, 55, 20]], [[-70000, 12000, 15000, 18000, 21000, 26000]],
+                         [[-53, 16, 55, 32, 6, 32, 24, -11, -11, 50, -6, -23, 45, 17, 3, 16, 36,
+                           -15, 29, 34, 43, -6]], [[-100, 110]]]}
+        for name, argsList in cases.iteritems():
+            outcomes = server.runBatch(emoney, name, argsList)
+            for args, outcome in zip(argsList, outcomes):
+                self.assertTrue(outcome[0])
+                self.assertAlmostEqual(getattr(emoney, name)(*args), outcome[1], 9)
+
+    def testErrorsStayWithTheirCall(self):
+        outcomes = server.runBatch(emoney, 'IRR', [[[-100, 110]], [[100, 110]], [[-1, 'x']]])
+        self.assertAlmostEqual(0.1, outcomes[0][1])
+        self.assertEqual((False, 'NumError'), outcomes[1][:2])
+        self.assertEqual(False, outcomes[2][0])
+
+
+    def testTimeout(self):
+        class Slow(easymoney.EasyMoney):
+            def SLOW(self):
+                time.sleep(0.5)
+        batcher = server.Batcher(Slow(), timeout=0.05)
+        try:
+            self.assertEqual((False, 'Timeout'), batcher.call('SLOW', [])[:2])
+            self.assertEqual(500, batcher.call('SUM', [[1]])[3])
+        finally:
+            batcher.close()
+
+
+class Serving(unittest.TestCase):
+
+    processes = 0
+    heavy = server.HEAVY
+
+    def setUp(self):
+        self.server = server.Server(('127.0.0.1', 0), processes=self.processes, heavy=self.heavy)
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,))
+        self.thread.start()
+        self.connection = httplib.HTTPConnection(*self.server.server_address)
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+
+    def request(self, method, path, body=None):
+        self.connection.request(method, path, body if body is None else json.dumps(body))
+        response = self.connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    def testFunctions(self):
+        # one keep-alive connection for all the requests
+        self.assertEqual((200, {'value': 2}), self.request('POST', '/functions/AVERAGE', {'args': [[1, 2, 3]]}))
+        self.assertEqual((200, {'value': 360}), self.request('POST', '/functions/DAYS360', {'args': [39448, 39813]}))
+        status, body = self.request('GET', '/functions')
+        self.assertTrue('NETWORKDAYS' in body['functions'] and 'AVERAGE' in body['functions'])
+
+    def testErrors(self):
+        self.assertEqual(404, self.request('POST', '/functions/NOSUCH', {'args': []})[0])
+        self.assertEqual(404, self.request('POST', '/functions/_stream', {'args': []})[0])
+        self.assertEqual((422, 'NumError'), self.requestError('IRR', [[100, 110]]))
+        self.assertEqual(400, self.request('POST', '/functions/AVERAGE', {'args': 3})[0])
+        self.assertEqual(400, self.request('POST', '/functions/AVERAGE', {'args': [1, 2, 3]})[0])
+
+    def requestError(self, name, args):
+        status, body = self.request('POST', '/functions/' + name, {'args': args})
+        return status, body['error']
+
+    def testBinary(self):
+        headers = {'Content-Type': wire.CONTENT_TYPE}
+        for name, args, value in (('AVERAGE', [[1.0, 2.0, 6.0]], 3.0), ('DAYS360', [39448, 39813], 360)):
+            self.connection.request('POST', '/functions/' + name, wire.dumps({'args': args}), headers)
+            response = self.connection.getresponse()
+            self.assertEqual(wire.CONTENT_TYPE, response.getheader('content-type'))
+            self.assertEqual({'value': value}, wire.loads(response.read()))
+        headers['Accept'] = 'application/json'
+        cells = {'A1': {'value': '=2 * 3', 'type': 'number'}}
+        self.connection.request('POST', '/evaluate', wire.dumps({'cells': cells}), headers)
+        self.assertEqual({'values': {'A1': 6}}, json.loads(self.connection.getresponse().read()))
+        self.connection.request('POST', '/evaluate', 'EMW1?', headers)
+        self.assertEqual(400, self.connection.getresponse().status)
+
+    def testEvaluate(self):
+        cells = {'A1': {'value': 2, 'type': 'number'},
+                 'A2': {'value': '=A1 * 3', 'type': 'number'}}
+        self.assertEqual((200, {'values': {'A2': 6}}),
+                         self.request('POST', '/evaluate', {'cells': cells, 'names': ['A2']}))
+        self.assertEqual(400, self.request('POST', '/evaluate', {'cells': [1]})[0])
+
+    def testConcurrentCallsAreBatched(self):
+        results = {}
+
+        def client(i):
+            c = httplib.HTTPConnection(*self.server.server_address)
+            c.request('POST', '/functions/YEARFRAC', json.dumps({'args': [39448, 39500 + i, 1]}))
+            results[i] = json.loads(c.getresponse().read())['value']
+            c.close()
+
+        self.server.batcher.window = 0.05
+        threads = [threading.Thread(target=client, args=(i,)) for i in xrange(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for i in xrange(20):
+            self.assertAlmostEqual(emoney.fYEARFRAC(39448, 39500 + i, 1), results[i])
+        self.assertTrue(self.server.batcher.batches < 20)
+
+
+    def testErrorsOfGoneClientsAreQuiet(self):
+        saved = sys.stdout, sys.stderr
+        sys.stdout = sys.stderr = StringIO.StringIO()
+        try:
+            for e in (socket.error(errno.ECONNRESET, 'reset'), socket.error(errno.EPIPE, 'pipe'),
+                      ValueError('other')):
+                try:
+                    raise e
+                except Exception:
+                    self.server.handle_error(None, ('127.0.0.1', 0))
+            self.assertEqual('', sys.stderr.getvalue())
+            self.server.verbose = True
+            try:
+                raise ValueError('other')
+            except ValueError:
+                self.server.handle_error(None, ('127.0.0.1', 0))
+            self.assertTrue('ValueError' in sys.stderr.getvalue())
+        finally:
+            sys.stdout, sys.stderr = saved
+
+
+class PoolServing(Serving):
+
+    processes = 1
+    heavy = 0
+
+    def testPooled(self):
+        self.assertEqual((200, {'value': 6}), self.request('POST', '/functions/SUM', {'args': [[1, 2, 3]]}))
+        self.assertTrue(self.server.batcher.pooled > 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""Unit test for solver.py and the EasyMoney rate of return functions
+"""
+
+import datetime
+import easymoney
+import errors
+import random
+import solver
+import unittest
+
+emoney = easymoney.EasyMoney()
+
+
+class KnownValues(unittest.TestCase):
+
+    # values as computed by spreadsheet software
+    def testIRR(self):
+        flows = [-70000, 12000, 15000, 18000, 21000, 26000]
+        self.assertAlmostEqual(0.0866309480365316, emoney.IRR(flows), 10)
+        self.assertAlmostEqual(-0.0212448482233268, emoney.IRR(flows[:5]), 7)
+        self.assertAlmostEqual(-0.443506941334306,
+                               emoney.IRR(flows[:3], -0.1), 10)
+
+    def testXIRR(self):
+        values = [-10000, 2750, 4250, 3250, 2750]
+        dates = [datetime.date(2008, 1, 1), datetime.date(2008, 3, 1),
+                 datetime.date(2008, 10, 30), datetime.date(2009, 2, 15),
+                 datetime.date(2009, 4, 1)]
+        self.assertAlmostEqual(0.373362535, emoney.XIRR(values, dates), 8)
+
+    def testMIRR(self):
+        flows = [-120000, 39000, 30000, 21000, 37000, 46000]
+        self.assertAlmostEqual(0.126094130, emoney.MIRR(flows, 0.1, 0.12), 8)
+
+
+class TestSolver(unittest.TestCase):
+
+    def testDerivative(self):
+        flows = [-100, 30, 40, 50]
+        f, df = solver.npv(0.05, flows)
+        h = 1e-6
+        numeric = (solver.npv(0.05 + h, flows)[0] -
+                   solver.npv(0.05 - h, flows)[0]) / (2 * h)
+        self.assertAlmostEqual(numeric, df, 5)
+
+    def testWarmStartIsCheap(self):
+        stats = solver.SolverStats()
+        solver.irr([-1000, 100, 100, 100, 1100], stats=stats)
+        self.assertTrue(stats.maxIterations <= 6)
+        self.assertEqual(0, stats.failures)
+
+    def testBadGuessFallsBackToBracket(self):
+        stats = solver.SolverStats()
+        rate = solver.irr([-100, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1000],
+                          guess=50.0, stats=stats)
+        self.assertAlmostEqual(10 ** 0.1 - 1, rate, 10)
+        self.assertEqual(0, stats.failures)
+
+    def testBatch(self):
+        stats = solver.SolverStats()
+        flows = [[-70000, 12000, 15000, 18000, 21000, 26000],
+                 [-100, 110],
+                 [100, 200]]
+        rates = solver.irrBatch(flows, stats=stats)
+        self.assertAlmostEqual(0.0866309480365316, rates[0], 10)
+        self.assertAlmostEqual(0.1, rates[1], 10)
+        self.assertTrue(rates[2] != rates[2])
+        self.assertEqual(3, stats.calls)
+        self.assertEqual(1, stats.failures)
+
+    def testBatchFindsTheRootsOfIRR(self):
+        rng = random.Random(5)
+        flows = [[rng.randint(-60, 60) for j in xrange(rng.randint(2, 25))] for i in xrange(300)]
+        flows.append([-53, 16, 55, 32, 6, 32, 24, -11, -11, 50, -6, -23, 45, 17, 3, 16, 36,
+                      -15, 29, 34, 43, -6])
+        for guess in (None, 0.1, -0.5):
+            for values, rate in zip(flows, solver.irrBatch(flows, guess=guess)):
+                try:
+                    self.assertEqual(solver.irr(values, guess), rate)
+                except errors.NumError:
+                    self.assertTrue(rate != rate)
+        self.assertAlmostEqual(0.4947023413, solver.irrBatch(flows[-1:])[0], 9)
+
+    def testGuessStaysAboveMinusOne(self):
+        values = [14, 58, -36, -40, -28, 2, 11, -11, -14, 38, 24, -19, -60, -40, 5, 56,
+                  -50, -27, 20, -35, 48, 32, -22, -12]
+        self.assertTrue(solver.initialGuess(values) > -1.0)
+        self.assertAlmostEqual(0.2123869276, solver.irr(values), 9)
+
+    def testBatchOffsets(self):
+        rates = solver.irrBatch([-100, 110, -100, 0, 121], offsets=[0, 2, 5])
+        self.assertAlmostEqual(0.1, rates[0], 10)
+        self.assertAlmostEqual(0.1, rates[1], 10)
+
+
+class BadInput(unittest.TestCase):
+
+    def testNoSignChange(self):
+        self.assertRaises(emoney.NumError, emoney.IRR, [100, 200])
+
+    def testDateBeforeStart(self):
+        self.assertRaises(emoney.NumError, emoney.XIRR, [-100, 110], [10, 5])
+
+    def testMIRRWithoutNegatives(self):
+        self.assertRaises(emoney.ZeroDivisionError, emoney.MIRR,
+                          [100, 200], 0.1, 0.1)
+
+if __name__ == "__main__":
+    unittest.main()
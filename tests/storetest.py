@@ -0,0 +1,88 @@
+"""Unit test for store.py
+"""
+
+import array
+import easymoney
+import os
+import shutil
+import store
+import tempfile
+import unittest
+
+emoney = easymoney.EasyMoney()
+
+
+class Store(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'book.ems')
+        sheet = {}
+        for i in xrange(1, 101):
+            sheet['A%d' % i] = {'value': i * 0.5, 'type': 'number'}
+            sheet['B%d' % i] = {'value': i, 'type': 'number'}
+        sheet['C1'] = {'value': '=SUM(A1:A3)', 'type': 'number', 'label': 'total'}
+        sheet['C2'] = {'value': 4.5, 'type': 'number'}
+        sheet['D2'] = {'value': 1.0, 'type': 'number'}
+        self.sheet = sheet
+        store.write(self.path, sheet, {'prices': array.array('d', [9.5, 10.25])})
+        self.book = store.Store(self.path)
+
+    def tearDown(self):
+        self.book.close()
+        shutil.rmtree(self.dir)
+
+    def testColumns(self):
+        self.assertEqual(['A', 'B', 'prices'], self.book.names())
+        self.assertEqual(100, self.book.size('A'))
+        self.assertEqual([], self.book.loaded())
+        self.assertEqual(2525.0, emoney.SUM(self.book.column('A')))
+        self.assertEqual(['A'], self.book.loaded())
+        self.assertEqual(50.5, emoney.AVERAGE(self.book.column('B')))
+        self.assertEqual(5050, emoney.SUM(self.book.column('B')))
+        self.assertEqual(19.75, emoney.SUM(self.book.column('prices')))
+        self.assertEqual(5, emoney.SUM(self.book.range('B2:B3')))
+        self.assertRaises(store.StoreError, self.book.range, 'A1:B2')
+        self.assertRaises(store.StoreError, self.book.range, 'A1:A101')
+        self.assertRaises(store.StoreError, self.book.column, 'Z')
+
+    def testCells(self):
+        self.assertEqual({'value': 1.5, 'type': 'number'}, self.book.cell('A3'))
+        self.assertEqual({'value': 7, 'type': 'number'}, self.book.cell('b7'))
+        self.assertEqual(self.sheet['C1'], self.book.cell('C1'))
+        # D2 has no D1, so it is not a column
+        self.assertEqual(['C1', 'C2', 'D2'], sorted(self.book.cells()))
+        self.assertRaises(store.StoreError, self.book.cell, 'E1')
+
+    def testMapped(self):
+        column = self.book.column('A')
+        if store.numpy is not None:
+            self.assertFalse(column.flags.owndata)
+        self.book.close()
+        # the column keeps the mapping alive
+        self.assertEqual(50.0, column[-1])
+
+    def testBoolColumns(self):
+        if store.numpy is not None:
+            self.assertRaises(store.StoreError, store.write, self.path,
+                              columns={'flags': store.numpy.array([True, False])})
+
+    def testColumnsMustNotHideSheetCells(self):
+        for name in ('A', 'a', 'D'):
+            self.assertRaises(store.StoreError, store.write, self.path, self.sheet,
+                              {name: [5.0]})
+        store.write(self.path, {'A1': {'value': 1.0}, 'A2': {'value': 2.0}}, {'AB': [5.0]})
+        book = store.Store(self.path)
+        self.assertEqual(2.0, book.cell('A2')['value'])
+        self.assertEqual(5.0, book.cell('AB1')['value'])
+        book.close()
+
+    def testBadFiles(self):
+        for data in ('', 'EMS1' + '\0' * 40, open(self.path, 'rb').read()[:-1]):
+            with open(self.path, 'wb') as f:
+                f.write(data)
+            self.assertRaises(store.StoreError, store.Store, self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+"""Unit test for tables.py and the EasyMoney database functions
+"""
+
+import easymoney
+import random
+import tables
+import unittest
+
+emoney = easymoney.EasyMoney()
+
+DATABASE = [['Tree', 'Height', 'Age', 'Yield', 'Profit'],
+            ['Apple', 18, 20, 14, 105.0],
+            ['Pear', 12, 12, 10, 96.0],
+            ['Cherry', 13, 14, 9, 105.0],
+            ['Apple', 14, 15, 10, 75.0],
+            ['Pear', 9, 8, 8, 76.8],
+            ['Apple', 8, 9, 6, 45.0]]
+
+LABELS = ['Tree', 'Height', 'Age', 'Yield', 'Profit', 'Height']
+APPLE_OR_PEAR = [LABELS, ['=Apple', '>10', None, None, None, '<16'], ['=Pear']]
+APPLE_TALL = [LABELS[:2], ['=Apple', '>10']]
+APPLE = [['Tree'], ['=Apple']]
+EITHER = [['Tree'], ['=Apple'], ['=Pear']]
+
+
+class KnownValues(unittest.TestCase):
+
+    # values as computed by spreadsheet software
+    def testDCOUNT(self):
+        self.assertEqual(1, emoney.DCOUNT(DATABASE, 'Age', APPLE_OR_PEAR[:2]))
+        self.assertEqual(1, emoney.DCOUNTA(DATABASE, 'Profit', APPLE_OR_PEAR[:2]))
+
+    def testDMAXDMIN(self):
+        self.assertEqual(105.0, emoney.DMAX(DATABASE, 'Profit', EITHER))
+        self.assertEqual(75.0, emoney.DMIN(DATABASE, 'Profit', APPLE_TALL))
+
+    def testDSUM(self):
+        self.assertEqual(225.0, emoney.DSUM(DATABASE, 'Profit', APPLE))
+        self.assertEqual(75.0, emoney.DSUM(DATABASE, 'Profit', APPLE_OR_PEAR[:2]))
+        self.assertEqual(75.0 + 96.0 + 76.8, emoney.DSUM(DATABASE, 5, APPLE_OR_PEAR))
+
+    def testDPRODUCTDAVERAGE(self):
+        self.assertEqual(140.0, emoney.DPRODUCT(DATABASE, 'Yield', APPLE_TALL))
+        self.assertEqual(12.0, emoney.DAVERAGE(DATABASE, 'Yield', APPLE_TALL))
+
+    def testDeviations(self):
+        self.assertAlmostEqual(2.966479395, emoney.DSTDEV(DATABASE, 'Yield', EITHER), 9)
+        self.assertAlmostEqual(2.653299832, emoney.DSTDEVP(DATABASE, 'Yield', EITHER), 9)
+        self.assertAlmostEqual(8.8, emoney.DVAR(DATABASE, 'Yield', EITHER), 9)
+        self.assertAlmostEqual(7.04, emoney.DVARP(DATABASE, 'Yield', EITHER), 9)
+
+    def testDGET(self):
+        self.assertEqual(9, emoney.DGET(DATABASE, 'Yield', [['Tree'], ['Cherry']]))
+        self.assertRaises(easymoney.NumError, emoney.DGET, DATABASE, 'Yield', EITHER)
+        self.assertRaises(easymoney.TypeError, emoney.DGET, DATABASE, 'Yield', [['Tree'], ['Plum']])
+
+    def testEmptySelection(self):
+        nothing = [['Tree'], ['Plum']]
+        self.assertEqual(0.0, emoney.DSUM(DATABASE, 'Profit', nothing))
+        self.assertEqual(0.0, emoney.DMAX(DATABASE, 'Profit', nothing))
+        self.assertRaises(easymoney.ZeroDivisionError, emoney.DAVERAGE, DATABASE, 'Profit', nothing)
+        self.assertRaises(easymoney.ZeroDivisionError, emoney.DVAR, DATABASE, 'Profit', APPLE_TALL[:1] + [['Cherry']])
+
+
+class Criteria(unittest.TestCase):
+
+    def setUp(self):
+        self.table = tables.Table(DATABASE + [[None, 'n/a', 1, 2, 3], ['apricot', 7, 1, 1, 1]])
+
+    def rows(self, label, cell):
+        return self.table.select([[label], [cell]])
+
+    def testTextConditions(self):
+        self.assertEqual([0, 3, 5, 7], self.rows('tree', 'ap'))
+        self.assertEqual([0, 3, 5], self.rows('Tree', '=APPLE'))
+        self.assertEqual([0, 3, 5, 7], self.rows('Tree', 'a*'))
+        self.assertEqual([1, 4], self.rows('Tree', '=p?ar'))
+        self.assertEqual([0, 2, 3, 5, 7], self.rows('Tree', '<d'))
+
+    def testBlankConditions(self):
+        self.assertEqual([6], self.rows('Tree', '='))
+        self.assertEqual([0, 1, 2, 3, 4, 5, 7], self.rows('Tree', '<>'))
+
+    def testNumberConditions(self):
+        self.assertEqual([0, 2, 3], self.rows('Height', '>12'))
+        self.assertEqual([1], self.rows('Height', 12))
+        self.assertEqual([0, 2, 3, 4, 5, 6, 7], self.rows('Height', '<>12'))
+        self.assertEqual([4, 5, 7], self.rows('Height', '<=9'))
+
+    def testEmptyCriteriaRowMatchesAll(self):
+        self.assertEqual(range(8), self.table.select([['Tree'], [None]]))
+
+    def testIndexesAgainstScan(self):
+        rng = random.Random(14)
+        names = ['alpha', 'beta', 'gamma', 'Alpine', 'delta', '', None]
+        rows = [['Name', 'Value']] + [[rng.choice(names), rng.choice([rng.randint(0, 20), 'x', None])]
+                                      for i in xrange(500)]
+        t = tables.Table(rows)
+        cells = ['al', '=alpha', '<>beta', '>=gamma', '*ta', '=', '<>', 5, '>5', '<=10', '<>7', 'x']
+        for label in ('Name', 'Value'):
+            i = t.position(label)
+            for cell in cells:
+                c = tables.Condition.parse(cell)
+                expected = [r for r in xrange(500) if c.matches(t.columns[i][r])]
+                self.assertEqual(expected, t.select([[label], [cell]]))
+
+    def testUnknownField(self):
+        self.assertRaises(easymoney.TypeError, emoney.DSUM, DATABASE, 'Weight', APPLE)
+        self.assertRaises(easymoney.TypeError, emoney.DSUM, DATABASE, 6, APPLE)
+
+    def testAggregatesWithoutField(self):
+        self.assertEqual(3, emoney.DCOUNTA(DATABASE, None, APPLE))
+        for f in (emoney.DSUM, emoney.DAVERAGE, emoney.DMAX, emoney.DMIN, emoney.DGET):
+            self.assertRaises(easymoney.TypeError, f, DATABASE, None, APPLE)
+
+
+class Reuse(unittest.TestCase):
+
+    def testIndexesAndSelectionsAreKept(self):
+        t = tables.Table(DATABASE)
+        first = t.select(APPLE_TALL)
+        index = t.index('Tree')
+        self.assertTrue(first is t.select([list(r) for r in APPLE_TALL]))
+        self.assertTrue(index is t.index('TREE'))
+
+    def testAppendDropsIndexes(self):
+        t = tables.Table(DATABASE)
+        self.assertEqual(225.0, emoney.DSUM(t, 'Profit', APPLE))
+        t.append(['Apple', 10, 10, 10, 10.0])
+        self.assertEqual(235.0, emoney.DSUM(t, 'Profit', APPLE))
+
+    def testSeveralAggregatesInOnePass(self):
+        t = tables.Table(DATABASE)
+        result = t.aggregate('Yield', EITHER, ('sum', 'count', 'average', 'var', 'max'))
+        self.assertEqual({'sum': 48.0, 'count': 5, 'average': 9.6, 'max': 14}, dict(
+            (k, v) for k, v in result.items() if k != 'var'))
+        self.assertAlmostEqual(8.8, result['var'], 9)
+
+    def testListDatabasesAreKept(self):
+        database = [list(r) for r in DATABASE]
+        t = tables.table(database)
+        self.assertTrue(t is tables.table(database))
+        self.assertEqual(225.0, emoney.DSUM(database, 'Profit', APPLE))
+        self.assertTrue(t.index('Tree') is tables.table(database).index('Tree'))
+        # a changed cell or an appended row builds a new Table
+        database[1][4] = 5.0
+        self.assertEqual(125.0, emoney.DSUM(database, 'Profit', APPLE))
+        database.append(['Apple', 10, 10, 10, 10.0])
+        self.assertEqual(135.0, emoney.DSUM(database, 'Profit', APPLE))
+        self.assertFalse(t is tables.table(database))
+        self.assertFalse(tables.table(DATABASE) is tables.table([list(r) for r in DATABASE]))
+
+    def testFromColumns(self):
+        t = tables.Table.fromColumns(['a', 'b'], [[1, 2, 3], [4, 5, 6]])
+        self.assertEqual(11.0, emoney.DSUM(t, 'b', [['a'], ['>1']]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""Unit test for wire.py
+"""
+
+import array
+import easymoney
+import json
+import unittest
+import wire
+
+from decimal import Decimal
+
+emoney = easymoney.EasyMoney()
+
+
+class RoundTrip(unittest.TestCase):
+
+    def testValues(self):
+        values = [None, True, False, 0, -2 ** 63, 2 ** 63, 1.5, float('inf'),
+                  u'\u20ac', 'text', 'a\0b', Decimal('-12.30'), [], [1, 'x'], {}, {'a': {'b': [None]}}]
+        for x in values:
+            self.assertEqual(x, wire.loads(wire.dumps(x)))
+        self.assertEqual(Decimal, type(wire.loads(wire.dumps(Decimal('1.0')))))
+
+    def testColumns(self):
+        cases = [([1.5, -2.25, 1e300], 'd'), ([1, -2, 2 ** 62], 'q'),
+                 (array.array('d', [1, 2]), 'd'), (array.array('i', [3, 4]), 'q')]
+        for x, code in cases:
+            data = wire.dumps(x)
+            self.assertEqual('c' + code, data[4:6])
+            y = wire.loads(data)
+            self.assertEqual(list(x), list(y))
+            self.assertEqual(sum(x), emoney.SUM(y))
+        # items that do not all fit one column stay a list
+        self.assertEqual('l', wire.dumps([1, 2.5])[4])
+        self.assertEqual('l', wire.dumps([1, 2 ** 64])[4])
+        self.assertEqual('l', wire.dumps([True, False])[4])
+        if wire.numpy is not None:
+            flags = wire.numpy.array([True, False])
+            self.assertEqual(None, wire.columnBytes(None, flags))
+            self.assertEqual([True, False], wire.loads(wire.dumps(flags)))
+
+    def testMatricesKeepTheirRows(self):
+        if wire.numpy is not None:
+            m = wire.numpy.arange(6.0).reshape((2, 3))
+            self.assertEqual(None, wire.columnBytes(None, m))
+            rows = wire.loads(wire.dumps({'value': m}))['value']
+            self.assertEqual([[0.0, 1.0, 2.0], [3.0, 4.0, 5.0]], [list(r) for r in rows])
+            product = emoney.fMMULT([[1.0, 2.0], [3.0, 4.0]], [[1.0, 0.0], [0.0, 1.0]])
+            self.assertEqual(2, len(wire.loads(wire.dumps(product))))
+
+    def testColumnsAreAligned(self):
+        data = wire.dumps({'x': 'abc', 'y': [1.0, 2.0]})
+        start = data.index(array.array('d', [1.0, 2.0]).tostring())
+        self.assertEqual(0, start % 8)
+
+    def testSheet(self):
+        sheet = {'A1': {'value': 1.5, 'type': 'number'},
+                 'A2': {'value': 7, 'type': 'number', 'label': 'qty'},
+                 'A3': {'value': '=A1 * A2', 'type': 'number', 'label': 'total'},
+                 'A4': {'value': True, 'type': 'bool'},
+                 'A5': {'value': None, 'type': 'empty', 'label': ''},
+                 'A6': {'value': 2 ** 70},
+                 'A7': {'value': Decimal('0.10'), 'type': 'money'},
+                 'A8': {'value': {'nested': 1}, 'type': 'other'}}
+        data = wire.dumps(sheet)
+        self.assertEqual('S', data[4])
+        self.assertEqual(sheet, wire.loads(data))
+        self.assertEqual(1, data.count('number'))
+
+    def testFallsBackToJSON(self):
+        self.assertEqual({'args': [1, 2]}, wire.loads(json.dumps({'args': [1, 2]})))
+        self.assertRaises(wire.WireError, wire.loads, 'not json')
+
+    def testBuffers(self):
+        data = wire.dumps([1.0, 2.0, 3.0])
+        for buf in (bytearray(data), memoryview(data), buffer(data)):
+            self.assertEqual([1.0, 2.0, 3.0], list(wire.loads(buf)))
+
+    def testBadMessages(self):
+        data = wire.dumps({'a': [1.0, 2.0], 'b': 'text'})
+        for end in xrange(4, len(data)):
+            self.assertRaises(wire.WireError, wire.loads, data[:end])
+        self.assertRaises(wire.WireError, wire.loads, data + '\0')
+        self.assertRaises(wire.WireError, wire.loads, 'EMW1?')
+        self.assertRaises(wire.WireError, wire.dumps, object())
+        self.assertEqual('x', wire.loads(wire.dumps(object(), lambda o: 'x')))
+
+    def testCorruptMessagesRaiseWireError(self):
+        cells = dict(('A%d' % i, {'value': v, 'type': 't%d' % (i % 3), 'label': 'l'})
+                     for i, v in enumerate([1.0, 2, 'text', None, True, 10 ** 30, [1, 2]]))
+        for data in (wire.dumps({'args': [[1.0, 2.5], [1, 2], 'x', 10 ** 30, {'k': None}]}),
+                     wire.dumps(cells), wire.dumps([u'a\0b', u'c'])):
+            for i in xrange(4, len(data)):
+                for byte in ('\x00', '\x01', '\x7f', '\x80', '\xff'):
+                    try:
+                        wire.loads(data[:i] + byte + data[i + 1:])
+                    except wire.WireError:
+                        pass
+
+
+if __name__ == "__main__":
+    unittest.main()
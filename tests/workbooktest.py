@@ -0,0 +1,106 @@
+"""Unit test for workbook.py
+"""
+
+import workbook
+import unittest
+
+
+def chain():
+    """A1 <- A2 <- A3 <- A4, with B1 independent of the chain"""
+    return workbook.Workbook({
+        'A1': {'value': 1, 'type': 'number'},
+        'A2': {'value': '=A1*2', 'type': 'number'},
+        'A3': {'value': '=A2+A1', 'type': 'number'},
+        'A4': {'value': '=SUM(A1:A3)', 'type': 'number'},
+        'B1': {'value': '=10', 'type': 'number'}})
+
+
+class TestRecalculation(unittest.TestCase):
+
+    def testInitialValues(self):
+        wb = chain()
+        self.assertEqual(6, wb.get('A4'))
+        self.assertEqual(5, wb.lastEvaluated)
+
+    def testEditTouchesDownstreamOnly(self):
+        wb = chain()
+        wb.recalculate()
+        self.assertEqual(4, wb.set('A1', 2))
+        self.assertEqual(set(['A1', 'A2', 'A3', 'A4']), wb.dirty())
+        self.assertEqual(12, wb.get('A4'))
+        self.assertEqual(4, wb.lastEvaluated)
+
+    def testEditLeaf(self):
+        wb = chain()
+        wb.recalculate()
+        self.assertEqual(1, wb.set('A4', '=A3*10'))
+        self.assertEqual(30, wb.get('A4'))
+        self.assertEqual(1, wb.lastEvaluated)
+
+    def testRelink(self):
+        wb = chain()
+        wb.set('A2', '=B1')
+        wb.recalculate()
+        self.assertEqual(set(['A2']), wb.dependents('B1'))
+        self.assertEqual(set(['A3', 'A4']), wb.dependents('A1'))
+        self.assertEqual(4, wb.set('B1', 20))
+        self.assertEqual(21, wb.get('A3'))
+
+    def testForwardReference(self):
+        wb = workbook.Workbook()
+        wb.set('A1', '=A2+1')
+        wb.set('A2', 1)
+        self.assertEqual(2, wb.get('A1'))
+
+    def testDelete(self):
+        wb = chain()
+        wb.recalculate()
+        self.assertEqual(2, wb.delete('A3'))
+        self.assertEqual(1, wb.get('A1'))
+        self.assertEqual('#REF!', wb.get('A4').code)
+        self.assertRaises(workbook.FormulaError, wb.get, 'A3')
+        wb.set('A3', 0)
+        self.assertEqual(3, wb.get('A4'))
+
+
+class TestErrors(unittest.TestCase):
+
+    def testBadCellDoesNotStopTheOthers(self):
+        wb = chain()
+        wb.set('C1', 0)
+        wb.set('C2', '=1/C1')
+        wb.set('C3', '=C2*2')
+        wb.set('C4', '=E1+1')
+        self.assertEqual(6, wb.get('A4'))
+        self.assertEqual(10, wb.get('B1'))
+        self.assertEqual('#DIV/0!', wb.get('C2').code)
+        self.assertEqual('#DIV/0!', wb.get('C3').code)
+        self.assertEqual('#REF!', str(wb.get('C4')))
+        self.assertTrue(isinstance(wb.get('C2').error, ZeroDivisionError))
+
+    def testErrorsClearWhenFixed(self):
+        wb = chain()
+        wb.set('C1', 0)
+        wb.set('C2', '=1/C1')
+        wb.set('C3', '=C2*2')
+        self.assertEqual(workbook.CellError('#DIV/0!', None), wb.get('C3'))
+        wb.set('C1', 4)
+        self.assertEqual(0.5, wb.get('C3'))
+        self.assertEqual(0.25, wb.values()['C2'])
+
+
+class TestCycles(unittest.TestCase):
+
+    def testSelfReference(self):
+        wb = chain()
+        self.assertRaises(workbook.CycleError, wb.set, 'A1', '=A1+1')
+
+    def testIndirectCycle(self):
+        wb = chain()
+        self.assertRaises(workbook.CycleError, wb.set, 'A1', '=A4')
+        # the rejected edit leaves the workbook as it was
+        self.assertEqual(1, wb.get('A1'))
+        self.assertEqual(set(), wb.precedents('A1'))
+
+if __name__ == "__main__":
+    unittest.main()